@@ -30,22 +30,35 @@ INSTALLED_APPS = [
     'produccion',
 ]
 
+# Instrumentación por petición (produccion/instrumentacion.py): consultas SQL,
+# tiempos y cabecera Server-Timing. Apagada no agrega ningún costo.
+PRODUCCION_INSTRUMENTACION = os.environ.get('PRODUCCION_INSTRUMENTACION', 'False') == 'True'
+PRODUCCION_INSTRUMENTACION_MUESTREO = float(os.environ.get('PRODUCCION_INSTRUMENTACION_MUESTREO', '1.0'))
+PRODUCCION_INSTRUMENTACION_UMBRAL_N_MAS_1 = 5
+
 MIDDLEWARE = [
+    'produccion.instrumentacion.InstrumentacionMiddleware',  # primero: mide toda la petición
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'produccion.actividad.UsuarioActividadMiddleware',  # después de auth: quién hizo cada cambio
+    'produccion.replicas.ReplicasMiddleware',  # después de auth: sesiones y usuarios, de la primaria
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'produccion.instrumentacion.InstrumentacionVistaMiddleware',  # último: mide solo la vista
 ]
 
 ROOT_URLCONF = 'game_production.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': (
+            'produccion.instrumentacion.PlantillasInstrumentadas' if PRODUCCION_INSTRUMENTACION
+            else 'django.template.backends.django.DjangoTemplates'
+        ),
         'DIRS': [os.path.join(BASE_DIR,'produccion','templates','produccion')],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -85,6 +98,49 @@ else:
         }
     }
 
+# Réplicas de lectura (produccion/replicas.py): DATABASE_REPLICA_URLS separadas por
+# coma y, opcional, DATABASE_REPLICA_PESOS ("3,1") para repartir las lecturas.
+# En los tests son espejos de 'default'.
+PRODUCCION_REPLICAS = {}
+_pesos_replicas = [int(peso) for peso in os.environ.get('DATABASE_REPLICA_PESOS', '').split(',') if peso.strip()]
+for _numero, _url in enumerate(filter(None, os.environ.get('DATABASE_REPLICA_URLS', '').split(',')), 1):
+    DATABASES[f'replica{_numero}'] = {
+        **dj_database_url.parse(_url.strip(), conn_max_age=600, conn_health_checks=True),
+        'TEST': {'MIRROR': 'default'},
+    }
+    PRODUCCION_REPLICAS[f'replica{_numero}'] = _pesos_replicas[_numero - 1] if _numero <= len(_pesos_replicas) else 1
+
+DATABASE_ROUTERS = ['produccion.replicas.RouterReplicas']
+
+# 'peso' o 'menos_conexiones'; después de un POST el cliente lee de la primaria
+# FIJAR_SEGUNDOS; las réplicas que atrasan más de RETRASO_MAXIMO segundos quedan
+# afuera (se chequean cada CHEQUEO_CADA segundos)
+PRODUCCION_REPLICAS_SELECCION = os.environ.get('PRODUCCION_REPLICAS_SELECCION', 'peso')
+PRODUCCION_REPLICAS_FIJAR_SEGUNDOS = 10
+PRODUCCION_REPLICAS_RETRASO_MAXIMO = 5
+PRODUCCION_REPLICAS_CHEQUEO_CADA = 5
+
+
+# Cache
+# Con REDIS_URL se usa Redis (compartido entre workers); sin él, caché en
+# memoria local de cada proceso. Los fragmentos de produccion/cache_fragmentos.py
+# se invalidan por fecha leída de la BD, así que valen con cualquiera de las dos.
+
+if 'REDIS_URL' in os.environ:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'game-production',
+        }
+    }
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -132,6 +188,61 @@ MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
 
+# Búsqueda de texto completo (produccion/busqueda.py)
+# Por defecto se usa el índice nativo del motor; 'memoria' fuerza el índice invertido en memoria,
+# que se reconstruye cada PRODUCCION_BUSQUEDA_RECONSTRUIR segundos para ver cambios de otros workers
+PRODUCCION_BUSQUEDA_MOTOR = os.environ.get('PRODUCCION_BUSQUEDA_MOTOR') or None
+PRODUCCION_BUSQUEDA_RECONSTRUIR = 300
+
+# Selectores con autocompletado (produccion/autocompletar.py): cada cuántos segundos se
+# reconstruye el índice de nombres de cada proceso
+PRODUCCION_AUTOCOMPLETAR_RECONSTRUIR = 60
+
+# Registro de actividad (produccion/actividad.py): los eventos se escriben en lotes desde un hilo
+# de fondo cada INTERVALO_MS milisegundos o al juntar LOTE eventos; ASINCRONA = False los escribe en el acto
+PRODUCCION_ACTIVIDAD_ASINCRONA = os.environ.get('PRODUCCION_ACTIVIDAD_ASINCRONA', 'True') == 'True'
+PRODUCCION_ACTIVIDAD_LOTE = 200
+PRODUCCION_ACTIVIDAD_INTERVALO_MS = 500
+PRODUCCION_ACTIVIDAD_MAXIMO = 50_000
+
+# Borrado de proyectos (produccion/eliminacion.py): filas por cada DELETE del comando
+# eliminar_proyectos_pendientes, que borra los hijos de los proyectos marcados
+PRODUCCION_ELIMINACION_LOTE = 1000
+
+# Archivos de los assets (produccion/almacen.py): se guardan una vez por SHA-256 en
+# PRODUCCION_ARCHIVOS_DIR; las subidas por trozos van de a TROZO bytes, hasta MAXIMO por archivo
+PRODUCCION_ARCHIVOS_DIR = os.environ.get('PRODUCCION_ARCHIVOS_DIR') or os.path.join(MEDIA_ROOT, 'archivos')
+PRODUCCION_ARCHIVOS_TROZO = 8 * 1024 * 1024
+PRODUCCION_ARCHIVOS_MAXIMO = 4 * 1024 ** 3
+
+# Vistas previas de los archivos (produccion/derivados.py): PROCESOS procesos las generan
+# en segundo plano (0 = solo con el comando generar_derivados); la carpeta se poda por
+# LRU al pasar de MAXIMO bytes
+PRODUCCION_DERIVADOS_DIR = os.environ.get('PRODUCCION_DERIVADOS_DIR') or os.path.join(MEDIA_ROOT, 'derivados')
+PRODUCCION_DERIVADOS_PROCESOS = int(os.environ.get('PRODUCCION_DERIVADOS_PROCESOS', 2))
+PRODUCCION_DERIVADOS_MAXIMO = 2 * 1024 ** 3
+
+# Descargas de archivos (produccion/descargas.py): '' las envía el worker (sendfile bajo
+# gunicorn), 'x-accel' las delega a nginx en la location interna PREFIJO y 'x-sendfile'
+# a Apache/lighttpd
+PRODUCCION_DESCARGAS_MODO = os.environ.get('PRODUCCION_DESCARGAS_MODO', '')
+PRODUCCION_DESCARGAS_PREFIJO = '/archivos-internos/'
+
+
+# Logging: las líneas JSON de la instrumentación van a la consola
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'consola': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'produccion': {'handlers': ['consola'], 'level': 'INFO', 'propagate': False},
+    },
+}
+
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
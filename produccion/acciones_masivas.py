@@ -0,0 +1,180 @@
+from collections import Counter
+from itertools import islice
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from . import actividad
+from .filtros import filtrar_tareas
+from .models import Tarea, Etiqueta, ResumenTareas
+from .signals import actualizacion_masiva
+
+
+# Cambios masivos sobre tareas (cierre de sprint, re-etiquetado): estado,
+# prioridad y agregar/quitar etiquetas a una selección de tareas, todo en una
+# transacción y con operaciones por conjunto en vez de guardar tarea por tarea:
+#   - estado/prioridad: un UPDATE por lote de ids, más el ajuste de ResumenTareas
+#     y un evento de Actividad por tarea que cambió
+#   - agregar etiquetas: un INSERT ... SELECT por lote que omite los pares existentes
+#   - quitar etiquetas: un DELETE directo sobre la tabla intermedia por lote
+# La selección son ids explícitos o los mismos filtros de la lista de tareas.
+
+# Ids por sentencia: mantiene cada IN (...) bajo el límite de parámetros de
+# SQLite y Oracle y evita UPDATE ... WHERE id IN (SELECT ...) sobre la misma
+# tabla, que MySQL no permite
+TAMAÑO_LOTE = 1000
+
+
+class SeleccionInvalida(ValueError):
+    pass
+
+
+def _lotes(ids, tamaño=TAMAÑO_LOTE):
+    iterador = iter(ids)
+    while lote := list(islice(iterador, tamaño)):
+        yield lote
+
+
+def _insertar_etiquetas(tarea_ids, etiqueta_ids):
+    # INSERT ... SELECT en la BD: sin crear un objeto del modelo intermedio por
+    # par (eso era el 90% del tiempo con bulk_create). Devuelve las filas insertadas.
+    Through = Tarea.etiquetas.through
+    q = connection.ops.quote_name
+    col_tarea = q(Through._meta.get_field('tarea').column)
+    col_etiqueta = q(Through._meta.get_field('etiqueta').column)
+    intermedia = q(Through._meta.db_table)
+    marcas_tareas = ', '.join(['%s'] * len(tarea_ids))
+    marcas_etiquetas = ', '.join(['%s'] * len(etiqueta_ids))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {intermedia} ({col_tarea}, {col_etiqueta}) '
+            f'SELECT t.id, e.id FROM {q(Tarea._meta.db_table)} t, {q(Etiqueta._meta.db_table)} e '
+            f'WHERE t.id IN ({marcas_tareas}) AND e.id IN ({marcas_etiquetas}) '
+            f'AND NOT EXISTS (SELECT 1 FROM {intermedia} x '
+            f'WHERE x.{col_tarea} = t.id AND x.{col_etiqueta} = e.id)',
+            [*tarea_ids, *etiqueta_ids],
+        )
+        return cursor.rowcount
+
+
+def _bloquear(tarea_ids):
+    # Valores actuales del lote, bloqueados hasta el UPDATE para que nadie
+    # cambie su estado en el medio: (id, proyecto_id, titulo, estado, prioridad).
+    # Quedan afuera las de un proyecto marcado para borrar después de elegirlas.
+    return list(
+        Tarea.objects.visibles().select_for_update().filter(id__in=tarea_ids).order_by()
+        .values_list('id', 'proyecto_id', 'titulo', 'estado', 'prioridad')
+    )
+
+
+def _deltas_resumen(filas, cambios):
+    # Lo que el UPDATE de `cambios` mueve entre filas de ResumenTareas
+    deltas = Counter()
+    for _, proyecto_id, _, estado, prioridad in filas:
+        deltas[(proyecto_id, estado, prioridad)] -= 1
+        deltas[(proyecto_id, cambios.get('estado', estado), cambios.get('prioridad', prioridad))] += 1
+    return deltas
+
+
+def _eventos(filas, cambios, agregar, quitar):
+    # Un evento de Actividad por tarea, con lo que efectivamente cambia de
+    # estado/prioridad y las etiquetas pedidas
+    eventos = []
+    for pk, proyecto_id, titulo, estado, prioridad in filas:
+        actuales = {'estado': estado, 'prioridad': prioridad}
+        diferencias = {
+            campo: [actuales[campo], valor] for campo, valor in cambios.items() if actuales[campo] != valor
+        }
+        if agregar or quitar:
+            diferencias['etiquetas'] = {'agregadas': sorted(agregar), 'quitadas': sorted(quitar)}
+        if diferencias:
+            eventos.append(actividad.nuevo_evento('tarea', pk, proyecto_id, titulo, 'editar', diferencias))
+    return eventos
+
+
+def seleccionar_tareas(ids=None, filtros=None):
+    # Devuelve el queryset de la selección. Sin ids ni filtros se rechaza,
+    # para que un formulario vacío no termine cambiando todas las tareas.
+    if ids:
+        try:
+            ids = {int(pk) for pk in ids}
+        except (TypeError, ValueError):
+            raise SeleccionInvalida('Los ids de tareas deben ser números enteros.')
+        return Tarea.objects.visibles().filter(id__in=ids)
+
+    queryset, activos = filtrar_tareas(Tarea.objects.visibles(), filtros or {})
+    if not activos:
+        raise SeleccionInvalida('Indica ids de tareas o al menos un filtro válido.')
+    return queryset
+
+
+def aplicar(tareas, estado=None, prioridad=None, agregar_etiquetas=(), quitar_etiquetas=()):
+    # Aplica los cambios a la selección `tareas` (queryset) y devuelve los conteos
+    if estado is not None and estado not in dict(Tarea.ESTADO_CHOICES):
+        raise SeleccionInvalida(f'Estado no válido: "{estado}".')
+    if prioridad is not None and prioridad not in dict(Tarea.PRIORIDAD_CHOICES):
+        raise SeleccionInvalida(f'Prioridad no válida: "{prioridad}".')
+
+    if estado is None and prioridad is None and not agregar_etiquetas and not quitar_etiquetas:
+        raise SeleccionInvalida('No se indicó ningún cambio.')
+
+    agregar = set(agregar_etiquetas) - set(quitar_etiquetas)
+    quitar = set(quitar_etiquetas)
+    existentes = set(Etiqueta.objects.filter(id__in=agregar | quitar).values_list('id', flat=True))
+    if (agregar | quitar) - existentes:
+        faltantes = ', '.join(str(pk) for pk in sorted((agregar | quitar) - existentes))
+        raise SeleccionInvalida(f'No existen las etiquetas: {faltantes}.')
+
+    cambios = {}
+    if estado is not None:
+        cambios['estado'] = estado
+    if prioridad is not None:
+        cambios['prioridad'] = prioridad
+
+    resultado = {
+        'seleccionadas': 0,
+        'actualizadas': 0,
+        'etiquetas_agregadas': 0,
+        'etiquetas_quitadas': 0,
+    }
+    Through = Tarea.etiquetas.through
+
+    with transaction.atomic():
+        # Se fija la selección al principio: si los cambios afectan al filtro
+        # (ej: estado=pendiente -> completada) no deben cambiar qué filas se tocan
+        filas = list(tareas.order_by().values_list('id', 'proyecto_id'))
+        ids = [pk for pk, _ in filas]
+        resultado['seleccionadas'] = len(ids)
+        ahora = timezone.now()
+
+        eventos = []
+        for lote in _lotes(ids):
+            filas_lote = _bloquear(lote)
+            lote = [pk for pk, *_ in filas_lote]
+            if not lote:
+                continue
+            eventos += _eventos(filas_lote, cambios, agregar, quitar)
+            if cambios:
+                ResumenTareas.sumar(_deltas_resumen(filas_lote, cambios))
+                resultado['actualizadas'] += Tarea.objects.filter(id__in=lote).update(
+                    fecha_actualizacion=ahora, **cambios
+                )
+
+            if quitar:
+                borradas, _ = Through.objects.filter(tarea_id__in=lote, etiqueta_id__in=quitar).delete()
+                resultado['etiquetas_quitadas'] += borradas
+
+            if agregar:
+                resultado['etiquetas_agregadas'] += _insertar_etiquetas(lote, sorted(agregar))
+
+            if not cambios and (quitar or agregar):
+                # Solo cambiaron etiquetas: igual cuenta como actualización de la tarea (ETag)
+                Tarea.objects.filter(id__in=lote).update(fecha_actualizacion=ahora)
+
+        actividad.registrar(*eventos)
+        if ids:
+            actualizacion_masiva.send(
+                sender=Tarea, ids=ids, proyecto_ids={proyecto_id for _, proyecto_id in filas}
+            )
+
+    return resultado
@@ -0,0 +1,154 @@
+import atexit
+import logging
+import threading
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections, transaction
+from django.utils import timezone
+
+from .models import Proyecto, Asset, Tarea, Actividad
+
+
+# Registro de actividad (modelo Actividad) sin sumar escrituras al request.
+# Las señales (ver signals.py) arman cada evento y, cuando la transacción del
+# cambio se confirma, lo dejan en un buffer en memoria del proceso. Un hilo de
+# fondo lo escribe con un solo bulk_create cada PRODUCCION_ACTIVIDAD_INTERVALO_MS
+# milisegundos, o antes si se juntan PRODUCCION_ACTIVIDAD_LOTE eventos, y lo
+# que quede se escribe al terminar el proceso (atexit).
+# Con PRODUCCION_ACTIVIDAD_ASINCRONA = False cada evento se escribe en el acto.
+#
+# Si la BD falla los eventos vuelven al buffer (hasta PRODUCCION_ACTIVIDAD_MAXIMO;
+# de ahí en más se descartan los más viejos). Si el proceso muere de golpe se
+# pierde a lo sumo lo del último intervalo.
+
+logger = logging.getLogger('produccion.actividad')
+
+# Usuario de la petición en curso (lo fija UsuarioActividadMiddleware)
+usuario_actual = ContextVar('usuario_actual', default=None)
+
+# Campos que se registran de cada modelo
+CAMPOS = {
+    Proyecto: ('nombre', 'descripcion', 'fecha_inicio', 'estado'),
+    Asset: ('nombre', 'tipo', 'descripcion', 'proyecto_id', 'archivo_id'),
+    Tarea: ('titulo', 'descripcion', 'estado', 'prioridad', 'proyecto_id'),
+}
+
+TIPO = {
+    Proyecto: 'proyecto',
+    Asset: 'asset',
+    Tarea: 'tarea',
+}
+
+
+def _config(nombre, defecto):
+    return getattr(settings, f'PRODUCCION_ACTIVIDAD_{nombre}', defecto)
+
+
+class BufferActividad:
+
+    def __init__(self):
+        self._eventos = []
+        self._lock = threading.Lock()
+        self._despertar = threading.Event()   # lote lleno: escribir sin esperar el intervalo
+        self._hilo = None
+
+    def agregar(self, eventos):
+        with self._lock:
+            self._eventos.extend(eventos)
+            pendientes = len(self._eventos)
+        if not _config('ASINCRONA', True):
+            self.vaciar()
+            return
+        self._asegurar_hilo()
+        if pendientes >= _config('LOTE', 200):
+            self._despertar.set()
+
+    def _asegurar_hilo(self):
+        # También después de un fork (gunicorn --preload): el hilo no pasa al hijo
+        if self._hilo is not None and self._hilo.is_alive():
+            return
+        with self._lock:
+            if self._hilo is None or not self._hilo.is_alive():
+                self._hilo = threading.Thread(target=self._trabajar, name='buffer-actividad', daemon=True)
+                self._hilo.start()
+
+    def _trabajar(self):
+        while True:
+            self._despertar.wait(_config('INTERVALO_MS', 500) / 1000)
+            self._despertar.clear()
+            self.vaciar()
+            close_old_connections()  # la conexión de este hilo respeta CONN_MAX_AGE
+
+    def vaciar(self):
+        # Escribe lo pendiente; devuelve cuántos eventos se guardaron
+        with self._lock:
+            eventos, self._eventos = self._eventos, []
+        if not eventos:
+            return 0
+        try:
+            Actividad.objects.bulk_create(eventos, batch_size=500)
+        except DatabaseError:
+            logger.exception('No se pudieron guardar %d eventos de actividad', len(eventos))
+            with self._lock:
+                self._eventos[:0] = eventos
+                sobrantes = len(self._eventos) - _config('MAXIMO', 50_000)
+                if sobrantes > 0:
+                    del self._eventos[:sobrantes]
+                    logger.error('Se descartaron %d eventos de actividad (buffer lleno)', sobrantes)
+            return 0
+        return len(eventos)
+
+
+buffer = BufferActividad()
+atexit.register(buffer.vaciar)
+
+
+def valores(objeto):
+    # Valores actuales de los campos registrados (solo los cargados: con
+    # only()/defer() los demás no se comparan)
+    return {campo: objeto.__dict__[campo] for campo in CAMPOS[type(objeto)] if campo in objeto.__dict__}
+
+
+def _usuario_id():
+    usuario = usuario_actual.get()
+    return usuario.pk if usuario is not None and usuario.is_authenticated else None
+
+
+def nuevo_evento(tipo, objeto_id, proyecto_id, descripcion, accion, cambios):
+    return Actividad(
+        fecha=timezone.now(),
+        usuario_id=_usuario_id(),
+        proyecto_id=proyecto_id,
+        tipo=tipo,
+        objeto_id=objeto_id,
+        accion=accion,
+        descripcion=descripcion[:200],
+        cambios=cambios,
+    )
+
+
+def evento(objeto, accion, cambios):
+    proyecto_id = objeto.pk if isinstance(objeto, Proyecto) else objeto.proyecto_id
+    return nuevo_evento(TIPO[type(objeto)], objeto.pk, proyecto_id, str(objeto), accion, cambios)
+
+
+def registrar(*eventos):
+    # Los eventos entran al buffer solo si la transacción del cambio se confirma
+    if eventos:
+        transaction.on_commit(lambda: buffer.agregar(eventos))
+
+
+class UsuarioActividadMiddleware:
+    # Deja request.user (sin evaluar: no cuesta consultas si no hay cambios)
+    # a mano de las señales. Va después de AuthenticationMiddleware.
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = usuario_actual.set(getattr(request, 'user', None))
+        try:
+            return self.get_response(request)
+        finally:
+            usuario_actual.reset(token)
@@ -1,43 +1,174 @@
 from django.contrib import admin
-from .models import Proyecto, DetalleProyecto, Asset, Tarea, Etiqueta
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.urls import reverse
+from . import eliminacion
+from .autocompletar import FUENTES
+from .models import Proyecto, DetalleProyecto, Asset, Archivo, Tarea, Etiqueta, Actividad
+from .paginacion import PaginadorEstimado
+
+
+# ========== FILTROS CON AUTOCOMPLETADO ==========
+# Un list_filter sobre una FK lista todas las filas del modelo relacionado en
+# la barra lateral (10.000 proyectos = 10.000 links en cada carga). Estos
+# filtros solo consultan la opción elegida y el resto lo busca el mismo
+# autocompletado de los formularios (autocompletar.py).
+class FiltroAutocompletar(admin.SimpleListFilter):
+    template = 'admin/produccion/filtro_autocompletar.html'
+    tipo = None    # clave de autocompletar.FUENTES
+    campo = None   # lookup del filtro, ej: 'proyecto_id'
+
+    def lookups(self, request, model_admin):
+        valor = self.value()
+        if not (valor and valor.isdigit()):
+            return []
+        modelo, campo_nombre = FUENTES[self.tipo]
+        return list(modelo.objects.filter(pk=valor).order_by().values_list('pk', campo_nombre))
+
+    def has_output(self):
+        return True  # siempre se muestra, aunque todavía no haya nada elegido
+
+    def queryset(self, request, queryset):
+        valor = self.value()
+        if valor and valor.isdigit():
+            return queryset.filter(**{self.campo: valor})
+        return queryset
+
+    @property
+    def url_autocompletar(self):
+        return reverse('opciones_autocompletar', args=[self.tipo])
+
+
+class FiltroProyecto(FiltroAutocompletar):
+    title = 'proyecto'
+    parameter_name = 'proyecto'
+    tipo = 'proyectos'
+    campo = 'proyecto_id'
+
+
+class FiltroEtiqueta(FiltroAutocompletar):
+    title = 'etiqueta'
+    parameter_name = 'etiqueta'
+    tipo = 'etiquetas'
+    campo = 'etiquetas'
+
+
+class AdminGrande(admin.ModelAdmin):
+    # Para tablas que pueden llegar a millones de filas: total estimado sin
+    # filtros (ver paginacion.PaginadorEstimado) y sin el COUNT(*) extra que
+    # el admin hace para mostrar "(N en total)" al filtrar
+    paginator = PaginadorEstimado
+    show_full_result_count = False
+
+    class Media:
+        css = {'all': ('produccion/css/admin.css',)}
+        js = ('produccion/js/autocompletar.js', 'produccion/js/filtro_admin.js')
+
 
 @admin.register(Proyecto)
-class ProyectoAdmin(admin.ModelAdmin):
-    list_display = ('nombre', 'estado', 'fecha_inicio', 'contar_assets', 'contar_tareas')
-    list_filter = ('estado', 'fecha_inicio')
+class ProyectoAdmin(AdminGrande):
+    # Los marcados para borrar se siguen listando (con su marca) hasta que el
+    # comando termina: filtrarlos le quitaría al paginador el total estimado
+    list_display = ('nombre', 'estado', 'fecha_inicio', 'contar_assets', 'contar_tareas', 'pendiente_eliminacion')
+    list_filter = ('estado', 'fecha_inicio', 'pendiente_eliminacion')
     search_fields = ('nombre', 'descripcion')
-    
+
+    # Los conteos vienen anotados en la misma consulta del listado (sin N+1)
+    def get_queryset(self, request):
+        return super().get_queryset(request).con_estadisticas()
+
+    # Borrar marca los proyectos y el resto lo hace eliminar_proyectos_pendientes
+    # (ver eliminacion.py). La confirmación no lista cada asset y tarea: para
+    # eso el admin recorre el CASCADE completo con el Collector.
+    def get_deleted_objects(self, objs, request):
+        objs = list(objs)
+        return [str(obj) for obj in objs], {Proyecto._meta.verbose_name_plural: len(objs)}, set(), []
+
+    def delete_model(self, request, obj):
+        eliminacion.marcar(obj)
+
+    def delete_queryset(self, request, queryset):
+        eliminacion.marcar(*queryset)
+
+    @admin.display(description='Assets', ordering='num_assets')
     def contar_assets(self, obj):
-        return obj.assets.count()
-    contar_assets.short_description = 'Assets'
-    
+        return obj.num_assets
+
+    @admin.display(description='Tareas', ordering='num_tareas')
     def contar_tareas(self, obj):
-        return obj.tareas.count()
-    contar_tareas.short_description = 'Tareas'
+        return obj.num_tareas
 
 @admin.register(DetalleProyecto)
-class DetalleProyectoAdmin(admin.ModelAdmin):
+class DetalleProyectoAdmin(AdminGrande):
     list_display = ('proyecto', 'plataforma', 'engine', 'tamaño_equipo')
     search_fields = ('proyecto__nombre', 'plataforma', 'engine')
+    autocomplete_fields = ('proyecto',)
 
 @admin.register(Asset)
-class AssetAdmin(admin.ModelAdmin):
+class AssetAdmin(AdminGrande):
     list_display = ('nombre', 'tipo', 'proyecto', 'fecha_creacion')
-    list_filter = ('tipo', 'proyecto', 'fecha_creacion')
+    list_filter = ('tipo', FiltroProyecto, 'fecha_creacion')
     search_fields = ('nombre', 'descripcion')
+    autocomplete_fields = ('proyecto',)
+    raw_id_fields = ('archivo',)
+
+@admin.register(Archivo)
+class ArchivoAdmin(AdminGrande):
+    # Solo lectura: los crea almacen.py al subir y los borra limpiar_archivos
+    list_display = ('sha256', 'tamaño', 'tipo_mime', 'fecha_creacion')
+    search_fields = ('=sha256',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
 
 @admin.register(Tarea)
-class TareaAdmin(admin.ModelAdmin):
+class TareaAdmin(AdminGrande):
     list_display = ('titulo', 'proyecto', 'estado', 'prioridad', 'fecha_creacion')
-    list_filter = ('estado', 'prioridad', 'proyecto', 'fecha_creacion')
+    list_filter = ('estado', 'prioridad', FiltroProyecto, FiltroEtiqueta, 'fecha_creacion')
     search_fields = ('titulo', 'descripcion')
-    filter_horizontal = ('etiquetas',)
+    autocomplete_fields = ('proyecto', 'etiquetas')
 
 @admin.register(Etiqueta)
-class EtiquetaAdmin(admin.ModelAdmin):
+class EtiquetaAdmin(AdminGrande):
     list_display = ('nombre', 'contar_tareas')
     search_fields = ('nombre',)
-    
+
+    # Subconsulta correlacionada por la FK de la tabla intermedia en vez de
+    # JOIN + GROUP BY: solo se calcula para las etiquetas de la página, sin
+    # agrupar antes todas las filas de la tabla intermedia
+    def get_queryset(self, request):
+        Through = Tarea.etiquetas.through
+        conteo = (
+            Through.objects.filter(etiqueta=OuterRef('pk'))
+            .order_by().values('etiqueta').annotate(total=Count('id')).values('total')
+        )
+        return super().get_queryset(request).annotate(
+            num_tareas=Coalesce(Subquery(conteo, output_field=IntegerField()), 0)
+        )
+
+    @admin.display(description='Tareas', ordering='num_tareas')
     def contar_tareas(self, obj):
-        return obj.tareas.count()
-    contar_tareas.short_description = 'Tareas'
+        return obj.num_tareas
+
+@admin.register(Actividad)
+class ActividadAdmin(AdminGrande):
+    # Solo lectura: el historial se escribe desde actividad.py y se poda con compactar_actividad
+    list_display = ('fecha', 'accion', 'tipo', 'descripcion', 'proyecto_id', 'usuario')
+    list_filter = ('accion', 'tipo', FiltroProyecto, 'fecha')
+    list_select_related = ('usuario',)
+    search_fields = ('descripcion',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,225 @@
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Archivo, Asset, Subida
+
+
+# Almacén de los archivos de los assets, direccionado por contenido: cada
+# archivo se guarda una sola vez en PRODUCCION_ARCHIVOS_DIR/ab/cd/<sha256>
+# (modelo Archivo) y los assets apuntan a él, así el mismo binario subido a
+# diez proyectos ocupa lugar una vez. Se sube de dos maneras:
+#   - guardar(): un archivo entero que ya llega en trozos (el FileField del
+#     formulario; Django lo deja en un temporal en disco, no en memoria)
+#   - iniciar() + recibir(): subida por trozos y reanudable (API /api/v1/subidas/,
+#     la usa static/produccion/js/subidas.js). Cada trozo se escribe en su
+#     posición del archivo parcial y `Subida.recibido` marca hasta dónde llegó.
+# En los dos casos el SHA-256 se calcula mientras se escribe, de a BLOQUE
+# bytes, sin tener nunca el archivo entero en memoria. El hash de una subida
+# en curso vive en la memoria del proceso (_HashesEnCurso); si el trozo
+# siguiente llega a otro worker o después de un reinicio, se recalcula
+# releyendo del disco lo ya recibido.
+
+BLOQUE = 1024 * 1024
+
+
+class SubidaInvalida(ValueError):
+    pass
+
+
+class DesfaseSubida(SubidaInvalida):
+    # El trozo no empieza donde terminó lo recibido: el cliente debe seguir desde `recibido`
+
+    def __init__(self, recibido):
+        super().__init__(f'El trozo debe empezar en el byte {recibido}.')
+        self.recibido = recibido
+
+
+def _config(nombre, defecto):
+    return getattr(settings, f'PRODUCCION_ARCHIVOS_{nombre}', defecto)
+
+
+def directorio():
+    return _config('DIR', os.path.join(settings.MEDIA_ROOT, 'archivos'))
+
+
+def ruta(sha256):
+    return os.path.join(directorio(), sha256[:2], sha256[2:4], sha256)
+
+
+def _directorio_parciales():
+    # Dentro del almacén: mover un parcial terminado a su ruta final es un os.replace() atómico
+    carpeta = os.path.join(directorio(), 'parciales')
+    os.makedirs(carpeta, exist_ok=True)
+    return carpeta
+
+
+def ruta_parcial(subida):
+    return os.path.join(_directorio_parciales(), f'{subida.token.hex}.parte')
+
+
+def _consolidar(temporal, sha256, tamaño, tipo_mime):
+    # Deja el contenido en su ruta definitiva (si ya estaba, descarta la copia).
+    # Devuelve (Archivo, nuevo); nuevo=False es un duplicado.
+    destino = ruta(sha256)
+    if os.path.exists(destino):
+        os.remove(temporal)
+        os.utime(destino)  # recién usado: limpiar_archivos no lo borra aunque no tenga assets todavía
+    else:
+        os.makedirs(os.path.dirname(destino), exist_ok=True)
+        os.chmod(temporal, 0o644)
+        os.replace(temporal, destino)
+    return Archivo.objects.get_or_create(sha256=sha256, defaults={'tamaño': tamaño, 'tipo_mime': tipo_mime})
+
+
+def guardar(trozos, tipo_mime=''):
+    # Guarda un archivo que llega como iterable de bytes (UploadedFile.chunks(),
+    # iter(partial(f.read, BLOQUE), b''), ...). Devuelve (Archivo, nuevo).
+    descriptor, temporal = tempfile.mkstemp(dir=_directorio_parciales(), suffix='.parte')
+    sha256 = hashlib.sha256()
+    tamaño = 0
+    try:
+        with os.fdopen(descriptor, 'wb') as destino:
+            for trozo in trozos:
+                sha256.update(trozo)
+                destino.write(trozo)
+                tamaño += len(trozo)
+        return _consolidar(temporal, sha256.hexdigest(), tamaño, tipo_mime)
+    except BaseException:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+        raise
+
+
+# ========== SUBIDAS POR TROZOS ==========
+class _HashesEnCurso:
+    # subida -> (bytes hasheados, hash) de las últimas subidas que pasaron por este proceso
+
+    def __init__(self, maximo=256):
+        self.maximo = maximo
+        self._hashes = OrderedDict()
+        self._lock = threading.Lock()
+
+    def tomar(self, pk, recibido):
+        with self._lock:
+            guardado = self._hashes.get(pk)
+        if guardado is not None and guardado[0] == recibido:
+            return guardado[1].copy()
+        return None
+
+    def guardar(self, pk, recibido, sha256):
+        with self._lock:
+            self._hashes[pk] = (recibido, sha256)
+            self._hashes.move_to_end(pk)
+            while len(self._hashes) > self.maximo:
+                self._hashes.popitem(last=False)
+
+    def quitar(self, pk):
+        with self._lock:
+            self._hashes.pop(pk, None)
+
+
+hashes_en_curso = _HashesEnCurso()
+
+
+def iniciar(nombre_archivo, tamaño, tipo_mime='', asset=None):
+    # Abre una subida de `tamaño` bytes. No se deduplica por un hash que diga el
+    # cliente (conocer el sha256 no prueba tener el archivo): eso pasa en
+    # _consolidar(), con el contenido ya recibido y hasheado.
+    if tamaño < 1:
+        raise SubidaInvalida('El archivo está vacío.')
+    maximo = _config('MAXIMO', 4 * 1024 ** 3)
+    if tamaño > maximo:
+        raise SubidaInvalida(f'El archivo supera el máximo de {maximo} bytes.')
+
+    return Subida.objects.create(
+        nombre_archivo=os.path.basename(nombre_archivo)[:255], tipo_mime=tipo_mime[:100],
+        tamaño=tamaño, asset=asset,
+    )
+
+
+def _hash_hasta(subida):
+    # sha256 de los primeros `recibido` bytes de la subida
+    sha256 = hashes_en_curso.tomar(subida.pk, subida.recibido)
+    if sha256 is not None:
+        return sha256
+    sha256 = hashlib.sha256()
+    restantes = subida.recibido
+    if not restantes:
+        return sha256
+    try:
+        with open(ruta_parcial(subida), 'rb') as parcial:
+            while restantes:
+                bloque = parcial.read(min(BLOQUE, restantes))
+                if not bloque:
+                    break
+                sha256.update(bloque)
+                restantes -= len(bloque)
+    except FileNotFoundError:
+        pass
+    if restantes:
+        raise SubidaInvalida('Se perdió parte de lo recibido: hay que subir el archivo de nuevo.')
+    return sha256
+
+
+def recibir(subida, inicio, flujo, largo):
+    # Escribe `largo` bytes leídos de `flujo` (el request) a partir de `inicio`,
+    # que tiene que ser lo ya recibido. Un trozo cortado a la mitad no cuenta:
+    # el cliente lo repite desde `recibido`. Devuelve la subida actualizada.
+    with transaction.atomic():
+        subida = Subida.objects.select_for_update().get(pk=subida.pk)
+        if subida.archivo_id is not None:
+            raise SubidaInvalida('La subida ya está completa.')
+        if inicio != subida.recibido:
+            raise DesfaseSubida(subida.recibido)
+        if largo < 1 or inicio + largo > subida.tamaño:
+            raise SubidaInvalida('El trozo se pasa del tamaño declarado.')
+
+        sha256 = _hash_hasta(subida)
+        comienzo = time.monotonic()
+        escritos = 0
+        descriptor = os.open(ruta_parcial(subida), os.O_RDWR | os.O_CREAT, 0o600)
+        with os.fdopen(descriptor, 'r+b') as parcial:
+            parcial.seek(inicio)
+            while escritos < largo:
+                trozo = flujo.read(min(BLOQUE, largo - escritos))
+                if not trozo:
+                    break
+                parcial.write(trozo)
+                sha256.update(trozo)
+                escritos += len(trozo)
+        if escritos < largo:
+            raise SubidaInvalida(f'El trozo llegó incompleto ({escritos} de {largo} bytes).')
+
+        subida.recibido += escritos
+        subida.segundos += time.monotonic() - comienzo
+        if subida.recibido < subida.tamaño:
+            subida.save(update_fields=['recibido', 'segundos', 'fecha_actualizacion'])
+            hashes_en_curso.guardar(subida.pk, subida.recibido, sha256)
+            return subida
+
+        hashes_en_curso.quitar(subida.pk)
+        archivo, nuevo = _consolidar(ruta_parcial(subida), sha256.hexdigest(), subida.tamaño, subida.tipo_mime)
+        _completar(subida, archivo, deduplicada=not nuevo)
+    return subida
+
+
+def _completar(subida, archivo, deduplicada):
+    subida.archivo = archivo
+    subida.deduplicada = deduplicada
+    subida.fecha_completada = timezone.now()
+    subida.save()
+    if subida.asset_id is not None:
+        asset = Asset.objects.filter(pk=subida.asset_id).first()
+        if asset is not None:
+            # save() y no update(): las señales invalidan la caché y registran la actividad
+            asset.archivo = archivo
+            asset.nombre_archivo = subida.nombre_archivo
+            asset.save(update_fields=['archivo', 'nombre_archivo', 'fecha_actualizacion'])
@@ -0,0 +1,436 @@
+import json
+import re
+from datetime import date, timedelta
+from operator import itemgetter
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse
+from django.urls import reverse
+from django.utils import timezone
+from django.views.decorators.http import require_GET, require_POST, require_http_methods
+
+from . import almacen, instantaneas
+from .acciones_masivas import seleccionar_tareas, aplicar, SeleccionInvalida
+from .exportacion import mapa_etiquetas
+from .filtros import filtrar_proyectos, filtrar_assets, filtrar_tareas, filtrar_actividad
+from .models import Proyecto, Asset, Tarea, Etiqueta, Actividad, Subida, progreso_de_proyectos
+from .paginacion import paginar
+
+try:
+    import orjson  # Opcional: si está instalado se usa para serializar (bastante más rápido)
+except ImportError:
+    orjson = None
+
+
+# API JSON versión 1 (/api/v1/...), de lectura salvo las acciones masivas y las subidas.
+# Las respuestas se arman directo desde tuplas de .values_list(), sin crear
+# instancias del modelo ni renderizar templates. Soporta:
+#   ?fields=id,titulo,estado   campos a devolver (sparse fieldsets)
+#   ?estado=...&proyecto=...   los mismos filtros de las listas HTML
+#   ?cursor=...&limite=100     paginación por cursor (keyset)
+
+LIMITE_POR_DEFECTO = 100
+LIMITE_MAXIMO = 500
+
+
+# Cada recurso define sus campos públicos (nombre -> campo del ORM),
+# los campos por defecto, el filtro y la columna de orden para paginar.
+# Los campos especiales (None) se resuelven con una consulta por página:
+# 'etiquetas' de tareas y 'progreso' de proyectos (de los resúmenes por proyecto).
+RECURSOS = {
+    'proyectos': {
+        'queryset': lambda: Proyecto.objects.visibles(),
+        'filtrar': filtrar_proyectos,
+        'orden': 'fecha_inicio',
+        'campos': {
+            'id': 'id',
+            'nombre': 'nombre',
+            'descripcion': 'descripcion',
+            'fecha_inicio': 'fecha_inicio',
+            'estado': 'estado',
+            'plataforma': 'detalle__plataforma',
+            'engine': 'detalle__engine',
+            'tamaño_equipo': 'detalle__tamaño_equipo',
+            'progreso': None,
+        },
+        'por_defecto': ['id', 'nombre', 'fecha_inicio', 'estado'],
+    },
+    'tareas': {
+        'queryset': lambda: Tarea.objects.visibles(),
+        'filtrar': filtrar_tareas,
+        'orden': 'fecha_creacion',
+        'campos': {
+            'id': 'id',
+            'titulo': 'titulo',
+            'descripcion': 'descripcion',
+            'estado': 'estado',
+            'prioridad': 'prioridad',
+            'proyecto_id': 'proyecto_id',
+            'proyecto': 'proyecto__nombre',
+            'fecha_creacion': 'fecha_creacion',
+            'etiquetas': None,
+        },
+        'por_defecto': ['id', 'titulo', 'estado', 'prioridad', 'proyecto_id', 'fecha_creacion'],
+    },
+    'assets': {
+        'queryset': lambda: Asset.objects.visibles(),
+        'filtrar': filtrar_assets,
+        'orden': 'fecha_creacion',
+        'campos': {
+            'id': 'id',
+            'nombre': 'nombre',
+            'tipo': 'tipo',
+            'descripcion': 'descripcion',
+            'proyecto_id': 'proyecto_id',
+            'proyecto': 'proyecto__nombre',
+            'fecha_creacion': 'fecha_creacion',
+            'nombre_archivo': 'nombre_archivo',
+            'sha256': 'archivo__sha256',
+            'tamaño_archivo': 'archivo__tamaño',
+        },
+        'por_defecto': ['id', 'nombre', 'tipo', 'proyecto_id', 'fecha_creacion'],
+    },
+    'actividad': {
+        'queryset': lambda: Actividad.objects.all(),
+        'filtrar': filtrar_actividad,
+        'orden': 'fecha',
+        'campos': {
+            'id': 'id',
+            'fecha': 'fecha',
+            'accion': 'accion',
+            'tipo': 'tipo',
+            'objeto_id': 'objeto_id',
+            'descripcion': 'descripcion',
+            'proyecto_id': 'proyecto_id',
+            'usuario_id': 'usuario_id',
+            'usuario': 'usuario__username',
+            'cambios': 'cambios',
+        },
+        'por_defecto': ['id', 'fecha', 'accion', 'tipo', 'objeto_id', 'usuario_id', 'cambios'],
+    },
+}
+
+
+class ErrorAPI(Exception):
+
+    def __init__(self, mensaje, status=400):
+        super().__init__(mensaje)
+        self.mensaje = mensaje
+        self.status = status
+
+
+# ========== SERIALIZACIÓN ==========
+def _codificar(datos):
+    if orjson is not None:
+        return orjson.dumps(datos, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(datos, cls=DjangoJSONEncoder, ensure_ascii=False, separators=(',', ':'))
+
+
+def respuesta_json(datos, status=200):
+    return HttpResponse(_codificar(datos), content_type='application/json', status=status)
+
+
+def _con_errores(vista):
+    # Convierte ErrorAPI en una respuesta JSON con el status que corresponda
+    def envoltura(request, *args, **kwargs):
+        try:
+            return vista(request, *args, **kwargs)
+        except ErrorAPI as error:
+            return respuesta_json({'error': error.mensaje}, status=error.status)
+    envoltura.__name__ = vista.__name__
+    envoltura.__doc__ = vista.__doc__
+    return envoltura
+
+
+def _campos_pedidos(recurso, request):
+    parametro = request.GET.get('fields')
+    if not parametro:
+        return list(recurso['por_defecto'])
+    pedidos = list(dict.fromkeys(c.strip() for c in parametro.split(',') if c.strip()))
+    desconocidos = [c for c in pedidos if c not in recurso['campos']]
+    if desconocidos:
+        raise ErrorAPI(
+            f"Campos desconocidos: {', '.join(desconocidos)}. "
+            f"Disponibles: {', '.join(recurso['campos'])}"
+        )
+    return pedidos
+
+
+def _limite(request):
+    try:
+        limite = int(request.GET.get('limite', LIMITE_POR_DEFECTO))
+    except ValueError:
+        raise ErrorAPI('limite debe ser un número entero.')
+    return max(1, min(limite, LIMITE_MAXIMO))
+
+
+def _columnas(recurso, pedidos):
+    # Columnas a leer: las pedidas + las necesarias para el cursor (orden e id)
+    columnas = [c for c in pedidos if recurso['campos'][c] is not None]
+    for extra in ('id', recurso['orden']):
+        if extra not in columnas:
+            columnas.append(extra)
+    return columnas
+
+
+def _serializar(filas, columnas, pedidos):
+    # Tuplas -> diccionarios con solo los campos pedidos (y los especiales si se pidieron)
+    posiciones = [(nombre, columnas.index(nombre)) for nombre in pedidos if nombre in columnas]
+    resultado = [{nombre: fila[i] for nombre, i in posiciones} for fila in filas]
+
+    if 'etiquetas' in pedidos:
+        i_id = columnas.index('id')
+        etiquetas = mapa_etiquetas([fila[i_id] for fila in filas])
+        for datos, fila in zip(resultado, filas):
+            datos['etiquetas'] = etiquetas.get(fila[i_id], [])
+
+    if 'progreso' in pedidos:
+        i_id = columnas.index('id')
+        progreso = progreso_de_proyectos([fila[i_id] for fila in filas])
+        for datos, fila in zip(resultado, filas):
+            datos['progreso'] = progreso[fila[i_id]]
+    return resultado
+
+
+# ========== VISTAS ==========
+def _listar(request, nombre):
+    recurso = RECURSOS[nombre]
+    pedidos = _campos_pedidos(recurso, request)
+    columnas = _columnas(recurso, pedidos)
+
+    queryset, filtros = recurso['filtrar'](recurso['queryset'](), request.GET)
+    queryset = queryset.values_list(*[recurso['campos'][c] for c in columnas])
+
+    pagina = paginar(
+        queryset, recurso['orden'], request.GET.get('cursor'), tamaño=_limite(request),
+        clave=itemgetter(columnas.index(recurso['orden']), columnas.index('id')),
+    )
+    return respuesta_json({
+        'resultados': _serializar(pagina.items, columnas, pedidos),
+        'siguiente': pagina.siguiente,
+        'anterior': pagina.anterior,
+        'filtros': filtros,
+    })
+
+
+def _detalle(request, nombre, id):
+    recurso = RECURSOS[nombre]
+    pedidos = _campos_pedidos(recurso, request)
+    columnas = _columnas(recurso, pedidos)
+
+    fila = (
+        recurso['queryset']().filter(id=id)
+        .values_list(*[recurso['campos'][c] for c in columnas])
+        .first()
+    )
+    if fila is None:
+        raise ErrorAPI('No encontrado.', status=404)
+    return respuesta_json(_serializar([fila], columnas, pedidos)[0])
+
+
+@require_GET
+@_con_errores
+def proyectos(request):
+    return _listar(request, 'proyectos')
+
+
+@require_GET
+@_con_errores
+def proyecto(request, id):
+    return _detalle(request, 'proyectos', id)
+
+
+@require_GET
+@_con_errores
+def serie_proyecto(request, id):
+    # Conteos diarios del proyecto para burndown / flujo acumulado (ver instantaneas.py):
+    #   ?desde=AAAA-MM-DD&hasta=AAAA-MM-DD   por defecto los últimos 90 días
+    #   ?por=estado|prioridad|todo           columnas (por defecto, estado)
+    # "valores" tiene una fila por día desde "desde" (numpy.array(valores) da la matriz)
+    if not Proyecto.objects.visibles().filter(id=id).exists():
+        raise ErrorAPI('No encontrado.', status=404)
+    try:
+        hasta = date.fromisoformat(request.GET['hasta']) if request.GET.get('hasta') else timezone.localdate()
+        desde = date.fromisoformat(request.GET['desde']) if request.GET.get('desde') else hasta - timedelta(days=89)
+    except ValueError:
+        raise ErrorAPI('desde y hasta deben tener el formato AAAA-MM-DD.')
+    por = request.GET.get('por', 'estado')
+
+    try:
+        columnas, valores = instantaneas.serie(id, desde, hasta, por=None if por == 'todo' else por)
+    except ValueError as error:
+        raise ErrorAPI(str(error))
+    if instantaneas.numpy is not None:
+        valores = valores.tolist()
+    return respuesta_json({
+        'desde': desde,
+        'hasta': hasta,
+        'columnas': columnas,
+        'valores': valores,
+    })
+
+
+@require_GET
+@_con_errores
+def tareas(request):
+    return _listar(request, 'tareas')
+
+
+@require_GET
+@_con_errores
+def tarea(request, id):
+    return _detalle(request, 'tareas', id)
+
+
+@require_GET
+@_con_errores
+def assets(request):
+    return _listar(request, 'assets')
+
+
+@require_GET
+@_con_errores
+def asset(request, id):
+    return _detalle(request, 'assets', id)
+
+
+@require_GET
+@_con_errores
+def actividad(request):
+    # Historial de cambios (append-only): ?proyecto=, ?tarea=, ?asset=, ?accion=
+    return _listar(request, 'actividad')
+
+
+@require_GET
+def etiquetas(request):
+    # Las etiquetas son pocas: se devuelven todas, sin paginar
+    return respuesta_json({
+        'resultados': [
+            {'id': pk, 'nombre': nombre}
+            for pk, nombre in Etiqueta.objects.values_list('id', 'nombre')
+        ],
+    })
+
+
+@require_POST
+@_con_errores
+def acciones_tareas(request):
+    # Cambios masivos sobre tareas. Cuerpo JSON:
+    #   {"ids": [1, 2, 3]}  o  {"filtros": {"estado": "pendiente", "proyecto": 4}}
+    #   + "estado", "prioridad", "agregar_etiquetas": [ids], "quitar_etiquetas": [ids]
+    # Responde los conteos de acciones_masivas.aplicar(). Requiere el token CSRF
+    # (cabecera X-CSRFToken) como cualquier POST del sitio.
+    try:
+        datos = json.loads(request.body or b'{}')
+    except ValueError:
+        raise ErrorAPI('El cuerpo debe ser JSON válido.')
+    if not isinstance(datos, dict):
+        raise ErrorAPI('El cuerpo debe ser un objeto JSON.')
+
+    def lista_de_ids(clave):
+        valor = datos.get(clave) or []
+        if not isinstance(valor, list) or not all(isinstance(pk, int) for pk in valor):
+            raise ErrorAPI(f'{clave} debe ser una lista de ids enteros.')
+        return valor
+
+    filtros = datos.get('filtros') or {}
+    if not isinstance(filtros, dict):
+        raise ErrorAPI('filtros debe ser un objeto.')
+
+    try:
+        tareas = seleccionar_tareas(ids=lista_de_ids('ids'), filtros=filtros)
+        resultado = aplicar(
+            tareas,
+            estado=datos.get('estado'),
+            prioridad=datos.get('prioridad'),
+            agregar_etiquetas=lista_de_ids('agregar_etiquetas'),
+            quitar_etiquetas=lista_de_ids('quitar_etiquetas'),
+        )
+    except SeleccionInvalida as error:
+        raise ErrorAPI(str(error))
+    return respuesta_json(resultado)
+
+
+# ========== SUBIDAS POR TROZOS ==========
+# Archivos de assets de cualquier tamaño en trozos, reanudables (ver almacen.py):
+#   1. POST /api/v1/subidas/ con {"nombre", "tamaño", "tipo_mime"?, "asset"?}
+#   2. un PUT a "url" por trozo: cuerpo binario + Content-Range: bytes inicio-fin/total
+#   3. si se corta, GET a "url" dice cuánto llegó ("recibido") y se sigue desde ahí
+# Al llegar el último byte la subida queda "completa" con el sha256 de su
+# contenido y, si vino "asset", el archivo ya queda adjunto a ese asset.
+_CONTENT_RANGE = re.compile(r'bytes (\d+)-(\d+)/(\d+)$')
+
+
+def _estado_subida(subida):
+    return {
+        'token': str(subida.token),
+        'url': reverse('api_subida', args=[subida.token]),
+        'nombre': subida.nombre_archivo,
+        'tamaño': subida.tamaño,
+        'recibido': subida.recibido,
+        'tamaño_trozo': getattr(settings, 'PRODUCCION_ARCHIVOS_TROZO', 8 * 1024 * 1024),
+        'completa': subida.archivo_id is not None,
+        'sha256': subida.archivo.sha256 if subida.archivo_id else None,
+        'deduplicada': subida.deduplicada,
+        'asset': subida.asset_id,
+    }
+
+
+@require_POST
+@_con_errores
+def subidas(request):
+    try:
+        datos = json.loads(request.body or b'{}')
+    except ValueError:
+        raise ErrorAPI('El cuerpo debe ser JSON válido.')
+    if not isinstance(datos, dict):
+        raise ErrorAPI('El cuerpo debe ser un objeto JSON.')
+
+    nombre, tamaño = datos.get('nombre'), datos.get('tamaño')
+    if not isinstance(nombre, str) or not nombre.strip():
+        raise ErrorAPI('nombre es obligatorio.')
+    if not isinstance(tamaño, int) or isinstance(tamaño, bool):
+        raise ErrorAPI('tamaño debe ser un entero (bytes).')
+    asset = None
+    if datos.get('asset') is not None:
+        asset = Asset.objects.filter(pk=datos['asset']).first() if isinstance(datos['asset'], int) else None
+        if asset is None:
+            raise ErrorAPI('El asset no existe.')
+
+    try:
+        subida = almacen.iniciar(
+            nombre, tamaño, tipo_mime=str(datos.get('tipo_mime') or ''), asset=asset,
+        )
+    except almacen.SubidaInvalida as error:
+        raise ErrorAPI(str(error))
+    return respuesta_json(_estado_subida(subida), status=201)
+
+
+@require_http_methods(['GET', 'PUT'])
+@_con_errores
+def subida(request, token):
+    subida = Subida.objects.select_related('archivo').filter(token=token).first()
+    if subida is None:
+        raise ErrorAPI('No encontrado.', status=404)
+    if request.method == 'GET':
+        return respuesta_json(_estado_subida(subida))
+
+    rango = _CONTENT_RANGE.match(request.headers.get('Content-Range', ''))
+    if rango is None:
+        raise ErrorAPI('Falta la cabecera Content-Range: bytes inicio-fin/total.')
+    inicio, fin, total = map(int, rango.groups())
+    if total != subida.tamaño or fin < inicio:
+        raise ErrorAPI('Content-Range no coincide con el tamaño de la subida.')
+    largo = fin - inicio + 1
+    if request.headers.get('Content-Length') != str(largo):
+        raise ErrorAPI('El largo del cuerpo no coincide con Content-Range.')
+
+    try:
+        # El cuerpo se lee del request de a bloques, sin request.body
+        subida = almacen.recibir(subida, inicio, request, largo)
+    except almacen.DesfaseSubida as error:
+        return respuesta_json({'error': str(error), 'recibido': error.recibido}, status=409)
+    except almacen.SubidaInvalida as error:
+        raise ErrorAPI(str(error))
+    return respuesta_json(_estado_subida(subida))
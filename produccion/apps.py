@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class ProduccionConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'produccion'
+
+    def ready(self):
+        # Registra los receptores de señales (contadores, etc.)
+        from . import signals  # noqa: F401
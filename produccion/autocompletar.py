@@ -0,0 +1,231 @@
+import bisect
+import threading
+import time
+
+from django import forms
+from django.conf import settings
+from django.urls import reverse
+
+from .busqueda import normalizar
+from .models import Proyecto, Etiqueta
+
+
+# Selectores de proyecto y etiquetas que no cargan la tabla entera.
+# El formulario solo renderiza las opciones ya elegidas y el JS
+# (static/produccion/js/autocompletar.js) pide el resto a la vista
+# `opciones_autocompletar` a medida que se escribe. La búsqueda es por prefijo sobre
+# un índice en memoria por proceso (como el de busqueda.py; un trie para las
+# etiquetas y una lista ordenada para los proyectos): se construye en
+# la primera consulta, lo parchan las señales y se reconstruye cada
+# PRODUCCION_AUTOCOMPLETAR_RECONSTRUIR segundos para ver cambios de otros workers.
+# La validación no cambia: ModelChoiceField solo busca los ids enviados.
+
+LIMITE_OPCIONES = 10
+
+# tipo (en la URL) -> (modelo, campo que se muestra y se busca)
+FUENTES = {
+    'proyectos': (Proyecto, 'nombre'),
+    'etiquetas': (Etiqueta, 'nombre'),
+}
+
+
+class IndicePrefijos:
+    # Índice de nombres en memoria con una clave por cada palabra del nombre
+    # (desde esa palabra hasta el final), así "cas" encuentra tanto
+    # "Castillo Oscuro" como "Mazmorra del Castillo". Esta clase guarda las
+    # claves en una lista ordenada y busca con bisect; TriePrefijos cambia
+    # solo el almacenamiento.
+
+    def __init__(self, modelo, campo, filtro=None):
+        self.modelo = modelo
+        self.campo = campo
+        self.filtro = filtro or {}
+        self._lock = threading.RLock()
+        self._construido_en = None
+        self._nombres = {}    # id -> nombre
+        self._vaciar()
+
+    def _vencido(self):
+        ttl = getattr(settings, 'PRODUCCION_AUTOCOMPLETAR_RECONSTRUIR', 60)
+        return self._construido_en is None or (ttl and time.monotonic() - self._construido_en > ttl)
+
+    @staticmethod
+    def _claves_de(nombre):
+        palabras = normalizar(nombre).split()
+        return [' '.join(palabras[i:]) for i in range(len(palabras))]
+
+    # ----- almacenamiento: lista ordenada de (clave, id) -----
+    def _vaciar(self):
+        self._claves = []
+
+    def _cargar(self):
+        self._claves = sorted(
+            (clave, pk) for pk, nombre in self._nombres.items() for clave in self._claves_de(nombre)
+        )
+
+    def _insertar(self, clave, pk):
+        bisect.insort(self._claves, (clave, pk))
+
+    def _borrar(self, clave, pk):
+        posicion = bisect.bisect_left(self._claves, (clave, pk))
+        if posicion < len(self._claves) and self._claves[posicion] == (clave, pk):
+            del self._claves[posicion]
+
+    def _recorrer(self, prefijo):
+        # ids de las claves que empiezan con `prefijo`, en orden alfabético de la clave
+        inicio = bisect.bisect_left(self._claves, (prefijo,))
+        for clave, pk in self._claves[inicio:]:
+            if not clave.startswith(prefijo):
+                break
+            yield pk
+
+    # ----- operaciones -----
+    def construir(self):
+        with self._lock:
+            self._nombres = dict(
+                self.modelo.objects.filter(**self.filtro)
+                .values_list('id', self.campo).order_by().iterator(chunk_size=5000)
+            )
+            self._vaciar()
+            self._cargar()
+            self._construido_en = time.monotonic()
+
+    def invalidar(self):
+        # Para altas/bajas masivas: más barato reconstruir en la próxima consulta
+        self._construido_en = None
+
+    def actualizar(self, pk, nombre):
+        if self._construido_en is None:
+            return
+        with self._lock:
+            self._quitar(pk)
+            self._nombres[pk] = nombre
+            for clave in self._claves_de(nombre):
+                self._insertar(clave, pk)
+
+    def eliminar(self, pk):
+        if self._construido_en is None:
+            return
+        with self._lock:
+            self._quitar(pk)
+
+    def _quitar(self, pk):
+        nombre = self._nombres.pop(pk, None)
+        if nombre is not None:
+            for clave in self._claves_de(nombre):
+                self._borrar(clave, pk)
+
+    def buscar(self, texto, limite=LIMITE_OPCIONES):
+        if self._vencido():
+            self.construir()
+        prefijo = ' '.join(normalizar(texto).split())
+        resultados = {}
+        with self._lock:
+            for pk in self._recorrer(prefijo):
+                resultados.setdefault(pk, self._nombres[pk])
+                if len(resultados) == limite:
+                    break
+        return [{'id': pk, 'nombre': nombre} for pk, nombre in resultados.items()]
+
+
+class _Nodo:
+    __slots__ = ('hijos', 'ids')
+
+    def __init__(self):
+        self.hijos = {}     # carácter -> _Nodo
+        self.ids = set()    # ids cuya clave termina en este nodo
+
+
+class TriePrefijos(IndicePrefijos):
+    # Para las etiquetas: se editan seguido y cada alta/cambio en la lista
+    # ordenada es un insort O(n); en el trie parchar es O(largo del nombre)
+    # y buscar un prefijo es bajar por sus caracteres.
+
+    def _vaciar(self):
+        self._raiz = _Nodo()
+
+    def _cargar(self):
+        for pk, nombre in self._nombres.items():
+            for clave in self._claves_de(nombre):
+                self._insertar(clave, pk)
+
+    def _insertar(self, clave, pk):
+        nodo = self._raiz
+        for caracter in clave:
+            nodo = nodo.hijos.setdefault(caracter, _Nodo())
+        nodo.ids.add(pk)
+
+    def _borrar(self, clave, pk):
+        camino = [self._raiz]
+        for caracter in clave:
+            siguiente = camino[-1].hijos.get(caracter)
+            if siguiente is None:
+                return
+            camino.append(siguiente)
+        camino[-1].ids.discard(pk)
+        # Podar las ramas que quedaron vacías
+        for caracter, padre, nodo in zip(reversed(clave), reversed(camino[:-1]), reversed(camino[1:])):
+            if nodo.ids or nodo.hijos:
+                break
+            del padre.hijos[caracter]
+
+    def _recorrer(self, prefijo):
+        nodo = self._raiz
+        for caracter in prefijo:
+            nodo = nodo.hijos.get(caracter)
+            if nodo is None:
+                return
+        # Recorrido en preorden con los hijos en orden alfabético: mismo orden que la lista ordenada
+        pila = [nodo]
+        while pila:
+            nodo = pila.pop()
+            yield from sorted(nodo.ids)
+            pila.extend(nodo.hijos[c] for c in sorted(nodo.hijos, reverse=True))
+
+
+indices = {
+    'proyectos': IndicePrefijos(*FUENTES['proyectos'], filtro={'pendiente_eliminacion': False}),
+    'etiquetas': TriePrefijos(*FUENTES['etiquetas']),
+}
+indice_por_modelo = {indice.modelo: indice for indice in indices.values()}
+
+
+def buscar(tipo, texto, limite=LIMITE_OPCIONES):
+    return indices[tipo].buscar(texto, limite)
+
+
+# ========== WIDGETS ==========
+class _SoloElegidas:
+    # Renderiza solo las opciones elegidas (una consulta por pk__in, o ninguna
+    # si no hay nada elegido) en vez de iterar todo el queryset del campo
+
+    def __init__(self, tipo, attrs=None):
+        super().__init__(attrs)
+        self.tipo = tipo
+
+    def get_context(self, name, value, attrs):
+        context = super().get_context(name, value, attrs)
+        context['widget']['attrs']['data-autocompletar'] = reverse('opciones_autocompletar', args=[self.tipo])
+        return context
+
+    def optgroups(self, name, value, attrs=None):
+        elegidas = [v for v in value if v and str(v).isdigit()]
+        opciones = []
+        if not self.allow_multiple_selected and self.choices.field.empty_label is not None:
+            opciones.append(('', self.choices.field.empty_label))
+        if elegidas:
+            opciones += [self.choices.choice(obj) for obj in self.choices.queryset.filter(pk__in=elegidas)]
+
+        grupos = []
+        for indice, (valor, etiqueta) in enumerate(opciones):
+            seleccionada = str(valor) in elegidas
+            grupos.append((None, [self.create_option(name, valor, etiqueta, seleccionada, indice, attrs=attrs)], indice))
+        return grupos
+
+
+class Autocompletar(_SoloElegidas, forms.Select):
+    pass
+
+
+class AutocompletarMultiple(_SoloElegidas, forms.SelectMultiple):
+    pass
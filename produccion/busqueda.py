@@ -0,0 +1,417 @@
+import bisect
+import math
+import re
+import threading
+import time
+import unicodedata
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import connection
+from django.urls import reverse
+
+from .models import Proyecto, Asset, Tarea
+
+
+# Búsqueda de texto completo sobre tareas, assets y proyectos.
+# Usa el índice nativo de cada motor cuando existe (ver migración 0004):
+#   - MySQL: índices FULLTEXT + MATCH ... AGAINST en modo booleano (LIKE para
+#     las palabras más cortas que innodb_ft_min_token_size)
+#   - Postgres: tsvector con pesos (título A, descripción B) + índice GIN
+#   - SQLite: tabla virtual FTS5 mantenida con triggers
+# y si no, un índice invertido en memoria que se mantiene con señales.
+
+# tipo -> (modelo, campo de título, campo de descripción, código para FTS5)
+FUENTES = {
+    'tarea': (Tarea, 'titulo', 'descripcion', 1),
+    'asset': (Asset, 'nombre', 'descripcion', 2),
+    'proyecto': (Proyecto, 'nombre', 'descripcion', 3),
+}
+
+TABLA_FTS = 'produccion_busqueda_fts'
+LIMITE_RESULTADOS = 20
+LIMITE_SUGERENCIAS = 8
+
+
+def normalizar(texto):
+    # Minúsculas y sin tildes, para que "animación" encuentre "animacion"
+    texto = unicodedata.normalize('NFKD', texto or '')
+    return ''.join(c for c in texto if not unicodedata.combining(c)).lower()
+
+
+def terminos(texto, quitar_tildes=True):
+    texto = normalizar(texto) if quitar_tildes else (texto or '').lower()
+    return re.findall(r'\w{2,}', texto)
+
+
+# ========== MOTORES ==========
+class MotorMySQL:
+    nombre = 'mysql'
+    quitar_tildes = True  # la collation por defecto ya ignora tildes
+
+    def __init__(self):
+        self._minimo_token = None
+
+    def minimo_token(self):
+        # innodb_ft_min_token_size (3 por defecto): el índice FULLTEXT no guarda
+        # palabras más cortas, así que MATCH no las encontraría nunca
+        if self._minimo_token is None:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT @@innodb_ft_min_token_size')
+                self._minimo_token = int(cursor.fetchone()[0])
+        return self._minimo_token
+
+    def _consulta(self, palabras, prefijo):
+        # Modo booleano: todas las palabras obligatorias, la última como prefijo
+        partes = [f'+{p}' for p in palabras]
+        if prefijo:
+            partes[-1] += '*'
+        return ' '.join(partes)
+
+    def _condiciones(self, titulo, cuerpo, palabras, prefijo):
+        # (expresión del puntaje, WHERE, parámetros del puntaje, parámetros del WHERE).
+        # Las palabras cortas para el índice se buscan con LIKE sobre las filas
+        # que ya filtró MATCH (o sobre toda la tabla si no queda ninguna larga).
+        minimo = self.minimo_token()
+        largas = [p for p in palabras if len(p) >= minimo]
+        cortas = [p for p in palabras if len(p) < minimo]
+        condiciones, parametros = [], []
+        puntaje, parametros_puntaje = '0', []
+        if largas:
+            consulta = self._consulta(largas, prefijo and len(palabras[-1]) >= minimo)
+            puntaje = f'MATCH({titulo}, {cuerpo}) AGAINST (%s IN BOOLEAN MODE)'
+            parametros_puntaje = [consulta]
+            condiciones.append(puntaje)
+            parametros.append(consulta)
+        for palabra in cortas:
+            condiciones.append(f'({titulo} LIKE %s OR {cuerpo} LIKE %s)')
+            patron = '%' + palabra.replace('_', '\\_') + '%'
+            parametros += [patron, patron]
+        return puntaje, ' AND '.join(condiciones), parametros_puntaje, parametros
+
+    def buscar(self, palabras, limite, prefijo=False):
+        resultados = []
+        with connection.cursor() as cursor:
+            for tipo, (modelo, titulo, cuerpo, _) in FUENTES.items():
+                tabla = connection.ops.quote_name(modelo._meta.db_table)
+                puntaje, condiciones, parametros_puntaje, parametros = self._condiciones(
+                    titulo, cuerpo, palabras, prefijo,
+                )
+                cursor.execute(
+                    f'SELECT id, {puntaje} AS puntaje FROM {tabla} WHERE {condiciones} '
+                    f'ORDER BY puntaje DESC, id DESC LIMIT %s',
+                    [*parametros_puntaje, *parametros, limite],
+                )
+                resultados += [(tipo, pk, float(puntaje)) for pk, puntaje in cursor.fetchall()]
+        return resultados
+
+
+class MotorPostgres:
+    nombre = 'postgresql'
+    quitar_tildes = False  # to_tsvector('spanish') conserva las tildes del texto
+
+    @staticmethod
+    def vector(titulo, cuerpo):
+        # Debe ser exactamente la misma expresión del índice GIN para que se use
+        return (
+            f"(setweight(to_tsvector('spanish', coalesce({titulo}, '')), 'A') || "
+            f"setweight(to_tsvector('spanish', coalesce({cuerpo}, '')), 'B'))"
+        )
+
+    def _consulta(self, palabras, prefijo):
+        partes = list(palabras)
+        if prefijo:
+            partes[-1] += ':*'
+        return ' & '.join(partes)
+
+    def buscar(self, palabras, limite, prefijo=False):
+        consulta = self._consulta(palabras, prefijo)
+        resultados = []
+        with connection.cursor() as cursor:
+            for tipo, (modelo, titulo, cuerpo, _) in FUENTES.items():
+                tabla = connection.ops.quote_name(modelo._meta.db_table)
+                vector = self.vector(titulo, cuerpo)
+                cursor.execute(
+                    f"SELECT id, ts_rank({vector}, to_tsquery('spanish', %s)) AS puntaje "
+                    f"FROM {tabla} WHERE {vector} @@ to_tsquery('spanish', %s) "
+                    f"ORDER BY puntaje DESC LIMIT %s",
+                    [consulta, consulta, limite],
+                )
+                resultados += [(tipo, pk, float(puntaje)) for pk, puntaje in cursor.fetchall()]
+        return resultados
+
+
+class MotorSQLite:
+    nombre = 'sqlite-fts5'
+    quitar_tildes = True  # el tokenizer usa remove_diacritics
+
+    # El rowid de la tabla FTS codifica tipo e id: id * 4 + código del tipo
+    TIPOS_POR_CODIGO = {codigo: tipo for tipo, (_, _, _, codigo) in FUENTES.items()}
+
+    def _consulta(self, palabras, prefijo):
+        partes = [f'"{p}"' for p in palabras]
+        if prefijo:
+            partes[-1] += '*'
+        return ' '.join(partes)
+
+    def buscar(self, palabras, limite, prefijo=False):
+        with connection.cursor() as cursor:
+            # bm25 devuelve valores menores para mejores resultados; el título pesa más
+            cursor.execute(
+                f'SELECT rowid, bm25({TABLA_FTS}, 10.0, 1.0) AS rango FROM {TABLA_FTS} '
+                f'WHERE {TABLA_FTS} MATCH %s ORDER BY rango LIMIT %s',
+                [self._consulta(palabras, prefijo), limite],
+            )
+            return [
+                (self.TIPOS_POR_CODIGO[rowid % 4], rowid // 4, -rango)
+                for rowid, rango in cursor.fetchall()
+            ]
+
+
+class IndiceInvertido:
+    # Respaldo en memoria para motores sin índice de texto nativo.
+    # Se construye de forma perezosa en la primera búsqueda y después lo
+    # parchan las señales (ver signals.py). Como vive en cada proceso, los
+    # cambios hechos por otros workers se ven al reconstruirse cada
+    # PRODUCCION_BUSQUEDA_RECONSTRUIR segundos.
+
+    PESO_TITULO = 3
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._construido_en = None
+        self._postings = defaultdict(dict)   # término -> {(tipo, id): peso}
+        self._documentos = {}                # (tipo, id) -> términos del documento
+        self._vocabulario = []               # términos ordenados, para prefijos
+
+    @property
+    def construido(self):
+        return self._construido_en is not None
+
+    def _vencido(self):
+        ttl = getattr(settings, 'PRODUCCION_BUSQUEDA_RECONSTRUIR', 300)
+        return not self.construido or (ttl and time.monotonic() - self._construido_en > ttl)
+
+    def construir(self):
+        with self._lock:
+            self._postings = defaultdict(dict)
+            self._documentos = {}
+            for tipo, (modelo, titulo, cuerpo, _) in FUENTES.items():
+                filas = modelo.objects.values_list('id', titulo, cuerpo).order_by().iterator(chunk_size=5000)
+                for pk, texto_titulo, texto_cuerpo in filas:
+                    self._agregar((tipo, pk), texto_titulo, texto_cuerpo)
+            self._vocabulario = sorted(self._postings)
+            self._construido_en = time.monotonic()
+
+    def _agregar(self, clave, titulo, cuerpo):
+        pesos = defaultdict(int)
+        for termino in terminos(titulo):
+            pesos[termino] += self.PESO_TITULO
+        for termino in terminos(cuerpo):
+            pesos[termino] += 1
+        for termino, peso in pesos.items():
+            self._postings[termino][clave] = peso
+        self._documentos[clave] = tuple(pesos)
+
+    def _quitar(self, clave):
+        for termino in self._documentos.pop(clave, ()):
+            postings = self._postings.get(termino)
+            if postings is not None:
+                postings.pop(clave, None)
+                if not postings:
+                    del self._postings[termino]
+
+    def actualizar(self, tipo, pk, titulo, cuerpo):
+        if not self.construido:
+            return
+        with self._lock:
+            nuevos = [t for t in terminos(f'{titulo} {cuerpo}') if t not in self._postings]
+            self._quitar((tipo, pk))
+            self._agregar((tipo, pk), titulo, cuerpo)
+            for termino in set(nuevos):
+                bisect.insort(self._vocabulario, termino)
+
+    def eliminar(self, tipo, pk):
+        if not self.construido:
+            return
+        with self._lock:
+            self._quitar((tipo, pk))
+            # Los términos que quedaron sin documentos se limpian del vocabulario al buscar
+
+    def _expandir(self, prefijo):
+        inicio = bisect.bisect_left(self._vocabulario, prefijo)
+        for termino in self._vocabulario[inicio:]:
+            if not termino.startswith(prefijo):
+                break
+            yield termino
+
+    def buscar(self, palabras, limite, prefijo=False):
+        if self._vencido():
+            self.construir()
+        with self._lock:
+            total = max(len(self._documentos), 1)
+            puntajes = None
+            for i, palabra in enumerate(palabras):
+                if prefijo and i == len(palabras) - 1:
+                    candidatos = list(self._expandir(palabra))
+                else:
+                    candidatos = [palabra]
+
+                acumulado = defaultdict(float)
+                for termino in candidatos:
+                    postings = self._postings.get(termino, {})
+                    idf = math.log(1 + total / (1 + len(postings)))
+                    for clave, peso in postings.items():
+                        acumulado[clave] += peso * idf
+
+                # AND entre palabras: solo quedan los documentos que tienen todas
+                if puntajes is None:
+                    puntajes = acumulado
+                else:
+                    puntajes = {c: p + acumulado[c] for c, p in puntajes.items() if c in acumulado}
+                if not puntajes:
+                    return []
+
+        mejores = sorted(puntajes.items(), key=lambda item: -item[1])[:limite]
+        return [(tipo, pk, puntaje) for (tipo, pk), puntaje in mejores]
+
+
+class MotorMemoria:
+    nombre = 'memoria'
+    quitar_tildes = True
+
+    def buscar(self, palabras, limite, prefijo=False):
+        return indice_memoria.buscar(palabras, limite, prefijo)
+
+
+indice_memoria = IndiceInvertido()
+_motor = None
+
+
+def _existe_tabla_fts():
+    return TABLA_FTS in connection.introspection.table_names()
+
+
+def obtener_motor():
+    global _motor
+    if _motor is None:
+        forzado = getattr(settings, 'PRODUCCION_BUSQUEDA_MOTOR', None)
+        if forzado == 'memoria':
+            _motor = MotorMemoria()
+        elif connection.vendor == 'mysql':
+            _motor = MotorMySQL()
+        elif connection.vendor == 'postgresql':
+            _motor = MotorPostgres()
+        elif connection.vendor == 'sqlite' and _existe_tabla_fts():
+            _motor = MotorSQLite()
+        else:
+            _motor = MotorMemoria()
+    return _motor
+
+
+def usa_indice_memoria():
+    return isinstance(obtener_motor(), MotorMemoria)
+
+
+# ========== TRIGGERS FTS5 (SQLite) ==========
+# La tabla FTS5 se mantiene con triggers sobre tareas, assets y proyectos,
+# pero SQLite los borra cuando una migración recrea la tabla (AlterField,
+# AddIndex, ...). Se vuelven a crear después de cada `migrate` (receptor
+# post_migrate en signals.py) y, si faltaba alguno, se reindexa esa tabla.
+
+def _triggers(tabla, titulo, cuerpo, codigo):
+    # nombre -> SQL; el rowid de la tabla FTS es id * 4 + código (ver MotorSQLite)
+    return {
+        f'{tabla}_fts_ai': (
+            f'CREATE TRIGGER IF NOT EXISTS {tabla}_fts_ai AFTER INSERT ON {tabla} BEGIN '
+            f'INSERT INTO {TABLA_FTS}(rowid, titulo, cuerpo) '
+            f'VALUES (new.id * 4 + {codigo}, new.{titulo}, new.{cuerpo}); END'
+        ),
+        f'{tabla}_fts_au': (
+            f'CREATE TRIGGER IF NOT EXISTS {tabla}_fts_au AFTER UPDATE OF {titulo}, {cuerpo} ON {tabla} BEGIN '
+            f'UPDATE {TABLA_FTS} SET titulo = new.{titulo}, cuerpo = new.{cuerpo} '
+            f'WHERE rowid = old.id * 4 + {codigo}; END'
+        ),
+        f'{tabla}_fts_ad': (
+            f'CREATE TRIGGER IF NOT EXISTS {tabla}_fts_ad AFTER DELETE ON {tabla} BEGIN '
+            f'DELETE FROM {TABLA_FTS} WHERE rowid = old.id * 4 + {codigo}; END'
+        ),
+    }
+
+
+def asegurar_triggers_sqlite(conexion):
+    # Crea los triggers que falten; devuelve cuántos creó
+    if conexion.vendor != 'sqlite' or TABLA_FTS not in conexion.introspection.table_names():
+        return 0
+    creados = 0
+    with conexion.cursor() as cursor:
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")
+        existentes = {nombre for nombre, in cursor.fetchall()}
+        for modelo, campo_titulo, campo_cuerpo, codigo in FUENTES.values():
+            tabla = modelo._meta.db_table
+            titulo = modelo._meta.get_field(campo_titulo).column
+            cuerpo = modelo._meta.get_field(campo_cuerpo).column
+            faltantes = [sql for nombre, sql in _triggers(tabla, titulo, cuerpo, codigo).items() if nombre not in existentes]
+            if not faltantes:
+                continue
+            # Sin triggers la tabla pudo cambiar sin que el índice se enterara
+            cursor.execute(f'DELETE FROM {TABLA_FTS} WHERE rowid % 4 = {codigo}')
+            cursor.execute(
+                f'INSERT INTO {TABLA_FTS}(rowid, titulo, cuerpo) '
+                f'SELECT id * 4 + {codigo}, {titulo}, {cuerpo} FROM {tabla}'
+            )
+            for sql in faltantes:
+                cursor.execute(sql)
+            creados += len(faltantes)
+    return creados
+
+
+# ========== API PÚBLICA ==========
+def _hidratar(coincidencias):
+    # Trae título, descripción y URL con una consulta por tipo (no por resultado)
+    ids_por_tipo = defaultdict(list)
+    for tipo, pk, _ in coincidencias:
+        ids_por_tipo[tipo].append(pk)
+
+    filas = {}
+    for tipo, ids in ids_por_tipo.items():
+        modelo, titulo, cuerpo, _ = FUENTES[tipo]
+        # El índice nativo todavía tiene a los proyectos marcados para borrar y a sus hijos
+        consulta = modelo.objects.visibles().filter(id__in=ids)
+        for fila in consulta.values('id', titulo, cuerpo):
+            filas[(tipo, fila['id'])] = (fila[titulo], fila[cuerpo])
+
+    urls = {
+        'tarea': 'editar_tarea',
+        'asset': 'editar_asset',
+        'proyecto': 'detalle_proyecto',
+    }
+    resultados = []
+    for tipo, pk, puntaje in coincidencias:
+        if (tipo, pk) not in filas:
+            continue  # se eliminó entre la búsqueda y la hidratación
+        titulo, descripcion = filas[(tipo, pk)]
+        resultados.append({
+            'tipo': tipo,
+            'id': pk,
+            'titulo': titulo,
+            'descripcion': descripcion,
+            'puntaje': round(puntaje, 4),
+            'url': reverse(urls[tipo], args=[pk]),
+        })
+    return resultados
+
+
+def buscar(texto, limite=LIMITE_RESULTADOS, prefijo=False):
+    motor = obtener_motor()
+    palabras = terminos(texto, quitar_tildes=motor.quitar_tildes)
+    if not palabras:
+        return []
+    coincidencias = motor.buscar(palabras, limite, prefijo=prefijo)
+    coincidencias.sort(key=lambda c: -c[2])
+    return _hidratar(coincidencias[:limite])
+
+
+def sugerir(texto, limite=LIMITE_SUGERENCIAS):
+    # Typeahead: la última palabra se trata como prefijo
+    return buscar(texto, limite=limite, prefijo=True)
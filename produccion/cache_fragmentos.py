@@ -0,0 +1,47 @@
+import time
+
+from django.core.cache import cache
+
+
+# Caché de fragmentos HTML con invalidación por fecha.
+# Las claves de los fragmentos de un proyecto incluyen su fecha_actualizacion,
+# que ya se mueve con todo lo que se ve en la página de detalle (ver "FECHAS
+# DE ACTUALIZACIÓN" en signals.py) y que el validador del GET condicional lee
+# de todas formas. Un cambio deja de usar las claves viejas (expiran solas) y,
+# como la versión sale de la BD, vale igual con una caché por proceso.
+
+DURACION_FRAGMENTO = 60 * 60 * 24
+DURACION_CANDADO = 10       # segundos máximos que se espera a otro proceso
+ESPERA_CANDADO = 0.05
+
+
+def clave_fragmento(proyecto_id, fecha_actualizacion, seccion):
+    return f'produccion:proyecto:{proyecto_id}:{fecha_actualizacion.isoformat()}:{seccion}'
+
+
+def obtener_fragmento(clave, generar, duracion=DURACION_FRAGMENTO):
+    # Devuelve el valor cacheado o lo genera protegiendo contra estampidas:
+    # si muchos pedidos fallan a la vez, solo el que toma el candado genera
+    # y los demás esperan un momento a que aparezca en la caché
+    valor = cache.get(clave)
+    if valor is not None:
+        return valor
+
+    candado = f'{clave}:candado'
+    if cache.add(candado, 1, DURACION_CANDADO):
+        try:
+            valor = generar()
+            cache.set(clave, valor, duracion)
+        finally:
+            cache.delete(candado)
+        return valor
+
+    limite = time.monotonic() + DURACION_CANDADO
+    while time.monotonic() < limite:
+        time.sleep(ESPERA_CANDADO)
+        valor = cache.get(clave)
+        if valor is not None:
+            return valor
+        if cache.get(candado) is None:
+            break  # el otro proceso falló (ej: 404); generamos nosotros
+    return generar()
@@ -0,0 +1,96 @@
+import hashlib
+
+from django.contrib.messages import get_messages
+from django.db.models import Count, DateTimeField, Max, Subquery, Value
+from django.views.decorators.http import condition
+
+from .models import ContadorGlobal, Proyecto
+
+
+# GET condicionales (ETag / Last-Modified) para las vistas de listas y detalle.
+# Cada vista declara una función barata que resume "qué tan nuevos" son sus
+# datos; si el cliente (o el proxy) ya tiene esa versión se responde
+# 304 Not Modified sin consultar ni renderizar nada más.
+#
+#   @condicional(lambda request: resumen_tabla(Etiqueta, 'etiquetas'))
+#   def lista_etiquetas(request): ...
+
+
+def resumen(queryset, con_proyecto=False):
+    # (última actualización, cantidad) en una sola consulta sobre el índice de
+    # fecha_actualizacion; la cantidad detecta los borrados, que no dejan fecha.
+    # con_proyecto: las filas muestran el nombre de su proyecto, así que también
+    # cuenta la última actualización de esos proyectos (renombrar uno no
+    # necesita tocar sus tareas y assets)
+    agregados = {'ultima': Max('fecha_actualizacion'), 'total': Count('id')}
+    if con_proyecto:
+        agregados['proyectos'] = Max('proyecto__fecha_actualizacion')
+    datos = queryset.order_by().aggregate(**agregados)
+    return _con_proyectos(datos['ultima'], datos['total'], datos.get('proyectos'))
+
+
+def _ultima(modelo):
+    # MAX(fecha_actualizacion) como ORDER BY ... LIMIT 1: lee un extremo del índice
+    return Subquery(modelo.objects.order_by('-fecha_actualizacion').values('fecha_actualizacion')[:1])
+
+
+def resumen_tabla(modelo, contador, con_proyecto=False):
+    # Lo mismo para una lista sin filtros, sin recorrer la tabla: el total sale
+    # de ContadorGlobal (campo `contador`) y las fechas de los índices, todo en
+    # una consulta. Con la lista filtrada hay que contar las filas (resumen()).
+    fila = (
+        ContadorGlobal.objects.filter(pk=1)
+        .annotate(_ultima=_ultima(modelo), _proyectos=_ultima(Proyecto) if con_proyecto else Value(None, DateTimeField()))
+        .values_list('_ultima', contador, '_proyectos')
+        .first()
+    )
+    if fila is None:  # todavía no hay fila de contadores
+        return resumen(modelo.objects.all(), con_proyecto)
+    return _con_proyectos(*fila)
+
+
+def resumen_lista(filtrado, contador, con_proyecto=False):
+    # `filtrado`: lo que devuelven las funciones de filtros.py (queryset, filtros activos)
+    queryset, activos = filtrado
+    if activos:
+        return resumen(queryset, con_proyecto)
+    return resumen_tabla(queryset.model, contador, con_proyecto)
+
+
+def _con_proyectos(ultima, total, proyectos):
+    # El Last-Modified es la más nueva de las dos fechas
+    if proyectos is None:
+        return ultima, total
+    return max(ultima or proyectos, proyectos), total, proyectos
+
+
+def condicional(validador):
+    # `validador(request, *args, **kwargs)` -> (datetime o None, extra) o None.
+    # Se calcula una sola vez por petición aunque condition() pida el ETag y
+    # el Last-Modified por separado.
+    def calcular(request, *args, **kwargs):
+        if not hasattr(request, '_validador_condicional'):
+            valor = None
+            # Con mensajes flash pendientes hay que renderizar para mostrarlos
+            if not len(get_messages(request)):
+                valor = validador(request, *args, **kwargs)
+            request._validador_condicional = valor
+        return request._validador_condicional
+
+    def etag(request, *args, **kwargs):
+        valor = calcular(request, *args, **kwargs)
+        if valor is None:
+            return None
+        return hashlib.md5(repr(valor).encode(), usedforsecurity=False).hexdigest()
+
+    def ultima_modificacion(request, *args, **kwargs):
+        valor = calcular(request, *args, **kwargs)
+        return valor[0] if valor else None
+
+    return condition(etag_func=etag, last_modified_func=ultima_modificacion)
+
+
+def validado(request):
+    # Lo que devolvió el validador de @condicional en esta petición (None si
+    # no se calculó, ej: con mensajes flash pendientes)
+    return getattr(request, '_validador_condicional', None)
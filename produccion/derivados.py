@@ -0,0 +1,202 @@
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+from django.urls import reverse
+
+from . import almacen
+from .vistas_previas import generar
+
+
+# Vistas previas (derivados) de los archivos de los assets: miniaturas de
+# sprites y modelos 3D y formas de onda de audio/música, en TAMAÑOS píxeles.
+# Se generan en un pool de PRODUCCION_DERIVADOS_PROCESOS procesos (fuera del
+# request y del GIL) cuando se adjunta un archivo o cuando alguien pide una
+# que falta; mientras tanto la vista devuelve una imagen genérica. El comando
+# generar_derivados las regenera todas usando todos los núcleos.
+# Como los archivos son por contenido, el derivado de un sha256 no cambia
+# nunca: se guarda en disco por sha256 y el navegador lo cachea para siempre.
+# La carpeta tiene un tope de PRODUCCION_DERIVADOS_MAXIMO bytes y se poda por
+# LRU usando la fecha de modificación (que se renueva al servirlos).
+
+logger = logging.getLogger('produccion.derivados')
+
+TAMAÑOS = (128, 256, 512)
+
+# Asset.tipo -> generador de vistas_previas.py
+TIPO_DERIVADO = {
+    'sprite': 'miniatura',
+    'modelo3d': 'modelo',
+    'audio': 'onda',
+    'musica': 'onda',
+}
+
+# Renovar la fecha de un derivado como mucho una vez por hora (no una escritura por request)
+RENOVAR_CADA = 3600
+# Al pasarse del tope se poda hasta esta fracción, para no podar en cada alta
+PODAR_HASTA = 0.9
+
+
+def _config(nombre, defecto):
+    return getattr(settings, f'PRODUCCION_DERIVADOS_{nombre}', defecto)
+
+
+def directorio():
+    return _config('DIR', os.path.join(settings.MEDIA_ROOT, 'derivados'))
+
+
+def ruta(sha256, tipo, tamaño):
+    return os.path.join(directorio(), sha256[:2], f'{sha256}-{tipo}-{tamaño}.png')
+
+
+def ruta_fallo(sha256, tipo):
+    return os.path.join(directorio(), sha256[:2], f'{sha256}-{tipo}.fallo')
+
+
+def destinos(sha256, tipo):
+    return {tamaño: ruta(sha256, tipo, tamaño) for tamaño in TAMAÑOS}
+
+
+def completo(sha256, tipo):
+    # Generado (todos los tamaños) o marcado como imposible de generar
+    return os.path.exists(ruta_fallo(sha256, tipo)) or all(os.path.exists(r) for r in destinos(sha256, tipo).values())
+
+
+def url(asset, tamaño):
+    # URL de la vista previa de un asset (con archivo cargado vía select_related), o None
+    tipo = TIPO_DERIVADO.get(asset.tipo)
+    if tipo is None or asset.archivo_id is None:
+        return None
+    return reverse('derivado', args=[asset.archivo.sha256, tipo, tamaño])
+
+
+# ========== CACHÉ EN DISCO (LRU) ==========
+class CacheDerivados:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._escritos = 0   # bytes generados desde la última poda
+
+    @staticmethod
+    def renovar(ruta_derivado):
+        # Marca el derivado como recién usado
+        try:
+            if time.time() - os.path.getmtime(ruta_derivado) > RENOVAR_CADA:
+                os.utime(ruta_derivado)
+        except FileNotFoundError:
+            pass
+
+    def registrar(self, escritos):
+        # Cada 5% del tope escrito se revisa si hay que podar
+        maximo = _config('MAXIMO', 2 * 1024 ** 3)
+        with self._lock:
+            self._escritos += escritos
+            if self._escritos < maximo * 0.05:
+                return
+            self._escritos = 0
+        self.podar()
+
+    def podar(self, maximo=None):
+        # Borra los menos usados hasta quedar en PODAR_HASTA del tope; devuelve los bytes liberados
+        maximo = _config('MAXIMO', 2 * 1024 ** 3) if maximo is None else maximo
+        entradas = []
+        total = 0
+        for carpeta, _, nombres in os.walk(directorio()):
+            for nombre in nombres:
+                camino = os.path.join(carpeta, nombre)
+                try:
+                    datos = os.stat(camino)
+                except FileNotFoundError:
+                    continue
+                entradas.append((datos.st_mtime, datos.st_size, camino))
+                total += datos.st_size
+        if total <= maximo:
+            return 0
+        liberados = 0
+        for _, tamaño, camino in sorted(entradas):
+            if total - liberados <= maximo * PODAR_HASTA:
+                break
+            try:
+                os.remove(camino)
+            except FileNotFoundError:
+                continue
+            liberados += tamaño
+        return liberados
+
+
+cache = CacheDerivados()
+
+
+# ========== POOL DE PROCESOS ==========
+_lock = threading.Lock()
+_pool = None
+_pool_pid = None
+_en_curso = set()   # (sha256, tipo) ya encargados y sin terminar
+
+
+def _obtener_pool():
+    global _pool, _pool_pid
+    procesos = _config('PROCESOS', 2)
+    if not procesos:
+        return None
+    with _lock:
+        # Después de un fork (gunicorn --preload) el pool del padre no sirve
+        if _pool is None or _pool_pid != os.getpid():
+            # spawn: los procesos nuevos no heredan los hilos ni las conexiones de este
+            _pool = ProcessPoolExecutor(max_workers=procesos, mp_context=multiprocessing.get_context('spawn'))
+            _pool_pid = os.getpid()
+        return _pool
+
+
+def _descartar_pool():
+    global _pool
+    with _lock:
+        _pool = None
+
+
+def encargar(sha256, tipo):
+    # Pide los derivados en segundo plano sin esperarlos. Devuelve False si no
+    # se encargó (ya estaba en curso o el pool está desactivado).
+    pool = _obtener_pool()
+    if pool is None:
+        return False
+    clave = (sha256, tipo)
+    with _lock:
+        if clave in _en_curso:
+            return False
+        _en_curso.add(clave)
+    try:
+        futuro = pool.submit(generar, tipo, almacen.ruta(sha256), destinos(sha256, tipo), ruta_fallo(sha256, tipo))
+    except (BrokenProcessPool, RuntimeError):
+        logger.exception('El pool de derivados no acepta trabajos; se recrea en el próximo pedido')
+        _descartar_pool()
+        with _lock:
+            _en_curso.discard(clave)
+        return False
+    futuro.add_done_callback(lambda futuro: _terminado(clave, futuro))
+    return True
+
+
+def _terminado(clave, futuro):
+    with _lock:
+        _en_curso.discard(clave)
+    if futuro.exception() is not None:
+        logger.error('No se pudieron generar los derivados de %s', clave, exc_info=futuro.exception())
+        return
+    cache.registrar(futuro.result())
+
+
+def encargar_para(asset):
+    # Derivados del archivo de un asset, si le corresponden y faltan
+    tipo = TIPO_DERIVADO.get(asset.tipo)
+    if tipo is None or asset.archivo_id is None:
+        return False
+    sha256 = asset.archivo.sha256
+    if completo(sha256, tipo):
+        return False
+    return encargar(sha256, tipo)
@@ -0,0 +1,146 @@
+import os
+import re
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified
+from django.utils.http import content_disposition_header, parse_etags
+
+from . import almacen
+
+
+# Descarga de los archivos del almacén (almacen.py) sin pasarlos por la
+# memoria del worker. El ETag es el sha256 del contenido, así que validarlo
+# no lee el disco. Según PRODUCCION_DESCARGAS_MODO:
+#   ''             el worker envía el archivo con FileResponse. Bajo gunicorn
+#                  (wsgi.file_wrapper) eso es os.sendfile() desde la posición
+#                  del archivo, copia cero; con otros servidores se lee de a
+#                  BLOQUE bytes. Los Range los resuelve esta vista.
+#   'x-accel'      nginx: X-Accel-Redirect a PRODUCCION_DESCARGAS_PREFIJO, una
+#                  location `internal` con alias a PRODUCCION_ARCHIVOS_DIR
+#   'x-sendfile'   Apache (mod_xsendfile) o lighttpd: X-Sendfile con la ruta
+# Con los dos últimos el worker queda libre enseguida y el servidor de
+# adelante resuelve los Range.
+#
+#   location /archivos-internos/ {
+#       internal;
+#       alias /srv/gpm/media/archivos/;
+#   }
+
+BLOQUE = 256 * 1024
+
+# Un solo rango: "bytes=inicio-fin", "bytes=inicio-" o "bytes=-sufijo"
+RANGO = re.compile(r'bytes=(\d*)-(\d*)')
+
+
+def _config(nombre, defecto):
+    return getattr(settings, f'PRODUCCION_DESCARGAS_{nombre}', defecto)
+
+
+def etag(archivo):
+    return f'"{archivo.sha256}"'
+
+
+def rango(cabecera, tamaño):
+    # (inicio, fin inclusive), None si no hay que usarla (ausente, varios rangos
+    # o mal formada: se responde el archivo entero) o False si no se puede
+    # satisfacer (416)
+    coincidencia = RANGO.fullmatch(cabecera.replace(' ', '')) if cabecera else None
+    if coincidencia is None:
+        return None
+    inicio, fin = coincidencia.groups()
+    if not inicio:
+        if not fin:
+            return None
+        sufijo = int(fin)
+        if not sufijo or not tamaño:
+            return False
+        return max(tamaño - sufijo, 0), tamaño - 1
+    inicio = int(inicio)
+    if fin and int(fin) < inicio:
+        return None
+    if inicio >= tamaño:
+        return False
+    return inicio, min(int(fin), tamaño - 1) if fin else tamaño - 1
+
+
+class _Tramo:
+    # Lo que FileResponse necesita de un archivo, limitado a [inicio, inicio + largo).
+    # fileno() y la posición del archivo real quedan al alcance del file_wrapper
+    # de gunicorn, que con el Content-Length del rango hace sendfile de solo ese tramo.
+
+    def __init__(self, archivo, inicio, largo):
+        self._archivo = archivo
+        self._restante = largo
+        archivo.seek(inicio)
+
+    def read(self, cantidad=-1):
+        if cantidad < 0 or cantidad > self._restante:
+            cantidad = self._restante
+        datos = self._archivo.read(cantidad)
+        self._restante -= len(datos)
+        return datos
+
+    def fileno(self):
+        return self._archivo.fileno()
+
+    def tell(self):
+        return self._archivo.tell()
+
+    def seek(self, *args):
+        return self._archivo.seek(*args)
+
+    def close(self):
+        self._archivo.close()
+
+
+def responder(request, archivo, nombre):
+    # Respuesta de descarga de `archivo` (models.Archivo) con el nombre `nombre`
+    cabeceras = {
+        'ETag': etag(archivo),
+        'Accept-Ranges': 'bytes',
+        # El asset puede cambiar de archivo: el navegador revalida cada vez (304 sin leer nada)
+        'Cache-Control': 'private, no-cache',
+    }
+    validadores = parse_etags(request.headers.get('If-None-Match', ''))
+    if '*' in validadores or etag(archivo) in validadores:
+        return HttpResponseNotModified(headers=cabeceras)
+
+    tipo_mime = archivo.tipo_mime or 'application/octet-stream'
+    ruta = almacen.ruta(archivo.sha256)
+    modo = _config('MODO', '')
+    if modo:
+        respuesta = HttpResponse(content_type=tipo_mime, headers=cabeceras)
+        respuesta['Content-Disposition'] = content_disposition_header(True, nombre)
+        if modo == 'x-accel':
+            prefijo = _config('PREFIJO', '/archivos-internos/')
+            respuesta['X-Accel-Redirect'] = prefijo.rstrip('/') + '/' + os.path.relpath(ruta, almacen.directorio())
+        else:
+            respuesta['X-Sendfile'] = ruta
+        return respuesta
+
+    # If-Range con otro ETag: el cliente tiene otra versión, va el archivo entero
+    pedido = request.headers.get('Range') if request.headers.get('If-Range', etag(archivo)) == etag(archivo) else None
+    tramo = rango(pedido, archivo.tamaño)
+    if tramo is False:
+        respuesta = HttpResponse(status=416, headers=cabeceras)
+        respuesta['Content-Range'] = f'bytes */{archivo.tamaño}'
+        return respuesta
+
+    try:
+        contenido = open(ruta, 'rb')
+    except FileNotFoundError:
+        return None
+    if tramo is None:
+        respuesta = FileResponse(
+            contenido, as_attachment=True, filename=nombre, content_type=tipo_mime, headers=cabeceras,
+        )
+    else:
+        inicio, fin = tramo
+        respuesta = FileResponse(
+            _Tramo(contenido, inicio, fin - inicio + 1), as_attachment=True, filename=nombre,
+            content_type=tipo_mime, status=206, headers=cabeceras,
+        )
+        respuesta['Content-Length'] = fin - inicio + 1
+        respuesta['Content-Range'] = f'bytes {inicio}-{fin}/{archivo.tamaño}'
+    respuesta.block_size = BLOQUE
+    return respuesta
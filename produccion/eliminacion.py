@@ -0,0 +1,97 @@
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from . import actividad, autocompletar, busqueda
+from .models import Proyecto, Asset, Tarea
+from .signals import eliminacion_masiva
+
+
+# Borrado de proyectos grandes en dos tiempos. proyecto.delete() hace que el
+# Collector de Django cargue en memoria cada asset, tarea y fila de la tabla
+# intermedia de etiquetas (las tareas tienen receivers de post_delete, así que
+# no hay "fast delete") y los borre en una sola transacción larga.
+#   1. marcar(): un UPDATE que pone pendiente_eliminacion; el proyecto y sus
+#      tareas y assets (visibles() en los querysets) dejan de verse en listas,
+#      detalle, exportaciones, API, autocompletado y búsqueda en el acto.
+#   2. eliminar_pendientes() (comando eliminar_proyectos_pendientes): borra
+#      los hijos con DELETE ... WHERE id IN (...) de a PRODUCCION_ELIMINACION_LOTE
+#      filas, cada lote en su transacción, y al final el proyecto ya vacío.
+# Todo el estado está en la BD (la marca y lo que queda sin borrar), así que
+# si el proceso se corta basta con volver a correrlo.
+# Los resúmenes del proyecto no se ajustan por lote: no se muestran mientras
+# está marcado y caen en el CASCADE del final.
+
+Etiquetado = Tarea.etiquetas.through
+
+
+def _tamaño_lote():
+    return getattr(settings, 'PRODUCCION_ELIMINACION_LOTE', 1000)
+
+
+def marcar(*proyectos):
+    ids = [proyecto.pk for proyecto in proyectos]
+    with transaction.atomic():
+        Proyecto.objects.filter(id__in=ids).update(pendiente_eliminacion=True, fecha_actualizacion=timezone.now())
+        # El evento queda con el usuario que pidió el borrado (no con el del proceso de fondo)
+        actividad.registrar(*(
+            actividad.evento(proyecto, 'eliminar', {
+                campo: [valor, None] for campo, valor in actividad.valores(proyecto).items()
+            })
+            for proyecto in proyectos
+        ))
+    for pk in ids:
+        autocompletar.indices['proyectos'].eliminar(pk)
+        busqueda.indice_memoria.eliminar('proyecto', pk)
+
+
+def _borrar_filas(modelo, columna, ids):
+    # DELETE directo: sin cargar instancias ni disparar post_delete por fila
+    tabla = connection.ops.quote_name(modelo._meta.db_table)
+    marcadores = ', '.join(['%s'] * len(ids))
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {tabla} WHERE {columna} IN ({marcadores})', ids)
+
+
+def _borrar_lote(modelo, proyecto_id, lote):
+    # Borra hasta `lote` filas de `modelo` del proyecto; devuelve cuántas.
+    # skip_locked: dos procesos sobre el mismo proyecto no toman las mismas filas.
+    with transaction.atomic():
+        ids = list(
+            modelo.objects.filter(proyecto_id=proyecto_id).order_by()
+            .select_for_update(skip_locked=connection.features.has_select_for_update_skip_locked)
+            .values_list('id', flat=True)[:lote]
+        )
+        if not ids:
+            return 0
+        if modelo is Tarea:
+            _borrar_filas(Etiquetado, 'tarea_id', ids)
+        _borrar_filas(modelo, 'id', ids)
+        # Contadores e índices en memoria (ver signals.py)
+        eliminacion_masiva.send(sender=modelo, ids=ids)
+    return len(ids)
+
+
+def vaciar_proyecto(proyecto, lote=None, progreso=None):
+    # Borra las tareas y assets de un proyecto marcado y después el proyecto.
+    # progreso(proyecto, tipo, borradas, total) se llama después de cada lote.
+    lote = lote or _tamaño_lote()
+    for modelo, tipo in ((Tarea, 'tareas'), (Asset, 'assets')):
+        total = modelo.objects.filter(proyecto_id=proyecto.pk).count()
+        borradas = 0
+        while cantidad := _borrar_lote(modelo, proyecto.pk, lote):
+            borradas += cantidad
+            if progreso:
+                progreso(proyecto, tipo, borradas, total)
+
+    # Lo que queda (detalle, resúmenes, instantáneas) son pocas filas: CASCADE normal
+    with transaction.atomic():
+        Proyecto.objects.filter(pk=proyecto.pk).delete()
+
+
+def eliminar_pendientes(lote=None, progreso=None):
+    # Vacía y borra todos los proyectos marcados; devuelve cuántos eran
+    pendientes = list(Proyecto.objects.filter(pendiente_eliminacion=True).order_by('id'))
+    for proyecto in pendientes:
+        vaciar_proyecto(proyecto, lote=lote, progreso=progreso)
+    return len(pendientes)
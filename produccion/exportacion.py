@@ -0,0 +1,145 @@
+import csv
+from collections import defaultdict
+from itertools import islice
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection
+
+from .models import Asset, Tarea
+
+
+# Exportación en streaming de tareas y assets (CSV o NDJSON).
+# Las filas salen de .values_list() en lotes, nunca como instancias del modelo,
+# y las etiquetas de cada lote se traen con una sola consulta extra.
+# Así la respuesta empieza a enviarse al tiro y la memoria queda acotada
+# al tamaño del lote, sin importar cuántos millones de filas haya.
+
+TAMAÑO_LOTE = 2000
+
+# (nombre de la columna exportada, campo del ORM)
+COLUMNAS_TAREAS = [
+    ('id', 'id'),
+    ('titulo', 'titulo'),
+    ('descripcion', 'descripcion'),
+    ('estado', 'estado'),
+    ('prioridad', 'prioridad'),
+    ('proyecto_id', 'proyecto_id'),
+    ('proyecto', 'proyecto__nombre'),
+    ('fecha_creacion', 'fecha_creacion'),
+]
+
+COLUMNAS_ASSETS = [
+    ('id', 'id'),
+    ('nombre', 'nombre'),
+    ('tipo', 'tipo'),
+    ('descripcion', 'descripcion'),
+    ('proyecto_id', 'proyecto_id'),
+    ('proyecto', 'proyecto__nombre'),
+    ('fecha_creacion', 'fecha_creacion'),
+]
+
+
+def mapa_etiquetas(tarea_ids):
+    # {tarea_id: [nombres de etiquetas]} para un lote de tareas, en una consulta
+    etiquetas = defaultdict(list)
+    filas = (
+        Tarea.etiquetas.through.objects
+        .filter(tarea_id__in=tarea_ids)
+        .order_by('etiqueta__nombre')
+        .values_list('tarea_id', 'etiqueta__nombre')
+    )
+    for tarea_id, nombre in filas:
+        etiquetas[tarea_id].append(nombre)
+    return etiquetas
+
+
+def _lotes(iterable, tamaño):
+    iterador = iter(iterable)
+    while lote := list(islice(iterador, tamaño)):
+        yield lote
+
+
+def recorrer_en_lotes(queryset, campos, tamaño_lote=TAMAÑO_LOTE):
+    # Devuelve lotes de tuplas con los `campos` pedidos (el primero debe ser 'id').
+    # En Postgres iterator() usa un cursor del lado del servidor. mysqlclient en
+    # cambio descarga el resultado completo al cliente, así que en MySQL se
+    # pagina por id (keyset) para no cargar la tabla entera en el worker.
+    queryset = queryset.order_by('id').values_list(*campos)
+
+    if connection.vendor != 'mysql':
+        yield from _lotes(queryset.iterator(chunk_size=tamaño_lote), tamaño_lote)
+        return
+
+    ultimo_id = 0
+    while True:
+        lote = list(queryset.filter(id__gt=ultimo_id)[:tamaño_lote])
+        if not lote:
+            return
+        yield lote
+        ultimo_id = lote[-1][0]
+
+
+def filas_tareas(queryset=None, tamaño_lote=TAMAÑO_LOTE):
+    # Genera diccionarios {columna: valor}; etiquetas va como lista de nombres
+    queryset = Tarea.objects.visibles() if queryset is None else queryset
+    nombres = [nombre for nombre, _ in COLUMNAS_TAREAS]
+    campos = [campo for _, campo in COLUMNAS_TAREAS]
+
+    for lote in recorrer_en_lotes(queryset, campos, tamaño_lote):
+        etiquetas = mapa_etiquetas([fila[0] for fila in lote])
+        for fila in lote:
+            datos = dict(zip(nombres, fila))
+            datos['etiquetas'] = etiquetas.get(fila[0], [])
+            yield datos
+
+
+def filas_assets(queryset=None, tamaño_lote=TAMAÑO_LOTE):
+    queryset = Asset.objects.visibles() if queryset is None else queryset
+    nombres = [nombre for nombre, _ in COLUMNAS_ASSETS]
+    campos = [campo for _, campo in COLUMNAS_ASSETS]
+
+    for lote in recorrer_en_lotes(queryset, campos, tamaño_lote):
+        for fila in lote:
+            yield dict(zip(nombres, fila))
+
+
+# ========== FORMATOS ==========
+class _Eco:
+    # "Archivo" que devuelve lo escrito en vez de guardarlo (patrón de la doc de Django)
+    def write(self, valor):
+        return valor
+
+
+def como_csv(filas, columnas):
+    escritor = csv.writer(_Eco())
+    yield escritor.writerow(columnas)
+    for fila in filas:
+        if isinstance(fila.get('etiquetas'), list):
+            fila['etiquetas'] = '|'.join(fila['etiquetas'])  # mismo formato que importar
+        yield escritor.writerow([fila.get(columna) for columna in columnas])
+
+
+def como_ndjson(filas):
+    codificador = DjangoJSONEncoder(ensure_ascii=False)
+    for fila in filas:
+        yield codificador.encode(fila) + '\n'
+
+
+FORMATOS = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson; charset=utf-8',
+}
+
+
+def exportar(tipo, formato, queryset=None, tamaño_lote=TAMAÑO_LOTE):
+    # Devuelve un generador de fragmentos de texto listo para StreamingHttpResponse
+    if tipo == 'tareas':
+        filas = filas_tareas(queryset, tamaño_lote)
+        columnas = [nombre for nombre, _ in COLUMNAS_TAREAS] + ['etiquetas']
+    else:
+        filas = filas_assets(queryset, tamaño_lote)
+        columnas = [nombre for nombre, _ in COLUMNAS_ASSETS]
+
+    if formato == 'ndjson':
+        return como_ndjson(filas)
+    return como_csv(filas, columnas)
@@ -0,0 +1,96 @@
+from .models import Proyecto, Asset, Tarea, Actividad
+
+
+# Filtros del lado del servidor para las listas.
+# Cada función recibe el queryset y los parámetros GET, ignora los valores
+# inválidos y devuelve el queryset filtrado + los filtros que quedaron activos
+# (para que el template pueda mostrarlos y mantenerlos al paginar).
+
+def _entero(valor):
+    try:
+        valor = int(valor)
+    except (TypeError, ValueError):
+        return None
+    return valor if valor > 0 else None
+
+
+def _opcion(valor, choices):
+    return valor if valor in dict(choices) else None
+
+
+def filtrar_proyectos(queryset, params):
+    activos = {}
+
+    estado = _opcion(params.get('estado'), Proyecto.ESTADO_CHOICES)
+    if estado:
+        queryset = queryset.filter(estado=estado)
+        activos['estado'] = estado
+
+    return queryset, activos
+
+
+def filtrar_assets(queryset, params):
+    activos = {}
+
+    tipo = _opcion(params.get('tipo'), Asset.TIPO_CHOICES)
+    if tipo:
+        queryset = queryset.filter(tipo=tipo)
+        activos['tipo'] = tipo
+
+    proyecto = _entero(params.get('proyecto'))
+    if proyecto:
+        queryset = queryset.filter(proyecto_id=proyecto)
+        activos['proyecto'] = proyecto
+
+    return queryset, activos
+
+
+def filtrar_tareas(queryset, params):
+    activos = {}
+
+    estado = _opcion(params.get('estado'), Tarea.ESTADO_CHOICES)
+    if estado:
+        queryset = queryset.filter(estado=estado)
+        activos['estado'] = estado
+
+    prioridad = _opcion(params.get('prioridad'), Tarea.PRIORIDAD_CHOICES)
+    if prioridad:
+        queryset = queryset.filter(prioridad=prioridad)
+        activos['prioridad'] = prioridad
+
+    proyecto = _entero(params.get('proyecto'))
+    if proyecto:
+        queryset = queryset.filter(proyecto_id=proyecto)
+        activos['proyecto'] = proyecto
+
+    # Una tarea tiene a lo sumo una fila por etiqueta, así que el join no duplica
+    etiqueta = _entero(params.get('etiqueta'))
+    if etiqueta:
+        queryset = queryset.filter(etiquetas__id=etiqueta)
+        activos['etiqueta'] = etiqueta
+
+    return queryset, activos
+
+
+def filtrar_actividad(queryset, params):
+    activos = {}
+
+    proyecto = _entero(params.get('proyecto'))
+    if proyecto:
+        queryset = queryset.de_proyecto(proyecto)
+        activos['proyecto'] = proyecto
+
+    # ?tarea=, ?asset= o ?proyecto_objeto= (los cambios del proyecto en sí)
+    for tipo, parametro in (('tarea', 'tarea'), ('asset', 'asset'), ('proyecto', 'proyecto_objeto')):
+        objeto = _entero(params.get(parametro))
+        if objeto:
+            queryset = queryset.de_objeto(tipo, objeto)
+            activos[parametro] = objeto
+            break
+
+    accion = _opcion(params.get('accion'), Actividad.ACCION_CHOICES)
+    if accion:
+        queryset = queryset.filter(accion=accion)
+        activos['accion'] = accion
+
+    return queryset, activos
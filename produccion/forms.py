@@ -1,6 +1,37 @@
+import os
+
 from django import forms
+from django.urls import reverse_lazy
 from datetime import date
-from .models import Proyecto, DetalleProyecto, Asset, Tarea, Etiqueta
+from . import almacen
+from .autocompletar import Autocompletar, AutocompletarMultiple
+from .models import Proyecto, DetalleProyecto, Asset, Tarea, Etiqueta, Subida
+
+
+# Reglas de validación compartidas entre los formularios y la importación
+# masiva (importacion.py), para que un archivo importado cumpla lo mismo
+# que se pide al crear desde la web.
+
+def validar_nombre_asset(nombre):
+    #Valida que el nombre del asset no esté vacío ni sea solo espacios.
+    if nombre:
+        nombre = nombre.strip()
+        if len(nombre) < 2:
+            raise forms.ValidationError(
+                'El nombre del asset debe tener al menos 2 caracteres.'
+            )
+    return nombre
+
+
+def validar_titulo_tarea(titulo):
+    #Valida que el título de la tarea tenga al menos 5 caracteres.
+    if titulo:
+        titulo = titulo.strip()
+        if len(titulo) < 5:
+            raise forms.ValidationError(
+                'El título de la tarea debe tener al menos 5 caracteres.'
+            )
+    return titulo
 
 
 class ProyectoForm(forms.ModelForm):
@@ -101,6 +132,15 @@ class DetalleProyectoForm(forms.ModelForm):
 
 class AssetForm(forms.ModelForm):
     #Formulario para crear y editar assets del proyecto.
+    #El archivo se sube por trozos desde el navegador (subidas.js) y llega solo
+    #el token de la subida; sin JS llega entero en el POST. Ver almacen.py.
+    
+    archivo_nuevo = forms.FileField(
+        required=False,
+        label='Archivo',
+        widget=forms.FileInput(attrs={'class': 'form-control', 'data-subida': reverse_lazy('api_subidas')}),
+    )
+    subida = forms.UUIDField(required=False, widget=forms.HiddenInput)
     
     class Meta:
         model = Asset
@@ -116,7 +156,10 @@ class AssetForm(forms.ModelForm):
                 'rows': 3,
                 'placeholder': 'Descripción del asset (opcional)'
             }),
-            'proyecto': forms.Select(attrs={'class': 'form-control'}),
+            'proyecto': Autocompletar('proyectos', attrs={
+                'class': 'form-control',
+                'placeholder': 'Escribe para buscar un proyecto'
+            }),
         }
         labels = {
             'nombre': 'Nombre del Asset',
@@ -125,19 +168,38 @@ class AssetForm(forms.ModelForm):
             'proyecto': 'Proyecto Asociado'
         }
     
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if self.instance.archivo_id:
+            self.fields['archivo_nuevo'].help_text = (
+                f'Actual: {self.instance.nombre_archivo or "sin nombre"}. Elegir otro lo reemplaza.'
+            )
+    
     def clean_nombre(self):
-        #Valida que el nombre del asset no esté vacío ni sea solo espacios.
-        
-        nombre = self.cleaned_data.get('nombre')
-        
-        if nombre:
-            nombre = nombre.strip()
-            if len(nombre) < 2:
-                raise forms.ValidationError(
-                    'El nombre del asset debe tener al menos 2 caracteres.'
-                )
-        
-        return nombre
+        return validar_nombre_asset(self.cleaned_data.get('nombre'))
+    
+    def clean_subida(self):
+        token = self.cleaned_data.get('subida')
+        if token is None:
+            return None
+        subida = Subida.objects.select_related('archivo').filter(token=token, archivo__isnull=False).first()
+        if subida is None:
+            raise forms.ValidationError('La subida del archivo no terminó. Vuelve a elegirlo para retomarla.')
+        return subida
+    
+    def save(self, commit=True):
+        asset = super().save(commit=False)
+        subida = self.cleaned_data.get('subida')
+        archivo_nuevo = self.cleaned_data.get('archivo_nuevo')
+        if subida is not None:
+            asset.archivo, asset.nombre_archivo = subida.archivo, subida.nombre_archivo
+        elif archivo_nuevo is not None:
+            asset.archivo, _ = almacen.guardar(archivo_nuevo.chunks(), archivo_nuevo.content_type or '')
+            asset.nombre_archivo = os.path.basename(archivo_nuevo.name)[:255]
+        if commit:
+            asset.save()
+            self.save_m2m()
+        return asset
 
 
 class TareaForm(forms.ModelForm):
@@ -159,8 +221,14 @@ class TareaForm(forms.ModelForm):
             }),
             'estado': forms.Select(attrs={'class': 'form-control'}),
             'prioridad': forms.Select(attrs={'class': 'form-control'}),
-            'proyecto': forms.Select(attrs={'class': 'form-control'}),
-            'etiquetas': forms.CheckboxSelectMultiple(),
+            'proyecto': Autocompletar('proyectos', attrs={
+                'class': 'form-control',
+                'placeholder': 'Escribe para buscar un proyecto'
+            }),
+            'etiquetas': AutocompletarMultiple('etiquetas', attrs={
+                'class': 'form-control',
+                'placeholder': 'Escribe para agregar etiquetas'
+            }),
         }
         labels = {
             'titulo': 'Título de la Tarea',
@@ -172,18 +240,7 @@ class TareaForm(forms.ModelForm):
         }
     
     def clean_titulo(self):
-        #Valida que el título de la tarea tenga al menos 5 caracteres.
-       
-        titulo = self.cleaned_data.get('titulo')
-        
-        if titulo:
-            titulo = titulo.strip()
-            if len(titulo) < 5:
-                raise forms.ValidationError(
-                    'El título de la tarea debe tener al menos 5 caracteres.'
-                )
-        
-        return titulo
+        return validar_titulo_tarea(self.cleaned_data.get('titulo'))
 
 
 class EtiquetaForm(forms.ModelForm):
@@ -209,7 +266,7 @@ class EtiquetaForm(forms.ModelForm):
         nombre = self.cleaned_data.get('nombre')
         
         if nombre:
-            nombre = nombre.strip()
+            nombre = ' '.join(nombre.split())
             
             # Validar longitud
             if len(nombre) < 2:
@@ -217,9 +274,9 @@ class EtiquetaForm(forms.ModelForm):
                     'El nombre de la etiqueta debe tener al menos 2 caracteres.'
                 )
             
-            # Validar que no exista ya (case-insensitive)
+            # Validar que no exista ya (sin distinguir mayúsculas ni espacios)
             # Excluir la instancia actual si estamos editando
-            exists = Etiqueta.objects.filter(nombre__iexact=nombre)
+            exists = Etiqueta.objects.por_nombre(nombre)
             if self.instance.pk:
                 exists = exists.exclude(pk=self.instance.pk)
             
@@ -228,4 +285,56 @@ class EtiquetaForm(forms.ModelForm):
                     f'Ya existe una etiqueta con el nombre "{nombre}".'
                 )
         
-        return nombre
\ No newline at end of file
+        return nombre
+
+
+class ImportacionForm(forms.Form):
+    #Formulario para subir un archivo CSV o NDJSON con tareas o assets.
+    
+    TIPO_CHOICES = [
+        ('tareas', 'Tareas'),
+        ('assets', 'Assets'),
+    ]
+    
+    tipo = forms.ChoiceField(
+        choices=TIPO_CHOICES,
+        label='Qué vas a importar',
+        widget=forms.Select(attrs={'class': 'form-control'})
+    )
+    archivo = forms.FileField(
+        label='Archivo (.csv o .ndjson)',
+        widget=forms.ClearableFileInput(attrs={'class': 'form-control', 'accept': '.csv,.ndjson,.jsonl'})
+    )
+
+
+class AccionMasivaTareasForm(forms.Form):
+    #Cambios masivos desde la lista de tareas (ver acciones_masivas.py).
+    #Los filtros de la lista llegan en la URL, no en este formulario.
+    
+    ALCANCE_CHOICES = [
+        ('seleccionadas', 'Tareas seleccionadas'),
+        ('filtradas', 'Todas las tareas filtradas'),
+    ]
+    
+    alcance = forms.ChoiceField(choices=ALCANCE_CHOICES, initial='seleccionadas')
+    estado = forms.ChoiceField(
+        choices=[('', 'Estado sin cambio')] + Tarea.ESTADO_CHOICES, required=False
+    )
+    prioridad = forms.ChoiceField(
+        choices=[('', 'Prioridad sin cambio')] + Tarea.PRIORIDAD_CHOICES, required=False
+    )
+    agregar_etiquetas = forms.ModelMultipleChoiceField(
+        queryset=Etiqueta.objects.all(), required=False,
+        widget=AutocompletarMultiple('etiquetas', attrs={'placeholder': 'Agregar etiquetas'})
+    )
+    quitar_etiquetas = forms.ModelMultipleChoiceField(
+        queryset=Etiqueta.objects.all(), required=False,
+        widget=AutocompletarMultiple('etiquetas', attrs={'placeholder': 'Quitar etiquetas'})
+    )
+    
+    def clean(self):
+        datos = super().clean()
+        if not (datos.get('estado') or datos.get('prioridad')
+                or datos.get('agregar_etiquetas') or datos.get('quitar_etiquetas')):
+            raise forms.ValidationError('Elige al menos un cambio para aplicar.')
+        return datos
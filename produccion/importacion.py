@@ -0,0 +1,266 @@
+import csv
+import io
+import json
+import time
+from contextlib import contextmanager
+
+from django import forms
+from django.db import connection, transaction
+
+from .forms import validar_nombre_asset, validar_titulo_tarea
+from .models import Proyecto, Asset, Tarea, Etiqueta, normalizar_nombre_etiqueta
+from .signals import creacion_masiva
+
+
+# Importación masiva de tareas y assets desde CSV o NDJSON (un JSON por línea).
+# El archivo se lee fila por fila y se escribe en lotes con bulk_create, así
+# la memoria usada depende del tamaño del lote y no del tamaño del archivo.
+#
+# Columnas de tareas: titulo, descripcion, estado, prioridad, proyecto, etiquetas
+# Columnas de assets:  nombre, tipo, descripcion, proyecto
+# `proyecto` puede ser el id o el nombre; `etiquetas` en CSV va separado por "|"
+# (en NDJSON también puede ser una lista). Las etiquetas que no existen se crean.
+
+TAMAÑO_LOTE = 1000
+MAXIMO_ERRORES_GUARDADOS = 100
+ESPERA_CANDADO = 30     # segundos que se espera a otra importación del mismo tipo (MySQL)
+
+
+class ResultadoImportacion:
+
+    def __init__(self):
+        self.filas = 0
+        self.creados = 0
+        self.errores = []        # (número de fila, mensaje), solo los primeros
+        self.total_errores = 0
+        self.segundos = 0.0
+
+    @property
+    def filas_por_segundo(self):
+        return self.filas / self.segundos if self.segundos else 0.0
+
+    def agregar_error(self, fila, mensaje):
+        self.total_errores += 1
+        if len(self.errores) < MAXIMO_ERRORES_GUARDADOS:
+            self.errores.append((fila, mensaje))
+
+    def resumen(self):
+        return (
+            f'{self.creados} creados de {self.filas} filas, {self.total_errores} con errores, '
+            f'en {self.segundos:.2f} s ({self.filas_por_segundo:,.0f} filas/s)'
+        )
+
+
+# ========== LECTURA EN STREAMING ==========
+def detectar_formato(nombre_archivo):
+    nombre = (nombre_archivo or '').lower()
+    if nombre.endswith(('.ndjson', '.jsonl', '.json')):
+        return 'ndjson'
+    return 'csv'
+
+
+def leer_filas(archivo, formato):
+    # `archivo` es binario (archivo subido o abierto con 'rb'); se decodifica de a poco
+    texto = io.TextIOWrapper(archivo, encoding='utf-8-sig', newline='')
+    try:
+        if formato == 'ndjson':
+            for linea in texto:
+                linea = linea.strip()
+                if linea:
+                    yield json.loads(linea)
+        else:
+            yield from csv.DictReader(texto)
+    finally:
+        texto.detach()  # no cerrar el archivo original, es del llamador
+
+
+# ========== IMPORTADOR ==========
+class Importador:
+
+    def __init__(self, tipo, tamaño_lote=TAMAÑO_LOTE):
+        if tipo not in ('tareas', 'assets'):
+            raise ValueError(f'Tipo de importación no válido: {tipo}')
+        self.tipo = tipo
+        self.modelo = Tarea if tipo == 'tareas' else Asset
+        self.tamaño_lote = tamaño_lote
+        self.resultado = ResultadoImportacion()
+        self._proyectos_por_nombre = None
+        self._proyectos_ids = None
+        self._etiquetas = None
+        self._lote = []  # (objeto, ids de etiquetas)
+
+    # ----- mapas de búsqueda en memoria (una consulta cada uno) -----
+    def _cargar_proyectos(self):
+        self._proyectos_por_nombre = {}
+        self._proyectos_ids = set()
+        for pk, nombre in Proyecto.objects.values_list('id', 'nombre').order_by().iterator(chunk_size=5000):
+            self._proyectos_ids.add(pk)
+            self._proyectos_por_nombre.setdefault(nombre.strip().casefold(), pk)
+
+    def _resolver_proyecto(self, valor):
+        if self._proyectos_ids is None:
+            self._cargar_proyectos()
+        valor = str(valor if valor is not None else '').strip()
+        if not valor:
+            raise forms.ValidationError('Falta el proyecto.')
+        if valor.isdigit() and int(valor) in self._proyectos_ids:
+            return int(valor)
+        pk = self._proyectos_por_nombre.get(valor.casefold())
+        if pk is None:
+            raise forms.ValidationError(f'No existe el proyecto "{valor}".')
+        return pk
+
+    def _resolver_etiquetas(self, valor):
+        if self._etiquetas is None:
+            self._etiquetas = dict(Etiqueta.objects.values_list('nombre_normalizado', 'id'))
+        if isinstance(valor, str):
+            nombres = valor.split('|')
+        else:
+            nombres = valor or []
+
+        ids = []
+        for nombre in nombres:
+            nombre = ' '.join(str(nombre).split())[:50]
+            if not nombre:
+                continue
+            clave = normalizar_nombre_etiqueta(nombre)
+            if clave not in self._etiquetas:
+                if len(nombre) < 2:
+                    raise forms.ValidationError(f'Etiqueta demasiado corta: "{nombre}".')
+                etiqueta, _ = Etiqueta.objects.obtener_o_crear(nombre)
+                self._etiquetas[clave] = etiqueta.pk
+            ids.append(self._etiquetas[clave])
+        return list(dict.fromkeys(ids))
+
+    # ----- validación (mismas reglas que los formularios) -----
+    @staticmethod
+    def _texto(valor):
+        return str(valor).strip() if valor is not None else ''
+
+    @classmethod
+    def _opcion(cls, valor, choices, por_defecto, campo):
+        valor = cls._texto(valor) or por_defecto
+        if valor not in dict(choices):
+            raise forms.ValidationError(f'Valor no válido para {campo}: "{valor}".')
+        return valor
+
+    @classmethod
+    def _requerido(cls, valor, campo, largo_maximo=None):
+        valor = cls._texto(valor)
+        if not valor:
+            raise forms.ValidationError(f'Falta el campo {campo}.')
+        if largo_maximo and len(valor) > largo_maximo:
+            raise forms.ValidationError(f'{campo} supera los {largo_maximo} caracteres.')
+        return valor
+
+    def _construir_tarea(self, fila):
+        titulo = validar_titulo_tarea(self._requerido(fila.get('titulo'), 'titulo', 200))
+        tarea = Tarea(
+            titulo=titulo,
+            descripcion=self._requerido(fila.get('descripcion'), 'descripcion'),
+            estado=self._opcion(fila.get('estado'), Tarea.ESTADO_CHOICES, 'pendiente', 'estado'),
+            prioridad=self._opcion(fila.get('prioridad'), Tarea.PRIORIDAD_CHOICES, 'media', 'prioridad'),
+            proyecto_id=self._resolver_proyecto(fila.get('proyecto')),
+        )
+        return tarea, self._resolver_etiquetas(fila.get('etiquetas'))
+
+    def _construir_asset(self, fila):
+        nombre = validar_nombre_asset(self._requerido(fila.get('nombre'), 'nombre', 200))
+        asset = Asset(
+            nombre=nombre,
+            tipo=self._opcion(fila.get('tipo'), Asset.TIPO_CHOICES, '', 'tipo'),
+            descripcion=self._texto(fila.get('descripcion')),
+            proyecto_id=self._resolver_proyecto(fila.get('proyecto')),
+        )
+        return asset, []
+
+    # ----- escritura por lotes -----
+    def _asignar_ids(self, objetos):
+        # MySQL no devuelve los ids de bulk_create: se asignan acá, a partir del
+        # último (como seed_benchmark), para enlazar las etiquetas y avisar a
+        # creacion_masiva. Otra importación no puede reservar el mismo rango
+        # mientras dure el candado de _candado_ids().
+        ultimo = self.modelo.objects.order_by('-id').values_list('id', flat=True).first()
+        for pk, objeto in enumerate(objetos, start=(ultimo or 0) + 1):
+            objeto.pk = pk
+
+    def _guardar_lote(self):
+        if not self._lote:
+            return
+        objetos = [objeto for objeto, _ in self._lote]
+        Through = Tarea.etiquetas.through
+
+        with transaction.atomic():
+            if not connection.features.can_return_rows_from_bulk_insert:
+                self._asignar_ids(objetos)
+            self.modelo.objects.bulk_create(objetos)
+
+            if self.modelo is Tarea:
+                Through.objects.bulk_create([
+                    Through(tarea_id=objeto.pk, etiqueta_id=etiqueta_id)
+                    for objeto, ids in self._lote
+                    for etiqueta_id in ids
+                ], ignore_conflicts=True)
+
+            creacion_masiva.send(sender=self.modelo, objetos=objetos)
+
+        self.resultado.creados += len(objetos)
+        self._lote = []
+
+    def importar(self, filas):
+        construir = self._construir_tarea if self.modelo is Tarea else self._construir_asset
+        inicio = time.perf_counter()
+
+        for numero, fila in enumerate(filas, start=1):
+            self.resultado.filas += 1
+            try:
+                if not isinstance(fila, dict):
+                    raise forms.ValidationError('La fila no es un objeto.')
+                self._lote.append(construir(fila))
+            except forms.ValidationError as error:
+                self.resultado.agregar_error(numero, ' '.join(error.messages))
+                continue
+            if len(self._lote) >= self.tamaño_lote:
+                self._guardar_lote()
+
+        self._guardar_lote()
+        self.resultado.segundos = time.perf_counter() - inicio
+        return self.resultado
+
+
+@contextmanager
+def _candado_ids(modelo):
+    # Donde hay que reservar los ids a mano (MySQL) se toma un candado con
+    # nombre durante toda la importación: GET_LOCK es de la sesión, no de la
+    # transacción, así que dura entre lote y lote. Un SELECT ... FOR UPDATE no
+    # alcanza: con READ COMMITTED (el nivel que usa Django) InnoDB no bloquea
+    # el hueco después del último id. Devuelve False si no se pudo tomar.
+    if connection.features.can_return_rows_from_bulk_insert or connection.vendor != 'mysql':
+        yield True
+        return
+    nombre = f'produccion:importar:{modelo._meta.db_table}'
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT GET_LOCK(%s, %s)', [nombre, ESPERA_CANDADO])
+        tomado = cursor.fetchone()[0] == 1
+    try:
+        yield tomado
+    finally:
+        if tomado:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT RELEASE_LOCK(%s)', [nombre])
+
+
+def importar_archivo(archivo, tipo, formato=None, tamaño_lote=TAMAÑO_LOTE):
+    formato = formato or detectar_formato(getattr(archivo, 'name', ''))
+    importador = Importador(tipo, tamaño_lote=tamaño_lote)
+    with _candado_ids(importador.modelo) as tomado:
+        if not tomado:
+            importador.resultado.agregar_error(0, f'Hay otra importación de {tipo} en curso; intenta de nuevo más tarde.')
+            return importador.resultado
+        try:
+            return importador.importar(leer_filas(archivo, formato))
+        except (json.JSONDecodeError, UnicodeDecodeError, csv.Error) as error:
+            # Un archivo mal formado corta la lectura; lo ya guardado queda guardado
+            importador._guardar_lote()
+            importador.resultado.agregar_error(importador.resultado.filas + 1, f'Archivo mal formado: {error}')
+            return importador.resultado
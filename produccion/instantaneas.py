@@ -0,0 +1,194 @@
+import struct
+from collections import Counter
+from datetime import datetime, time, timedelta
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import Proyecto, Tarea, ResumenTareas, InstantaneaDiaria, Actividad
+
+try:
+    import numpy  # Opcional: si está instalado las series se devuelven como numpy.ndarray
+except ImportError:
+    numpy = None
+
+
+# Instantáneas diarias (InstantaneaDiaria) para burndown y flujo acumulado.
+# Cada fila guarda los conteos de un proyecto en un día como 9 enteros sin
+# signo de 32 bits (little-endian), uno por columna de COLUMNAS. Se toman
+# leyendo ResumenTareas (unas filas por proyecto, sin recorrer las tareas) y
+# se leen como una matriz días x columnas lista para numpy. Los días sin foto
+# se pueden reconstruir desde el registro de actividad (ver reconstruir()).
+
+ESTADOS = [estado for estado, _ in Tarea.ESTADO_CHOICES]
+PRIORIDADES = [prioridad for prioridad, _ in Tarea.PRIORIDAD_CHOICES]
+
+# Orden fijo de los conteos empaquetados: agregar un estado o prioridad
+# cambia el formato y obliga a migrar las filas existentes
+COLUMNAS = [(estado, prioridad) for estado in ESTADOS for prioridad in PRIORIDADES]
+_FORMATO = struct.Struct(f'<{len(COLUMNAS)}I')
+
+# Agrupaciones de columnas que acepta serie(por=...)
+AGRUPACIONES = {
+    'estado': (ESTADOS, 0),
+    'prioridad': (PRIORIDADES, 1),
+}
+
+# Rango máximo de una serie (unos 5 años)
+DIAS_MAXIMOS = 1830
+
+
+def empaquetar(conteos):
+    # {(estado, prioridad): total} -> bytes
+    return _FORMATO.pack(*(conteos.get(columna, 0) for columna in COLUMNAS))
+
+
+def desempaquetar(datos):
+    # bytes -> tupla con un conteo por columna de COLUMNAS
+    return _FORMATO.unpack(bytes(datos))
+
+
+def tomar(fecha=None):
+    # Guarda (o reemplaza) la foto de `fecha` de todos los proyectos, con los
+    # conteos actuales. Devuelve la cantidad de proyectos.
+    fecha = fecha or timezone.localdate()
+    conteos = {pk: {} for pk in Proyecto.objects.order_by().values_list('id', flat=True).iterator(chunk_size=5000)}
+    filas = ResumenTareas.objects.order_by().values_list('proyecto_id', 'estado', 'prioridad', 'total')
+    for proyecto_id, estado, prioridad, total in filas.iterator(chunk_size=5000):
+        conteos[proyecto_id][(estado, prioridad)] = total
+
+    fotos = [
+        InstantaneaDiaria(proyecto_id=pk, fecha=fecha, conteos=empaquetar(conteos_proyecto))
+        for pk, conteos_proyecto in conteos.items()
+    ]
+    with transaction.atomic():
+        if connection.features.supports_update_conflicts:
+            # MySQL no acepta unique_fields: ON DUPLICATE KEY UPDATE salta con
+            # cualquier clave única, y la única además de la pk es (proyecto, fecha)
+            opciones = {'update_conflicts': True, 'update_fields': ['conteos']}
+            if connection.features.supports_update_conflicts_with_target:
+                opciones['unique_fields'] = ['proyecto', 'fecha']
+            InstantaneaDiaria.objects.bulk_create(fotos, batch_size=2000, **opciones)
+        else:
+            InstantaneaDiaria.objects.filter(fecha=fecha).delete()
+            InstantaneaDiaria.objects.bulk_create(fotos, batch_size=2000)
+    return len(conteos)
+
+
+def reconstruir(desde, hasta=None):
+    # Completa las fotos que faltan entre `desde` y `hasta` (por defecto, ayer)
+    # partiendo de los conteos actuales y deshaciendo hacia atrás, día por día,
+    # lo que dice el registro de actividad de las tareas. Las fotos que ya
+    # existen no se tocan. Lo que no dejó rastro en la actividad (altas
+    # masivas, ediciones anteriores al registro) no se puede reconstruir.
+    # Devuelve la cantidad de fotos generadas (incluye las que ya existían y se ignoraron).
+    ayer = timezone.localdate() - timedelta(days=1)
+    hasta = min(hasta or ayer, ayer)
+    if hasta < desde:
+        return 0
+
+    conteos = {pk: Counter() for pk in Proyecto.objects.order_by().values_list('id', flat=True).iterator(chunk_size=5000)}
+    for proyecto_id, estado, prioridad, total in ResumenTareas.objects.order_by().values_list(
+        'proyecto_id', 'estado', 'prioridad', 'total'
+    ).iterator(chunk_size=5000):
+        conteos[proyecto_id][(estado, prioridad)] = total
+
+    inicio = timezone.make_aware(datetime.combine(desde + timedelta(days=1), time.min))
+    eventos = Actividad.objects.filter(tipo='tarea', fecha__gte=inicio).order_by()
+
+    # Estado actual (proyecto, estado, prioridad) de las tareas que aparecen en los eventos
+    claves = {}
+    tocadas = list(eventos.values_list('objeto_id', flat=True).distinct())
+    for posicion in range(0, len(tocadas), 1000):
+        for pk, proyecto_id, estado, prioridad in Tarea.objects.filter(
+            id__in=tocadas[posicion:posicion + 1000]
+        ).order_by().values_list('id', 'proyecto_id', 'estado', 'prioridad'):
+            claves[pk] = (proyecto_id, estado, prioridad)
+
+    def mover(clave, delta):
+        if clave[0] in conteos:
+            conteos[clave[0]][clave[1:]] += delta
+
+    def deshacer(objeto_id, accion, cambios):
+        if accion == 'crear':
+            clave = claves.pop(objeto_id, None)
+            if clave:
+                mover(clave, -1)
+        elif accion == 'eliminar':
+            clave = tuple(cambios.get(campo, [None])[0] for campo in ('proyecto_id', 'estado', 'prioridad'))
+            if None not in clave:
+                claves[objeto_id] = clave
+                mover(clave, 1)
+        elif objeto_id in claves and cambios.keys() & {'proyecto_id', 'estado', 'prioridad'}:
+            despues = claves[objeto_id]
+            antes = tuple(
+                cambios[campo][0] if campo in cambios else valor
+                for campo, valor in zip(('proyecto_id', 'estado', 'prioridad'), despues)
+            )
+            mover(despues, -1)
+            mover(antes, 1)
+            claves[objeto_id] = antes
+
+    filas = eventos.order_by('-fecha', '-id').values_list('fecha', 'objeto_id', 'accion', 'cambios')
+    pendientes = filas.iterator(chunk_size=5000)
+    siguiente = next(pendientes, None)
+    creadas = 0
+    for desplazamiento in range((hasta - desde).days + 1):
+        dia = hasta - timedelta(days=desplazamiento)
+        while siguiente is not None and timezone.localdate(siguiente[0]) > dia:
+            deshacer(*siguiente[1:])
+            siguiente = next(pendientes, None)
+        fotos = [
+            InstantaneaDiaria(
+                proyecto_id=pk, fecha=dia,
+                conteos=empaquetar({clave: max(total, 0) for clave, total in conteos_proyecto.items()}),
+            )
+            for pk, conteos_proyecto in conteos.items()
+        ]
+        with transaction.atomic():
+            InstantaneaDiaria.objects.bulk_create(fotos, batch_size=2000, ignore_conflicts=True)
+        creadas += len(fotos)
+    return creadas
+
+
+def _agrupar(filas, por):
+    nombres, posicion = AGRUPACIONES[por]
+    indices = [[i for i, columna in enumerate(COLUMNAS) if columna[posicion] == nombre] for nombre in nombres]
+    return nombres, [[sum(fila[i] for i in grupo) for grupo in indices] for fila in filas]
+
+
+def serie(proyecto_id, desde, hasta, por=None):
+    # Conteos de un proyecto por día entre `desde` y `hasta` (inclusive).
+    # Devuelve (columnas, matriz) con una fila por día; las columnas son
+    # COLUMNAS o, con por='estado'/'prioridad', los estados o prioridades.
+    # Un día sin foto repite la anterior (también la previa a `desde`);
+    # antes de la primera foto del proyecto los conteos son 0.
+    dias = (hasta - desde).days + 1
+    if dias < 1:
+        raise ValueError('hasta debe ser igual o posterior a desde.')
+    if dias > DIAS_MAXIMOS:
+        raise ValueError(f'El rango no puede superar los {DIAS_MAXIMOS} días.')
+    if por is not None and por not in AGRUPACIONES:
+        raise ValueError(f'Agrupación no válida: "{por}".')
+
+    instantaneas = InstantaneaDiaria.objects.filter(proyecto_id=proyecto_id).order_by()
+    previa = instantaneas.filter(fecha__lt=desde).order_by('-fecha').values_list('conteos', flat=True).first()
+    ultima = desempaquetar(previa) if previa is not None else (0,) * len(COLUMNAS)
+
+    por_dia = {
+        fecha: datos
+        for fecha, datos in instantaneas.filter(fecha__range=(desde, hasta)).values_list('fecha', 'conteos')
+    }
+    filas = []
+    for desplazamiento in range(dias):
+        datos = por_dia.get(desde + timedelta(days=desplazamiento))
+        if datos is not None:
+            ultima = desempaquetar(datos)
+        filas.append(ultima)
+
+    columnas = [f'{estado}/{prioridad}' for estado, prioridad in COLUMNAS]
+    if por is not None:
+        columnas, filas = _agrupar(filas, por)
+    if numpy is not None:
+        return columnas, numpy.array(filas, dtype=numpy.uint32)
+    return columnas, [list(fila) for fila in filas]
@@ -0,0 +1,202 @@
+import json
+import logging
+import random
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.template.backends.django import DjangoTemplates
+
+
+# Instrumentación por petición: consultas SQL, tiempo en la BD, consultas
+# repetidas / patrones N+1, tiempo de render de templates y tiempo de los
+# middlewares. Sale como cabecera Server-Timing (visible en las DevTools del
+# navegador) y como una línea JSON en el logger "produccion.instrumentacion".
+#
+# Se activa con PRODUCCION_INSTRUMENTACION = True; apagada, los middlewares
+# se descartan al arrancar (MiddlewareNotUsed) y no cuestan nada.
+# PRODUCCION_INSTRUMENTACION_MUESTREO (0 a 1) indica qué fracción de las
+# peticiones se mide.
+
+logger = logging.getLogger('produccion.instrumentacion')
+
+# Medición de la petición en curso (la lee el backend de templates)
+medicion_actual = ContextVar('medicion_actual', default=None)
+
+# A partir de cuántas repeticiones de una misma consulta (con distintos
+# parámetros) se la reporta como patrón N+1
+UMBRAL_N_MAS_1 = 5
+
+_LITERALES = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_LISTAS = re.compile(r'\((?:\s*(?:%s|\?)\s*,)+\s*(?:%s|\?)\s*\)')
+_ESPACIOS = re.compile(r'\s+')
+
+
+def normalizar_sql(sql):
+    # Misma "forma" de consulta sin importar los valores:
+    #   ... WHERE id IN (%s, %s, %s) LIMIT 21  ->  ... WHERE id IN (...) LIMIT ?
+    sql = _LITERALES.sub('?', sql)
+    sql = _LISTAS.sub('(...)', sql)
+    return _ESPACIOS.sub(' ', sql).strip()
+
+
+class MedicionPeticion:
+
+    def __init__(self):
+        self.inicio = time.perf_counter()
+        self.consultas = 0
+        self.tiempo_sql = 0.0
+        self.tiempo_templates = 0.0
+        self.tiempo_vista = None
+        self.patrones = {}          # sql normalizado -> [veces, segundos]
+        self.exactas = Counter()    # (sql, parámetros) -> veces
+
+    # execute_wrapper de cada conexión
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duracion = time.perf_counter() - inicio
+            self.consultas += 1
+            self.tiempo_sql += duracion
+            patron = self.patrones.setdefault(normalizar_sql(sql), [0, 0.0])
+            patron[0] += 1
+            patron[1] += duracion
+            self.exactas[(sql, repr(params))] += 1
+
+    @property
+    def duplicadas(self):
+        # Consultas idénticas (mismo SQL y mismos parámetros) ejecutadas más de una vez
+        return sum(veces - 1 for veces in self.exactas.values() if veces > 1)
+
+    def n_mas_1(self, umbral=UMBRAL_N_MAS_1):
+        # Misma forma de consulta repetida muchas veces: típico de un loop en el template
+        return sorted(
+            (
+                {'sql': sql, 'veces': veces, 'ms': round(segundos * 1000, 2)}
+                for sql, (veces, segundos) in self.patrones.items()
+                if veces >= umbral
+            ),
+            key=lambda patron: -patron['veces'],
+        )
+
+    def server_timing(self, total):
+        partes = [
+            f'db;dur={self.tiempo_sql * 1000:.2f};desc="{self.consultas} consultas, {self.duplicadas} duplicadas"',
+            f'tpl;dur={self.tiempo_templates * 1000:.2f};desc="templates"',
+        ]
+        if self.tiempo_vista is not None:
+            partes.append(f'vista;dur={self.tiempo_vista * 1000:.2f};desc="vista"')
+            partes.append(f'mw;dur={(total - self.tiempo_vista) * 1000:.2f};desc="middlewares"')
+        partes.append(f'total;dur={total * 1000:.2f}')
+        return ', '.join(partes)
+
+
+def _instrumentacion_activa():
+    return getattr(settings, 'PRODUCCION_INSTRUMENTACION', False)
+
+
+# ========== MIDDLEWARES ==========
+# InstrumentacionMiddleware va primero en MIDDLEWARE (mide todo) e
+# InstrumentacionVistaMiddleware último (mide solo la vista); la diferencia
+# es lo que se fue en sesiones, mensajes, CSRF, etc.
+class InstrumentacionMiddleware:
+
+    def __init__(self, get_response):
+        if not _instrumentacion_activa():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.muestreo = getattr(settings, 'PRODUCCION_INSTRUMENTACION_MUESTREO', 1.0)
+        self.umbral = getattr(settings, 'PRODUCCION_INSTRUMENTACION_UMBRAL_N_MAS_1', UMBRAL_N_MAS_1)
+
+    def __call__(self, request):
+        if self.muestreo < 1 and random.random() >= self.muestreo:
+            return self.get_response(request)
+
+        medicion = MedicionPeticion()
+        token = medicion_actual.set(medicion)
+        try:
+            with ExitStack() as pila:
+                for conexion in connections.all():
+                    pila.enter_context(conexion.execute_wrapper(medicion))
+                respuesta = self.get_response(request)
+        finally:
+            medicion_actual.reset(token)
+
+        total = time.perf_counter() - medicion.inicio
+        respuesta['Server-Timing'] = medicion.server_timing(total)
+        self._registrar(request, respuesta, medicion, total)
+        return respuesta
+
+    def _registrar(self, request, respuesta, medicion, total):
+        n_mas_1 = medicion.n_mas_1(self.umbral)
+        datos = {
+            'metodo': request.method,
+            'ruta': request.path,
+            'status': respuesta.status_code,
+            'total_ms': round(total * 1000, 2),
+            'vista_ms': round(medicion.tiempo_vista * 1000, 2) if medicion.tiempo_vista is not None else None,
+            'db_ms': round(medicion.tiempo_sql * 1000, 2),
+            'templates_ms': round(medicion.tiempo_templates * 1000, 2),
+            'consultas': medicion.consultas,
+            'duplicadas': medicion.duplicadas,
+            'n_mas_1': n_mas_1[:5],
+        }
+        nivel = logging.WARNING if n_mas_1 else logging.INFO
+        logger.log(nivel, json.dumps(datos, ensure_ascii=False), extra={'instrumentacion': datos})
+
+
+class InstrumentacionVistaMiddleware:
+
+    def __init__(self, get_response):
+        if not _instrumentacion_activa():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        medicion = medicion_actual.get()
+        if medicion is None:  # petición no muestreada
+            return self.get_response(request)
+        inicio = time.perf_counter()
+        try:
+            return self.get_response(request)
+        finally:
+            medicion.tiempo_vista = time.perf_counter() - inicio
+
+
+# ========== TEMPLATES ==========
+# Backend igual al de Django pero que suma el tiempo de cada render a la
+# medición en curso. Incluye las consultas que se disparen desde el template
+# (querysets perezosos), que también se cuentan en "db".
+class PlantillaInstrumentada:
+
+    def __init__(self, plantilla):
+        self.plantilla = plantilla
+
+    def __getattr__(self, nombre):
+        return getattr(self.plantilla, nombre)
+
+    def render(self, context=None, request=None):
+        medicion = medicion_actual.get()
+        if medicion is None:
+            return self.plantilla.render(context, request)
+        inicio = time.perf_counter()
+        try:
+            return self.plantilla.render(context, request)
+        finally:
+            medicion.tiempo_templates += time.perf_counter() - inicio
+
+
+class PlantillasInstrumentadas(DjangoTemplates):
+
+    def from_string(self, template_code):
+        return PlantillaInstrumentada(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return PlantillaInstrumentada(super().get_template(template_name))
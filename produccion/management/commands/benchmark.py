@@ -0,0 +1,245 @@
+import json
+import platform
+import statistics
+import subprocess
+import time
+import tracemalloc
+from datetime import datetime
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import URLPattern, reverse
+
+from produccion import urls as urls_produccion
+from produccion.models import Proyecto, Asset, Tarea, Etiqueta
+
+
+# Recorre todas las rutas de produccion/urls.py con el cliente de pruebas y
+# mide por vista: latencia p50/p95/p99, cantidad de consultas SQL y memoria
+# pico de Python. El resultado es un JSON pensado para guardarlo por commit
+# y compararlo con --comparar. Conviene correrlo sobre los datos de seed_benchmark.
+
+# Parámetro extra de algunas rutas para que midan algo representativo
+# ({proyecto} y {etiqueta} se reemplazan por ids reales)
+CONSULTAS = {
+    'exportar_tareas': 'proyecto={proyecto}',
+    'exportar_assets': 'proyecto={proyecto}',
+    'buscar': 'q=nivel jefe',
+    'sugerencias_busqueda': 'q=cas',
+    'opciones_autocompletar': 'q=cas',
+    # Dos años de la serie diaria (seed_benchmark --historial 730 termina en FECHA_BASE)
+    'api_serie_proyecto': 'desde=2023-01-03&hasta=2025-01-01&por=todo',
+}
+
+# Argumentos fijos de las rutas que no son un <id>
+ARGUMENTOS = {
+    'opciones_autocompletar': {'tipo': 'proyectos'},
+}
+
+# Variantes filtradas de las listas, medidas como vistas aparte
+VARIANTES = {
+    'lista_proyectos': ['estado=desarrollo'],
+    'lista_assets': ['tipo=sprite', 'proyecto={proyecto}'],
+    'lista_tareas': ['estado=pendiente&prioridad=alta', 'proyecto={proyecto}', 'etiqueta={etiqueta}'],
+    'api_tareas': ['fields=id,titulo,etiquetas&limite=500'],
+}
+
+# Modelo del que sale el <id> de cada ruta, según el nombre de la ruta
+MODELO_POR_NOMBRE = [
+    ('proyecto', Proyecto),
+    ('asset', Asset),
+    ('tarea', Tarea),
+    ('etiqueta', Etiqueta),
+]
+
+
+def percentil(muestras, p):
+    if len(muestras) == 1:
+        return muestras[0]
+    return statistics.quantiles(muestras, n=100, method='inclusive')[p - 1]
+
+
+def _commit_actual():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = 'Mide latencia (p50/p95/p99), consultas SQL y memoria pico de cada vista de produccion'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeticiones', type=int, default=20, help='peticiones medidas por vista')
+        parser.add_argument('--calentamiento', type=int, default=2, help='peticiones previas sin medir')
+        parser.add_argument('--salida', help='archivo JSON de destino (por defecto, la salida estándar)')
+        parser.add_argument('--comparar', help='JSON de una corrida anterior para mostrar las diferencias')
+        parser.add_argument('--filtro', help='solo las vistas cuyo nombre contenga este texto')
+        parser.add_argument('--sin-cache', action='store_true',
+                            help='vacía la caché antes de cada petición (mide el peor caso)')
+
+    def handle(self, *args, **options):
+        if options['repeticiones'] < 1:
+            raise CommandError('--repeticiones debe ser al menos 1.')
+
+        ids = self._ids_de_muestra()
+        resultados = {}
+        with override_settings(ALLOWED_HOSTS=['*'], DEBUG=False):
+            cliente = Client()
+            for nombre, url in self._urls(ids):
+                if options['filtro'] and options['filtro'] not in nombre:
+                    continue
+                resultados[nombre] = self._medir(cliente, url, options)
+                self.stderr.write(
+                    f"{nombre:45} p50 {resultados[nombre]['p50_ms']:8.2f} ms  "
+                    f"{resultados[nombre]['consultas']:4} consultas"
+                )
+
+        informe = {
+            'meta': {
+                'commit': _commit_actual(),
+                'fecha': datetime.now().isoformat(timespec='seconds'),
+                'motor': connection.vendor,
+                'python': platform.python_version(),
+                'repeticiones': options['repeticiones'],
+                'sin_cache': options['sin_cache'],
+                'filas': {
+                    'proyectos': Proyecto.objects.count(),
+                    'assets': Asset.objects.count(),
+                    'tareas': Tarea.objects.count(),
+                    'etiquetas': Etiqueta.objects.count(),
+                },
+            },
+            'vistas': resultados,
+        }
+
+        texto = json.dumps(informe, indent=2, ensure_ascii=False)
+        if options['salida']:
+            with open(options['salida'], 'w', encoding='utf-8') as archivo:
+                archivo.write(texto + '\n')
+            self.stderr.write(self.style.SUCCESS(f'Resultados guardados en {options["salida"]}'))
+        else:
+            self.stdout.write(texto)
+
+        if options['comparar']:
+            self._comparar(options['comparar'], resultados)
+
+    # ----- armado de las URLs -----
+    @staticmethod
+    def _ids_de_muestra():
+        # El proyecto con más tareas es el caso más pesado del detalle y los filtros
+        proyecto = (
+            Tarea.objects.values('proyecto_id').order_by().annotate(total=Count('id'))
+            .order_by('-total').values_list('proyecto_id', flat=True).first()
+        ) or Proyecto.objects.values_list('id', flat=True).first()
+        return {
+            'proyecto': proyecto,
+            'asset': Asset.objects.values_list('id', flat=True).first(),
+            'tarea': Tarea.objects.values_list('id', flat=True).first(),
+            'etiqueta': Tarea.etiquetas.through.objects.values_list('etiqueta_id', flat=True).first()
+                        or Etiqueta.objects.values_list('id', flat=True).first(),
+        }
+
+    def _urls(self, ids):
+        for patron in urls_produccion.urlpatterns:
+            if not isinstance(patron, URLPattern):
+                continue
+            nombre = patron.name
+            kwargs = dict(ARGUMENTOS.get(nombre, {}))
+            if 'id' in patron.pattern.converters:
+                clave = next((clave for clave, _ in MODELO_POR_NOMBRE if clave in nombre), None)
+                if clave is None or ids.get(clave) is None:
+                    self.stderr.write(self.style.WARNING(f'{nombre}: sin datos para <id>, se omite'))
+                    continue
+                kwargs['id'] = ids[clave]
+            # Rutas con parámetros que no son ids de muestra (ej: las subidas, por token)
+            faltan = patron.pattern.converters.keys() - kwargs.keys()
+            if faltan:
+                faltan = ', '.join(sorted(faltan))
+                self.stderr.write(self.style.WARNING(f'{nombre}: sin datos para <{faltan}>, se omite'))
+                continue
+            url = reverse(nombre, kwargs=kwargs)
+
+            consulta = CONSULTAS.get(nombre)
+            yield nombre, f'{url}?{consulta.format(**ids)}' if consulta else url
+            for variante in VARIANTES.get(nombre, []):
+                yield f'{nombre} ?{variante}', f'{url}?{variante.format(**ids)}'
+
+    # ----- medición -----
+    def _peticion(self, cliente, url, sin_cache):
+        if sin_cache:
+            cache.clear()
+        respuesta = cliente.get(url)
+        if respuesta.streaming:
+            # Las exportaciones recién trabajan al consumir el contenido
+            for _ in respuesta.streaming_content:
+                pass
+        return respuesta
+
+    def _medir(self, cliente, url, options):
+        sin_cache = options['sin_cache']
+        for _ in range(options['calentamiento']):
+            self._peticion(cliente, url, sin_cache)
+
+        # Conteo de consultas con execute_wrapper: connection.queries se
+        # reinicia al empezar cada petición y no serviría acá
+        consultas = []
+
+        def contar(execute, sql, params, many, context):
+            consultas.append(sql)
+            return execute(sql, params, many, context)
+
+        tiempos = []
+        with connection.execute_wrapper(contar):
+            for _ in range(options['repeticiones']):
+                consultas.clear()
+                inicio = time.perf_counter()
+                respuesta = self._peticion(cliente, url, sin_cache)
+                tiempos.append((time.perf_counter() - inicio) * 1000)
+
+        # La memoria se mide en una pasada aparte: tracemalloc hace todo más lento
+        tracemalloc.start()
+        try:
+            self._peticion(cliente, url, sin_cache)
+            _, pico = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        return {
+            'url': url,
+            'status': respuesta.status_code,
+            'p50_ms': round(percentil(tiempos, 50), 3),
+            'p95_ms': round(percentil(tiempos, 95), 3),
+            'p99_ms': round(percentil(tiempos, 99), 3),
+            'media_ms': round(statistics.fmean(tiempos), 3),
+            'consultas': len(consultas),
+            'memoria_pico_kb': round(pico / 1024, 1),
+        }
+
+    def _comparar(self, ruta, resultados):
+        try:
+            with open(ruta, encoding='utf-8') as archivo:
+                anterior = json.load(archivo)['vistas']
+        except (OSError, ValueError, KeyError) as error:
+            raise CommandError(f'No se pudo leer {ruta}: {error}')
+
+        self.stderr.write(f'\n{"vista":45} {"p50 ms":>18} {"consultas":>12} {"memoria kb":>20}')
+        for nombre, actual in resultados.items():
+            previo = anterior.get(nombre)
+            if previo is None:
+                self.stderr.write(f'{nombre:45} (nueva)')
+                continue
+            cambio = (actual['p50_ms'] - previo['p50_ms']) / previo['p50_ms'] * 100 if previo['p50_ms'] else 0
+            linea = (
+                f"{nombre:45} {previo['p50_ms']:7.2f} → {actual['p50_ms']:7.2f} "
+                f"{previo['consultas']:5} → {actual['consultas']:<5} "
+                f"{previo['memoria_pico_kb']:8.0f} → {actual['memoria_pico_kb']:<8.0f} {cambio:+.0f}%"
+            )
+            estilo = self.style.ERROR if cambio > 10 else self.style.SUCCESS if cambio < -10 else str
+            self.stderr.write(estilo(linea))
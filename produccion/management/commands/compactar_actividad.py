@@ -0,0 +1,122 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from produccion.models import Actividad
+
+
+# Poda y compacta el registro de actividad:
+#   - borra los eventos más viejos que --dias, por lotes (cada DELETE es corto)
+#   - desde --fusionar-desde días hacia atrás, junta las ediciones seguidas de
+#     un mismo objeto y usuario separadas por menos de --ventana minutos en una
+#     sola fila: queda el "antes" de la primera y el "después" de la última
+
+TAMAÑO_LOTE = 5000
+
+
+def fusionar_cambios(acumulado, cambios):
+    # Aplica `cambios` (posteriores) sobre `acumulado`; los campos que vuelven
+    # a su valor original y las etiquetas agregadas y luego quitadas se cancelan
+    for campo, cambio in cambios.items():
+        if campo == 'etiquetas':
+            previo = acumulado.get('etiquetas', {'agregadas': [], 'quitadas': []})
+            agregadas = set(previo['agregadas'])
+            quitadas = set(previo['quitadas'])
+            for pk in cambio.get('agregadas', []):
+                if pk in quitadas:
+                    quitadas.discard(pk)
+                else:
+                    agregadas.add(pk)
+            for pk in cambio.get('quitadas', []):
+                if pk in agregadas:
+                    agregadas.discard(pk)
+                else:
+                    quitadas.add(pk)
+            acumulado['etiquetas'] = {'agregadas': sorted(agregadas), 'quitadas': sorted(quitadas)}
+            if not agregadas and not quitadas:
+                del acumulado['etiquetas']
+        else:
+            antes = acumulado[campo][0] if campo in acumulado else cambio[0]
+            if antes == cambio[1]:
+                acumulado.pop(campo, None)
+            else:
+                acumulado[campo] = [antes, cambio[1]]
+    return acumulado
+
+
+class Command(BaseCommand):
+    help = 'Borra la actividad más vieja que --dias y compacta las ediciones seguidas de un mismo objeto'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dias', type=int, default=365, help='días de historial que se conservan')
+        parser.add_argument('--fusionar-desde', type=int, default=30,
+                            help='se compactan las ediciones con más de estos días')
+        parser.add_argument('--ventana', type=int, default=60,
+                            help='minutos máximos entre dos ediciones para juntarlas')
+
+    def handle(self, *args, **options):
+        if options['dias'] < 1 or options['fusionar_desde'] < 0 or options['ventana'] < 1:
+            raise CommandError('--dias y --ventana deben ser positivos y --fusionar-desde no negativo.')
+        ahora = timezone.now()
+
+        borrados = self._podar(ahora - timedelta(days=options['dias']))
+        fusionados = self._compactar(
+            ahora - timedelta(days=options['fusionar_desde']), timedelta(minutes=options['ventana'])
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Actividad: {borrados} eventos vencidos borrados, {fusionados} ediciones fusionadas.'
+        ))
+
+    def _podar(self, corte):
+        total = 0
+        vencidos = Actividad.objects.filter(fecha__lt=corte).order_by()
+        while ids := list(vencidos.values_list('id', flat=True)[:TAMAÑO_LOTE]):
+            total += Actividad.objects.filter(id__in=ids).delete()[0]
+        return total
+
+    def _compactar(self, corte, ventana):
+        ediciones = (
+            Actividad.objects.filter(accion='editar', fecha__lt=corte)
+            .order_by('tipo', 'objeto_id', 'fecha', 'id')
+            .values_list('id', 'tipo', 'objeto_id', 'usuario_id', 'fecha', 'cambios')
+        )
+        actualizar, borrar = [], []
+        fusionados = 0
+        grupo = None   # [primera fila, última fecha, cambios acumulados, ids absorbidos]
+
+        def cerrar(grupo):
+            nonlocal fusionados
+            if grupo is None or not grupo[3]:
+                return
+            fusionados += len(grupo[3])
+            borrar.extend(grupo[3])
+            if grupo[2]:
+                actualizar.append(Actividad(id=grupo[0][0], fecha=grupo[1], cambios=grupo[2]))
+            else:
+                borrar.append(grupo[0][0])  # los cambios se cancelaron entre sí
+
+        for fila in ediciones.iterator(chunk_size=TAMAÑO_LOTE):
+            pk, tipo, objeto_id, usuario_id, fecha, cambios = fila
+            if grupo and grupo[0][1:4] == (tipo, objeto_id, usuario_id) and fecha - grupo[1] <= ventana:
+                fusionar_cambios(grupo[2], cambios)
+                grupo[1] = fecha
+                grupo[3].append(pk)
+            else:
+                cerrar(grupo)
+                grupo = [fila, fecha, fusionar_cambios({}, cambios), []]
+            if len(actualizar) + len(borrar) >= TAMAÑO_LOTE:
+                self._escribir(actualizar, borrar)
+        cerrar(grupo)
+        self._escribir(actualizar, borrar)
+        return fusionados
+
+    @staticmethod
+    def _escribir(actualizar, borrar):
+        with transaction.atomic():
+            Actividad.objects.bulk_update(actualizar, ['fecha', 'cambios'], batch_size=500)
+            for desde in range(0, len(borrar), TAMAÑO_LOTE):
+                Actividad.objects.filter(id__in=borrar[desde:desde + TAMAÑO_LOTE]).delete()
+        actualizar.clear()
+        borrar.clear()
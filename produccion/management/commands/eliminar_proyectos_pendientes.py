@@ -0,0 +1,40 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+
+from produccion.eliminacion import eliminar_pendientes
+
+
+# Borra por lotes los proyectos marcados con eliminacion.marcar() (vista de
+# eliminar, admin). Se puede cortar y volver a correr: retoma donde quedó.
+# Con --esperar queda como proceso de fondo revisando cada tantos segundos.
+
+class Command(BaseCommand):
+    help = 'Borra por lotes los assets, tareas y etiquetados de los proyectos marcados para eliminar'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=None,
+                            help='filas por DELETE (por defecto PRODUCCION_ELIMINACION_LOTE)')
+        parser.add_argument('--esperar', type=int, default=0,
+                            help='segundos entre revisiones; 0 procesa lo pendiente y termina')
+
+    def handle(self, *args, **options):
+        if options['lote'] is not None and options['lote'] < 1:
+            raise CommandError('--lote debe ser positivo.')
+        if options['esperar'] < 0:
+            raise CommandError('--esperar no puede ser negativo.')
+
+        while True:
+            borrados = eliminar_pendientes(lote=options['lote'], progreso=self._progreso)
+            if borrados:
+                self.stdout.write(self.style.SUCCESS(f'{borrados} proyectos eliminados.'))
+            if not options['esperar']:
+                if not borrados:
+                    self.stdout.write('No hay proyectos pendientes de eliminar.')
+                return
+            close_old_connections()
+            time.sleep(options['esperar'])
+
+    def _progreso(self, proyecto, tipo, borradas, total):
+        self.stdout.write(f'  [{proyecto.pk}] {proyecto}: {tipo} {borradas}/{total}')
@@ -0,0 +1,61 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+from produccion.models import Archivo, Asset, Subida
+
+
+def legible(cantidad):
+    for unidad in ('B', 'KB', 'MB', 'GB'):
+        if cantidad < 1024:
+            return f'{cantidad:.1f} {unidad}'
+        cantidad /= 1024
+    return f'{cantidad:.1f} TB'
+
+
+class Command(BaseCommand):
+    help = 'Espacio del almacén de archivos, cuánto ahorra la deduplicación y velocidad de las subidas'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dias', type=int, default=30, help='subidas de los últimos N días')
+
+    def handle(self, *args, **options):
+        if options['dias'] < 1:
+            raise CommandError('--dias debe ser positivo.')
+
+        # Lo guardado (una copia por contenido) contra lo que ocuparía una copia por asset
+        almacen = Archivo.objects.aggregate(archivos=Count('id'), bytes=Sum('tamaño'))
+        referencias = Asset.objects.filter(archivo__isnull=False).aggregate(
+            assets=Count('id'), bytes=Sum('archivo__tamaño'),
+        )
+        guardado, logico = almacen['bytes'] or 0, referencias['bytes'] or 0
+        self.stdout.write(f'Almacén: {almacen["archivos"]} archivos, {legible(guardado)} en disco')
+        self.stdout.write(f'Assets con archivo: {referencias["assets"]} ({legible(logico)} sin deduplicar)')
+        if guardado and logico:
+            self.stdout.write(
+                f'Deduplicación: {logico / guardado:.2f}x, '
+                f'{legible(max(logico - guardado, 0))} ahorrados ({max(100 * (1 - guardado / logico), 0):.1f}%)'
+            )
+
+        # Throughput: bytes recibidos sobre el tiempo recibiendo trozos (sin las pausas
+        # del cliente); las deduplicadas por sha256 al iniciar no transfirieron nada
+        desde = timezone.now() - timedelta(days=options['dias'])
+        subidas = Subida.objects.filter(fecha_creacion__gte=desde).aggregate(
+            completadas=Count('id', filter=Q(fecha_completada__isnull=False)),
+            deduplicadas=Count('id', filter=Q(deduplicada=True)),
+            en_curso=Count('id', filter=Q(fecha_completada__isnull=True)),
+            bytes=Sum('recibido', filter=Q(segundos__gt=0)),
+            segundos=Sum('segundos'),
+        )
+        self.stdout.write(
+            f'Subidas de los últimos {options["dias"]} días: {subidas["completadas"]} completas '
+            f'({subidas["deduplicadas"]} ya estaban guardadas), {subidas["en_curso"]} sin terminar'
+        )
+        if subidas['segundos']:
+            velocidad = (subidas['bytes'] or 0) / subidas['segundos']
+            self.stdout.write(
+                f'Recibido: {legible(subidas["bytes"] or 0)} en {subidas["segundos"]:.1f} s '
+                f'({legible(velocidad)}/s)'
+            )
@@ -0,0 +1,134 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from produccion.models import Proyecto, Tarea, Etiqueta, ContadorGlobal
+from produccion.paginacion import TAMAÑO_PAGINA
+from produccion.views import (
+    consulta_proyectos, consulta_assets, consulta_tareas, consulta_assets_de_proyecto, consulta_tareas_de_proyecto,
+)
+
+
+# Consultas principales de cada vista, con los mismos helpers de views.py (y
+# lo que arma admin.py), en el mismo orden que usa la paginación por cursor
+def rutas_criticas(proyecto_id, etiqueta_id):
+    n = TAMAÑO_PAGINA + 1
+
+    def pagina(filtrado, campo):
+        queryset, _ = filtrado
+        return queryset.order_by(f'-{campo}', '-id')[:n]
+
+    return [
+        ('index: contadores', ContadorGlobal.objects.filter(pk=1)),
+        ('lista_proyectos', pagina(consulta_proyectos({}), 'fecha_inicio')),
+        ('lista_proyectos ?estado', pagina(consulta_proyectos({'estado': 'desarrollo'}), 'fecha_inicio')),
+        ('lista_assets', pagina(consulta_assets({}), 'fecha_creacion')),
+        ('lista_assets ?tipo', pagina(consulta_assets({'tipo': 'sprite'}), 'fecha_creacion')),
+        ('lista_assets ?proyecto', pagina(consulta_assets({'proyecto': proyecto_id}), 'fecha_creacion')),
+        ('lista_tareas', pagina(consulta_tareas({}), 'fecha_creacion')),
+        ('lista_tareas ?estado&prioridad', pagina(
+            consulta_tareas({'estado': 'pendiente', 'prioridad': 'alta'}), 'fecha_creacion')),
+        ('lista_tareas ?proyecto', pagina(consulta_tareas({'proyecto': proyecto_id}), 'fecha_creacion')),
+        ('lista_tareas ?etiqueta', pagina(consulta_tareas({'etiqueta': etiqueta_id}), 'fecha_creacion')),
+        ('detalle_proyecto: assets', consulta_assets_de_proyecto(proyecto_id)),
+        ('detalle_proyecto: tareas', consulta_tareas_de_proyecto(proyecto_id)),
+        ('lista_etiquetas', Etiqueta.objects.all()),
+        ('admin tareas ?estado&prioridad', Tarea.objects.select_related('proyecto').filter(
+            estado='pendiente', prioridad='alta').order_by('-fecha_creacion', '-pk')[:100]),
+    ]
+
+
+# ========== DETECCIÓN DE PROBLEMAS POR MOTOR ==========
+def _nodos_json(plan):
+    # Recorre recursivamente el JSON del plan (MySQL y Postgres)
+    if isinstance(plan, dict):
+        yield plan
+        for valor in plan.values():
+            yield from _nodos_json(valor)
+    elif isinstance(plan, list):
+        for valor in plan:
+            yield from _nodos_json(valor)
+
+
+def problemas_sqlite(plan):
+    problemas = []
+    for linea in plan.splitlines():
+        # Django entrega cada fila como "id parent notused detalle"
+        detalle = linea.split(maxsplit=3)[-1]
+        if detalle.startswith('SCAN ') and ' USING ' not in detalle and 'CONSTANT ROW' not in detalle:
+            problemas.append(f'full scan: {detalle}')
+        elif 'USE TEMP B-TREE FOR' in detalle and 'ORDER BY' in detalle:
+            problemas.append(f'filesort: {detalle}')
+    return problemas
+
+
+def problemas_mysql(plan):
+    problemas = []
+    for nodo in _nodos_json(json.loads(plan)):
+        if nodo.get('access_type') == 'ALL':
+            problemas.append(f"full scan: {nodo.get('table_name')}")
+        if nodo.get('using_filesort'):
+            problemas.append('filesort')
+    return problemas
+
+
+def problemas_postgresql(plan):
+    problemas = []
+    for nodo in _nodos_json(json.loads(plan)):
+        tipo = nodo.get('Node Type')
+        if tipo == 'Seq Scan':
+            problemas.append(f"full scan: {nodo.get('Relation Name')}")
+        elif tipo in ('Sort', 'Incremental Sort'):
+            problemas.append(f"filesort: {tipo} {nodo.get('Sort Key')}")
+    return problemas
+
+
+MOTORES = {
+    'sqlite': ({}, problemas_sqlite),
+    'mysql': ({'format': 'json'}, problemas_mysql),
+    'postgresql': ({'format': 'json'}, problemas_postgresql),
+}
+
+
+class Command(BaseCommand):
+    help = ('Ejecuta EXPLAIN sobre las consultas principales de cada vista '
+            'y marca los full scans y ordenamientos sin índice (filesort)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--proyecto', type=int, help='id de proyecto para las consultas filtradas')
+        parser.add_argument('--etiqueta', type=int, help='id de etiqueta para el filtro por etiqueta')
+        parser.add_argument('--plan', action='store_true', help='muestra el plan completo de cada consulta')
+        parser.add_argument('--estricto', action='store_true',
+                            help='termina con error si alguna consulta tiene problemas (útil en CI)')
+
+    def handle(self, *args, **options):
+        if connection.vendor not in MOTORES:
+            raise CommandError(f'Motor no soportado: {connection.vendor}')
+        opciones_explain, detectar = MOTORES[connection.vendor]
+
+        proyecto_id = options['proyecto'] or Proyecto.objects.values_list('id', flat=True).first() or 1
+        etiqueta_id = options['etiqueta'] or Etiqueta.objects.values_list('id', flat=True).first() or 1
+
+        self.stdout.write(f'Motor: {connection.vendor} (proyecto={proyecto_id}, etiqueta={etiqueta_id})\n')
+        total_problemas = 0
+
+        for nombre, queryset in rutas_criticas(proyecto_id, etiqueta_id):
+            plan = queryset.explain(**opciones_explain)
+            problemas = detectar(plan)
+            total_problemas += len(problemas)
+
+            if problemas:
+                self.stdout.write(self.style.WARNING(f'[!] {nombre}'))
+                for problema in problemas:
+                    self.stdout.write(f'      {problema}')
+            else:
+                self.stdout.write(self.style.SUCCESS(f'[ok] {nombre}'))
+
+            if options['plan']:
+                self.stdout.write('\n'.join(f'      {linea}' for linea in plan.splitlines()))
+
+        self.stdout.write('')
+        if total_problemas and options['estricto']:
+            raise CommandError(f'{total_problemas} problema(s) en los planes de consulta')
+        self.stdout.write(f'{total_problemas} problema(s) encontrados.')
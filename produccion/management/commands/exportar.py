@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from produccion.exportacion import exportar, TAMAÑO_LOTE
+
+
+class Command(BaseCommand):
+    help = 'Exporta todas las tareas o assets a CSV o NDJSON en streaming (memoria constante)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tipo', choices=['tareas', 'assets'], required=True)
+        parser.add_argument('--formato', choices=['csv', 'ndjson'], default='csv')
+        parser.add_argument('--salida', help='archivo de destino (por defecto, la salida estándar)')
+        parser.add_argument('--lote', type=int, default=TAMAÑO_LOTE, help='filas por lote leído de la BD')
+
+    def handle(self, *args, **options):
+        fragmentos = exportar(options['tipo'], options['formato'], tamaño_lote=options['lote'])
+
+        if not options['salida']:
+            for fragmento in fragmentos:
+                self.stdout.write(fragmento, ending='')
+            return
+
+        filas = 0
+        with open(options['salida'], 'w', encoding='utf-8', newline='') as archivo:
+            for fragmento in fragmentos:
+                archivo.write(fragmento)
+                filas += 1
+        if options['formato'] == 'csv':
+            filas -= 1  # encabezado
+        self.stderr.write(self.style.SUCCESS(f'{filas} filas exportadas a {options["salida"]}'))
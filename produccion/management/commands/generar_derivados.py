@@ -0,0 +1,75 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.core.management.base import BaseCommand, CommandError
+
+from produccion import almacen, derivados
+from produccion.models import Asset
+from produccion.vistas_previas import generar
+
+
+# Genera las vistas previas de todos los archivos de assets que las admiten,
+# repartidas en --procesos procesos (por defecto uno por núcleo). Sin --forzar
+# salta las que ya están en disco, así que se puede cortar y volver a correr.
+# Al final poda la carpeta hasta PRODUCCION_DERIVADOS_MAXIMO.
+
+class Command(BaseCommand):
+    help = 'Genera en paralelo las miniaturas y formas de onda de los archivos de assets'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--procesos', type=int, default=os.cpu_count() or 1,
+                            help='procesos en paralelo (por defecto uno por núcleo)')
+        parser.add_argument('--forzar', action='store_true',
+                            help='regenera también las que ya existen (y reintenta las fallidas)')
+
+    def handle(self, *args, **options):
+        if options['procesos'] < 1:
+            raise CommandError('--procesos debe ser positivo.')
+
+        pares = (
+            Asset.objects.filter(archivo__isnull=False, tipo__in=list(derivados.TIPO_DERIVADO))
+            .values_list('archivo__sha256', 'tipo').distinct().order_by()
+        )
+        trabajos = {(sha256, derivados.TIPO_DERIVADO[tipo]) for sha256, tipo in pares}
+        if options['forzar']:
+            for sha256, tipo in trabajos:
+                self._borrar(derivados.ruta_fallo(sha256, tipo))
+        else:
+            trabajos = {(sha256, tipo) for sha256, tipo in trabajos if not derivados.completo(sha256, tipo)}
+        if not trabajos:
+            self.stdout.write('No hay vistas previas pendientes.')
+            return
+
+        inicio = time.perf_counter()
+        escritos = fallidos = hechos = 0
+        with ProcessPoolExecutor(max_workers=options['procesos']) as pool:
+            futuros = {
+                pool.submit(generar, tipo, almacen.ruta(sha256), derivados.destinos(sha256, tipo),
+                            derivados.ruta_fallo(sha256, tipo)): (sha256, tipo)
+                for sha256, tipo in sorted(trabajos)
+            }
+            for futuro in as_completed(futuros):
+                hechos += 1
+                bytes_escritos = futuro.result()
+                escritos += bytes_escritos
+                if not bytes_escritos:
+                    fallidos += 1
+                    sha256, tipo = futuros[futuro]
+                    self.stderr.write(f'  {sha256[:12]} ({tipo}): no se pudo generar')
+                if hechos % 100 == 0:
+                    self.stdout.write(f'  {hechos}/{len(futuros)}')
+        segundos = time.perf_counter() - inicio
+
+        liberados = derivados.cache.podar()
+        self.stdout.write(self.style.SUCCESS(
+            f'{hechos - fallidos} archivos con vista previa ({escritos} bytes) y {fallidos} fallidos '
+            f'en {segundos:.1f} s con {options["procesos"]} procesos; {liberados} bytes podados.'
+        ))
+
+    @staticmethod
+    def _borrar(ruta):
+        try:
+            os.remove(ruta)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from produccion.importacion import importar_archivo, TAMAÑO_LOTE
+
+
+class Command(BaseCommand):
+    help = 'Importa tareas o assets desde un archivo CSV o NDJSON, en lotes y sin cargarlo completo en memoria'
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo', help='ruta del archivo .csv o .ndjson')
+        parser.add_argument('--tipo', choices=['tareas', 'assets'], required=True)
+        parser.add_argument('--formato', choices=['csv', 'ndjson'],
+                            help='por defecto se deduce de la extensión')
+        parser.add_argument('--lote', type=int, default=TAMAÑO_LOTE, help='filas por bulk_create')
+
+    def handle(self, *args, **options):
+        try:
+            archivo = open(options['archivo'], 'rb')
+        except OSError as error:
+            raise CommandError(f'No se pudo abrir el archivo: {error}')
+
+        with archivo:
+            resultado = importar_archivo(
+                archivo, options['tipo'], formato=options['formato'], tamaño_lote=options['lote']
+            )
+
+        for fila, mensaje in resultado.errores:
+            self.stderr.write(f'Fila {fila}: {mensaje}')
+        if resultado.total_errores > len(resultado.errores):
+            self.stderr.write(f'... y {resultado.total_errores - len(resultado.errores)} errores más')
+
+        self.stdout.write(self.style.SUCCESS(resultado.resumen()))
@@ -0,0 +1,83 @@
+import os
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from produccion import almacen
+from produccion.models import Archivo, Subida
+
+
+# Borra, de a TAMAÑO_LOTE filas:
+#   - las subidas sin terminar que no recibieron nada en --horas, con su archivo parcial
+#   - los Archivo que ya no usa ningún asset (y su contenido en disco), salvo
+#     los de subidas completadas en --horas: el formulario todavía puede adjuntarlos
+
+TAMAÑO_LOTE = 1000
+
+
+class Command(BaseCommand):
+    help = 'Borra las subidas abandonadas y los archivos que ya no usa ningún asset'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--horas', type=int, default=48, help='antigüedad mínima de lo que se borra')
+
+    def handle(self, *args, **options):
+        if options['horas'] < 1:
+            raise CommandError('--horas debe ser positivo.')
+        corte = timezone.now() - timedelta(hours=options['horas'])
+
+        subidas = self._subidas_abandonadas(corte)
+        archivos, liberados = self._archivos_huerfanos(corte)
+        self.stdout.write(self.style.SUCCESS(
+            f'{subidas} subidas abandonadas y {archivos} archivos sin assets borrados '
+            f'({liberados} bytes liberados).'
+        ))
+
+    def _subidas_abandonadas(self, corte):
+        total = 0
+        abandonadas = Subida.objects.filter(fecha_completada__isnull=True, fecha_actualizacion__lt=corte).order_by()
+        while lote := list(abandonadas[:TAMAÑO_LOTE]):
+            for subida in lote:
+                self._borrar_del_disco(almacen.ruta_parcial(subida))
+                almacen.hashes_en_curso.quitar(subida.pk)
+            total += Subida.objects.filter(id__in=[subida.pk for subida in lote]).delete()[0]
+        return total
+
+    def _archivos_huerfanos(self, corte):
+        borrados = liberados = 0
+        recientes = Subida.objects.filter(fecha_completada__gte=corte, archivo__isnull=False).values('archivo_id')
+        huerfanos = Archivo.objects.filter(assets__isnull=True).exclude(id__in=recientes).order_by('id')
+        ultimo = 0
+        while lote := list(huerfanos.filter(id__gt=ultimo).values_list('id', 'sha256', 'tamaño')[:TAMAÑO_LOTE]):
+            ultimo = lote[-1][0]
+            # Un archivo tocado hace poco lo acaba de volver a subir alguien (ver almacen._consolidar)
+            viejos = [
+                (pk, sha256, tamaño) for pk, sha256, tamaño in lote
+                if self._modificado(almacen.ruta(sha256)) < corte.timestamp()
+            ]
+            with transaction.atomic():
+                # Otra vez sin assets: alguno pudo haberse adjuntado mientras tanto
+                Archivo.objects.filter(id__in=[pk for pk, _, _ in viejos], assets__isnull=True).delete()
+                existentes = set(Archivo.objects.filter(id__in=[pk for pk, _, _ in viejos]).values_list('id', flat=True))
+            for pk, sha256, tamaño in viejos:
+                if pk not in existentes:
+                    self._borrar_del_disco(almacen.ruta(sha256))
+                    borrados += 1
+                    liberados += tamaño
+        return borrados, liberados
+
+    @staticmethod
+    def _modificado(ruta):
+        try:
+            return os.path.getmtime(ruta)
+        except FileNotFoundError:
+            return 0
+
+    @staticmethod
+    def _borrar_del_disco(ruta):
+        try:
+            os.remove(ruta)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from produccion.models import ContadorGlobal
+
+
+class Command(BaseCommand):
+    help = 'Recalcula los contadores del dashboard con COUNT(*) reales y corrige cualquier desfase'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            contador = ContadorGlobal.objects.select_for_update().filter(pk=1).first()
+            reales = ContadorGlobal.contar()
+
+            if contador is None:
+                ContadorGlobal.objects.create(pk=1, **reales)
+                self.stdout.write(self.style.SUCCESS('Contadores creados desde cero.'))
+                return
+
+            desfases = {
+                campo: reales[campo] - getattr(contador, campo)
+                for campo in ContadorGlobal.CAMPOS
+                if reales[campo] != getattr(contador, campo)
+            }
+            if desfases:
+                ContadorGlobal.objects.filter(pk=1).update(**reales)
+
+        if not desfases:
+            self.stdout.write(self.style.SUCCESS('Los contadores están al día.'))
+            return
+
+        for campo, delta in desfases.items():
+            self.stdout.write(f'{campo}: {reales[campo]} (desfase {delta:+d})')
+        self.stdout.write(self.style.SUCCESS('Contadores reconciliados.'))
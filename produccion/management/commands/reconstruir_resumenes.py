@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from produccion.models import ResumenTareas, ResumenAssets
+
+
+class Command(BaseCommand):
+    help = 'Recalcula los resúmenes por proyecto con un GROUP BY por tabla y corrige cualquier desfase'
+
+    def handle(self, *args, **options):
+        desfases = {}
+        with transaction.atomic():
+            for resumen in (ResumenTareas, ResumenAssets):
+                campos = ('proyecto_id', *resumen.CLAVE)
+                guardados = {
+                    tuple(fila[:-1]): fila[-1]
+                    for fila in resumen.objects.select_for_update().values_list(*campos, 'total')
+                }
+                reales = resumen.contar()
+                diferencias = {
+                    clave: reales.get(clave, 0) - guardados.get(clave, 0)
+                    for clave in guardados.keys() | reales.keys()
+                    if reales.get(clave, 0) != guardados.get(clave, 0)
+                }
+                if diferencias or len(guardados) != len(reales):
+                    # Reescribir la tabla entera: es chica (a lo sumo 9 o 5 filas por proyecto)
+                    resumen.objects.all().delete()
+                    resumen.objects.bulk_create(
+                        [resumen(total=total, **dict(zip(campos, clave))) for clave, total in reales.items()],
+                        batch_size=1000,
+                    )
+                desfases[resumen] = diferencias
+
+        if not any(desfases.values()):
+            self.stdout.write(self.style.SUCCESS('Los resúmenes están al día.'))
+            return
+
+        for resumen, diferencias in desfases.items():
+            proyectos = {clave[0] for clave in diferencias}
+            if proyectos:
+                self.stdout.write(
+                    f'{resumen._meta.verbose_name_plural}: {len(diferencias)} filas con desfase '
+                    f'en {len(proyectos)} proyectos'
+                )
+        self.stdout.write(self.style.SUCCESS('Resúmenes reconstruidos.'))
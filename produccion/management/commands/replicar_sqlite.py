@@ -0,0 +1,49 @@
+import sqlite3
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from produccion.replicas import PRIMARIA, configuradas
+
+
+# Réplicas de juguete para probar replicas.py en local: copia la BD SQLite
+# primaria sobre cada réplica SQLite con la API de backup de SQLite (página a
+# página y en el mismo archivo, así los servidores que ya la tienen abierta
+# ven la copia nueva). Con --cada queda repitiéndolo: entre copia y copia la
+# réplica atrasa, que es lo que el chequeo de retraso tiene que detectar.
+
+class Command(BaseCommand):
+    help = 'Copia la BD SQLite primaria a las réplicas SQLite (para probar las réplicas en local)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--cada', type=float, default=0,
+                            help='segundos entre copias; 0 copia una vez y termina')
+
+    def handle(self, *args, **options):
+        if options['cada'] < 0:
+            raise CommandError('--cada no puede ser negativo.')
+        origen = self._archivo(PRIMARIA)
+        destinos = {alias: self._archivo(alias) for alias in configuradas()}
+        if not destinos:
+            raise CommandError('No hay réplicas configuradas (DATABASE_REPLICA_URLS).')
+
+        while True:
+            inicio = time.perf_counter()
+            with sqlite3.connect(origen) as primaria:
+                for alias, archivo in destinos.items():
+                    with sqlite3.connect(archivo) as replica:
+                        primaria.backup(replica)
+                    replica.close()
+            primaria.close()
+            self.stdout.write(f'{len(destinos)} réplicas copiadas en {time.perf_counter() - inicio:.2f} s')
+            if not options['cada']:
+                return
+            time.sleep(options['cada'])
+
+    @staticmethod
+    def _archivo(alias):
+        datos = connections[alias].settings_dict
+        if datos['ENGINE'] != 'django.db.backends.sqlite3':
+            raise CommandError(f'{alias} no es SQLite: las réplicas de verdad se alimentan con la replicación de la BD.')
+        return datos['NAME']
@@ -0,0 +1,271 @@
+import random
+import time
+from datetime import date, timedelta
+from itertools import accumulate
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+
+from produccion.models import (
+    Proyecto, DetalleProyecto, Asset, Tarea, Etiqueta, ContadorGlobal, ResumenTareas, ResumenAssets,
+    InstantaneaDiaria, Actividad, normalizar_nombre_etiqueta,
+)
+from produccion.instantaneas import empaquetar
+from produccion.signals import creacion_masiva
+
+
+# Genera datos sintéticos para medir las vistas a escala real (ver benchmark.py).
+# Todo sale de un random.Random con semilla fija: la misma semilla y los mismos
+# tamaños producen exactamente los mismos datos, así los resultados entre
+# commits son comparables. Las distribuciones están sesgadas a propósito:
+# pocos proyectos concentran muchas tareas y pocas etiquetas se usan en casi
+# todas (Zipf), como pasa en un estudio de verdad.
+
+PALABRAS = (
+    'nivel jefe enemigo jugador menú inventario diálogo cinemática tutorial mapa '
+    'arma escudo poción misión logro tienda cámara colisión física partícula '
+    'sombra textura animación sprite sonido música interfaz guardado carga red '
+    'multijugador puntaje combo salto ataque defensa magia dragón bosque castillo '
+    'mazmorra cueva desierto ciudad nave planeta robot zombi pirata ninja'
+).split()
+
+VERBOS = (
+    'Corregir Implementar Optimizar Diseñar Revisar Animar Refactorizar Probar '
+    'Balancear Integrar Documentar Ajustar Modelar Texturizar Grabar Mezclar'
+).split()
+
+PLATAFORMAS = ['PC', 'Mobile', 'Web', 'PlayStation', 'Xbox', 'Switch']
+ENGINES = ['Unity', 'Godot', 'Unreal', 'GameMaker', 'Propio']
+
+# Fecha fija (no date.today()) para que los datos no dependan del día en que se generan
+FECHA_BASE = date(2025, 1, 1)
+
+# Probabilidad de que una tarea tenga 0, 1, 2 o 3 etiquetas
+ETIQUETAS_POR_TAREA = [0.3, 0.4, 0.2, 0.1]
+
+
+class Command(BaseCommand):
+    help = 'Genera datos sintéticos reproducibles (semilla fija) para el benchmark de vistas'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--proyectos', type=int, default=10_000)
+        parser.add_argument('--tareas', type=int, default=2_000_000)
+        parser.add_argument('--assets', type=int, default=200_000)
+        parser.add_argument('--etiquetas', type=int, default=500)
+        parser.add_argument('--semilla', type=int, default=42)
+        parser.add_argument('--lote', type=int, default=5000, help='filas por bulk_create')
+        parser.add_argument('--historial', type=int, default=0,
+                            help='días de instantáneas diarias sintéticas por proyecto (hasta FECHA_BASE)')
+        parser.add_argument('--limpiar', action='store_true',
+                            help='borra todos los proyectos, assets, tareas y etiquetas antes de generar')
+
+    def handle(self, *args, **options):
+        if options['proyectos'] < 1 and (options['tareas'] or options['assets']):
+            raise CommandError('Se necesita al menos un proyecto para crear tareas o assets.')
+
+        self.azar = random.Random(options['semilla'])
+        self.lote = options['lote']
+        inicio = time.perf_counter()
+
+        if options['limpiar']:
+            self._limpiar()
+
+        etiqueta_ids = self._crear_etiquetas(options['etiquetas'])
+        proyecto_ids = self._crear_proyectos(options['proyectos'])
+
+        # Peso de cada proyecto (Pareto) y de cada etiqueta (Zipf), acumulados
+        # una vez para que random.choices no los recalcule en cada lote
+        pesos_proyectos = list(accumulate(self.azar.paretovariate(1.2) for _ in proyecto_ids))
+        pesos_etiquetas = list(accumulate(1 / rango for rango in range(1, len(etiqueta_ids) + 1)))
+
+        self._crear_assets(options['assets'], proyecto_ids, pesos_proyectos)
+        self._crear_tareas(options['tareas'], proyecto_ids, pesos_proyectos, etiqueta_ids, pesos_etiquetas)
+
+        self._reiniciar_secuencias()
+        call_command('reconciliar_contadores', stdout=self.stdout)
+        call_command('reconstruir_resumenes', stdout=self.stdout)
+        self._crear_historial(options['historial'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Datos generados en {time.perf_counter() - inicio:.1f} s (semilla {options["semilla"]})'
+        ))
+
+    # ----- utilidades -----
+    def _frase(self, minimo, maximo):
+        return ' '.join(self.azar.choices(PALABRAS, k=self.azar.randint(minimo, maximo)))
+
+    @staticmethod
+    def _siguiente_id(modelo):
+        # Los ids se asignan acá para poder enlazar la tabla intermedia sin
+        # depender de que el motor devuelva los ids de bulk_create (MySQL no lo hace)
+        return (modelo.objects.aggregate(maximo=Max('id'))['maximo'] or 0) + 1
+
+    def _en_lotes(self, modelo, total, construir, descripcion):
+        primer_id = self._siguiente_id(modelo)
+        inicio = time.perf_counter()
+        for desde in range(0, total, self.lote):
+            ids = range(primer_id + desde, primer_id + min(desde + self.lote, total))
+            objetos, extra = construir(ids)
+            with transaction.atomic():
+                modelo.objects.bulk_create(objetos)
+                if extra:
+                    type(extra[0]).objects.bulk_create(extra)
+                creacion_masiva.send(sender=modelo, objetos=objetos)
+            hechos = desde + len(ids)
+            segundos = time.perf_counter() - inicio
+            self.stdout.write(f'\r{descripcion}: {hechos:,}/{total:,} ({hechos / segundos:,.0f}/s)', ending='')
+            self.stdout.flush()
+        if total:
+            self.stdout.write('')
+        return range(primer_id, primer_id + total)
+
+    def _limpiar(self):
+        # DELETE directo: con millones de filas el borrado del ORM (que carga
+        # los objetos para las señales) tardaría más que generar los datos
+        tablas = [
+            ResumenTareas, ResumenAssets, InstantaneaDiaria, Actividad,
+            Tarea.etiquetas.through, DetalleProyecto, Tarea, Asset, Proyecto, Etiqueta,
+        ]
+        with transaction.atomic(), connection.cursor() as cursor:
+            for modelo in tablas:
+                cursor.execute(f'DELETE FROM {connection.ops.quote_name(modelo._meta.db_table)}')
+            ContadorGlobal.objects.filter(pk=1).update(**{campo: 0 for campo in ContadorGlobal.CAMPOS})
+        cache.clear()  # fragmentos de proyectos con ids que se van a reutilizar
+        self.stdout.write('Datos anteriores eliminados.')
+
+    def _reiniciar_secuencias(self):
+        # En Postgres las secuencias no avanzan con ids explícitos
+        sentencias = connection.ops.sequence_reset_sql(no_style(), [Proyecto, DetalleProyecto, Asset, Tarea, Etiqueta])
+        if sentencias:
+            with connection.cursor() as cursor:
+                for sentencia in sentencias:
+                    cursor.execute(sentencia)
+
+    # ----- generadores por modelo -----
+    def _crear_etiquetas(self, total):
+        existentes = set(Etiqueta.objects.values_list('nombre_normalizado', flat=True))
+
+        def construir(ids):
+            etiquetas = []
+            for pk in ids:
+                nombre = f'{self.azar.choice(PALABRAS).capitalize()}-{pk}'
+                while normalizar_nombre_etiqueta(nombre) in existentes:
+                    nombre = f'{self.azar.choice(PALABRAS).capitalize()}-{pk}-{self.azar.randint(0, 999)}'
+                normalizado = normalizar_nombre_etiqueta(nombre)
+                existentes.add(normalizado)
+                # bulk_create no pasa por save(): el nombre normalizado se completa acá
+                etiquetas.append(Etiqueta(id=pk, nombre=nombre, nombre_normalizado=normalizado))
+            return etiquetas, []
+
+        return list(self._en_lotes(Etiqueta, total, construir, 'Etiquetas'))
+
+    def _crear_proyectos(self, total):
+        estados = [estado for estado, _ in Proyecto.ESTADO_CHOICES]
+
+        def construir(ids):
+            proyectos, detalles = [], []
+            for pk in ids:
+                proyectos.append(Proyecto(
+                    id=pk,
+                    nombre=f'{self._frase(1, 3).title()} {pk}',
+                    descripcion=self._frase(10, 40),
+                    fecha_inicio=FECHA_BASE - timedelta(days=self.azar.randint(0, 3650)),
+                    estado=self.azar.choice(estados),
+                ))
+                detalles.append(DetalleProyecto(
+                    proyecto_id=pk,
+                    plataforma=self.azar.choice(PLATAFORMAS),
+                    engine=self.azar.choice(ENGINES),
+                    tamaño_equipo=max(1, int(self.azar.lognormvariate(1.5, 0.8))),
+                ))
+            return proyectos, detalles
+
+        return list(self._en_lotes(Proyecto, total, construir, 'Proyectos'))
+
+    def _crear_assets(self, total, proyecto_ids, pesos_proyectos):
+        tipos = [tipo for tipo, _ in Asset.TIPO_CHOICES]
+
+        def construir(ids):
+            proyectos = self.azar.choices(proyecto_ids, cum_weights=pesos_proyectos, k=len(ids))
+            return [
+                Asset(
+                    id=pk,
+                    nombre=f'{self._frase(1, 3)} {pk}',
+                    tipo=self.azar.choice(tipos),
+                    descripcion=self._frase(0, 20),
+                    proyecto_id=proyecto_id,
+                )
+                for pk, proyecto_id in zip(ids, proyectos)
+            ], []
+
+        self._en_lotes(Asset, total, construir, 'Assets')
+
+    def _crear_tareas(self, total, proyecto_ids, pesos_proyectos, etiqueta_ids, pesos_etiquetas):
+        estados = [estado for estado, _ in Tarea.ESTADO_CHOICES]
+        prioridades = [prioridad for prioridad, _ in Tarea.PRIORIDAD_CHOICES]
+        Through = Tarea.etiquetas.through
+
+        def construir(ids):
+            proyectos = self.azar.choices(proyecto_ids, cum_weights=pesos_proyectos, k=len(ids))
+            tareas, enlaces = [], []
+            for pk, proyecto_id in zip(ids, proyectos):
+                tareas.append(Tarea(
+                    id=pk,
+                    titulo=f'{self.azar.choice(VERBOS)} {self._frase(2, 5)}',
+                    descripcion=self._frase(5, 30),
+                    estado=self.azar.choices(estados, weights=[5, 2, 3])[0],
+                    prioridad=self.azar.choices(prioridades, weights=[3, 5, 2])[0],
+                    proyecto_id=proyecto_id,
+                ))
+                if etiqueta_ids:
+                    cantidad = self.azar.choices(range(len(ETIQUETAS_POR_TAREA)), weights=ETIQUETAS_POR_TAREA)[0]
+                    elegidas = set(self.azar.choices(etiqueta_ids, cum_weights=pesos_etiquetas, k=cantidad))
+                    enlaces.extend(Through(tarea_id=pk, etiqueta_id=etiqueta_id) for etiqueta_id in elegidas)
+            return tareas, enlaces
+
+        self._en_lotes(Tarea, total, construir, 'Tareas')
+
+    def _crear_historial(self, dias):
+        # Fotos de los `dias` días hasta FECHA_BASE: lo no pendiente crece en
+        # línea recta hasta los conteos actuales y el resto figura como pendiente
+        if dias < 1:
+            return
+        actuales = {}
+        for proyecto_id, estado, prioridad, total in ResumenTareas.objects.values_list(
+            'proyecto_id', 'estado', 'prioridad', 'total'
+        ):
+            actuales.setdefault(proyecto_id, {})[(estado, prioridad)] = total
+
+        lote, hechas = [], 0
+        inicio = time.perf_counter()
+        total_fotos = len(actuales) * dias
+        for proyecto_id, conteos in actuales.items():
+            por_prioridad = {}
+            for (_, prioridad), total in conteos.items():
+                por_prioridad[prioridad] = por_prioridad.get(prioridad, 0) + total
+            for dia in range(dias):
+                avance = (dia + 1) / dias
+                foto = {clave: int(total * avance) for clave, total in conteos.items() if clave[0] != 'pendiente'}
+                pendientes = dict(por_prioridad)
+                for (_, prioridad), cantidad in foto.items():
+                    pendientes[prioridad] -= cantidad
+                foto.update((('pendiente', prioridad), cantidad) for prioridad, cantidad in pendientes.items())
+                lote.append(InstantaneaDiaria(
+                    proyecto_id=proyecto_id,
+                    fecha=FECHA_BASE - timedelta(days=dias - 1 - dia),
+                    conteos=empaquetar(foto),
+                ))
+                if len(lote) == self.lote:
+                    InstantaneaDiaria.objects.bulk_create(lote)
+                    hechas += len(lote)
+                    lote = []
+                    self.stdout.write(
+                        f'\rInstantáneas: {hechas:,}/{total_fotos:,} '
+                        f'({hechas / (time.perf_counter() - inicio):,.0f}/s)', ending=''
+                    )
+                    self.stdout.flush()
+        InstantaneaDiaria.objects.bulk_create(lote)
+        self.stdout.write(f'\rInstantáneas: {total_fotos:,}/{total_fotos:,}')
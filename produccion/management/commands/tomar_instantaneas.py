@@ -0,0 +1,34 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from produccion.instantaneas import tomar, reconstruir
+
+
+class Command(BaseCommand):
+    help = 'Guarda la foto diaria de tareas por estado y prioridad de cada proyecto (correr una vez por día)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fecha', help='día al que se asigna la foto (AAAA-MM-DD, por defecto hoy); '
+                                            'los conteos son siempre los actuales')
+        parser.add_argument('--reconstruir-desde',
+                            help='además completa las fotos faltantes desde este día hasta ayer '
+                                 '(AAAA-MM-DD) con el registro de actividad')
+
+    def handle(self, *args, **options):
+        fecha = self._fecha(options, 'fecha')
+        desde = self._fecha(options, 'reconstruir_desde')
+        proyectos = tomar(fecha)
+        self.stdout.write(self.style.SUCCESS(f'Instantánea guardada para {proyectos} proyectos.'))
+        if desde:
+            fotos = reconstruir(desde)
+            self.stdout.write(self.style.SUCCESS(f'Reconstrucción desde la actividad: {fotos} fotos revisadas.'))
+
+    @staticmethod
+    def _fecha(options, clave):
+        if not options[clave]:
+            return None
+        try:
+            return date.fromisoformat(options[clave])
+        except ValueError:
+            raise CommandError(f'--{clave.replace("_", "-")} debe tener el formato AAAA-MM-DD.')
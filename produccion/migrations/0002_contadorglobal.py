@@ -0,0 +1,39 @@
+# Generated by Django 5.2.7 on 2026-10-18 10:56
+
+from django.db import migrations, models
+
+
+# Crea la fila única de contadores con los totales actuales
+def crear_contadores(apps, schema_editor):
+    ContadorGlobal = apps.get_model('produccion', 'ContadorGlobal')
+    ContadorGlobal.objects.update_or_create(pk=1, defaults={
+        'proyectos': apps.get_model('produccion', 'Proyecto').objects.count(),
+        'assets': apps.get_model('produccion', 'Asset').objects.count(),
+        'tareas': apps.get_model('produccion', 'Tarea').objects.count(),
+        'etiquetas': apps.get_model('produccion', 'Etiqueta').objects.count(),
+    })
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('produccion', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContadorGlobal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('proyectos', models.BigIntegerField(default=0)),
+                ('assets', models.BigIntegerField(default=0)),
+                ('tareas', models.BigIntegerField(default=0)),
+                ('etiquetas', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Contador Global',
+                'verbose_name_plural': 'Contadores Globales',
+            },
+        ),
+        migrations.RunPython(crear_contadores, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.7 on 2026-10-18 10:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('produccion', '0002_contadorglobal'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='asset',
+            index=models.Index(fields=['-fecha_creacion', '-id'], name='asset_fecha_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='asset',
+            index=models.Index(fields=['proyecto', '-fecha_creacion', '-id'], name='asset_proyecto_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='asset',
+            index=models.Index(fields=['tipo', '-fecha_creacion', '-id'], name='asset_tipo_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='proyecto',
+            index=models.Index(fields=['-fecha_inicio', '-id'], name='proyecto_fecha_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='proyecto',
+            index=models.Index(fields=['estado', '-fecha_inicio', '-id'], name='proyecto_estado_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tarea',
+            index=models.Index(fields=['-fecha_creacion', '-id'], name='tarea_fecha_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tarea',
+            index=models.Index(fields=['proyecto', '-fecha_creacion', '-id'], name='tarea_proyecto_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tarea',
+            index=models.Index(fields=['estado', 'prioridad', '-fecha_creacion', '-id'], name='tarea_estado_prioridad_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tarea',
+            index=models.Index(fields=['proyecto', 'estado', 'prioridad'], name='tarea_proyecto_estado_idx'),
+        ),
+    ]
@@ -0,0 +1,107 @@
+from django.db import migrations
+
+
+# Índices de texto completo nativos de cada motor para produccion/busqueda.py.
+# En motores sin soporte (o SQLite compilado sin FTS5) no se crea nada y la
+# búsqueda usa el índice invertido en memoria.
+
+# tabla -> (campo título, campo descripción, código del tipo en el rowid FTS5)
+TABLAS = {
+    'produccion_tarea': ('titulo', 'descripcion', 1),
+    'produccion_asset': ('nombre', 'descripcion', 2),
+    'produccion_proyecto': ('nombre', 'descripcion', 3),
+}
+
+TABLA_FTS = 'produccion_busqueda_fts'
+
+
+def _vector_postgres(titulo, cuerpo):
+    # Tiene que coincidir con MotorPostgres.vector() para que el planner use el índice
+    return (
+        f"(setweight(to_tsvector('spanish', coalesce({titulo}, '')), 'A') || "
+        f"setweight(to_tsvector('spanish', coalesce({cuerpo}, '')), 'B'))"
+    )
+
+
+def _sqlite_tiene_fts5(cursor):
+    try:
+        cursor.execute('CREATE VIRTUAL TABLE temp.prueba_fts5 USING fts5(x)')
+        cursor.execute('DROP TABLE temp.prueba_fts5')
+    except Exception:
+        return False
+    return True
+
+
+def crear_indices(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+
+    if vendor == 'mysql':
+        for tabla, (titulo, cuerpo, _) in TABLAS.items():
+            schema_editor.execute(
+                f'ALTER TABLE {tabla} ADD FULLTEXT INDEX {tabla}_texto_idx ({titulo}, {cuerpo})'
+            )
+
+    elif vendor == 'postgresql':
+        for tabla, (titulo, cuerpo, _) in TABLAS.items():
+            schema_editor.execute(
+                f'CREATE INDEX {tabla}_texto_idx ON {tabla} USING GIN ({_vector_postgres(titulo, cuerpo)})'
+            )
+
+    elif vendor == 'sqlite':
+        with schema_editor.connection.cursor() as cursor:
+            if not _sqlite_tiene_fts5(cursor):
+                return
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE {TABLA_FTS} USING fts5("
+            f"titulo, cuerpo, tokenize = 'unicode61 remove_diacritics 2')"
+        )
+        for tabla, (titulo, cuerpo, codigo) in TABLAS.items():
+            # El rowid de la tabla FTS es id * 4 + código, así cada trigger
+            # actualiza o borra su fila por clave primaria
+            schema_editor.execute(
+                f'INSERT INTO {TABLA_FTS}(rowid, titulo, cuerpo) '
+                f'SELECT id * 4 + {codigo}, {titulo}, {cuerpo} FROM {tabla}'
+            )
+            schema_editor.execute(
+                f'CREATE TRIGGER {tabla}_fts_ai AFTER INSERT ON {tabla} BEGIN '
+                f'INSERT INTO {TABLA_FTS}(rowid, titulo, cuerpo) '
+                f'VALUES (new.id * 4 + {codigo}, new.{titulo}, new.{cuerpo}); END'
+            )
+            schema_editor.execute(
+                f'CREATE TRIGGER {tabla}_fts_au AFTER UPDATE OF {titulo}, {cuerpo} ON {tabla} BEGIN '
+                f'UPDATE {TABLA_FTS} SET titulo = new.{titulo}, cuerpo = new.{cuerpo} '
+                f'WHERE rowid = old.id * 4 + {codigo}; END'
+            )
+            schema_editor.execute(
+                f'CREATE TRIGGER {tabla}_fts_ad AFTER DELETE ON {tabla} BEGIN '
+                f'DELETE FROM {TABLA_FTS} WHERE rowid = old.id * 4 + {codigo}; END'
+            )
+
+
+def eliminar_indices(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+
+    if vendor == 'mysql':
+        for tabla in TABLAS:
+            schema_editor.execute(f'ALTER TABLE {tabla} DROP INDEX {tabla}_texto_idx')
+
+    elif vendor == 'postgresql':
+        for tabla in TABLAS:
+            schema_editor.execute(f'DROP INDEX IF EXISTS {tabla}_texto_idx')
+
+    elif vendor == 'sqlite':
+        for tabla in TABLAS:
+            for sufijo in ('ai', 'au', 'ad'):
+                schema_editor.execute(f'DROP TRIGGER IF EXISTS {tabla}_fts_{sufijo}')
+        schema_editor.execute(f'DROP TABLE IF EXISTS {TABLA_FTS}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('produccion', '0003_indices_compuestos'),
+    ]
+
+    operations = [
+        migrations.RunPython(crear_indices, eliminar_indices),
+    ]
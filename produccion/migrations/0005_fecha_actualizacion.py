@@ -0,0 +1,53 @@
+# Generated by Django 5.2.7 on 2026-10-18 11:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('produccion', '0004_indices_busqueda'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='asset',
+            name='fecha_actualizacion',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='etiqueta',
+            name='fecha_actualizacion',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='proyecto',
+            name='fecha_actualizacion',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='tarea',
+            name='fecha_actualizacion',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddIndex(
+            model_name='asset',
+            index=models.Index(fields=['fecha_actualizacion'], name='asset_actualizacion_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='asset',
+            index=models.Index(fields=['proyecto', 'fecha_actualizacion'], name='asset_proyecto_actualiz_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='proyecto',
+            index=models.Index(fields=['fecha_actualizacion'], name='proyecto_actualizacion_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tarea',
+            index=models.Index(fields=['fecha_actualizacion'], name='tarea_actualizacion_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tarea',
+            index=models.Index(fields=['proyecto', 'fecha_actualizacion'], name='tarea_proyecto_actualiz_idx'),
+        ),
+    ]
@@ -0,0 +1,45 @@
+from django.db import migrations, models
+
+
+def normalizar(nombre):
+    # Copia de models.normalizar_nombre_etiqueta (las migraciones no deben importar el modelo actual)
+    return ' '.join((nombre or '').split()).casefold()
+
+
+def completar_nombre_normalizado(apps, schema_editor):
+    # Si ya había etiquetas que solo difieren en mayúsculas o espacios
+    # ("Arte" y "arte"), la más antigua se queda con la clave y las demás
+    # reciben "clave#id" para no romper el unique. No se fusionan: los
+    # nombres quedan como estaban y se pueden corregir desde la web.
+    Etiqueta = apps.get_model('produccion', 'Etiqueta')
+    vistas = set()
+    pendientes = []
+    for etiqueta in Etiqueta.objects.order_by('id').only('id', 'nombre').iterator(chunk_size=2000):
+        clave = normalizar(etiqueta.nombre)
+        if clave in vistas:
+            clave = f'{clave}#{etiqueta.pk}'
+        vistas.add(clave)
+        etiqueta.nombre_normalizado = clave
+        pendientes.append(etiqueta)
+    Etiqueta.objects.bulk_update(pendientes, ['nombre_normalizado'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('produccion', '0005_fecha_actualizacion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='etiqueta',
+            name='nombre_normalizado',
+            field=models.CharField(editable=False, max_length=150, null=True),
+        ),
+        migrations.RunPython(completar_nombre_normalizado, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='etiqueta',
+            name='nombre_normalizado',
+            field=models.CharField(editable=False, max_length=150, unique=True),
+        ),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 5.2.7 on 2026-10-18 11:27
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+
+
+# Llena los resúmenes con un GROUP BY por tabla (como reconstruir_resumenes)
+def llenar_resumenes(apps, schema_editor):
+    for origen, resumen, clave in (
+        ('Tarea', 'ResumenTareas', ('estado', 'prioridad')),
+        ('Asset', 'ResumenAssets', ('tipo',)),
+    ):
+        Origen = apps.get_model('produccion', origen)
+        Resumen = apps.get_model('produccion', resumen)
+        campos = ('proyecto_id', *clave)
+        filas = Origen.objects.order_by().values_list(*campos).annotate(total=Count('id'))
+        Resumen.objects.bulk_create(
+            [Resumen(total=fila[-1], **dict(zip(campos, fila[:-1]))) for fila in filas],
+            batch_size=1000,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('produccion', '0006_nombre_normalizado_etiqueta'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumenAssets',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total', models.IntegerField(default=0)),
+                ('tipo', models.CharField(choices=[('sprite', 'Sprite/Gráfico'), ('audio', 'Audio/SFX'), ('musica', 'Música'), ('modelo3d', 'Modelo 3D'), ('otro', 'Otro')], max_length=20)),
+                ('proyecto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='resumen_assets', to='produccion.proyecto')),
+            ],
+            options={
+                'verbose_name': 'Resumen de assets',
+                'verbose_name_plural': 'Resúmenes de assets',
+                'constraints': [models.UniqueConstraint(fields=('proyecto', 'tipo'), name='resumen_assets_unico')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ResumenTareas',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total', models.IntegerField(default=0)),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('en_proceso', 'En Proceso'), ('completada', 'Completada')], max_length=20)),
+                ('prioridad', models.CharField(choices=[('baja', 'Baja'), ('media', 'Media'), ('alta', 'Alta')], max_length=20)),
+                ('proyecto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='resumen_tareas', to='produccion.proyecto')),
+            ],
+            options={
+                'verbose_name': 'Resumen de tareas',
+                'verbose_name_plural': 'Resúmenes de tareas',
+                'constraints': [models.UniqueConstraint(fields=('proyecto', 'estado', 'prioridad'), name='resumen_tareas_unico')],
+            },
+        ),
+        migrations.RunPython(llenar_resumenes, migrations.RunPython.noop),
+    ]
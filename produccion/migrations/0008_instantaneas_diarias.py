@@ -0,0 +1,28 @@
+# Generated by Django 5.2.7 on 2026-10-18 11:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('produccion', '0007_resumenes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InstantaneaDiaria',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField()),
+                ('conteos', models.BinaryField()),
+                ('proyecto', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='instantaneas', to='produccion.proyecto')),
+            ],
+            options={
+                'verbose_name': 'Instantánea diaria',
+                'verbose_name_plural': 'Instantáneas diarias',
+                'constraints': [models.UniqueConstraint(fields=('proyecto', 'fecha'), name='instantanea_proyecto_fecha')],
+            },
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.7 on 2026-10-18 11:33
+
+import django.core.serializers.json
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('produccion', '0008_instantaneas_diarias'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Actividad',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateTimeField(default=django.utils.timezone.now)),
+                ('tipo', models.CharField(choices=[('proyecto', 'Proyecto'), ('asset', 'Asset'), ('tarea', 'Tarea')], max_length=10)),
+                ('objeto_id', models.BigIntegerField()),
+                ('accion', models.CharField(choices=[('crear', 'Creación'), ('editar', 'Edición'), ('eliminar', 'Eliminación')], max_length=10)),
+                ('descripcion', models.CharField(max_length=200)),
+                ('cambios', models.JSONField(default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('proyecto', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='produccion.proyecto')),
+                ('usuario', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Actividad',
+                'verbose_name_plural': 'Actividad',
+                'ordering': ['-fecha', '-id'],
+                'indexes': [models.Index(fields=['proyecto', '-fecha', '-id'], name='actividad_proyecto_idx'), models.Index(fields=['tipo', 'objeto_id', '-fecha', '-id'], name='actividad_objeto_idx'), models.Index(fields=['-fecha', '-id'], name='actividad_fecha_idx')],
+            },
+        ),
+    ]
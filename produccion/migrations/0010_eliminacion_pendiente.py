@@ -0,0 +1,33 @@
+# Generated by Django 5.2.7 on 2026-10-18 11:38
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('produccion', '0009_actividad'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='proyecto',
+            name='pendiente_eliminacion',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.AlterField(
+            model_name='asset',
+            name='proyecto',
+            field=models.ForeignKey(limit_choices_to={'pendiente_eliminacion': False}, on_delete=django.db.models.deletion.CASCADE, related_name='assets', to='produccion.proyecto'),
+        ),
+        migrations.AlterField(
+            model_name='tarea',
+            name='proyecto',
+            field=models.ForeignKey(limit_choices_to={'pendiente_eliminacion': False}, on_delete=django.db.models.deletion.CASCADE, related_name='tareas', to='produccion.proyecto'),
+        ),
+        migrations.AddIndex(
+            model_name='proyecto',
+            index=models.Index(condition=models.Q(('pendiente_eliminacion', True)), fields=['id'], name='proyecto_pendiente_idx'),
+        ),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 5.2.7 on 2026-10-18 11:42
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('produccion', '0010_eliminacion_pendiente'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Archivo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sha256', models.CharField(max_length=64, unique=True)),
+                ('tamaño', models.BigIntegerField()),
+                ('tipo_mime', models.CharField(blank=True, max_length=100)),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Archivo',
+                'verbose_name_plural': 'Archivos',
+                'ordering': ['-fecha_creacion'],
+            },
+        ),
+        migrations.AddField(
+            model_name='asset',
+            name='nombre_archivo',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='asset',
+            name='archivo',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='assets', to='produccion.archivo'),
+        ),
+        migrations.CreateModel(
+            name='Subida',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.UUIDField(default=uuid.uuid4, editable=False, unique=True)),
+                ('nombre_archivo', models.CharField(max_length=255)),
+                ('tipo_mime', models.CharField(blank=True, max_length=100)),
+                ('tamaño', models.BigIntegerField()),
+                ('recibido', models.BigIntegerField(default=0)),
+                ('segundos', models.FloatField(default=0)),
+                ('deduplicada', models.BooleanField(default=False)),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True)),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True)),
+                ('fecha_completada', models.DateTimeField(blank=True, null=True)),
+                ('archivo', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='produccion.archivo')),
+                ('asset', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='produccion.asset')),
+            ],
+            options={
+                'verbose_name': 'Subida',
+                'verbose_name_plural': 'Subidas',
+                'indexes': [models.Index(fields=['fecha_actualizacion'], name='subida_actualizacion_idx'), models.Index(fields=['fecha_completada'], name='subida_completada_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.7 on 2026-10-18 11:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('produccion', '0011_archivos'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Latido',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateTimeField()),
+            ],
+            options={
+                'verbose_name': 'Latido',
+                'verbose_name_plural': 'Latidos',
+            },
+        ),
+    ]
@@ -0,0 +1,68 @@
+from django.db import migrations
+
+
+# Bases migradas antes de que los triggers FTS5 se recrearan con post_migrate
+# (ver busqueda.asegurar_triggers_sqlite): los vuelve a crear y reindexa las
+# tablas que los habían perdido. En MySQL y Postgres no hace nada.
+# El SQL va copiado acá (el de 0004): la migración no debe cambiar si después
+# cambia produccion/busqueda.py.
+
+# tabla -> (campo título, campo descripción, código del tipo en el rowid FTS5)
+TABLAS = {
+    'produccion_tarea': ('titulo', 'descripcion', 1),
+    'produccion_asset': ('nombre', 'descripcion', 2),
+    'produccion_proyecto': ('nombre', 'descripcion', 3),
+}
+
+TABLA_FTS = 'produccion_busqueda_fts'
+
+
+def _triggers(tabla, titulo, cuerpo, codigo):
+    return {
+        f'{tabla}_fts_ai': (
+            f'CREATE TRIGGER IF NOT EXISTS {tabla}_fts_ai AFTER INSERT ON {tabla} BEGIN '
+            f'INSERT INTO {TABLA_FTS}(rowid, titulo, cuerpo) '
+            f'VALUES (new.id * 4 + {codigo}, new.{titulo}, new.{cuerpo}); END'
+        ),
+        f'{tabla}_fts_au': (
+            f'CREATE TRIGGER IF NOT EXISTS {tabla}_fts_au AFTER UPDATE OF {titulo}, {cuerpo} ON {tabla} BEGIN '
+            f'UPDATE {TABLA_FTS} SET titulo = new.{titulo}, cuerpo = new.{cuerpo} '
+            f'WHERE rowid = old.id * 4 + {codigo}; END'
+        ),
+        f'{tabla}_fts_ad': (
+            f'CREATE TRIGGER IF NOT EXISTS {tabla}_fts_ad AFTER DELETE ON {tabla} BEGIN '
+            f'DELETE FROM {TABLA_FTS} WHERE rowid = old.id * 4 + {codigo}; END'
+        ),
+    }
+
+
+def restaurar_triggers(apps, schema_editor):
+    conexion = schema_editor.connection
+    if conexion.vendor != 'sqlite' or TABLA_FTS not in conexion.introspection.table_names():
+        return
+    with conexion.cursor() as cursor:
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")
+        existentes = {nombre for nombre, in cursor.fetchall()}
+    for tabla, (titulo, cuerpo, codigo) in TABLAS.items():
+        faltantes = [sql for nombre, sql in _triggers(tabla, titulo, cuerpo, codigo).items() if nombre not in existentes]
+        if not faltantes:
+            continue
+        # Sin triggers la tabla pudo cambiar sin que el índice se enterara
+        schema_editor.execute(f'DELETE FROM {TABLA_FTS} WHERE rowid % 4 = {codigo}')
+        schema_editor.execute(
+            f'INSERT INTO {TABLA_FTS}(rowid, titulo, cuerpo) '
+            f'SELECT id * 4 + {codigo}, {titulo}, {cuerpo} FROM {tabla}'
+        )
+        for sql in faltantes:
+            schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('produccion', '0012_latido'),
+    ]
+
+    operations = [
+        migrations.RunPython(restaurar_triggers, migrations.RunPython.noop),
+    ]
@@ -1,4 +1,48 @@
-from django.db import models
+import uuid
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, models, transaction
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+
+# Suma las filas del resumen `modelo` (ResumenTareas/ResumenAssets) del
+# proyecto de la fila externa. Es una subconsulta correlacionada sobre a lo
+# sumo 9 filas por proyecto: cuesta lo mismo con 10 tareas que con 100.000.
+def _conteo_por_proyecto(modelo, **filtros):
+    subconsulta = (
+        modelo.objects.filter(proyecto=OuterRef('pk'), **filtros)
+        .order_by()
+        .values('proyecto')
+        .annotate(suma=Sum('total'))
+        .values('suma')
+    )
+    return Coalesce(Subquery(subconsulta, output_field=IntegerField()), 0)
+
+
+class ProyectoQuerySet(models.QuerySet):
+
+    def visibles(self):
+        # Sin los proyectos marcados para borrar (ver eliminacion.py)
+        return self.filter(pendiente_eliminacion=False)
+
+    def con_estadisticas(self):
+        # Trae en una sola consulta el detalle (JOIN 1:1), el total de assets
+        # y el desglose de tareas por estado, para las cards y el admin.
+        # Cada proyecto queda con: num_assets, num_tareas y tareas_<estado>
+        # (ver Proyecto.porcentaje_completado).
+        conteos = {
+            f'tareas_{estado}': _conteo_por_proyecto(ResumenTareas, estado=estado)
+            for estado, _ in Tarea.ESTADO_CHOICES
+        }
+        return self.select_related('detalle').annotate(
+            num_assets=_conteo_por_proyecto(ResumenAssets),
+            **conteos,
+        ).annotate(
+            num_tareas=sum((models.F(campo) for campo in conteos), models.Value(0)),
+        )
 
 
 # Proyecto es el modelo principal donde guardamos toda la info básica del juego
@@ -20,14 +64,39 @@ class Proyecto(models.Model):
         choices=ESTADO_CHOICES, 
         default='planificacion'
     )
+    # Se actualiza también cuando cambia algo que se ve en su card o su detalle
+    # (detalle técnico, assets, tareas), ver signals.py. Sirve para los ETag.
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
+    # Marcado para borrar: deja de verse en el acto y sus assets y tareas se
+    # borran por lotes en segundo plano (ver eliminacion.py)
+    pendiente_eliminacion = models.BooleanField(default=False, editable=False)
+    
+    objects = ProyectoQuerySet.as_manager()
     
     class Meta:
         verbose_name = 'Proyecto'
         verbose_name_plural = 'Proyectos'
         ordering = ['-fecha_inicio']  # Los más recientes primero
+        # Índices para la lista paginada por cursor (fecha_inicio, id) y el filtro por estado
+        indexes = [
+            models.Index(fields=['-fecha_inicio', '-id'], name='proyecto_fecha_id_idx'),
+            models.Index(fields=['estado', '-fecha_inicio', '-id'], name='proyecto_estado_fecha_idx'),
+            models.Index(fields=['fecha_actualizacion'], name='proyecto_actualizacion_idx'),
+            # Parcial: solo los pocos proyectos que esperan su borrado
+            models.Index(
+                fields=['id'], condition=models.Q(pendiente_eliminacion=True), name='proyecto_pendiente_idx'
+            ),
+        ]
     
     def __str__(self):
         return self.nombre
+    
+    @property
+    def porcentaje_completado(self):
+        # Solo con las anotaciones de con_estadisticas()
+        if not self.num_tareas:
+            return 0
+        return round(self.tareas_completada * 100 / self.num_tareas)
 
 
 # DetalleProyecto guarda info técnica extra del proyecto
@@ -60,9 +129,44 @@ class DetalleProyecto(models.Model):
 
 # Etiquetas para categorizar tareas - modelo independiente
 # Se pueden usar cosas como "Bug", "Feature", "Arte", "Sonido", etc.
+def normalizar_nombre_etiqueta(nombre):
+    # "  Arte   2D " y "arte 2d" son la misma etiqueta
+    return ' '.join((nombre or '').split()).casefold()
+
+
+class EtiquetaQuerySet(models.QuerySet):
+
+    def por_nombre(self, nombre):
+        # Igualdad sobre la columna normalizada: usa su índice unique, a
+        # diferencia de nombre__iexact (LOWER(...) en MySQL/Postgres)
+        return self.filter(nombre_normalizado=normalizar_nombre_etiqueta(nombre))
+
+    def obtener_o_crear(self, nombre):
+        # Como get_or_create pero sin distinguir mayúsculas ni espacios. Si otro
+        # proceso crea la misma etiqueta entre la búsqueda y el INSERT, la
+        # restricción unique lo detecta y se devuelve la que quedó guardada.
+        nombre = ' '.join(nombre.split())
+        etiqueta = self.por_nombre(nombre).first()
+        if etiqueta is not None:
+            return etiqueta, False
+        try:
+            with transaction.atomic():
+                return self.create(nombre=nombre), True
+        except IntegrityError:
+            return self.por_nombre(nombre).get(), False
+
+
 class Etiqueta(models.Model):
     
     nombre = models.CharField(max_length=50, unique=True)
+    # nombre en minúsculas (casefold) y con los espacios colapsados, se completa
+    # en save(). Es lo que la BD mantiene único: evita "Arte" y "arte" aunque
+    # dos altas lleguen a la vez. Quien use bulk_create debe completarlo.
+    # (150: casefold puede alargar el texto, ej: "ß" -> "ss")
+    nombre_normalizado = models.CharField(max_length=150, unique=True, editable=False)
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
+    
+    objects = EtiquetaQuerySet.as_manager()
     
     class Meta:
         verbose_name = 'Etiqueta'
@@ -71,6 +175,41 @@ class Etiqueta(models.Model):
     
     def __str__(self):
         return self.nombre
+    
+    def save(self, *args, **kwargs):
+        self.nombre_normalizado = normalizar_nombre_etiqueta(self.nombre)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'nombre' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'nombre_normalizado'}
+        super().save(*args, **kwargs)
+
+
+# Contenido binario de un asset, guardado una sola vez por su hash SHA-256
+# (ver almacen.py): dos assets con el mismo sprite, en el mismo proyecto o en
+# otro, apuntan al mismo Archivo. Los que quedan sin assets los borra:
+# python manage.py limpiar_archivos
+class Archivo(models.Model):
+    sha256 = models.CharField(max_length=64, unique=True)
+    tamaño = models.BigIntegerField()
+    tipo_mime = models.CharField(max_length=100, blank=True)
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        verbose_name = 'Archivo'
+        verbose_name_plural = 'Archivos'
+        ordering = ['-fecha_creacion']
+    
+    def __str__(self):
+        return f'{self.sha256[:12]} ({self.tamaño} bytes)'
+
+
+# Queryset de los modelos que cuelgan de un proyecto (Asset y Tarea)
+class DeProyectoQuerySet(models.QuerySet):
+
+    def visibles(self):
+        # Sin los de proyectos marcados para borrar: se ocultan junto con el
+        # proyecto mientras eliminar_pendientes los borra por lotes
+        return self.filter(proyecto__pendiente_eliminacion=False)
 
 
 # Asset representa cualquier recurso del proyecto: sprites, audio, modelos 3D, etc.
@@ -93,17 +232,43 @@ class Asset(models.Model):
     proyecto = models.ForeignKey(
         Proyecto, 
         on_delete=models.CASCADE, 
-        related_name='assets'
+        related_name='assets',
+        limit_choices_to={'pendiente_eliminacion': False},
+    )
+    # Archivo del asset (opcional). PROTECT: un Archivo se borra solo cuando
+    # ningún asset lo usa, y eso lo hace limpiar_archivos
+    archivo = models.ForeignKey(
+        Archivo, on_delete=models.PROTECT, null=True, blank=True, related_name='assets'
     )
+    nombre_archivo = models.CharField(max_length=255, blank=True)  # nombre original al subirlo
     fecha_creacion = models.DateTimeField(auto_now_add=True)  # Se guarda automáticamente
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
+    
+    objects = DeProyectoQuerySet.as_manager()
     
     class Meta:
         verbose_name = 'Asset'
         verbose_name_plural = 'Assets'
         ordering = ['-fecha_creacion']  # Los más nuevos primero
+        # Cada índice cubre un camino real: la lista general, los assets de un
+        # proyecto (detalle y filtro) y el filtro por tipo, todos ya ordenados
+        indexes = [
+            models.Index(fields=['-fecha_creacion', '-id'], name='asset_fecha_id_idx'),
+            models.Index(fields=['proyecto', '-fecha_creacion', '-id'], name='asset_proyecto_fecha_idx'),
+            models.Index(fields=['tipo', '-fecha_creacion', '-id'], name='asset_tipo_fecha_idx'),
+            # MAX(fecha_actualizacion) + COUNT para los ETag, resueltos con el índice
+            models.Index(fields=['fecha_actualizacion'], name='asset_actualizacion_idx'),
+            models.Index(fields=['proyecto', 'fecha_actualizacion'], name='asset_proyecto_actualiz_idx'),
+        ]
     
     def __str__(self):
         return f"{self.nombre} ({self.get_tipo_display()})"
+    
+    def save(self, *args, **kwargs):
+        # post_save corre fuera de la transacción de save(): así el resumen
+        # del proyecto (ver signals.py) se guarda o se descarta junto con el asset
+        with transaction.atomic():
+            super().save(*args, **kwargs)
 
 
 # Tarea representa trabajo pendiente en un proyecto
@@ -139,7 +304,8 @@ class Tarea(models.Model):
     proyecto = models.ForeignKey(
         Proyecto, 
         on_delete=models.CASCADE, 
-        related_name='tareas'
+        related_name='tareas',
+        limit_choices_to={'pendiente_eliminacion': False},
     )
     
     # Una tarea puede tener muchas etiquetas y viceversa (N:M)
@@ -149,11 +315,366 @@ class Tarea(models.Model):
         related_name='tareas'
     )
     fecha_creacion = models.DateTimeField(auto_now_add=True)
+    # También se toca al cambiar sus etiquetas (ver signals.py); el nombre de su
+    # proyecto entra en los ETag de las listas por la fecha del proyecto
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
+    
+    objects = DeProyectoQuerySet.as_manager()
     
     class Meta:
         verbose_name = 'Tarea'
         verbose_name_plural = 'Tareas'
         ordering = ['-fecha_creacion']  # Las más recientes primero
+        # Lista general, tareas de un proyecto (detalle y filtro) y filtros
+        # de estado/prioridad (lista y admin), todos en el orden de la lista.
+        # (proyecto, estado, prioridad) deja el GROUP BY de los resúmenes
+        # (ResumenTareas.contar) resolverse solo con el índice, sin leer la tabla.
+        indexes = [
+            models.Index(fields=['-fecha_creacion', '-id'], name='tarea_fecha_id_idx'),
+            models.Index(fields=['proyecto', '-fecha_creacion', '-id'], name='tarea_proyecto_fecha_idx'),
+            models.Index(fields=['estado', 'prioridad', '-fecha_creacion', '-id'], name='tarea_estado_prioridad_idx'),
+            models.Index(fields=['proyecto', 'estado', 'prioridad'], name='tarea_proyecto_estado_idx'),
+            models.Index(fields=['fecha_actualizacion'], name='tarea_actualizacion_idx'),
+            models.Index(fields=['proyecto', 'fecha_actualizacion'], name='tarea_proyecto_actualiz_idx'),
+        ]
+    
+    def __str__(self):
+        return self.titulo
+    
+    def save(self, *args, **kwargs):
+        # Igual que Asset.save(): el resumen del proyecto en la misma transacción
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+# Totales globales para el dashboard, mantenidos de forma incremental.
+# Es una sola fila (pk=1) que actualizan las señales de signals.py con F(),
+# así el inicio lee un registro en vez de hacer cuatro COUNT(*) sobre tablas grandes.
+# Si alguna vez se desalinea, se corrige con: python manage.py reconciliar_contadores
+class ContadorGlobal(models.Model):
+    
+    CAMPOS = ('proyectos', 'assets', 'tareas', 'etiquetas')
+    
+    proyectos = models.BigIntegerField(default=0)
+    assets = models.BigIntegerField(default=0)
+    tareas = models.BigIntegerField(default=0)
+    etiquetas = models.BigIntegerField(default=0)
+    
+    class Meta:
+        verbose_name = 'Contador Global'
+        verbose_name_plural = 'Contadores Globales'
+    
+    def __str__(self):
+        return 'Contadores del dashboard'
+    
+    @classmethod
+    def contar(cls):
+        # Conteo real (caro): solo para crear la fila o reconciliar
+        return {
+            'proyectos': Proyecto.objects.count(),
+            'assets': Asset.objects.count(),
+            'tareas': Tarea.objects.count(),
+            'etiquetas': Etiqueta.objects.count(),
+        }
+    
+    @classmethod
+    def obtener(cls):
+        contador = cls.objects.filter(pk=1).first()
+        if contador is None:
+            contador, _ = cls.objects.get_or_create(pk=1, defaults=cls.contar())
+        return contador
+    
+    @classmethod
+    def incrementar(cls, **deltas):
+        # Ej: ContadorGlobal.incrementar(tareas=1) o incrementar(assets=-20)
+        cambios = {campo: models.F(campo) + delta for campo, delta in deltas.items() if delta}
+        if not cambios:
+            return
+        if not cls.objects.filter(pk=1).update(**cambios):
+            # La fila todavía no existe: se crea con el conteo real (ya incluye el cambio)
+            cls.obtener()
+
+
+# Resúmenes por proyecto, mantenidos de forma incremental (como ContadorGlobal)
+# en la misma transacción que el cambio de la tarea o el asset (ver signals.py).
+# Las cards, el detalle y la API leen de acá el progreso y los conteos: a lo
+# sumo 9 filas de tareas (estado x prioridad) y 5 de assets por proyecto, en
+# vez de agregar sobre todas sus tareas. Si alguna vez se desalinean, se
+# recalculan con: python manage.py reconstruir_resumenes
+class Resumen(models.Model):
+    
+    CLAVE = ()      # campos que junto con proyecto identifican la fila
+    ORIGEN = None   # modelo que se resume
+    
+    # Cada subclase define `proyecto` (FK con su related_name) y los campos de CLAVE
+    total = models.IntegerField(default=0)
+    
+    class Meta:
+        abstract = True
+    
+    @classmethod
+    def clave(cls, objeto):
+        # (proyecto_id, *CLAVE) de una tarea/asset, o None si el objeto se cargó sin esos campos
+        valores = [objeto.__dict__.get(campo) for campo in ('proyecto_id', *cls.CLAVE)]
+        return None if None in valores else tuple(valores)
+    
+    @classmethod
+    def contar(cls, proyecto_ids=None):
+        # Conteo real con un solo GROUP BY: {(proyecto_id, *CLAVE): total}
+        filas = cls.ORIGEN.objects.order_by()
+        if proyecto_ids is not None:
+            filas = filas.filter(proyecto_id__in=proyecto_ids)
+        return {
+            tuple(fila[:-1]): fila[-1]
+            for fila in filas.values_list('proyecto_id', *cls.CLAVE).annotate(total=Count('id'))
+        }
+    
+    @classmethod
+    def sumar(cls, deltas):
+        # deltas: {(proyecto_id, *CLAVE): +n / -n}. Se bloquean las filas de los
+        # proyectos afectados (pocas por proyecto), se suman en memoria y se
+        # escriben con un bulk_update; las combinaciones nuevas se insertan.
+        deltas = {clave: delta for clave, delta in deltas.items() if delta}
+        if not deltas:
+            return
+        campos = ('proyecto_id', *cls.CLAVE)
+        with transaction.atomic():
+            existentes = {
+                tuple(getattr(fila, campo) for campo in campos): fila
+                for fila in cls.objects.select_for_update().filter(
+                    proyecto_id__in={clave[0] for clave in deltas}
+                )
+            }
+            cambiadas, nuevas = [], {}
+            for clave, delta in deltas.items():
+                fila = existentes.get(clave)
+                if fila is not None:
+                    fila.total += delta
+                    cambiadas.append(fila)
+                else:
+                    nuevas[clave] = delta
+            cls.objects.bulk_update(cambiadas, ['total'], batch_size=500)
+            try:
+                with transaction.atomic():
+                    cls.objects.bulk_create(
+                        [cls(total=delta, **dict(zip(campos, clave))) for clave, delta in nuevas.items()],
+                        batch_size=500,
+                    )
+            except IntegrityError:
+                # Otra transacción creó la misma combinación recién: ahora existe y se puede bloquear
+                cls.sumar(nuevas)
+    
+    @classmethod
+    def recalcular(cls, proyecto_ids):
+        # Reemplaza las filas de esos proyectos por el conteo real (índice por proyecto)
+        proyecto_ids = {pk for pk in proyecto_ids if pk is not None}
+        if not proyecto_ids:
+            return
+        campos = ('proyecto_id', *cls.CLAVE)
+        with transaction.atomic():
+            cls.objects.filter(proyecto_id__in=proyecto_ids).delete()
+            cls.objects.bulk_create(
+                [cls(total=total, **dict(zip(campos, clave))) for clave, total in cls.contar(proyecto_ids).items()],
+                batch_size=500,
+            )
+
+
+class ResumenTareas(Resumen):
+    
+    CLAVE = ('estado', 'prioridad')
+    ORIGEN = Tarea
+    
+    proyecto = models.ForeignKey(Proyecto, on_delete=models.CASCADE, related_name='resumen_tareas')
+    estado = models.CharField(max_length=20, choices=Tarea.ESTADO_CHOICES)
+    prioridad = models.CharField(max_length=20, choices=Tarea.PRIORIDAD_CHOICES)
+    
+    class Meta:
+        verbose_name = 'Resumen de tareas'
+        verbose_name_plural = 'Resúmenes de tareas'
+        constraints = [
+            models.UniqueConstraint(fields=['proyecto', 'estado', 'prioridad'], name='resumen_tareas_unico'),
+        ]
+    
+    def __str__(self):
+        return f'{self.proyecto_id}: {self.estado}/{self.prioridad} = {self.total}'
+
+
+class ResumenAssets(Resumen):
+    
+    CLAVE = ('tipo',)
+    ORIGEN = Asset
+    
+    proyecto = models.ForeignKey(Proyecto, on_delete=models.CASCADE, related_name='resumen_assets')
+    tipo = models.CharField(max_length=20, choices=Asset.TIPO_CHOICES)
+    
+    class Meta:
+        verbose_name = 'Resumen de assets'
+        verbose_name_plural = 'Resúmenes de assets'
+        constraints = [
+            models.UniqueConstraint(fields=['proyecto', 'tipo'], name='resumen_assets_unico'),
+        ]
+    
+    def __str__(self):
+        return f'{self.proyecto_id}: {self.tipo} = {self.total}'
+
+
+def progreso_de_proyectos(proyecto_ids):
+    # {proyecto_id: {...}} leyendo solo los resúmenes (dos consultas para toda la lista)
+    progreso = {
+        pk: {
+            'tareas': 0,
+            'completadas': 0,
+            'porcentaje': 0,
+            'por_estado': {estado: 0 for estado, _ in Tarea.ESTADO_CHOICES},
+            'por_prioridad': {prioridad: 0 for prioridad, _ in Tarea.PRIORIDAD_CHOICES},
+            'assets': 0,
+            'assets_por_tipo': {tipo: 0 for tipo, _ in Asset.TIPO_CHOICES},
+        }
+        for pk in proyecto_ids
+    }
+    filas = ResumenTareas.objects.filter(proyecto_id__in=progreso).values_list('proyecto_id', 'estado', 'prioridad', 'total')
+    for proyecto_id, estado, prioridad, total in filas:
+        datos = progreso[proyecto_id]
+        datos['tareas'] += total
+        datos['por_estado'][estado] = datos['por_estado'].get(estado, 0) + total
+        datos['por_prioridad'][prioridad] = datos['por_prioridad'].get(prioridad, 0) + total
+    for proyecto_id, tipo, total in ResumenAssets.objects.filter(proyecto_id__in=progreso).values_list('proyecto_id', 'tipo', 'total'):
+        progreso[proyecto_id]['assets'] += total
+        progreso[proyecto_id]['assets_por_tipo'][tipo] = progreso[proyecto_id]['assets_por_tipo'].get(tipo, 0) + total
+    for datos in progreso.values():
+        datos['completadas'] = datos['por_estado'].get('completada', 0)
+        if datos['tareas']:
+            datos['porcentaje'] = round(datos['completadas'] * 100 / datos['tareas'])
+    return progreso
+
+
+# Foto diaria de las tareas de cada proyecto, para burndown y flujo acumulado.
+# Una fila por proyecto y día con los 9 conteos (estado x prioridad) empaquetados
+# en 36 bytes (ver instantaneas.py): 2 años de un proyecto son 730 filas chicas
+# leídas por el índice único (proyecto, fecha). Las toma: python manage.py tomar_instantaneas
+class InstantaneaDiaria(models.Model):
+    
+    # Sin índice propio en la FK: lo cubre el índice único (proyecto, fecha)
+    proyecto = models.ForeignKey(Proyecto, on_delete=models.CASCADE, related_name='instantaneas', db_index=False)
+    fecha = models.DateField()
+    conteos = models.BinaryField()
+    
+    class Meta:
+        verbose_name = 'Instantánea diaria'
+        verbose_name_plural = 'Instantáneas diarias'
+        constraints = [
+            models.UniqueConstraint(fields=['proyecto', 'fecha'], name='instantanea_proyecto_fecha'),
+        ]
+    
+    def __str__(self):
+        return f'{self.proyecto_id} @ {self.fecha}'
+
+
+class ActividadQuerySet(models.QuerySet):
+
+    def de_proyecto(self, proyecto_id):
+        return self.filter(proyecto_id=proyecto_id)
+
+    def de_objeto(self, tipo, objeto_id):
+        # Ej: Actividad.objects.de_objeto('tarea', 15)
+        return self.filter(tipo=tipo, objeto_id=objeto_id)
+
+
+# Registro de cambios: quién cambió qué, cuándo y de qué a qué. Solo se
+# agregan filas, en lotes desde el buffer de actividad.py (nunca dentro del
+# save() de la vista). Las FK no tienen restricción en la BD ni CASCADE:
+# el historial sobrevive al borrado de la tarea, el proyecto o el usuario.
+# El historial viejo se poda con: python manage.py compactar_actividad
+class Actividad(models.Model):
+    
+    TIPO_CHOICES = [
+        ('proyecto', 'Proyecto'),
+        ('asset', 'Asset'),
+        ('tarea', 'Tarea'),
+    ]
+    
+    ACCION_CHOICES = [
+        ('crear', 'Creación'),
+        ('editar', 'Edición'),
+        ('eliminar', 'Eliminación'),
+    ]
+    
+    fecha = models.DateTimeField(default=timezone.now)  # momento del cambio, no de la escritura
+    usuario = models.ForeignKey(
+        settings.AUTH_USER_MODEL, null=True, blank=True,
+        on_delete=models.DO_NOTHING, db_constraint=False, related_name='+',
+    )
+    proyecto = models.ForeignKey(
+        Proyecto, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+',
+    )
+    tipo = models.CharField(max_length=10, choices=TIPO_CHOICES)
+    objeto_id = models.BigIntegerField()
+    accion = models.CharField(max_length=10, choices=ACCION_CHOICES)
+    descripcion = models.CharField(max_length=200)  # str() del objeto al momento del cambio
+    # {campo: [antes, después]}; en etiquetas: {'etiquetas': {'agregadas': [ids], 'quitadas': [ids]}}
+    cambios = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    
+    objects = ActividadQuerySet.as_manager()
+    
+    class Meta:
+        verbose_name = 'Actividad'
+        verbose_name_plural = 'Actividad'
+        ordering = ['-fecha', '-id']
+        # Historial de un proyecto, de un objeto y general (también la poda por fecha)
+        indexes = [
+            models.Index(fields=['proyecto', '-fecha', '-id'], name='actividad_proyecto_idx'),
+            models.Index(fields=['tipo', 'objeto_id', '-fecha', '-id'], name='actividad_objeto_idx'),
+            models.Index(fields=['-fecha', '-id'], name='actividad_fecha_idx'),
+        ]
+    
+    def __str__(self):
+        return f'{self.get_accion_display()} de {self.tipo} {self.objeto_id} ({self.fecha:%Y-%m-%d %H:%M})'
+
+
+
+# Subida por trozos en curso (ver almacen.py). Lo recibido se va escribiendo
+# en un archivo parcial y `recibido` dice hasta dónde llegó, así una subida
+# cortada se retoma desde ahí. Al completarse queda apuntando a su Archivo
+# (y se la adjunta al asset, si vino uno); las completadas dan el throughput
+# de estadisticas_archivos y las abandonadas las borra limpiar_archivos.
+class Subida(models.Model):
+    token = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+    nombre_archivo = models.CharField(max_length=255)
+    tipo_mime = models.CharField(max_length=100, blank=True)
+    tamaño = models.BigIntegerField()
+    recibido = models.BigIntegerField(default=0)
+    segundos = models.FloatField(default=0)  # tiempo recibiendo trozos (sin las pausas entre uno y otro)
+    # Sin restricción en la BD: el asset se puede borrar (también por lotes) con la subida en curso
+    asset = models.ForeignKey(
+        Asset, null=True, blank=True, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+',
+    )
+    archivo = models.ForeignKey(Archivo, null=True, blank=True, on_delete=models.SET_NULL, related_name='+')
+    deduplicada = models.BooleanField(default=False)  # el contenido ya estaba guardado
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
+    fecha_completada = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        verbose_name = 'Subida'
+        verbose_name_plural = 'Subidas'
+        # Limpieza de las abandonadas y estadísticas de las completadas
+        indexes = [
+            models.Index(fields=['fecha_actualizacion'], name='subida_actualizacion_idx'),
+            models.Index(fields=['fecha_completada'], name='subida_completada_idx'),
+        ]
+    
+    def __str__(self):
+        return f'{self.nombre_archivo} ({self.recibido}/{self.tamaño})'
+
+
+# ========== LATIDO DE LA PRIMARIA ==========
+# Una sola fila (pk=1) cuya fecha se renueva en la primaria en cada chequeo de
+# replicas.py; lo que tarda en verse en cada réplica es su retraso.
+class Latido(models.Model):
+    fecha = models.DateTimeField()
+    
+    class Meta:
+        verbose_name = 'Latido'
+        verbose_name_plural = 'Latidos'
     
     def __str__(self):
-        return self.titulo
\ No newline at end of file
+        return f'Latido {self.fecha:%Y-%m-%d %H:%M:%S}'
@@ -0,0 +1,167 @@
+import base64
+import json
+from datetime import date, datetime
+
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db import DatabaseError, connections, router
+from django.db.models import Q, QuerySet
+from django.utils.functional import cached_property
+
+
+# Cantidad de cards por página (múltiplo de 3 para que la grilla quede pareja)
+TAMAÑO_PAGINA = 24
+
+
+# Paginación por cursor (keyset) para las listas grandes.
+# En vez de OFFSET guardamos el último valor visto de la columna de orden
+# junto con el id (desempate), así la página N cuesta lo mismo que la página 1:
+# la BD salta directo al punto del índice y lee solo tamaño + 1 filas.
+class PaginaKeyset:
+
+    def __init__(self, items, siguiente=None, anterior=None):
+        self.items = items
+        self.siguiente = siguiente  # cursor de la página siguiente (o None)
+        self.anterior = anterior    # cursor de la página anterior (o None)
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    @property
+    def tiene_otras_paginas(self):
+        return bool(self.siguiente or self.anterior)
+
+
+def codificar_cursor(valor, pk, direccion):
+    # El cursor es opaco para el cliente: JSON en base64 url-safe
+    if isinstance(valor, (date, datetime)):
+        valor = valor.isoformat()
+    crudo = json.dumps([valor, pk, direccion], separators=(',', ':'))
+    return base64.urlsafe_b64encode(crudo.encode()).decode().rstrip('=')
+
+
+def decodificar_cursor(cursor):
+    # Un cursor inválido o manipulado se trata como "sin cursor" (primera página)
+    if not cursor:
+        return None
+    try:
+        relleno = '=' * (-len(cursor) % 4)
+        valor, pk, direccion = json.loads(base64.urlsafe_b64decode(cursor + relleno))
+        pk = int(pk)
+    except (ValueError, TypeError):
+        return None
+    if direccion not in ('sig', 'ant'):
+        return None
+    return valor, pk, direccion
+
+
+def _valor(fila, campo):
+    # Soporta tanto instancias del modelo como filas de .values()
+    if isinstance(fila, dict):
+        return fila[campo]
+    return getattr(fila, campo)
+
+
+def paginar(queryset, campo, cursor=None, tamaño=TAMAÑO_PAGINA, clave=None):
+    # Pagina `queryset` en orden descendente por (campo, id).
+    # `campo` debe ser una columna indexada del modelo (ej: 'fecha_creacion').
+    # `clave(fila)` -> (valor de campo, id) permite paginar filas de
+    # .values_list(); por defecto se leen de instancias o diccionarios.
+    if clave is None:
+        clave = lambda fila: (_valor(fila, campo), _valor(fila, 'id'))
+    datos = decodificar_cursor(cursor)
+    direccion = 'sig'
+
+    if datos:
+        valor, pk, direccion = datos
+        try:
+            valor = queryset.model._meta.get_field(campo).to_python(valor)
+        except Exception:
+            valor = None
+
+        if valor is None:
+            datos, direccion = None, 'sig'
+        elif direccion == 'sig':
+            queryset = queryset.filter(
+                Q(**{f'{campo}__lt': valor}) | Q(**{campo: valor, 'id__lt': pk})
+            )
+        else:
+            queryset = queryset.filter(
+                Q(**{f'{campo}__gt': valor}) | Q(**{campo: valor, 'id__gt': pk})
+            )
+
+    if direccion == 'ant':
+        # Hacia atrás recorremos el índice en orden ascendente y damos vuelta el resultado
+        filas = list(queryset.order_by(campo, 'id')[:tamaño + 1])
+        hay_mas = len(filas) > tamaño
+        filas = filas[:tamaño][::-1]
+        hay_anterior, hay_siguiente = hay_mas, True
+    else:
+        filas = list(queryset.order_by(f'-{campo}', '-id')[:tamaño + 1])
+        hay_mas = len(filas) > tamaño
+        filas = filas[:tamaño]
+        hay_anterior, hay_siguiente = datos is not None, hay_mas
+
+    siguiente = anterior = None
+    if filas:
+        if hay_siguiente:
+            siguiente = codificar_cursor(*clave(filas[-1]), 'sig')
+        if hay_anterior:
+            anterior = codificar_cursor(*clave(filas[0]), 'ant')
+
+    return PaginaKeyset(filas, siguiente=siguiente, anterior=anterior)
+
+
+# ========== CONTEO ESTIMADO (ADMIN) ==========
+# El changelist del admin pagina con OFFSET y para eso necesita el total: un
+# COUNT(*) sobre millones de tareas recorre la tabla entera en cada carga.
+# Sin filtros se usa la estimación que el motor ya guarda en sus estadísticas
+# (gratis), y solo si es grande; con filtros o tablas chicas se cuenta de verdad.
+CONTEO_ESTIMADO_DESDE = 100_000
+
+
+def estimar_filas(modelo):
+    # Filas aproximadas de la tabla según las estadísticas del motor, o None si no hay
+    tabla = modelo._meta.db_table
+    consultas = {
+        'postgresql': ('SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass', [tabla]),
+        'mysql': (
+            'SELECT table_rows FROM information_schema.tables '
+            'WHERE table_schema = DATABASE() AND table_name = %s',
+            [tabla],
+        ),
+        # Solo existe si se corrió ANALYZE; el primer número de `stat` es el total de filas
+        'sqlite': ('SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1', [tabla]),
+    }
+    conexion = connections[router.db_for_read(modelo)]
+    if conexion.vendor not in consultas:
+        return None
+    sql, parametros = consultas[conexion.vendor]
+    try:
+        with conexion.cursor() as cursor:
+            cursor.execute(sql, parametros)
+            fila = cursor.fetchone()
+    except DatabaseError:
+        # Solo pasa en SQLite (sqlite_stat1 no existe hasta el primer ANALYZE),
+        # donde un error no invalida la transacción en curso
+        return None
+    if not fila or fila[0] is None:
+        return None
+    filas = int(str(fila[0]).split()[0])
+    return filas if filas >= 0 else None  # Postgres devuelve -1 si nunca se analizó la tabla
+
+
+class PaginadorEstimado(Paginator):
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if isinstance(queryset, QuerySet) and not queryset.query.where:
+            estimado = estimar_filas(queryset.model)
+            umbral = getattr(settings, 'PRODUCCION_CONTEO_ESTIMADO_DESDE', CONTEO_ESTIMADO_DESDE)
+            if estimado is not None and estimado >= umbral:
+                return estimado
+        return super().count
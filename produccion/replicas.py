@@ -0,0 +1,212 @@
+import logging
+import random
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DatabaseError, connections
+from django.utils import timezone
+
+from .models import Latido
+
+
+# Lecturas de las vistas de produccion en réplicas de la BD y escrituras en
+# la primaria ('default'). Las réplicas se configuran con DATABASE_REPLICA_URLS
+# (ver settings.py) y quedan en PRODUCCION_REPLICAS = {alias: peso}.
+#
+#   - ReplicasMiddleware elige una réplica por petición (GET/HEAD a una vista
+#     de produccion) y la deja en `replica_actual`; RouterReplicas manda ahí
+#     las lecturas de los modelos de produccion. Todo lo demás (admin,
+#     sesiones, usuarios, transacciones abiertas) va a la primaria.
+#   - Después de un POST/PUT/PATCH/DELETE el cliente queda fijado a la primaria
+#     PRODUCCION_REPLICAS_FIJAR_SEGUNDOS con una cookie: nunca ve una réplica
+#     que todavía no tiene lo que acaba de guardar. Si una petición de lectura
+#     escribe algo, lo que resta de ella también lee de la primaria.
+#   - Cada PRODUCCION_REPLICAS_CHEQUEO_CADA segundos (por proceso) se renueva
+#     el Latido de la primaria y se mide cuánto atrasa cada réplica; las que
+#     atrasan más de PRODUCCION_REPLICAS_RETRASO_MAXIMO segundos o no responden
+#     quedan afuera hasta el próximo chequeo en que estén al día.
+#   - PRODUCCION_REPLICAS_SELECCION: 'peso' (al azar según el peso) o
+#     'menos_conexiones' (la que menos peticiones atiende en este proceso,
+#     relativo a su peso).
+#
+# Para probarlo en local con dos SQLite: DATABASE_URL=sqlite:///db.sqlite3
+# DATABASE_REPLICA_URLS=sqlite:///replica.sqlite3 y `python manage.py
+# replicar_sqlite --cada 5`, que copia la primaria a la réplica cada 5 s.
+
+logger = logging.getLogger('produccion.replicas')
+
+PRIMARIA = 'default'
+METODOS_LECTURA = ('GET', 'HEAD', 'OPTIONS')
+COOKIE_PRIMARIA = 'gpm_primaria'
+
+# Réplica elegida para la petición en curso (None: todo a la primaria)
+replica_actual = ContextVar('replica_actual', default=None)
+
+
+def _config(nombre, defecto):
+    return getattr(settings, f'PRODUCCION_REPLICAS_{nombre}', defecto)
+
+
+def configuradas():
+    return getattr(settings, 'PRODUCCION_REPLICAS', {})
+
+
+def medir_retraso(alias, latido_primaria, ahora):
+    # Segundos que atrasa la réplica: 0 si ya tiene el último latido de la
+    # primaria; si no, desde el latido que sí tiene (cota superior)
+    latido = Latido.objects.using(alias).filter(pk=1).values_list('fecha', flat=True).first()
+    if latido_primaria is None or (latido is not None and latido >= latido_primaria):
+        return 0.0
+    if latido is None:
+        return float('inf')
+    return (ahora - latido).total_seconds()
+
+
+# ========== ESTADO DE LAS RÉPLICAS (por proceso) ==========
+class EstadoReplicas:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._chequeando = threading.Lock()
+        self.proximo_chequeo = 0.0
+        self.expulsadas = {}        # alias -> motivo
+        self.retrasos = {}          # alias -> segundos en el último chequeo
+        self.en_uso = Counter()     # alias -> peticiones atendiendo ahora
+
+    def sanas(self):
+        # {alias: peso} de las réplicas utilizables; chequea si toca (un solo hilo a la vez)
+        if time.monotonic() >= self.proximo_chequeo and self._chequeando.acquire(blocking=False):
+            try:
+                self.chequear()
+            finally:
+                self._chequeando.release()
+        return {alias: peso for alias, peso in configuradas().items() if peso > 0 and alias not in self.expulsadas}
+
+    def chequear(self):
+        self.proximo_chequeo = time.monotonic() + _config('CHEQUEO_CADA', 5)
+        maximo = _config('RETRASO_MAXIMO', 5)
+        ahora = timezone.now()
+        try:
+            latido = Latido.objects.using(PRIMARIA).filter(pk=1).values_list('fecha', flat=True).first()
+        except DatabaseError:
+            logger.exception('No se pudo leer el latido de la primaria; se mantiene el estado de las réplicas')
+            return
+
+        expulsadas = {}
+        for alias in configuradas():
+            try:
+                retraso = medir_retraso(alias, latido, ahora)
+            except DatabaseError as error:
+                connections[alias].close()
+                expulsadas[alias] = f'no responde ({error})'
+                continue
+            self.retrasos[alias] = retraso
+            if retraso > maximo:
+                expulsadas[alias] = f'atrasa {retraso:.1f} s'
+
+        for alias in expulsadas.keys() - self.expulsadas.keys():
+            logger.warning('Réplica %s fuera de servicio: %s', alias, expulsadas[alias])
+        for alias in self.expulsadas.keys() - expulsadas.keys():
+            logger.warning('Réplica %s de vuelta en servicio', alias)
+        self.expulsadas = expulsadas
+
+        try:
+            if not Latido.objects.using(PRIMARIA).filter(pk=1).update(fecha=ahora):
+                Latido.objects.using(PRIMARIA).get_or_create(pk=1, defaults={'fecha': ahora})
+        except DatabaseError:
+            logger.exception('No se pudo renovar el latido de la primaria')
+
+    def tomar(self):
+        # Réplica para una petición (None si no hay ninguna sana)
+        sanas = self.sanas()
+        if not sanas:
+            return None
+        with self._lock:
+            if _config('SELECCION', 'peso') == 'menos_conexiones':
+                alias = min(sanas, key=lambda alias: (self.en_uso[alias] / sanas[alias], random.random()))
+            else:
+                alias = random.choices(list(sanas), weights=list(sanas.values()))[0]
+            self.en_uso[alias] += 1
+        return alias
+
+    def soltar(self, alias):
+        with self._lock:
+            self.en_uso[alias] -= 1
+
+
+estado = EstadoReplicas()
+
+
+# ========== ROUTER ==========
+class RouterReplicas:
+
+    def db_for_read(self, model, **hints):
+        alias = replica_actual.get()
+        if alias is None or model._meta.app_label != 'produccion':
+            return None
+        # Dentro de una transacción se lee lo que ella misma escribió
+        if connections[PRIMARIA].in_atomic_block:
+            return None
+        return alias
+
+    def db_for_write(self, model, **hints):
+        # Lo que resta de la petición ya no puede leer de una réplica atrasada
+        if replica_actual.get() is not None:
+            replica_actual.set(None)
+        return PRIMARIA
+
+    def allow_relation(self, obj1, obj2, **hints):
+        bases = {PRIMARIA, *configuradas()}
+        if obj1._state.db in bases and obj2._state.db in bases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Las réplicas reciben el esquema por la replicación
+        if db in configuradas():
+            return False
+        return None
+
+
+# ========== MIDDLEWARE ==========
+class ReplicasMiddleware:
+    # Va después de AuthenticationMiddleware: las sesiones y el usuario se
+    # leen siempre de la primaria.
+
+    def __init__(self, get_response):
+        if not configuradas():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = replica_actual.set(None)
+        try:
+            respuesta = self.get_response(request)
+        finally:
+            alias = getattr(request, '_replica', None)
+            if alias is not None:
+                estado.soltar(alias)
+            replica_actual.reset(token)
+        if request.method not in METODOS_LECTURA:
+            respuesta.set_cookie(
+                COOKIE_PRIMARIA, '1', max_age=_config('FIJAR_SEGUNDOS', 10), httponly=True, samesite='Lax',
+            )
+        return respuesta
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if request.method not in METODOS_LECTURA or COOKIE_PRIMARIA in request.COOKIES:
+            return None
+        if not view_func.__module__.startswith('produccion.'):
+            return None
+        # En una transacción (ATOMIC_REQUESTS, tests) el router lee de la primaria igual
+        if connections[PRIMARIA].in_atomic_block:
+            return None
+        alias = estado.tomar()
+        if alias is not None:
+            request._replica = alias
+            replica_actual.set(alias)
+        return None
@@ -0,0 +1,362 @@
+from collections import Counter
+
+from django.db import connections, transaction
+from django.db.models.signals import post_init, post_migrate, post_save, post_delete, pre_delete, m2m_changed
+from django.dispatch import Signal, receiver
+from django.utils import timezone
+
+from . import actividad, autocompletar, busqueda, derivados
+from .models import (
+    Proyecto, DetalleProyecto, Asset, Tarea, Etiqueta, ContadorGlobal, ResumenTareas, ResumenAssets,
+)
+
+
+# Señales propias para las operaciones masivas. bulk_create() y los borrados
+# por lotes no disparan post_save/post_delete, así que quien los use debe
+# enviar estas señales para que contadores y demás datos derivados se enteren.
+#   creacion_masiva.send(sender=Tarea, objetos=lista_de_tareas)
+#   eliminacion_masiva.send(sender=Tarea, ids=lista_de_ids)
+#   actualizacion_masiva.send(sender=Tarea, ids=lista_de_ids, proyecto_ids=ids_de_sus_proyectos)
+# actualizacion_masiva es para update() y cambios directos en la tabla
+# intermedia de etiquetas (ver acciones_masivas.py); el texto no cambia.
+creacion_masiva = Signal()
+eliminacion_masiva = Signal()
+actualizacion_masiva = Signal()
+
+
+# ========== CONTADORES DEL DASHBOARD ==========
+CAMPO_CONTADOR = {
+    Proyecto: 'proyectos',
+    Asset: 'assets',
+    Tarea: 'tareas',
+    Etiqueta: 'etiquetas',
+}
+
+
+@receiver(post_save)
+def contar_creacion(sender, created, raw=False, **kwargs):
+    campo = CAMPO_CONTADOR.get(sender)
+    if campo and created and not raw:
+        ContadorGlobal.incrementar(**{campo: 1})
+
+
+# Con sender explícito: un receiver de post_delete sin sender obliga a Django
+# a cargar y borrar una por una las filas de cualquier modelo (incluida la
+# tabla intermedia de etiquetas) en vez de hacer un solo DELETE
+@receiver(post_delete, sender=Proyecto)
+@receiver(post_delete, sender=Asset)
+@receiver(post_delete, sender=Tarea)
+@receiver(post_delete, sender=Etiqueta)
+def contar_eliminacion(sender, **kwargs):
+    ContadorGlobal.incrementar(**{CAMPO_CONTADOR[sender]: -1})
+
+
+@receiver(creacion_masiva)
+def contar_creacion_masiva(sender, objetos, **kwargs):
+    campo = CAMPO_CONTADOR.get(sender)
+    if campo:
+        ContadorGlobal.incrementar(**{campo: len(objetos)})
+
+
+@receiver(eliminacion_masiva)
+def contar_eliminacion_masiva(sender, ids, **kwargs):
+    campo = CAMPO_CONTADOR.get(sender)
+    if campo:
+        ContadorGlobal.incrementar(**{campo: -len(ids)})
+
+
+# ========== RESÚMENES POR PROYECTO ==========
+# ResumenTareas/ResumenAssets se ajustan con +1/-1 en la misma transacción
+# que el cambio (Tarea.save() y Asset.save() son atómicos, y los borrados ya
+# corren dentro de la transacción del Collector). Los cambios por update()
+# los ajusta quien los hace (ver acciones_masivas.py).
+RESUMEN_DE = {
+    Tarea: ResumenTareas,
+    Asset: ResumenAssets,
+}
+
+
+@receiver(post_init, sender=Asset)
+@receiver(post_init, sender=Tarea)
+def recordar_clave_resumen(sender, instance, **kwargs):
+    instance._clave_resumen = RESUMEN_DE[sender].clave(instance)
+
+
+@receiver(post_save, sender=Asset)
+@receiver(post_save, sender=Tarea)
+def actualizar_resumen(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    resumen = RESUMEN_DE[sender]
+    if raw:
+        return
+    if update_fields is not None and not set(update_fields) & {'proyecto', 'proyecto_id', *resumen.CLAVE}:
+        return
+    
+    anterior, nueva = instance._clave_resumen, resumen.clave(instance)
+    if created:
+        resumen.sumar({nueva: 1})
+    elif anterior is None or nueva is None:
+        # Cargado con only()/defer(): no se sabe qué había, se recuentan sus proyectos
+        resumen.recalcular({instance._proyecto_id_original, instance.proyecto_id})
+    elif anterior != nueva:
+        resumen.sumar({anterior: -1, nueva: 1})
+    instance._clave_resumen = nueva
+
+
+@receiver(post_delete, sender=Asset)
+@receiver(post_delete, sender=Tarea)
+def descontar_resumen(sender, instance, origin=None, **kwargs):
+    # Si se está borrando el proyecto completo, sus resúmenes caen en el mismo CASCADE
+    if isinstance(origin, Proyecto):
+        return
+    resumen = RESUMEN_DE[sender]
+    clave = resumen.clave(instance)
+    if clave is None:
+        resumen.recalcular({instance.proyecto_id})
+    else:
+        resumen.sumar({clave: -1})
+
+
+@receiver(creacion_masiva)
+def sumar_resumen_masivo(sender, objetos, **kwargs):
+    resumen = RESUMEN_DE.get(sender)
+    if resumen:
+        resumen.sumar(Counter(resumen.clave(objeto) for objeto in objetos))
+
+
+# ========== REGISTRO DE ACTIVIDAD ==========
+# Arman los eventos de Actividad y los dejan en el buffer de actividad.py al
+# confirmarse la transacción. Los cambios por update() los registra quien los
+# hace (acciones_masivas.py); las altas masivas (importación, seed) no dejan
+# una fila por objeto.
+@receiver(post_init, sender=Proyecto)
+@receiver(post_init, sender=Asset)
+@receiver(post_init, sender=Tarea)
+def recordar_valores_actividad(sender, instance, **kwargs):
+    instance._valores_actividad = actividad.valores(instance)
+
+
+@receiver(post_save, sender=Proyecto)
+@receiver(post_save, sender=Asset)
+@receiver(post_save, sender=Tarea)
+def registrar_guardado(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    ahora = actividad.valores(instance)
+    if created:
+        cambios = {campo: [None, valor] for campo, valor in ahora.items()}
+    else:
+        antes = getattr(instance, '_valores_actividad', {})
+        cambios = {
+            campo: [antes[campo], valor]
+            for campo, valor in ahora.items()
+            if campo in antes and antes[campo] != valor
+        }
+    instance._valores_actividad = ahora
+    if cambios:
+        actividad.registrar(actividad.evento(instance, 'crear' if created else 'editar', cambios))
+
+
+@receiver(post_delete, sender=Proyecto)
+@receiver(post_delete, sender=Asset)
+@receiver(post_delete, sender=Tarea)
+def registrar_eliminacion(sender, instance, origin=None, **kwargs):
+    # Al borrar un proyecto se registra solo el proyecto, no cada hijo del CASCADE.
+    # Los marcados para borrar ya se registraron al marcarlos (ver eliminacion.py).
+    if sender is not Proyecto and isinstance(origin, Proyecto):
+        return
+    if getattr(instance, 'pendiente_eliminacion', False):
+        return
+    cambios = {campo: [valor, None] for campo, valor in actividad.valores(instance).items()}
+    actividad.registrar(actividad.evento(instance, 'eliminar', cambios))
+
+
+@receiver(m2m_changed, sender=Tarea.etiquetas.through)
+def registrar_etiquetas(sender, instance, action, reverse, pk_set, **kwargs):
+    if reverse:
+        # Desde la etiqueta (etiqueta.tareas.add(...)): no se registra por tarea
+        return
+    if action == 'pre_clear':
+        instance._etiquetas_quitadas = sorted(instance.etiquetas.values_list('id', flat=True))
+        return
+    if action == 'post_clear':
+        cambio = {'agregadas': [], 'quitadas': getattr(instance, '_etiquetas_quitadas', [])}
+    elif action in ('post_add', 'post_remove') and pk_set:
+        cambio = {'agregadas': [], 'quitadas': []}
+        cambio['agregadas' if action == 'post_add' else 'quitadas'] = sorted(pk_set)
+    else:
+        return
+    if cambio['agregadas'] or cambio['quitadas']:
+        actividad.registrar(actividad.evento(instance, 'editar', {'etiquetas': cambio}))
+
+
+# ========== ÍNDICE DE BÚSQUEDA EN MEMORIA ==========
+# Solo aplica cuando el motor no tiene índice de texto nativo (ver busqueda.py);
+# si el índice en memoria no está construido estas llamadas no hacen nada.
+TIPO_BUSQUEDA = {
+    Tarea: 'tarea',
+    Asset: 'asset',
+    Proyecto: 'proyecto',
+}
+
+
+def _indexar(tipo, objeto):
+    _, campo_titulo, campo_cuerpo, _ = busqueda.FUENTES[tipo]
+    busqueda.indice_memoria.actualizar(
+        tipo, objeto.pk, getattr(objeto, campo_titulo), getattr(objeto, campo_cuerpo)
+    )
+
+
+@receiver(post_save)
+def indexar_busqueda(sender, instance, raw=False, **kwargs):
+    tipo = TIPO_BUSQUEDA.get(sender)
+    if tipo and not raw:
+        _indexar(tipo, instance)
+
+
+@receiver(post_delete, sender=Tarea)
+@receiver(post_delete, sender=Asset)
+@receiver(post_delete, sender=Proyecto)
+def desindexar_busqueda(sender, instance, **kwargs):
+    busqueda.indice_memoria.eliminar(TIPO_BUSQUEDA[sender], instance.pk)
+
+
+@receiver(creacion_masiva)
+def indexar_busqueda_masiva(sender, objetos, **kwargs):
+    tipo = TIPO_BUSQUEDA.get(sender)
+    if tipo:
+        for objeto in objetos:
+            _indexar(tipo, objeto)
+
+
+@receiver(eliminacion_masiva)
+def desindexar_busqueda_masiva(sender, ids, **kwargs):
+    tipo = TIPO_BUSQUEDA.get(sender)
+    if tipo:
+        for pk in ids:
+            busqueda.indice_memoria.eliminar(tipo, pk)
+
+
+# ========== TRIGGERS DE BÚSQUEDA (SQLite) ==========
+# Los triggers FTS5 (busqueda.py) se recrean después de cada migrate: las
+# migraciones que recrean una tabla los borran.
+@receiver(post_migrate)
+def restaurar_triggers_busqueda(sender, using, **kwargs):
+    if sender.name == 'produccion':
+        busqueda.asegurar_triggers_sqlite(connections[using])
+
+
+# ========== ÍNDICE DE AUTOCOMPLETADO ==========
+# Parches del índice de prefijos de este proceso (ver autocompletar.py)
+@receiver(post_save, sender=Proyecto)
+@receiver(post_save, sender=Etiqueta)
+def indexar_autocompletar(sender, instance, raw=False, **kwargs):
+    if not raw:
+        indice = autocompletar.indice_por_modelo[sender]
+        indice.actualizar(instance.pk, getattr(instance, indice.campo))
+
+
+@receiver(post_delete, sender=Proyecto)
+@receiver(post_delete, sender=Etiqueta)
+def desindexar_autocompletar(sender, instance, **kwargs):
+    autocompletar.indice_por_modelo[sender].eliminar(instance.pk)
+
+
+@receiver(creacion_masiva)
+@receiver(eliminacion_masiva)
+def invalidar_autocompletar(sender, **kwargs):
+    indice = autocompletar.indice_por_modelo.get(sender)
+    if indice:
+        indice.invalidar()
+
+
+# ========== FECHAS DE ACTUALIZACIÓN (ETag / Last-Modified) ==========
+# auto_now solo cubre los save() del propio objeto. Lo que cambia lo que se ve
+# de otro objeto lo "toca" con un update() (que no dispara señales):
+#   asset/tarea/detalle -> su proyecto (conteos de la card, página de detalle)
+#   etiquetas de una tarea, renombrar una etiqueta -> esas tareas y sus proyectos
+# Renombrar un proyecto no toca sus tareas y assets: las listas incluyen la
+# fecha de sus proyectos en el ETag (condicional.resumen_lista(..., con_proyecto=True)).
+@receiver(post_init, sender=Asset)
+@receiver(post_init, sender=Tarea)
+def recordar_proyecto_original(sender, instance, **kwargs):
+    # Al mover un asset o tarea de proyecto hay que tocar los dos
+    instance._proyecto_id_original = instance.__dict__.get('proyecto_id')
+
+
+def _tocar(modelo, ids):
+    ids = {pk for pk in ids if pk is not None}
+    if ids:
+        modelo.objects.filter(pk__in=ids).update(fecha_actualizacion=timezone.now())
+
+
+def _tocar_tareas(tarea_ids):
+    tarea_ids = list(tarea_ids)
+    if not tarea_ids:
+        return
+    _tocar(Tarea, tarea_ids)
+    _tocar(Proyecto, Tarea.objects.filter(id__in=tarea_ids).values_list('proyecto_id', flat=True).distinct())
+
+
+@receiver(post_save, sender=DetalleProyecto)
+@receiver(post_save, sender=Asset)
+@receiver(post_save, sender=Tarea)
+def tocar_proyecto(sender, instance, raw=False, **kwargs):
+    if not raw:
+        _tocar(Proyecto, [instance.proyecto_id, getattr(instance, '_proyecto_id_original', None)])
+
+
+@receiver(post_delete, sender=DetalleProyecto)
+@receiver(post_delete, sender=Asset)
+@receiver(post_delete, sender=Tarea)
+def tocar_proyecto_al_eliminar(sender, instance, origin=None, **kwargs):
+    # Si se está borrando el proyecto completo (CASCADE) no hay nada que tocar
+    if not isinstance(origin, Proyecto):
+        _tocar(Proyecto, [instance.proyecto_id])
+
+
+@receiver(m2m_changed, sender=Tarea.etiquetas.through)
+def tocar_tareas_por_etiquetas(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action.startswith('post_'):
+            _tocar_tareas([instance.pk])
+    elif action == 'pre_clear':
+        # Después del clear ya no se sabe qué tareas tenían la etiqueta
+        _tocar_tareas(instance.tareas.values_list('id', flat=True))
+    elif action in ('post_add', 'post_remove'):
+        _tocar_tareas(pk_set)
+
+
+@receiver(post_save, sender=Etiqueta)
+def tocar_tareas_por_etiqueta(sender, instance, created, raw=False, **kwargs):
+    if not created and not raw:
+        _tocar_tareas(instance.tareas.values_list('id', flat=True))
+
+
+@receiver(pre_delete, sender=Etiqueta)
+def tocar_tareas_por_etiqueta_eliminada(sender, instance, **kwargs):
+    _tocar_tareas(instance.tareas.values_list('id', flat=True))
+
+
+@receiver(creacion_masiva)
+def tocar_proyectos_por_creacion_masiva(sender, objetos, **kwargs):
+    if sender in (Asset, Tarea):
+        _tocar(Proyecto, {objeto.proyecto_id for objeto in objetos})
+
+
+@receiver(actualizacion_masiva)
+def tocar_proyectos_por_actualizacion_masiva(sender, proyecto_ids, **kwargs):
+    # Las filas actualizadas ya traen su fecha_actualizacion desde el update()
+    _tocar(Proyecto, proyecto_ids)
+
+
+# ========== VISTAS PREVIAS ==========
+# Al adjuntar un archivo a un asset se encargan sus derivados al pool (ver
+# derivados.py), después del commit: si la transacción se deshace no hay nada
+# que generar, y el pool no debe esperar a que se libere la fila.
+@receiver(post_save, sender=Asset)
+def encargar_vista_previa(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or instance.archivo_id is None:
+        return
+    if update_fields is not None and not {'archivo', 'tipo'} & set(update_fields):
+        return
+    transaction.on_commit(lambda: derivados.encargar_para(instance))
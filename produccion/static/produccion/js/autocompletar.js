@@ -0,0 +1,138 @@
+// Selectores con autocompletado (widgets de produccion/autocompletar.py).
+// El <select> original queda oculto y sigue siendo lo que se envía: acá solo
+// se le agregan o quitan <option> elegidas. Las opciones salen del endpoint
+// de data-autocompletar, con la misma espera de 150 ms que el buscador.
+// Cada cambio dispara "change" en el <select> (lo usan los filtros del admin).
+(function () {
+    function iniciar(select) {
+        const multiple = select.multiple;
+        const contenedor = document.createElement('div');
+        contenedor.className = 'position-relative ' + (multiple ? '' : 'flex-grow-1');
+
+        const elegidas = document.createElement('div');
+        elegidas.className = 'd-flex flex-wrap gap-1 mb-1';
+
+        const input = document.createElement('input');
+        input.type = 'text';
+        input.className = 'form-control';
+        input.autocomplete = 'off';
+        input.placeholder = select.getAttribute('placeholder') || 'Buscar...';
+
+        const lista = document.createElement('div');
+        lista.className = 'list-group position-absolute w-100 shadow';
+        lista.style.zIndex = 1000;
+
+        select.hidden = true;
+        select.parentNode.insertBefore(contenedor, select);
+        if (multiple) contenedor.appendChild(elegidas);
+        contenedor.appendChild(input);
+        contenedor.appendChild(lista);
+        contenedor.appendChild(select);
+
+        let temporizador = null;
+        let ultimaConsulta = null;
+
+        function limpiar() {
+            lista.innerHTML = '';
+        }
+
+        function dibujarElegidas() {
+            if (!multiple) {
+                const opcion = select.selectedOptions[0];
+                input.value = opcion && opcion.value ? opcion.textContent : '';
+                return;
+            }
+            elegidas.innerHTML = '';
+            Array.from(select.selectedOptions).forEach(function (opcion) {
+                const badge = document.createElement('span');
+                badge.className = 'badge bg-secondary d-inline-flex align-items-center';
+                badge.textContent = opcion.textContent;
+                const quitar = document.createElement('button');
+                quitar.type = 'button';
+                quitar.className = 'btn-close btn-close-white ms-1';
+                quitar.style.fontSize = '0.6em';
+                quitar.addEventListener('click', function () {
+                    opcion.remove();
+                    dibujarElegidas();
+                    select.dispatchEvent(new Event('change'));
+                });
+                badge.appendChild(quitar);
+                elegidas.appendChild(badge);
+            });
+        }
+
+        function elegir(r) {
+            if (!multiple) {
+                Array.from(select.options).forEach(function (o) { if (o.value) o.remove(); });
+            }
+            let opcion = Array.from(select.options).find(function (o) { return o.value === String(r.id); });
+            if (!opcion) {
+                opcion = new Option(r.nombre, r.id);
+                select.appendChild(opcion);
+            }
+            opcion.selected = true;
+            if (multiple) input.value = '';
+            limpiar();
+            dibujarElegidas();
+            select.dispatchEvent(new Event('change'));
+        }
+
+        function mostrar(resultados) {
+            limpiar();
+            resultados.forEach(function (r) {
+                const item = document.createElement('button');
+                item.type = 'button';
+                item.className = 'list-group-item list-group-item-action';
+                item.textContent = r.nombre;
+                // mousedown en vez de click: se dispara antes del blur del input
+                item.addEventListener('mousedown', function (evento) {
+                    evento.preventDefault();
+                    elegir(r);
+                });
+                lista.appendChild(item);
+            });
+        }
+
+        function pedir() {
+            const consulta = input.value.trim();
+            clearTimeout(temporizador);
+            temporizador = setTimeout(function () {
+                ultimaConsulta = consulta;
+                fetch(select.dataset.autocompletar + '?q=' + encodeURIComponent(consulta))
+                    .then(function (r) { return r.json(); })
+                    .then(function (datos) {
+                        if (datos.consulta === ultimaConsulta) mostrar(datos.resultados);
+                    });
+            }, 150);
+        }
+
+        input.addEventListener('input', pedir);
+        input.addEventListener('focus', pedir);
+        input.addEventListener('keydown', function (evento) {
+            // Enter elige la primera opción en vez de enviar el formulario
+            if (evento.key === 'Enter' && lista.firstChild) {
+                evento.preventDefault();
+                lista.firstChild.dispatchEvent(new MouseEvent('mousedown'));
+            }
+        });
+        input.addEventListener('blur', function () {
+            clearTimeout(temporizador);
+            ultimaConsulta = null;
+            limpiar();
+            dibujarElegidas();
+        });
+
+        dibujarElegidas();
+    }
+
+    function iniciarTodos() {
+        document.querySelectorAll('select[data-autocompletar]').forEach(iniciar);
+    }
+
+    // En el admin el script se carga en el <head> (Media), antes que el formulario
+    if (document.readyState === 'loading') {
+        document.addEventListener('DOMContentLoaded', iniciarTodos);
+    } else {
+        iniciarTodos();
+    }
+})();
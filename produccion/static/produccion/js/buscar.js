@@ -0,0 +1,51 @@
+// Typeahead del buscador de la navbar.
+// Espera 150 ms después de la última tecla y descarta respuestas viejas,
+// así no se dispara una consulta por cada pulsación.
+(function () {
+    const input = document.getElementById('buscador');
+    const lista = document.getElementById('buscador-sugerencias');
+    if (!input || !lista) return;
+
+    const ICONOS = { tarea: 'bi-check2-square', asset: 'bi-file-earmark-image', proyecto: 'bi-folder-fill' };
+    let temporizador = null;
+    let ultimaConsulta = '';
+
+    function limpiar() {
+        lista.innerHTML = '';
+    }
+
+    function mostrar(resultados) {
+        limpiar();
+        resultados.forEach(function (r) {
+            const item = document.createElement('a');
+            item.className = 'list-group-item list-group-item-action';
+            item.href = r.url;
+            const icono = document.createElement('i');
+            icono.className = 'bi ' + (ICONOS[r.tipo] || 'bi-search') + ' me-2';
+            item.appendChild(icono);
+            item.appendChild(document.createTextNode(r.titulo));
+            lista.appendChild(item);
+        });
+    }
+
+    input.addEventListener('input', function () {
+        clearTimeout(temporizador);
+        const consulta = input.value.trim();
+        if (consulta.length < 2) {
+            limpiar();
+            return;
+        }
+        temporizador = setTimeout(function () {
+            ultimaConsulta = consulta;
+            fetch(input.dataset.sugerencias + '?q=' + encodeURIComponent(consulta))
+                .then(function (r) { return r.json(); })
+                .then(function (datos) {
+                    if (datos.consulta === ultimaConsulta) mostrar(datos.resultados);
+                });
+        }, 150);
+    });
+
+    input.addEventListener('blur', function () {
+        setTimeout(limpiar, 200);
+    });
+})();
@@ -0,0 +1,17 @@
+// Filtros del admin con autocompletado (FiltroAutocompletar en admin.py):
+// al elegir una opción se recarga el changelist con ese parámetro, como
+// haría un click en los filtros normales. Se vuelve a la primera página.
+document.addEventListener('DOMContentLoaded', function () {
+    document.querySelectorAll('.filtro-autocompletar select').forEach(function (select) {
+        select.addEventListener('change', function () {
+            const url = new URL(window.location.href);
+            if (select.value) {
+                url.searchParams.set(select.dataset.parametro, select.value);
+            } else {
+                url.searchParams.delete(select.dataset.parametro);
+            }
+            url.searchParams.delete('p');
+            window.location.href = url.toString();
+        });
+    });
+});
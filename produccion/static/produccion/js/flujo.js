@@ -0,0 +1,51 @@
+// Gráfico de flujo acumulado del detalle de proyecto.
+// Pide la serie diaria por estado a la API (/api/v1/proyectos/<id>/serie/)
+// y dibuja en el <canvas> las áreas apiladas (completadas abajo) más una
+// línea con lo que falta (pendientes + en proceso), que es el burndown.
+(function () {
+    const canvas = document.getElementById('grafico-flujo');
+    if (!canvas) return;
+
+    // Mismos tonos que los badges de estado (styles.css)
+    const COLORES = { completada: '#9AE6B4', en_proceso: '#FBD38D', pendiente: '#FBB6CE' };
+    const ORDEN = ['completada', 'en_proceso', 'pendiente'];
+
+    function dibujar(datos) {
+        const ctx = canvas.getContext('2d');
+        const ancho = canvas.width = canvas.clientWidth;
+        const alto = canvas.height;
+        const dias = datos.valores.length;
+        const indices = ORDEN.map(function (estado) { return datos.columnas.indexOf(estado); });
+        const maximo = Math.max(1, ...datos.valores.map(function (fila) {
+            return fila.reduce(function (a, b) { return a + b; }, 0);
+        }));
+        const x = function (dia) { return dias > 1 ? dia * ancho / (dias - 1) : ancho / 2; };
+        const y = function (valor) { return alto - valor * (alto - 4) / maximo; };
+
+        ctx.clearRect(0, 0, ancho, alto);
+        const base = new Array(dias).fill(0);
+        indices.forEach(function (columna, i) {
+            const techo = datos.valores.map(function (fila, dia) { return base[dia] + fila[columna]; });
+            ctx.beginPath();
+            techo.forEach(function (valor, dia) { ctx.lineTo(x(dia), y(valor)); });
+            for (let dia = dias - 1; dia >= 0; dia--) ctx.lineTo(x(dia), y(base[dia]));
+            ctx.closePath();
+            ctx.fillStyle = COLORES[ORDEN[i]];
+            ctx.fill();
+            techo.forEach(function (valor, dia) { base[dia] = valor; });
+        });
+
+        // Burndown: lo que falta terminar
+        ctx.beginPath();
+        datos.valores.forEach(function (fila, dia) {
+            ctx.lineTo(x(dia), y(fila[indices[1]] + fila[indices[2]]));
+        });
+        ctx.strokeStyle = '#1A202C';
+        ctx.lineWidth = 2;
+        ctx.stroke();
+    }
+
+    fetch(canvas.dataset.serie + '?por=estado')
+        .then(function (r) { return r.json(); })
+        .then(dibujar);
+})();
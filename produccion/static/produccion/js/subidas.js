@@ -0,0 +1,112 @@
+// Subida por trozos de los archivos de assets (API /api/v1/subidas/, ver almacen.py).
+// Al enviar el formulario, el archivo del <input type="file" data-subida> se
+// sube en trozos de tamaño_trozo bytes con PUT + Content-Range; después se
+// envía el formulario con el token de la subida en el campo oculto "subida"
+// y el <input> vacío. Si se corta (red, pestaña cerrada), al volver a elegir
+// el mismo archivo se retoma desde lo que el servidor ya recibió: el token
+// queda en localStorage por nombre + tamaño + fecha de modificación.
+(function () {
+    const REINTENTOS = 5;
+
+    function esperar(ms) {
+        return new Promise(function (resolver) { setTimeout(resolver, ms); });
+    }
+
+    function clave(archivo) {
+        return 'subida:' + archivo.name + ':' + archivo.size + ':' + archivo.lastModified;
+    }
+
+    function iniciar(input) {
+        const form = input.form;
+        const oculto = form.querySelector('input[name="subida"]');
+        const csrf = form.querySelector('input[name="csrfmiddlewaretoken"]');
+        if (!oculto || !csrf) return;
+
+        const estado = document.createElement('div');
+        estado.className = 'form-text';
+        input.parentNode.insertBefore(estado, input.nextSibling);
+        let enviando = false;
+
+        function pedir(url, opciones) {
+            opciones.headers = Object.assign({ 'X-CSRFToken': csrf.value }, opciones.headers || {});
+            opciones.credentials = 'same-origin';
+            return fetch(url, opciones);
+        }
+
+        async function retomar(archivo) {
+            // Subida guardada para este archivo, si el servidor todavía la tiene
+            const guardada = localStorage.getItem(clave(archivo));
+            if (guardada) {
+                const respuesta = await pedir(guardada, { method: 'GET' });
+                if (respuesta.ok) return respuesta.json();
+                localStorage.removeItem(clave(archivo));
+            }
+            const respuesta = await pedir(input.dataset.subida, {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify({ nombre: archivo.name, 'tamaño': archivo.size, tipo_mime: archivo.type }),
+            });
+            const datos = await respuesta.json();
+            if (!respuesta.ok) throw new Error(datos.error || 'No se pudo iniciar la subida');
+            localStorage.setItem(clave(archivo), datos.url);
+            return datos;
+        }
+
+        async function subir(archivo) {
+            let subida = await retomar(archivo);
+            let fallos = 0;
+            while (!subida.completa) {
+                const inicio = subida.recibido;
+                const fin = Math.min(inicio + subida['tamaño_trozo'], archivo.size);
+                estado.textContent = 'Subiendo ' + archivo.name + ': ' + Math.floor(100 * inicio / archivo.size) + '%';
+                let respuesta;
+                try {
+                    respuesta = await pedir(subida.url, {
+                        method: 'PUT',
+                        headers: {
+                            'Content-Type': 'application/octet-stream',
+                            'Content-Range': 'bytes ' + inicio + '-' + (fin - 1) + '/' + archivo.size,
+                        },
+                        body: archivo.slice(inicio, fin),
+                    });
+                } catch (error) {
+                    respuesta = null;  // sin red: se reintenta
+                }
+                if (respuesta && respuesta.ok) {
+                    subida = await respuesta.json();
+                    fallos = 0;
+                } else if (respuesta && respuesta.status === 409) {
+                    subida.recibido = (await respuesta.json()).recibido;  // seguir desde donde dice el servidor
+                } else if (respuesta && respuesta.status < 500) {
+                    localStorage.removeItem(clave(archivo));
+                    throw new Error((await respuesta.json()).error || 'La subida fue rechazada');
+                } else if (++fallos > REINTENTOS) {
+                    throw new Error('Se cortó la subida; vuelve a guardar para retomarla');
+                } else {
+                    await esperar(1000 * fallos);
+                }
+            }
+            localStorage.removeItem(clave(archivo));
+            return subida;
+        }
+
+        form.addEventListener('submit', async function (evento) {
+            if (enviando || !input.files.length) return;
+            evento.preventDefault();
+            enviando = true;
+            const archivo = input.files[0];
+            try {
+                const subida = await subir(archivo);
+                oculto.value = subida.token;
+                input.value = '';
+                estado.textContent = archivo.name + (subida.deduplicada ? ' (ya estaba guardado)' : ' subido');
+                form.submit();
+            } catch (error) {
+                estado.textContent = error.message;
+                enviando = false;
+            }
+        });
+    }
+
+    document.querySelectorAll('input[type="file"][data-subida]').forEach(iniciar);
+})();
@@ -1,3 +1,2033 @@
-from django.test import TestCase
+import hashlib
+import importlib
+import json
+import os
+import re
+import shutil
+import struct
+import tempfile
+import wave
+from collections import Counter
+from datetime import date, timedelta
+from io import BytesIO, StringIO
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import DatabaseError, IntegrityError, connection, connections, transaction
+from django.utils import timezone
+from django.core.management import CommandError, call_command
+from django.templatetags.static import static
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from PIL import Image
+
+from . import (
+    acciones_masivas, actividad, almacen, api, autocompletar, busqueda, cache_fragmentos, derivados, eliminacion, exportacion,
+    importacion, instantaneas, replicas, views,
+)
+from .signals import creacion_masiva
+from .acciones_masivas import seleccionar_tareas, aplicar, SeleccionInvalida
+from .instrumentacion import MedicionPeticion, normalizar_sql
+from .forms import EtiquetaForm
+from .models import (
+    Proyecto, DetalleProyecto, Asset, Tarea, Etiqueta, ResumenTareas, ResumenAssets, InstantaneaDiaria,
+    Actividad, ContadorGlobal, Archivo, Subida, Latido, progreso_de_proyectos,
+)
+from .filtros import filtrar_tareas
+from .management.commands import explain_hotpaths
+from .paginacion import PaginadorEstimado, codificar_cursor, estimar_filas, paginar
+from .vistas_previas import generar
+
+
+def sembrar(n, desde=0):
+    # n proyectos con detalle, 2n assets, 3n tareas (con etiquetas) y n etiquetas.
+    etiquetas = [Etiqueta.objects.create(nombre=f'Etiqueta {desde + i}') for i in range(n)]
+    for i in range(desde, desde + n):
+        proyecto = Proyecto.objects.create(
+            nombre=f'Proyecto nivel {i}', descripcion='Juego de prueba',
+            fecha_inicio=date(2025, 1, 1), estado='desarrollo',
+        )
+        DetalleProyecto.objects.create(proyecto=proyecto, plataforma='PC', engine='Godot')
+        for j in range(2):
+            Asset.objects.create(
+                nombre=f'Asset nivel {i}-{j}', tipo='sprite', descripcion='', proyecto=proyecto,
+            )
+        for j in range(3):
+            tarea = Tarea.objects.create(
+                titulo=f'Tarea nivel {i}-{j}', descripcion='Descripción de prueba',
+                estado='pendiente', prioridad='alta', proyecto=proyecto,
+            )
+            tarea.etiquetas.add(*etiquetas[:j + 1])
+
+
+# ========== PAGINACIÓN Y FILTROS ==========
+class PaginacionKeysetTests(TestCase):
+
+    def setUp(self):
+        sembrar(3)  # 9 tareas
+
+    def recorrer(self, queryset, tamaño):
+        # Todas las páginas hacia adelante; devuelve los ids y la última página
+        ids, cursor = [], None
+        while True:
+            pagina = paginar(queryset, 'fecha_creacion', cursor, tamaño=tamaño)
+            ids += [tarea.pk for tarea in pagina]
+            if not pagina.siguiente:
+                return ids, pagina
+            cursor = pagina.siguiente
+
+    def test_empates_en_la_columna_de_orden(self):
+        # Con la misma fecha_creacion el id desempata: ninguna fila se repite ni se pierde
+        Tarea.objects.update(fecha_creacion=timezone.now())
+        ids, ultima = self.recorrer(Tarea.objects.all(), 4)
+        self.assertEqual(ids, list(Tarea.objects.order_by('-id').values_list('id', flat=True)))
+
+        # Y hacia atrás desde la última página se vuelve a la anterior tal cual
+        anterior = paginar(Tarea.objects.all(), 'fecha_creacion', ultima.anterior, tamaño=4)
+        self.assertEqual([tarea.pk for tarea in anterior], ids[4:8])
+        self.assertTrue(anterior.siguiente and anterior.anterior)
+
+    def test_cursor_manipulado_vuelve_a_la_primera_pagina(self):
+        primera = paginar(Tarea.objects.all(), 'fecha_creacion', tamaño=4)
+        invalidos = [
+            'no-es-base64!', codificar_cursor('ayer', 1, 'sig'), codificar_cursor(None, 1, 'sig'),
+            codificar_cursor('2025-01-01T00:00:00', 1, 'arriba'), primera.siguiente[:-3],
+        ]
+        for cursor in invalidos:
+            with self.subTest(cursor=cursor):
+                pagina = paginar(Tarea.objects.all(), 'fecha_creacion', cursor, tamaño=4)
+                self.assertEqual([t.pk for t in pagina], [t.pk for t in primera])
+                self.assertIsNone(pagina.anterior)
+        self.assertEqual(self.client.get(reverse('lista_tareas'), {'cursor': 'x' * 40}).status_code, 200)
+
+    def test_cursor_de_una_fila_borrada_sigue_sirviendo(self):
+        primera = paginar(Tarea.objects.all(), 'fecha_creacion', tamaño=4)
+        esperado = [t.pk for t in paginar(Tarea.objects.all(), 'fecha_creacion', primera.siguiente, tamaño=4)]
+        primera.items[-1].delete()
+        pagina = paginar(Tarea.objects.all(), 'fecha_creacion', primera.siguiente, tamaño=4)
+        self.assertEqual([t.pk for t in pagina], esperado)
+
+    def test_filtros_invalidos_se_ignoran(self):
+        proyecto = Proyecto.objects.order_by('id').first()
+        _, activos = filtrar_tareas(Tarea.objects.all(), {'estado': 'inventado', 'proyecto': '-3', 'prioridad': 'alta'})
+        self.assertEqual(activos, {'prioridad': 'alta'})
+        tareas, activos = filtrar_tareas(Tarea.objects.all(), {'proyecto': str(proyecto.pk)})
+        self.assertEqual(activos, {'proyecto': proyecto.pk})
+        self.assertEqual(set(tareas), set(proyecto.tareas.all()))
+
+        # La vista pasa los filtros activos al template, que los mantiene al paginar
+        respuesta = self.client.get(reverse('lista_tareas'), {'estado': 'pendiente'})
+        self.assertEqual(respuesta.context['filtros'], {'estado': 'pendiente'})
+
+
+# ========== LISTADO DE PROYECTOS ANOTADO ==========
+class ListadoProyectosTests(TestCase):
+
+    def setUp(self):
+        sembrar(2)
+        self.proyecto, self.vacio = Proyecto.objects.order_by('id')
+        Asset.objects.filter(proyecto=self.vacio).delete()
+        Tarea.objects.filter(proyecto=self.vacio).delete()
+
+    def test_conteos_coinciden_con_las_tablas(self):
+        for tarea, estado in zip(self.proyecto.tareas.order_by('id'), ('completada', 'en_proceso', 'en_proceso')):
+            tarea.estado = estado
+            tarea.save()
+
+        with self.assertNumQueries(1):
+            proyectos = {p.pk: p for p in Proyecto.objects.con_estadisticas()}
+            self.assertEqual(proyectos[self.proyecto.pk].detalle.engine, 'Godot')
+        anotado = proyectos[self.proyecto.pk]
+        self.assertEqual((anotado.num_assets, anotado.num_tareas), (2, 3))
+        self.assertEqual((anotado.tareas_completada, anotado.tareas_en_proceso, anotado.tareas_pendiente), (1, 2, 0))
+        self.assertEqual(anotado.porcentaje_completado, 33)
+
+        vacio = proyectos[self.vacio.pk]
+        self.assertEqual((vacio.num_assets, vacio.num_tareas, vacio.porcentaje_completado), (0, 0, 0))
+
+
+# ========== CONTADORES DEL DASHBOARD ==========
+class ContadoresTests(TestCase):
+
+    def totales(self):
+        return ContadorGlobal.objects.values(*ContadorGlobal.CAMPOS).get(pk=1)
+
+    def test_siguen_las_altas_y_bajas(self):
+        sembrar(2)
+        self.assertEqual(self.totales(), ContadorGlobal.contar())
+
+        # El borrado en cascada avisa por cada hijo
+        Proyecto.objects.order_by('id').first().delete()
+        Etiqueta.objects.order_by('id').first().delete()
+        self.assertEqual(self.totales(), {'proyectos': 1, 'assets': 2, 'tareas': 3, 'etiquetas': 1})
+
+        # Las operaciones masivas avisan con sus señales
+        proyecto = Proyecto.objects.get()
+        tareas = Tarea.objects.bulk_create([
+            Tarea(titulo=f'Masiva {i}', descripcion='x', proyecto=proyecto) for i in range(4)
+        ])
+        creacion_masiva.send(sender=Tarea, objetos=tareas)
+        self.assertEqual(self.totales()['tareas'], 7)
+
+        respuesta = self.client.get(reverse('index'))
+        self.assertEqual(respuesta.context['total_tareas'], 7)
+
+    def test_reconciliar_corrige_el_desfase(self):
+        sembrar(1)
+        ContadorGlobal.objects.filter(pk=1).update(tareas=100, assets=-5)
+        salida = StringIO()
+        call_command('reconciliar_contadores', stdout=salida)
+        self.assertIn('tareas: 3 (desfase -97)', salida.getvalue())
+        self.assertEqual(self.totales(), ContadorGlobal.contar())
+
+        salida = StringIO()
+        call_command('reconciliar_contadores', stdout=salida)
+        self.assertIn('al día', salida.getvalue())
+
+    def test_se_crea_con_el_conteo_real(self):
+        sembrar(1)
+        ContadorGlobal.objects.all().delete()
+        Etiqueta.objects.create(nombre='Nueva')
+        self.assertEqual(self.totales(), {'proyectos': 1, 'assets': 2, 'tareas': 3, 'etiquetas': 2})
+
+
+# ========== ÍNDICES Y PLANES DE CONSULTA ==========
+class ExplainHotpathsTests(TestCase):
+
+    def test_rutas_criticas_usan_indices(self):
+        if connection.vendor not in explain_hotpaths.MOTORES:
+            self.skipTest(f'explain_hotpaths no soporta {connection.vendor}')
+        sembrar(2)
+        salida = StringIO()
+        call_command('explain_hotpaths', stdout=salida)
+        lineas = salida.getvalue().splitlines()
+        for ruta in ('lista_proyectos ?estado', 'lista_assets ?proyecto', 'lista_tareas',
+                     'lista_tareas ?estado&prioridad', 'lista_tareas ?proyecto', 'detalle_proyecto: tareas'):
+            with self.subTest(ruta=ruta):
+                self.assertIn(f'[ok] {ruta}', lineas)
+        # El filtro por etiqueta ordena a través de la tabla intermedia (conocido)
+        self.assertIn('[!] lista_tareas ?etiqueta', lineas)
+        with self.assertRaises(CommandError):
+            call_command('explain_hotpaths', '--estricto', stdout=StringIO())
+
+    def test_mismas_consultas_que_las_vistas(self):
+        sembrar(2)
+        proyecto = Proyecto.objects.order_by('id').first()
+        rutas = dict(explain_hotpaths.rutas_criticas(proyecto.pk, Etiqueta.objects.order_by('id').first().pk))
+        for ruta, url in [
+            ('lista_proyectos ?estado', f"{reverse('lista_proyectos')}?estado=desarrollo"),
+            ('lista_assets ?proyecto', f"{reverse('lista_assets')}?proyecto={proyecto.pk}"),
+            ('lista_tareas', reverse('lista_tareas')),
+        ]:
+            with self.subTest(ruta=ruta):
+                with CaptureQueriesContext(connection) as explicada:
+                    list(rutas[ruta])
+                with CaptureQueriesContext(connection) as vista:
+                    self.client.get(url)
+                self.assertIn(explicada[0]['sql'], [consulta['sql'] for consulta in vista])
+
+
+class ProblemasDelPlanTests(SimpleTestCase):
+
+    def test_sqlite(self):
+        plan = '\n'.join([
+            '3 0 0 SCAN produccion_tarea',
+            '6 0 0 SCAN produccion_asset USING INDEX asset_fecha_id_idx',
+            '9 0 0 USE TEMP B-TREE FOR ORDER BY',
+        ])
+        self.assertEqual(explain_hotpaths.problemas_sqlite(plan), [
+            'full scan: SCAN produccion_tarea', 'filesort: USE TEMP B-TREE FOR ORDER BY',
+        ])
+
+    def test_mysql(self):
+        plan = json.dumps({'query_block': {'ordering_operation': {
+            'using_filesort': True,
+            'table': {'table_name': 'produccion_tarea', 'access_type': 'ALL'},
+        }}})
+        self.assertEqual(explain_hotpaths.problemas_mysql(plan), ['filesort', 'full scan: produccion_tarea'])
+
+    def test_postgresql(self):
+        plan = json.dumps([{'Plan': {
+            'Node Type': 'Sort', 'Sort Key': ['fecha_creacion DESC'],
+            'Plans': [{'Node Type': 'Seq Scan', 'Relation Name': 'produccion_tarea'}],
+        }}])
+        self.assertEqual(explain_hotpaths.problemas_postgresql(plan), [
+            "filesort: Sort ['fecha_creacion DESC']", 'full scan: produccion_tarea',
+        ])
+
+
+# ========== BÚSQUEDA ==========
+@skipUnless(connection.vendor == 'sqlite', 'los triggers FTS5 son solo de SQLite')
+class TriggersBusquedaTests(TestCase):
+
+    def setUp(self):
+        if busqueda.TABLA_FTS not in connection.introspection.table_names():
+            self.skipTest('SQLite compilado sin FTS5')
+
+    def test_migrate_deja_los_triggers(self):
+        self.assertEqual(busqueda.asegurar_triggers_sqlite(connection), 0)
+
+    def test_recrea_los_que_faltan_y_reindexa(self):
+        sembrar(1)
+        tarea = Tarea.objects.order_by('id').first()
+        Tarea.objects.filter(pk=tarea.pk).update(titulo='Pulir texturas')
+        with connection.cursor() as cursor:
+            cursor.execute('DROP TRIGGER produccion_tarea_fts_au')
+        # Un cambio mientras falta el trigger no llega al índice...
+        Tarea.objects.filter(pk=tarea.pk).update(titulo='Ajustar colisiones')
+        self.assertEqual(busqueda.buscar('colisiones'), [])
+
+        self.assertEqual(busqueda.asegurar_triggers_sqlite(connection), 1)
+        self.assertEqual([r['id'] for r in busqueda.buscar('colisiones')], [tarea.pk])
+        self.assertEqual(busqueda.buscar('texturas'), [])
+
+        # ...y con el trigger de vuelta los cambios se indexan solos
+        Tarea.objects.filter(pk=tarea.pk).update(titulo='Revisar audio')
+        self.assertEqual([r['id'] for r in busqueda.buscar('audio')], [tarea.pk])
+
+    def test_la_migracion_0013_no_depende_de_busqueda(self):
+        migracion = importlib.import_module('produccion.migrations.0013_triggers_busqueda')
+        with connection.cursor() as cursor:
+            cursor.execute('DROP TRIGGER produccion_asset_fts_ad')
+            editor = mock.Mock(connection=connection, execute=cursor.execute)
+            migracion.restaurar_triggers(None, editor)
+        self.assertEqual(busqueda.asegurar_triggers_sqlite(connection), 0)
+
+
+class MotorMySQLTests(SimpleTestCase):
+    # Solo arma el SQL: las palabras más cortas que innodb_ft_min_token_size van por LIKE
+
+    def setUp(self):
+        self.motor = busqueda.MotorMySQL()
+        self.motor._minimo_token = 3
+
+    def test_palabras_cortas_por_like(self):
+        puntaje, condiciones, parametros_puntaje, parametros = self.motor._condiciones(
+            'titulo', 'descripcion', ['ui', 'menu', 'hp'], prefijo=True,
+        )
+        self.assertEqual(parametros_puntaje, ['+menu'])
+        self.assertEqual(condiciones.count('MATCH('), 1)
+        self.assertEqual(parametros, ['+menu', '%ui%', '%ui%', '%hp%', '%hp%'])
+
+    def test_prefijo_largo_y_sin_palabras_largas(self):
+        _, _, parametros_puntaje, _ = self.motor._condiciones('titulo', 'descripcion', ['menu', 'pau'], True)
+        self.assertEqual(parametros_puntaje, ['+menu +pau*'])
+        puntaje, condiciones, _, parametros = self.motor._condiciones('titulo', 'descripcion', ['x_'], False)
+        self.assertEqual(puntaje, '0')
+        self.assertNotIn('MATCH(', condiciones)
+        self.assertEqual(parametros, ['%x\\_%', '%x\\_%'])
+
+
+class BusquedaTests(TestCase):
+    # Con el motor que detecta busqueda.py para esta BD
+
+    def setUp(self):
+        self.motor = busqueda.obtener_motor()
+        if self.motor.nombre == 'mysql':
+            self.skipTest('los índices FULLTEXT de InnoDB no ven las filas sin commit de un TestCase')
+        sembrar(1)
+        self.proyecto = Proyecto.objects.get()
+        self.heroe = Tarea.objects.create(
+            titulo='Animación del héroe', descripcion='Sprites de correr y saltar',
+            proyecto=self.proyecto,
+        )
+        self.puerta = Tarea.objects.create(
+            titulo='Sonido de la puerta', descripcion='Sincronizar con la animación al abrir',
+            proyecto=self.proyecto,
+        )
+
+    def ids(self, resultados):
+        return [(r['tipo'], r['id']) for r in resultados]
+
+    def test_titulo_pesa_mas_que_la_descripcion(self):
+        resultados = busqueda.buscar('animación')
+        self.assertEqual(self.ids(resultados), [('tarea', self.heroe.pk), ('tarea', self.puerta.pk)])
+        self.assertEqual(resultados[0]['url'], reverse('editar_tarea', args=[self.heroe.pk]))
+
+    def test_todas_las_palabras_y_prefijo(self):
+        self.assertEqual(self.ids(busqueda.buscar('animación puerta')), [('tarea', self.puerta.pk)])
+        self.assertEqual(busqueda.buscar('anim'), [])
+        self.assertEqual(
+            {pk for _, pk in self.ids(busqueda.sugerir('sprites corr'))}, {self.heroe.pk},
+        )
+        if self.motor.quitar_tildes:
+            self.assertEqual(len(busqueda.buscar('ANIMACION')), 2)
+
+    def test_cambios_y_borrados_se_reflejan(self):
+        self.heroe.titulo = 'Caminata del héroe'
+        self.heroe.save()
+        self.puerta.delete()
+        self.assertEqual(busqueda.buscar('animación'), [])
+        self.assertEqual(self.ids(busqueda.buscar('caminata')), [('tarea', self.heroe.pk)])
+
+    def test_sin_proyectos_marcados_para_borrar(self):
+        Proyecto.objects.filter(pk=self.proyecto.pk).update(nombre='Animación secreta', pendiente_eliminacion=True)
+        self.assertNotIn('proyecto', {r['tipo'] for r in busqueda.buscar('secreta')})
+
+    def test_vistas(self):
+        respuesta = self.client.get(reverse('buscar'), {'q': 'animación'})
+        self.assertEqual(len(respuesta.context['resultados']), 2)
+        datos = self.client.get(reverse('sugerencias_busqueda'), {'q': 'sonido de la pue'}).json()
+        self.assertEqual([r['id'] for r in datos['resultados']], [self.puerta.pk])
+        self.assertEqual(self.client.get(reverse('sugerencias_busqueda'), {'q': 'a'}).json()['resultados'], [])
+
+
+class IndiceMemoriaTests(TestCase):
+
+    def setUp(self):
+        indice = busqueda.IndiceInvertido()
+        for objetivo in (mock.patch.object(busqueda, '_motor', busqueda.MotorMemoria()),
+                         mock.patch.object(busqueda, 'indice_memoria', indice)):
+            objetivo.start()
+            self.addCleanup(objetivo.stop)
+        self.indice = indice
+        sembrar(2)
+
+    def test_se_construye_en_la_primera_busqueda(self):
+        self.assertFalse(self.indice.construido)
+        with self.assertNumQueries(3 + 1):  # una lectura por tipo de FUENTES + la hidratación
+            resultados = busqueda.buscar('tarea nivel')
+        self.assertTrue(self.indice.construido)
+        self.assertEqual(len(resultados), 6)
+        self.assertEqual({r['tipo'] for r in resultados}, {'tarea'})
+        with self.assertNumQueries(1):
+            busqueda.buscar('tarea')
+
+    def test_las_senales_lo_mantienen_al_dia(self):
+        busqueda.buscar('nivel')
+        tarea = Tarea.objects.order_by('id').first()
+        tarea.titulo = 'Rediseñar menú'
+        tarea.save()
+        nueva = Asset.objects.create(nombre='Menú principal', tipo='sprite', descripcion='', proyecto=tarea.proyecto)
+        self.assertEqual(
+            {(r['tipo'], r['id']) for r in busqueda.sugerir('men')}, {('tarea', tarea.pk), ('asset', nueva.pk)},
+        )
+        nueva.delete()
+        self.assertEqual([r['id'] for r in busqueda.buscar('menu')], [tarea.pk])
+
+    def test_se_reconstruye_al_vencer(self):
+        busqueda.buscar('nivel')
+        # update() no manda señales: el índice de este proceso no se entera...
+        Tarea.objects.filter(titulo='Tarea nivel 0-0').update(titulo='Balancear jefe')
+        self.assertEqual(busqueda.buscar('jefe'), [])
+        # ...hasta que pasan PRODUCCION_BUSQUEDA_RECONSTRUIR segundos
+        self.indice._construido_en -= 301
+        self.assertEqual([r['titulo'] for r in busqueda.buscar('jefe')], ['Balancear jefe'])
+
+
+# ========== IMPORTACIÓN ==========
+class ImportacionTests(TestCase):
+
+    def setUp(self):
+        sembrar(1)
+        self.proyecto = Proyecto.objects.get()
+
+    def importar(self, contenido, tipo='tareas'):
+        return importacion.importar_archivo(BytesIO(contenido.encode()), tipo, 'csv', tamaño_lote=2)
+
+    def contadores(self):
+        return ContadorGlobal.objects.values('tareas', 'etiquetas').get(pk=1)
+
+    def test_tareas_con_etiquetas_en_lotes(self):
+        antes = self.contadores()
+        resultado = self.importar(
+            'titulo,descripcion,estado,prioridad,proyecto,etiquetas\n'
+            f'Importada 1,Uno,pendiente,alta,{self.proyecto.pk},Etiqueta 0|Nueva\n'
+            f'Importada 2,Dos,,,{self.proyecto.nombre},\n'
+            f'Importada 3,Tres,completada,baja,{self.proyecto.pk},nueva\n'
+            ',Sin título,,,1,\n'
+        )
+        self.assertEqual((resultado.filas, resultado.creados, resultado.total_errores), (4, 3, 1))
+        importadas = {t.titulo: t for t in Tarea.objects.filter(titulo__startswith='Importada')}
+        self.assertEqual(
+            sorted(importadas['Importada 1'].etiquetas.values_list('nombre', flat=True)), ['Etiqueta 0', 'Nueva'],
+        )
+        self.assertFalse(importadas['Importada 2'].etiquetas.exists())
+        self.assertEqual(importadas['Importada 2'].prioridad, 'media')
+        self.assertEqual(list(importadas['Importada 3'].etiquetas.values_list('nombre', flat=True)), ['Nueva'])
+        self.assertEqual(self.contadores(), {'tareas': antes['tareas'] + 3, 'etiquetas': antes['etiquetas'] + 1})
+
+    def test_motor_sin_ids_de_bulk_create(self):
+        # Como en MySQL: los ids se reservan antes y todo sigue yendo en bloque
+        antes = self.contadores()
+        ultimo = Tarea.objects.order_by('-id').values_list('id', flat=True).first()
+        contenido = 'titulo,descripcion,proyecto,etiquetas\n' + ''.join(
+            f'Importada {i},Texto,{self.proyecto.pk},Etiqueta 0\n' for i in range(5)
+        )
+        sin_ids = mock.patch.object(
+            type(connection.features), 'can_return_rows_from_bulk_insert', new_callable=mock.PropertyMock,
+            return_value=False,
+        )
+        with sin_ids, CaptureQueriesContext(connection) as consultas:
+            resultado = self.importar(contenido)
+        self.assertEqual(resultado.creados, 5)
+        ids = list(Tarea.objects.filter(titulo__startswith='Importada').order_by('id').values_list('id', flat=True))
+        self.assertEqual(ids, list(range(ultimo + 1, ultimo + 6)))
+        self.assertEqual(Tarea.etiquetas.through.objects.filter(tarea_id__in=ids).count(), 5)
+        self.assertEqual(self.contadores()['tareas'], antes['tareas'] + 5)
+        inserciones = [q['sql'] for q in consultas.captured_queries if q['sql'].startswith('INSERT INTO "produccion_tarea"')]
+        self.assertEqual(len(inserciones), 3)  # un INSERT por lote de 2, ninguno por fila
+        self.assertFalse([c['sql'] for c in consultas if 'FOR UPDATE' in c['sql'].upper()])
+
+    @skipUnless(connection.vendor == 'mysql', 'GET_LOCK es de MySQL')
+    def test_otra_importacion_en_curso(self):
+        # Otra sesión tiene el candado: no se reserva ningún id
+        nombre = f'produccion:importar:{Tarea._meta.db_table}'
+        otra = connections.create_connection('default')
+        self.addCleanup(otra.close)
+        with otra.cursor() as cursor:
+            cursor.execute('SELECT GET_LOCK(%s, 0)', [nombre])
+        with mock.patch.object(importacion, 'ESPERA_CANDADO', 0):
+            resultado = self.importar(f'titulo,descripcion,proyecto\nImportada,Texto,{self.proyecto.pk}\n')
+        self.assertEqual((resultado.creados, resultado.total_errores), (0, 1))
+        self.assertFalse(Tarea.objects.filter(titulo='Importada').exists())
+
+    def test_ndjson_y_archivo_mal_formado(self):
+        contenido = (
+            json.dumps({'titulo': 'Desde JSON', 'descripcion': 'x', 'proyecto': self.proyecto.pk,
+                        'etiquetas': ['Etiqueta 0', 'Otra']}) + '\n\n'
+            + '[1, 2]\n'
+            + json.dumps({'titulo': 'Antes del corte', 'descripcion': 'x', 'proyecto': self.proyecto.pk}) + '\n'
+            + '{"titulo": "cortado\n'
+        )
+        resultado = importacion.importar_archivo(BytesIO(contenido.encode()), 'tareas', 'ndjson', tamaño_lote=10)
+        # Lo leído antes del error queda guardado; el corte cuenta como un error más
+        self.assertEqual((resultado.creados, resultado.total_errores), (2, 2))
+        self.assertEqual(resultado.errores[0], (2, 'La fila no es un objeto.'))
+        self.assertIn('Archivo mal formado', resultado.errores[1][1])
+        tarea = Tarea.objects.get(titulo='Desde JSON')
+        self.assertEqual(sorted(tarea.etiquetas.values_list('nombre', flat=True)), ['Etiqueta 0', 'Otra'])
+
+    def test_assets_desde_el_formulario(self):
+        archivo = SimpleUploadedFile(
+            'assets.csv', f'nombre,tipo,descripcion,proyecto\nFondo,sprite,,{self.proyecto.nombre}\nMal,inventado,,1\n'.encode(),
+        )
+        respuesta = self.client.post(reverse('importar_datos'), {'tipo': 'assets', 'archivo': archivo})
+        self.assertEqual((respuesta.context['resultado'].creados, respuesta.context['resultado'].total_errores), (1, 1))
+        self.assertTrue(Asset.objects.filter(nombre='Fondo', proyecto=self.proyecto).exists())
+
+
+# ========== EXPORTACIÓN ==========
+class ExportacionTests(TestCase):
+
+    def setUp(self):
+        sembrar(2)
+
+    def descargar(self, nombre, **params):
+        respuesta = self.client.get(reverse(nombre), params)
+        self.assertTrue(respuesta.streaming)
+        return b''.join(respuesta.streaming_content)
+
+    def test_ida_y_vuelta_por_importacion(self):
+        # Lo exportado se puede volver a importar tal cual, en los dos formatos
+        originales = list(Tarea.objects.order_by('id').values_list('titulo', 'estado', 'prioridad', 'proyecto_id'))
+        etiquetas = {t.titulo: sorted(e.nombre for e in t.etiquetas.all()) for t in Tarea.objects.prefetch_related('etiquetas')}
+        for formato in ('csv', 'ndjson'):
+            with self.subTest(formato=formato):
+                contenido = self.descargar('exportar_tareas', formato=formato)
+                Tarea.objects.all().delete()
+                resultado = importacion.importar_archivo(BytesIO(contenido), 'tareas', formato)
+                self.assertEqual((resultado.creados, resultado.total_errores), (len(originales), 0))
+                importadas = Tarea.objects.order_by('id').prefetch_related('etiquetas')
+                self.assertEqual(
+                    [(t.titulo, t.estado, t.prioridad, t.proyecto_id) for t in importadas], originales,
+                )
+                self.assertEqual({t.titulo: sorted(e.nombre for e in t.etiquetas.all()) for t in importadas}, etiquetas)
+
+    def test_filtros_de_la_lista_y_lotes(self):
+        Tarea.objects.filter(titulo='Tarea nivel 0-0').update(estado='completada')
+        filas = [json.loads(linea) for linea in self.descargar(
+            'exportar_tareas', formato='ndjson', estado='completada').decode().splitlines()]
+        self.assertEqual([fila['titulo'] for fila in filas], ['Tarea nivel 0-0'])
+        self.assertEqual(filas[0]['etiquetas'], ['Etiqueta 0'])
+
+        # Las filas se leen con un iterator (en MySQL una consulta por lote, más la
+        # que termina vacía; ver recorrer_en_lotes) y las etiquetas, una vez por lote
+        lecturas = 3 + 1 if connection.vendor == 'mysql' else 1
+        with self.assertNumQueries(lecturas + 3):
+            lineas = list(exportacion.exportar('tareas', 'csv', tamaño_lote=2))
+        self.assertEqual(len(lineas), 1 + 6)
+        self.assertEqual(lineas[0].strip().split(','), [n for n, _ in exportacion.COLUMNAS_TAREAS] + ['etiquetas'])
+
+        assets = self.descargar('exportar_assets', formato='inventado')
+        self.assertEqual(len(assets.decode().splitlines()), 1 + 4)
+
+
+# ========== API JSON ==========
+class APITests(TestCase):
+
+    def setUp(self):
+        sembrar(3)
+
+    def get(self, nombre, *args, **params):
+        return self.client.get(reverse(nombre, args=args), params)
+
+    def test_campos_por_defecto_y_pedidos(self):
+        datos = self.get('api_tareas').json()
+        self.assertEqual(set(datos['resultados'][0]), set(api.RECURSOS['tareas']['por_defecto']))
+
+        proyecto = Proyecto.objects.first()
+        with self.assertNumQueries(2):  # la página + las etiquetas de toda la página
+            datos = self.get('api_tareas', fields='titulo,etiquetas,titulo', proyecto=proyecto.pk).json()
+        self.assertEqual(len(datos['resultados']), 3)
+        self.assertEqual(list(datos['resultados'][0]), ['titulo', 'etiquetas'])  # sin repetir ni agregar id
+        self.assertEqual(sorted(len(fila['etiquetas']) for fila in datos['resultados']), [1, 2, 3])
+
+        detalle = self.get('api_proyecto', proyecto.pk, fields='nombre,engine,progreso').json()
+        self.assertEqual(detalle['engine'], 'Godot')
+        self.assertEqual(detalle['nombre'], proyecto.nombre)
+        self.assertIn('progreso', detalle)
+
+    def test_campos_desconocidos_y_no_encontrado(self):
+        respuesta = self.get('api_assets', fields='nombre,clave_secreta')
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertIn('clave_secreta', respuesta.json()['error'])
+        self.assertEqual(self.get('api_tarea', 999999).status_code, 404)
+        self.assertEqual(self.client.post(reverse('api_tareas')).status_code, 405)
+
+    def test_limite_y_paginas(self):
+        self.assertEqual(self.get('api_tareas', limite='muchas').status_code, 400)
+        self.assertEqual(len(self.get('api_tareas', limite=0).json()['resultados']), 1)
+        with mock.patch.object(api, 'LIMITE_MAXIMO', 4):
+            primera = self.get('api_tareas', limite=1000, fields='id').json()
+        self.assertEqual(len(primera['resultados']), 4)
+
+        vistos = [fila['id'] for fila in primera['resultados']]
+        segunda = self.get('api_tareas', limite=4, fields='id', cursor=primera['siguiente']).json()
+        vistos += [fila['id'] for fila in segunda['resultados']]
+        self.assertEqual(len(set(vistos)), 8)
+        self.assertEqual(self.get('api_tareas', limite=4, fields='id', cursor=segunda['anterior']).json()['resultados'],
+                         primera['resultados'])
+
+    def test_filtros_activos_en_la_respuesta(self):
+        datos = self.get('api_assets', tipo='sprite', proyecto='no-es-un-id').json()
+        self.assertEqual(datos['filtros'], {'tipo': 'sprite'})
+        self.assertEqual(len(datos['resultados']), 6)
+
+
+# ========== CACHÉ DE FRAGMENTOS ==========
+# Sin el buffer de actividad: los on_commit que se ejecutan acá no deben
+# dejarle eventos pendientes a otro test
+@override_settings(PRODUCCION_ACTIVIDAD_ASINCRONA=False)
+class CacheFragmentosTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        sembrar(2)
+        self.proyecto, self.otro = Proyecto.objects.order_by('id')
+        self.url = reverse('detalle_proyecto', args=[self.proyecto.pk])
+
+    def fechas(self):
+        # Lo que entra en las claves de los fragmentos
+        return [Proyecto.objects.values_list('fecha_actualizacion', flat=True).get(pk=p.pk) for p in (self.proyecto, self.otro)]
+
+    def cambiar(self, funcion):
+        antes = self.fechas()
+        with self.captureOnCommitCallbacks(execute=True):
+            funcion()
+        return [a != d for a, d in zip(antes, self.fechas())]
+
+    def test_cache_caliente_solo_valida(self):
+        self.client.get(self.url)
+        with self.assertNumQueries(1):  # el validador del GET condicional
+            respuesta = self.client.get(self.url)
+        self.assertContains(respuesta, 'Tarea nivel 0-0')
+
+        tarea = self.proyecto.tareas.get(titulo='Tarea nivel 0-0')
+        tarea.titulo = 'Tarea renombrada'
+        self.assertEqual(self.cambiar(tarea.save), [True, False])
+        respuesta = self.client.get(self.url)
+        self.assertContains(respuesta, 'Tarea renombrada')
+        self.assertNotContains(respuesta, 'Tarea nivel 0-0')
+
+    def test_invalida_sin_pasar_por_la_cache(self):
+        # Lo que cambia otro proceso (con su propia caché local) solo queda en la BD
+        self.assertContains(self.client.get(self.url), 'Tarea nivel 0-0')
+        Tarea.objects.filter(titulo='Tarea nivel 0-0').update(titulo='Cambiada en otro proceso')
+        Proyecto.objects.filter(pk=self.proyecto.pk).update(fecha_actualizacion=timezone.now())
+        self.assertContains(self.client.get(self.url), 'Cambiada en otro proceso')
+
+    def test_que_proyectos_invalida_cada_cambio(self):
+        tarea = self.proyecto.tareas.order_by('id').first()
+        etiqueta = Etiqueta.objects.get(nombre='Etiqueta 1')  # solo en tareas *-1 y *-2 de los dos proyectos
+
+        def mover():
+            tarea.proyecto = self.otro
+            tarea.save()
+
+        def renombrar_etiqueta():
+            etiqueta.nombre = 'Etiqueta nueva'
+            etiqueta.save()
+
+        casos = [
+            ('detalle', lambda: DetalleProyecto.objects.filter(proyecto=self.proyecto).get().save(), [True, False]),
+            ('asset', lambda: self.otro.assets.first().delete(), [False, True]),
+            ('etiquetas de una tarea', lambda: tarea.etiquetas.clear(), [True, False]),
+            ('mover de proyecto', mover, [True, True]),
+            ('renombrar etiqueta', renombrar_etiqueta, [True, True]),
+            ('borrar etiqueta', lambda: Etiqueta.objects.get(pk=etiqueta.pk).delete(), [True, True]),
+            ('etiqueta sin tareas', lambda: Etiqueta.objects.create(nombre='Suelta'), [False, False]),
+        ]
+        for nombre, funcion, esperado in casos:
+            with self.subTest(cambio=nombre):
+                self.assertEqual(self.cambiar(funcion), esperado)
+
+    def test_rollback_no_invalida(self):
+        def fallar():
+            with transaction.atomic():
+                self.proyecto.tareas.first().delete()
+                raise IntegrityError('simulado')
+
+        fechas = self.fechas()
+        with self.captureOnCommitCallbacks(execute=True), self.assertRaises(IntegrityError):
+            fallar()
+        self.assertEqual(self.fechas(), fechas)
+
+    def test_estampida_espera_al_que_genera(self):
+        clave = cache_fragmentos.clave_fragmento(self.proyecto.pk, self.proyecto.fecha_actualizacion, 'prueba')
+        cache.add(f'{clave}:candado', 1)  # otro proceso lo está generando
+        generar = mock.Mock(return_value='propio')
+
+        def llega_el_otro(segundos):
+            cache.set(clave, 'del otro')
+
+        with mock.patch.object(cache_fragmentos.time, 'sleep', side_effect=llega_el_otro):
+            self.assertEqual(cache_fragmentos.obtener_fragmento(clave, generar), 'del otro')
+        generar.assert_not_called()
+
+        # Si el otro falla y suelta el candado sin guardar nada, se genera acá
+        cache.delete(clave)
+        cache.add(f'{clave}:candado', 1)
+        with mock.patch.object(cache_fragmentos.time, 'sleep', side_effect=lambda s: cache.delete(f'{clave}:candado')):
+            self.assertEqual(cache_fragmentos.obtener_fragmento(clave, generar), 'propio')
+
+
+# ========== GET CONDICIONALES ==========
+class CondicionalTests(TestCase):
+
+    def setUp(self):
+        # El detalle deja fragmentos en la caché, que no se revierte con la transacción
+        self.addCleanup(cache.clear)
+        sembrar(2)
+        self.proyecto = Proyecto.objects.order_by('id').first()
+
+    def etag(self, url):
+        respuesta = self.client.get(url)
+        self.assertEqual(respuesta.status_code, 200)
+        return respuesta['ETag']
+
+    def test_renombrar_proyecto_cambia_las_listas_sin_tocar_sus_hijos(self):
+        urls = [reverse('lista_tareas'), reverse('lista_assets'), f"{reverse('lista_tareas')}?estado=pendiente"]
+        etags = [self.etag(url) for url in urls]
+        fechas = set(Tarea.objects.values_list('fecha_actualizacion', flat=True))
+
+        self.proyecto.nombre = 'Otro nombre'
+        self.proyecto.save()
+        self.assertEqual(set(Tarea.objects.values_list('fecha_actualizacion', flat=True)), fechas)
+        for url, etag in zip(urls, etags):
+            with self.subTest(url=url):
+                self.assertNotEqual(self.etag(url), etag)
+
+    def test_lista_sin_filtros_no_cuenta_filas(self):
+        url = reverse('lista_tareas')
+        etag = self.etag(url)
+        with CaptureQueriesContext(connection) as consultas:
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertEqual(len(consultas), 1)
+        self.assertNotIn('COUNT(', consultas[0]['sql'].upper())
+
+        # Un borrado cambia el total de ContadorGlobal aunque no deje fecha
+        Tarea.objects.order_by('id').first().delete()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_304_con_el_mismo_etag_o_fecha(self):
+        url = reverse('detalle_proyecto', args=[self.proyecto.pk])
+        respuesta = self.client.get(url)
+        etag, fecha = respuesta['ETag'], respuesta['Last-Modified']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=fecha).status_code, 304)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH='"otro"').status_code, 200)
+        self.assertEqual(self.client.get(reverse('detalle_proyecto', args=[999999])).status_code, 404)
+
+    def test_cambios_que_invalidan(self):
+        tarea = self.proyecto.tareas.order_by('id').first()
+        detalle = reverse('detalle_proyecto', args=[self.proyecto.pk])
+        casos = [
+            ('tarea', [detalle, reverse('lista_tareas'), reverse('lista_proyectos')],
+             lambda: Tarea.objects.filter(pk=tarea.pk).get().save()),
+            ('asset borrado', [detalle, reverse('lista_assets')], lambda: self.proyecto.assets.first().delete()),
+            ('etiquetas de una tarea', [detalle, reverse('lista_tareas')], lambda: tarea.etiquetas.clear()),
+            ('etiqueta renombrada', [reverse('lista_etiquetas'), reverse('lista_tareas')],
+             lambda: Etiqueta.objects.filter(nombre='Etiqueta 1').get().save()),
+            ('etiqueta borrada', [reverse('lista_etiquetas'), detalle],
+             lambda: Etiqueta.objects.get(nombre='Etiqueta 1').delete()),
+        ]
+        for nombre, urls, cambio in casos:
+            with self.subTest(cambio=nombre):
+                etags = [self.etag(url) for url in urls]
+                cambio()
+                for url, etag in zip(urls, etags):
+                    self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200, url)
+
+    def test_cambio_fuera_del_filtro_no_invalida(self):
+        otro = Proyecto.objects.order_by('id').last()
+        url = f"{reverse('lista_tareas')}?proyecto={self.proyecto.pk}"
+        etag = self.etag(url)
+        otro.tareas.first().delete()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.proyecto.tareas.first().delete()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+# ========== DATOS SINTÉTICOS Y BENCHMARK ==========
+class SeedBenchmarkTests(TestCase):
+
+    def sembrar_sinteticos(self, *extra):
+        call_command(
+            'seed_benchmark', '--proyectos', '3', '--tareas', '20', '--assets', '6', '--etiquetas', '4',
+            '--lote', '7', '--limpiar', *extra, stdout=StringIO(),
+        )
+        return {
+            'proyectos': list(Proyecto.objects.order_by('id').values_list('id', 'nombre', 'estado')),
+            'assets': list(Asset.objects.order_by('id').values_list('id', 'nombre', 'tipo', 'proyecto_id')),
+            'tareas': list(Tarea.objects.order_by('id').values_list('id', 'titulo', 'estado', 'proyecto_id')),
+            'etiquetas': list(
+                Tarea.etiquetas.through.objects.order_by('tarea_id', 'etiqueta_id').values_list('tarea_id', 'etiqueta_id')
+            ),
+        }
+
+    def test_misma_semilla_mismos_datos(self):
+        primera = self.sembrar_sinteticos()
+        self.assertEqual(len(primera['tareas']), 20)
+        self.assertEqual(len(primera['assets']), 6)
+        self.assertTrue(primera['etiquetas'])
+        # Los lotes de 7 no cortan los ids: las tareas quedan enlazadas a sus etiquetas
+        self.assertLessEqual({tarea for tarea, _ in primera['etiquetas']}, {fila[0] for fila in primera['tareas']})
+
+        self.assertEqual(self.sembrar_sinteticos(), primera)
+        self.assertNotEqual(self.sembrar_sinteticos('--semilla', '7')['tareas'], primera['tareas'])
+
+    def test_contadores_y_resumenes_al_dia(self):
+        self.sembrar_sinteticos()
+        self.assertEqual(
+            ContadorGlobal.objects.values(*ContadorGlobal.CAMPOS).get(pk=1), ContadorGlobal.contar()
+        )
+        for resumen in (ResumenTareas, ResumenAssets):
+            guardados = {
+                tuple(fila[:-1]): fila[-1]
+                for fila in resumen.objects.exclude(total=0).values_list('proyecto_id', *resumen.CLAVE, 'total')
+            }
+            self.assertEqual(guardados, resumen.contar())
+
+    def test_tareas_sin_proyectos(self):
+        with self.assertRaises(CommandError):
+            call_command('seed_benchmark', '--proyectos', '0', '--tareas', '5', '--assets', '0', stdout=StringIO())
+
+
+class BenchmarkTests(TestCase):
+
+    def test_informe_json(self):
+        sembrar(2)
+        salida = StringIO()
+        call_command(
+            'benchmark', '--repeticiones', '1', '--calentamiento', '0', '--filtro', 'lista_tareas',
+            stdout=salida, stderr=StringIO(),
+        )
+        informe = json.loads(salida.getvalue())
+        self.assertEqual(informe['meta']['filas']['tareas'], 6)
+        self.assertIn('lista_tareas', informe['vistas'])
+        self.assertTrue(all(nombre.startswith('lista_tareas') for nombre in informe['vistas']))
+        for medicion in informe['vistas'].values():
+            self.assertEqual(medicion['status'], 200)
+            self.assertGreater(medicion['consultas'], 0)
+            self.assertLessEqual(medicion['p50_ms'], medicion['p99_ms'])
+
+    def test_comparar_con_corrida_anterior(self):
+        sembrar(1)
+        directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directorio)
+        anterior = os.path.join(directorio, 'anterior.json')
+        opciones = ['--repeticiones', '1', '--calentamiento', '0', '--filtro', 'lista_etiquetas']
+        call_command('benchmark', *opciones, '--salida', anterior, stdout=StringIO(), stderr=StringIO())
+
+        errores = StringIO()
+        call_command('benchmark', *opciones, '--comparar', anterior, stdout=StringIO(), stderr=errores)
+        self.assertIn('lista_etiquetas', errores.getvalue().split('vista', 1)[1])
+
+        with self.assertRaises(CommandError):
+            call_command('benchmark', *opciones, '--comparar', os.path.join(directorio, 'no-existe.json'),
+                         stdout=StringIO(), stderr=StringIO())
+        with self.assertRaises(CommandError):
+            call_command('benchmark', '--repeticiones', '0', stdout=StringIO(), stderr=StringIO())
+
+
+# ========== INSTRUMENTACIÓN ==========
+TEMPLATES_INSTRUMENTADOS = [
+    {**motor, 'BACKEND': 'produccion.instrumentacion.PlantillasInstrumentadas'} for motor in settings.TEMPLATES
+]
+
+
+class NormalizarSqlTests(SimpleTestCase):
+
+    def test_misma_forma_sin_importar_los_valores(self):
+        self.assertEqual(
+            normalizar_sql("SELECT *\n  FROM t WHERE id IN (%s, %s, %s) AND nombre = 'o''hara' LIMIT 21"),
+            'SELECT * FROM t WHERE id IN (...) AND nombre = ? LIMIT ?',
+        )
+        self.assertEqual(normalizar_sql('SELECT 1 FROM t WHERE id = %s'), normalizar_sql('SELECT 2 FROM t WHERE id = %s'))
+
+    def test_duplicadas_y_n_mas_1(self):
+        medicion = MedicionPeticion()
+
+        def ejecutar(sql, params, many, context):
+            return None
+
+        for tarea_id in range(6):
+            medicion(ejecutar, 'SELECT * FROM etiqueta WHERE tarea_id = %s', (tarea_id,), False, {})
+        for _ in range(3):
+            medicion(ejecutar, 'SELECT COUNT(*) FROM tarea', (), False, {})
+
+        self.assertEqual(medicion.consultas, 9)
+        self.assertEqual(medicion.duplicadas, 2)
+        self.assertEqual(
+            [patron['sql'] for patron in medicion.n_mas_1()], ['SELECT * FROM etiqueta WHERE tarea_id = %s'],
+        )
+        self.assertEqual([patron['veces'] for patron in medicion.n_mas_1(umbral=3)], [6, 3])
+
+
+@override_settings(PRODUCCION_INSTRUMENTACION=True, TEMPLATES=TEMPLATES_INSTRUMENTADOS)
+class InstrumentacionTests(TestCase):
+
+    def setUp(self):
+        sembrar(2)
+        self.addCleanup(cache.clear)
+
+    def test_server_timing_y_registro(self):
+        with self.assertLogs('produccion.instrumentacion', 'INFO') as registro, \
+                CaptureQueriesContext(connection) as consultas:
+            respuesta = self.client.get(reverse('lista_tareas'))
+
+        # Las descripciones van entre comillas y pueden tener comas
+        cabecera = respuesta['Server-Timing']
+        self.assertEqual(re.findall(r'(?:^|, )(\w+);dur=', cabecera), ['db', 'tpl', 'vista', 'mw', 'total'])
+        self.assertIn(f'desc="{len(consultas)} consultas, 0 duplicadas"', cabecera)
+
+        datos = json.loads(registro.records[-1].getMessage())
+        self.assertEqual(datos['ruta'], reverse('lista_tareas'))
+        self.assertEqual(datos['status'], 200)
+        self.assertEqual(datos['consultas'], len(consultas))
+        self.assertGreater(datos['templates_ms'], 0)
+        self.assertLessEqual(datos['vista_ms'], datos['total_ms'])
+
+    @override_settings(PRODUCCION_INSTRUMENTACION_UMBRAL_N_MAS_1=1)
+    def test_patrones_repetidos_como_advertencia(self):
+        with self.assertLogs('produccion.instrumentacion', 'WARNING') as registro:
+            self.client.get(reverse('index'))
+        self.assertTrue(json.loads(registro.records[-1].getMessage())['n_mas_1'])
+
+    @override_settings(PRODUCCION_INSTRUMENTACION_MUESTREO=0)
+    def test_peticion_no_muestreada(self):
+        respuesta = self.client.get(reverse('index'))
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertNotIn('Server-Timing', respuesta)
+
+    @override_settings(PRODUCCION_INSTRUMENTACION=False)
+    def test_apagada(self):
+        respuesta = self.client.get(reverse('index'))
+        self.assertNotIn('Server-Timing', respuesta)
+
+
+# ========== PRESUPUESTO DE CONSULTAS ==========
+# Cada vista tiene declarada la cantidad exacta de consultas SQL que hace.
+# Se mide con N filas y de nuevo con 10N: si el número cambia con la cantidad
+# de datos hay un N+1 (ej: un .count() o una relación sin select_related por
+# cada card), y si cambia el número declarado hay que revisarlo a propósito.
+# Las vistas se miden en frío (caché vacía) para no esconder consultas.
+
+N = 5
+
+# nombre de la ruta -> (kwargs o parámetros GET, consultas esperadas)
+# En `kwargs`, 'proyecto'/'asset'/'tarea'/'etiqueta' se reemplazan por un id real.
+PRESUPUESTO_VISTAS = {
+    'index': ({}, 1),
+    'lista_proyectos': ({}, 2),
+    'lista_proyectos?estado=desarrollo': ({}, 2),
+    'crear_proyecto': ({}, 0),
+    # La cabecera lee el progreso de los dos resúmenes por proyecto
+    'detalle_proyecto': ({'id': 'proyecto'}, 7),
+    'editar_proyecto': ({'id': 'proyecto'}, 2),
+    'eliminar_proyecto': ({'id': 'proyecto'}, 1),
+    'lista_assets': ({}, 2),
+    'lista_assets?tipo=sprite': ({}, 2),
+    'lista_assets?proyecto={proyecto}': ({}, 3),
+    'crear_asset': ({}, 0),
+    'editar_asset': ({'id': 'asset'}, 2),
+    'eliminar_asset': ({'id': 'asset'}, 1),
+    'exportar_assets': ({}, 1),
+    'lista_tareas': ({}, 3),
+    'lista_tareas?estado=pendiente&prioridad=alta': ({}, 3),
+    'lista_tareas?proyecto={proyecto}': ({}, 4),
+    'lista_tareas?etiqueta={etiqueta}': ({}, 4),
+    'crear_tarea': ({}, 0),
+    'editar_tarea': ({'id': 'tarea'}, 4),
+    'eliminar_tarea': ({'id': 'tarea'}, 1),
+    'exportar_tareas': ({}, 2),
+    'lista_etiquetas': ({}, 2),
+    'crear_etiqueta': ({}, 0),
+    'editar_etiqueta': ({'id': 'etiqueta'}, 1),
+    'eliminar_etiqueta': ({'id': 'etiqueta'}, 1),
+    'importar_datos': ({}, 0),
+}
+
+# La búsqueda depende del motor (ver busqueda.py), así que va por separado:
+#   - SQLite FTS5: 1 consulta al índice + 1 por tipo presente en los resultados
+#   - Postgres: 1 consulta por tipo de FUENTES + 1 por tipo presente
+#   - MySQL no se mide: los índices FULLTEXT de InnoDB no ven las filas sin
+#     commit de un TestCase. El índice en memoria tampoco (la primera
+#     búsqueda lo construye).
+# Se busca algo que solo está en tareas para que no dependa del ranking.
+PRESUPUESTO_BUSQUEDA = {
+    'sqlite-fts5': {'buscar?q=tarea': 2, 'sugerencias_busqueda?q=tar': 2},
+    'postgresql': {'buscar?q=tarea': 4, 'sugerencias_busqueda?q=tar': 4},
+}
+
+# Changelists del admin (incluyen sesión + usuario del staff logueado)
+PRESUPUESTO_ADMIN = {
+    'admin:produccion_proyecto_changelist': 5,
+    'admin:produccion_detalleproyecto_changelist': 5,
+    'admin:produccion_asset_changelist': 5,
+    'admin:produccion_tarea_changelist': 5,
+    'admin:produccion_etiqueta_changelist': 5,
+    'admin:produccion_actividad_changelist': 5,
+    'admin:produccion_archivo_changelist': 5,
+}
+
+
+class PresupuestoConsultasMixin:
+
+    def contar_consultas(self, url):
+        # execute_wrapper en vez de assertNumQueries para tener el SQL y poder
+        # consumir las respuestas en streaming dentro de la medición
+        cache.clear()
+        consultas = []
+
+        def registrar(execute, sql, params, many, context):
+            consultas.append(sql)
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(registrar):
+            respuesta = self.client.get(url)
+            if respuesta.streaming:
+                b''.join(respuesta.streaming_content)
+        self.assertLess(respuesta.status_code, 400, f'{url} respondió {respuesta.status_code}')
+        return consultas
+
+    def assertPresupuesto(self, url, esperado, filas):
+        consultas = self.contar_consultas(url)
+        if len(consultas) == esperado:
+            return
+        # Mostrar los patrones (SQL normalizado) ordenados por repeticiones:
+        # un N+1 aparece arriba con un número proporcional a las filas
+        patrones = Counter(normalizar_sql(sql) for sql in consultas)
+        detalle = '\n'.join(f'  {veces:3}x  {sql[:300]}' for sql, veces in patrones.most_common())
+        self.fail(
+            f'{url} hizo {len(consultas)} consultas con {filas} (presupuesto: {esperado}):\n{detalle}'
+        )
+
+    def ids_de_ejemplo(self):
+        return {
+            'proyecto': Proyecto.objects.values_list('id', flat=True).first(),
+            'asset': Asset.objects.values_list('id', flat=True).first(),
+            'tarea': Tarea.objects.values_list('id', flat=True).first(),
+            'etiqueta': Etiqueta.objects.values_list('id', flat=True).first(),
+        }
+
+
+class PresupuestoVistasTests(PresupuestoConsultasMixin, TestCase):
+
+    def url(self, clave, kwargs, ids):
+        nombre, _, consulta = clave.partition('?')
+        url = reverse(nombre, kwargs={k: ids[v] for k, v in kwargs.items()})
+        return f'{url}?{consulta.format(**ids)}' if consulta else url
+
+    def test_consultas_constantes_al_crecer_los_datos(self):
+        for filas, (cantidad, desde) in (('N', (N, 0)), ('10N', (9 * N, N))):
+            sembrar(cantidad, desde)
+            ids = self.ids_de_ejemplo()
+            for clave, (kwargs, esperado) in PRESUPUESTO_VISTAS.items():
+                with self.subTest(vista=clave, filas=filas):
+                    self.assertPresupuesto(self.url(clave, kwargs, ids), esperado, filas)
+
+    def test_busqueda_constante_al_crecer_los_datos(self):
+        motor = busqueda.obtener_motor()  # la detección del motor se hace una vez por proceso
+        if motor.nombre not in PRESUPUESTO_BUSQUEDA:
+            self.skipTest(f'sin presupuesto de búsqueda para el motor {motor.nombre}')
+        for filas, (cantidad, desde) in (('N', (N, 0)), ('10N', (9 * N, N))):
+            sembrar(cantidad, desde)
+            for clave, esperado in PRESUPUESTO_BUSQUEDA[motor.nombre].items():
+                with self.subTest(vista=clave, filas=filas):
+                    self.assertPresupuesto(self.url(clave, {}, {}), esperado, filas)
+
+
+class PresupuestoAdminTests(PresupuestoConsultasMixin, TestCase):
+
+    def setUp(self):
+        usuario = get_user_model().objects.create_superuser('admin', 'admin@example.com', 'clave')
+        self.client.force_login(usuario)
+
+    def test_changelists_constantes_al_crecer_los_datos(self):
+        for filas, (cantidad, desde) in (('N', (N, 0)), ('10N', (9 * N, N))):
+            sembrar(cantidad, desde)
+            for nombre, esperado in PRESUPUESTO_ADMIN.items():
+                with self.subTest(changelist=nombre, filas=filas):
+                    self.assertPresupuesto(reverse(nombre), esperado, filas)
+
+            # Filtros con autocompletado (solo consultan la opción elegida) y orden por conteos
+            ids = self.ids_de_ejemplo()
+            with self.subTest(filtros=filas):
+                self.assertPresupuesto(
+                    f"{reverse('admin:produccion_tarea_changelist')}?proyecto={ids['proyecto']}&etiqueta={ids['etiqueta']}",
+                    6, filas,
+                )
+                self.assertPresupuesto(f"{reverse('admin:produccion_proyecto_changelist')}?o=-5", 5, filas)
+                self.assertPresupuesto(f"{reverse('admin:produccion_etiqueta_changelist')}?o=-2", 5, filas)
+
+    def test_conteo_estimado_sin_filtros(self):
+        # Mismos motores que estimar_filas(); en MySQL ANALYZE TABLE hace un
+        # commit implícito y rompería el aislamiento del TestCase
+        analizar = {
+            'sqlite': 'ANALYZE {tabla}',
+            'postgresql': 'ANALYZE {tabla}',
+        }
+        if connection.vendor not in analizar:
+            self.skipTest(f'no se puede actualizar la estimación en {connection.vendor} dentro de un TestCase')
+        sembrar(N)
+        with connection.cursor() as cursor:
+            cursor.execute(analizar[connection.vendor].format(tabla=connection.ops.quote_name(Tarea._meta.db_table)))
+        # Las estadísticas son aproximadas: alcanza con que estén cerca
+        self.assertAlmostEqual(estimar_filas(Tarea), 3 * N, delta=1)
+        Tarea.objects.filter(id__in=Tarea.objects.values('id')[:2]).delete()
+
+        with override_settings(PRODUCCION_CONTEO_ESTIMADO_DESDE=1):
+            # La estimación queda desactualizada hasta el próximo ANALYZE: es el precio de no contar
+            self.assertAlmostEqual(PaginadorEstimado(Tarea.objects.all(), 10).count, 3 * N, delta=1)
+            self.assertEqual(PaginadorEstimado(Tarea.objects.filter(estado='pendiente'), 10).count, 3 * N - 2)
+        self.assertEqual(PaginadorEstimado(Tarea.objects.all(), 10).count, 3 * N - 2)
+
+
+# ========== ACCIONES MASIVAS ==========
+class AccionesMasivasTests(TestCase):
+
+    def setUp(self):
+        sembrar(3)
+        self.etiquetas = list(Etiqueta.objects.order_by('id'))
+
+    def test_cambia_estado_y_etiquetas_con_conteos(self):
+        ids = list(Tarea.objects.values_list('id', flat=True)[:4])
+        resultado = aplicar(
+            seleccionar_tareas(ids=ids), estado='completada',
+            agregar_etiquetas=[self.etiquetas[2].pk], quitar_etiquetas=[self.etiquetas[0].pk],
+        )
+        self.assertEqual(resultado['seleccionadas'], 4)
+        self.assertEqual(resultado['actualizadas'], 4)
+        # Todas las tareas de sembrar() tienen la etiqueta 0
+        self.assertEqual(resultado['etiquetas_quitadas'], 4)
+        self.assertEqual(Tarea.objects.filter(id__in=ids, estado='completada').count(), 4)
+        self.assertFalse(Tarea.objects.filter(id__in=ids, etiquetas=self.etiquetas[0]).exists())
+        self.assertEqual(Tarea.objects.filter(id__in=ids, etiquetas=self.etiquetas[2]).count(), 4)
+
+        # Repetir el agregado no duplica filas ni las cuenta
+        resultado = aplicar(seleccionar_tareas(ids=ids), agregar_etiquetas=[self.etiquetas[2].pk])
+        self.assertEqual(resultado['etiquetas_agregadas'], 0)
+
+    def test_seleccion_por_filtros_fijada_antes_de_cambiar(self):
+        resultado = aplicar(seleccionar_tareas(filtros={'estado': 'pendiente'}), estado='completada')
+        self.assertEqual(resultado['actualizadas'], 9)
+        self.assertFalse(Tarea.objects.filter(estado='pendiente').exists())
+
+    def test_rechaza_seleccion_o_cambios_vacios(self):
+        with self.assertRaises(SeleccionInvalida):
+            seleccionar_tareas(filtros={})
+        with self.assertRaises(SeleccionInvalida):
+            aplicar(Tarea.objects.all())
+        with self.assertRaises(SeleccionInvalida):
+            aplicar(Tarea.objects.all(), estado='inexistente')
+
+    def test_api_con_csrf(self):
+        cliente = Client(enforce_csrf_checks=True)
+        url = reverse('api_acciones_tareas')
+        self.assertEqual(cliente.post(url, '{}', content_type='application/json').status_code, 403)
+
+        cliente.get(reverse('lista_tareas'))
+        token = cliente.cookies['csrftoken'].value
+        respuesta = cliente.post(
+            url, {'filtros': {'prioridad': 'alta'}, 'prioridad': 'baja'},
+            content_type='application/json', headers={'X-CSRFToken': token},
+        )
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta.json()['actualizadas'], 9)
+
+        respuesta = cliente.post(
+            url, {'ids': [1], 'estado': 'otro'},
+            content_type='application/json', headers={'X-CSRFToken': token},
+        )
+        self.assertEqual(respuesta.status_code, 400)
+
+
+# ========== AUTOCOMPLETADO ==========
+class AutocompletarTests(TestCase):
+
+    def setUp(self):
+        for indice in autocompletar.indices.values():
+            indice.invalidar()
+
+    def test_formulario_de_tamaño_constante(self):
+        sembrar(N)
+        antes = len(self.client.get(reverse('crear_tarea')).content)
+        sembrar(9 * N, N)
+        self.assertEqual(len(self.client.get(reverse('crear_tarea')).content), antes)
+
+        # Al editar solo aparecen las opciones elegidas: 3 estados + 3 prioridades
+        # + opción vacía y proyecto de la tarea + sus 3 etiquetas
+        tarea = Tarea.objects.filter(titulo__endswith='-2').first()
+        html = self.client.get(reverse('editar_tarea', args=[tarea.id])).content.decode()
+        self.assertEqual(html.count('<option'), 3 + 3 + 2 + 3)
+
+    def test_busqueda_por_prefijo_de_cualquier_palabra(self):
+        sembrar(2)
+        url = reverse('opciones_autocompletar', args=['proyectos'])
+        nombres = [r['nombre'] for r in self.client.get(url, {'q': 'NIVEL 1'}).json()['resultados']]
+        self.assertEqual(nombres, ['Proyecto nivel 1'])
+
+        # Las señales parchan el índice del proceso sin reconstruirlo
+        proyecto = Proyecto.objects.get(nombre='Proyecto nivel 1')
+        proyecto.nombre = 'Castillo Embrujado'
+        proyecto.save()
+        self.assertEqual(autocompletar.buscar('proyectos', 'embru'), [{'id': proyecto.id, 'nombre': 'Castillo Embrujado'}])
+        self.assertEqual(autocompletar.buscar('proyectos', 'proyecto nivel 1'), [])
+        proyecto.delete()
+        self.assertEqual(autocompletar.buscar('proyectos', 'castillo'), [])
+
+        self.assertEqual(self.client.get(reverse('opciones_autocompletar', args=['tareas'])).status_code, 404)
+
+    def test_valida_solo_los_ids_enviados(self):
+        sembrar(2)
+        proyecto = Proyecto.objects.first()
+        etiqueta = Etiqueta.objects.first()
+        datos = {
+            'titulo': 'Tarea desde autocompletado', 'descripcion': 'Prueba', 'estado': 'pendiente',
+            'prioridad': 'media', 'proyecto': proyecto.id, 'etiquetas': [etiqueta.id],
+        }
+        self.assertEqual(self.client.post(reverse('crear_tarea'), datos).status_code, 302)
+        tarea = Tarea.objects.get(titulo='Tarea desde autocompletado')
+        self.assertEqual(list(tarea.etiquetas.all()), [etiqueta])
+
+        datos['etiquetas'] = [999999]
+        respuesta = self.client.post(reverse('crear_tarea'), datos)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertIn('etiquetas', respuesta.context['form'].errors)
+
+
+# ========== ETIQUETAS POR NOMBRE NORMALIZADO ==========
+class EtiquetaNormalizadaTests(TestCase):
+
+    def test_unica_sin_distinguir_mayusculas_ni_espacios(self):
+        arte = Etiqueta.objects.create(nombre='Arte 2D')
+        self.assertEqual(arte.nombre_normalizado, 'arte 2d')
+        self.assertEqual(Etiqueta.objects.obtener_o_crear('  ARTE   2d '), (arte, False))
+
+        # La BD lo impide aunque no se pase por el formulario
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Etiqueta.objects.create(nombre='arte 2d')
+
+        form = EtiquetaForm({'nombre': 'arte  2D'})
+        self.assertFalse(form.is_valid())
+        self.assertTrue(EtiquetaForm({'nombre': 'arte 2D'}, instance=arte).is_valid())
+
+        sonido, creada = Etiqueta.objects.obtener_o_crear('Sonido  ambiente')
+        self.assertTrue(creada)
+        self.assertEqual(sonido.nombre, 'Sonido ambiente')
+
+    def test_trie_y_lista_ordenada_dan_lo_mismo(self):
+        nombres = [
+            'Arte', 'arte final', 'Árbol', 'Bug crítico', 'Bug', 'UI', 'Nivel jefe final',
+            'Final boss', 'Música', 'musica ambiente', 'Mundo abierto',
+        ]
+        for nombre in nombres:
+            Etiqueta.objects.create(nombre=nombre)
+        lista = autocompletar.IndicePrefijos(Etiqueta, 'nombre')
+        trie = autocompletar.TriePrefijos(Etiqueta, 'nombre')
+
+        def comparar():
+            for prefijo in ['', 'a', 'ar', 'arbol', 'bug', 'bug c', 'fin', 'mu', 'mus', 'x', 'final b']:
+                with self.subTest(prefijo=prefijo):
+                    self.assertEqual(trie.buscar(prefijo, 50), lista.buscar(prefijo, 50))
+
+        comparar()
+        self.assertEqual([r['nombre'] for r in trie.buscar('fin')], ['arte final', 'Nivel jefe final', 'Final boss'])
+
+        # Parches como los de las señales
+        bug = Etiqueta.objects.get(nombre='Bug')
+        for indice in (lista, trie):
+            indice.actualizar(bug.pk, 'Bloqueante')
+            indice.eliminar(Etiqueta.objects.get(nombre='UI').pk)
+        comparar()
+        self.assertEqual(trie.buscar('ui'), [])
+        self.assertEqual([r['nombre'] for r in trie.buscar('blo')], ['Bloqueante'])
+
+
+# ========== RESÚMENES POR PROYECTO ==========
+class ResumenesTests(TestCase):
+
+    def setUp(self):
+        sembrar(2)
+        self.proyecto, self.otro = Proyecto.objects.order_by('id')
+
+    def assertAlDia(self):
+        # Lo guardado coincide con el GROUP BY real (sin filas en cero que sobren)
+        for resumen in (ResumenTareas, ResumenAssets):
+            campos = ('proyecto_id', *resumen.CLAVE)
+            guardados = {
+                tuple(fila[:-1]): fila[-1]
+                for fila in resumen.objects.exclude(total=0).values_list(*campos, 'total')
+            }
+            self.assertEqual(guardados, resumen.contar())
+
+    def test_crear_editar_mover_y_eliminar(self):
+        self.assertAlDia()
+        tarea = Tarea.objects.filter(proyecto=self.proyecto).first()
+        tarea.estado = 'completada'
+        tarea.save()
+        self.assertAlDia()
+        self.assertEqual(progreso_de_proyectos([self.proyecto.pk])[self.proyecto.pk]['porcentaje'], 33)
+
+        tarea.proyecto = self.otro
+        tarea.prioridad = 'baja'
+        tarea.save()
+        self.assertAlDia()
+
+        # Cargada con only(): no se sabe qué había, se recuentan los proyectos
+        parcial = Tarea.objects.only('id', 'titulo').get(pk=tarea.pk)
+        parcial.estado = 'en_proceso'
+        parcial.save()
+        self.assertAlDia()
+
+        asset = Asset.objects.filter(proyecto=self.proyecto).first()
+        asset.tipo = 'audio'
+        asset.save()
+        Tarea.objects.get(pk=tarea.pk).delete()
+        self.assertAlDia()
+
+        progreso = progreso_de_proyectos([self.proyecto.pk])[self.proyecto.pk]
+        self.assertEqual(progreso['tareas'], 2)
+        self.assertEqual(progreso['assets_por_tipo'], {'sprite': 1, 'audio': 1, 'musica': 0, 'modelo3d': 0, 'otro': 0})
+
+    def test_se_descarta_con_la_transaccion(self):
+        tarea = Tarea.objects.first()
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            tarea.estado = 'completada'
+            tarea.save()
+            raise RuntimeError
+        self.assertAlDia()
+
+    def test_acciones_masivas_creacion_masiva_y_cascada(self):
+        ids = list(Tarea.objects.filter(proyecto=self.proyecto).values_list('id', flat=True)[:2])
+        aplicar(seleccionar_tareas(ids=ids), estado='completada', prioridad='media')
+        self.assertAlDia()
+
+        nuevas = [
+            Tarea(titulo=f'Masiva {i}', descripcion='', estado='en_proceso', proyecto=self.otro) for i in range(4)
+        ]
+        Tarea.objects.bulk_create(nuevas)
+        creacion_masiva.send(sender=Tarea, objetos=nuevas)
+        self.assertAlDia()
+
+        self.proyecto.delete()
+        self.assertFalse(ResumenTareas.objects.filter(proyecto_id=self.proyecto.pk).exists())
+        self.assertAlDia()
+
+    def test_cards_leen_del_resumen(self):
+        proyecto = Proyecto.objects.con_estadisticas().get(pk=self.proyecto.pk)
+        self.assertEqual((proyecto.num_tareas, proyecto.tareas_pendiente, proyecto.num_assets), (3, 3, 2))
+        # Las cards muestran lo que dice el resumen, aunque no coincida con las tareas
+        ResumenTareas.objects.filter(proyecto=self.proyecto).update(total=10)
+        proyecto = Proyecto.objects.con_estadisticas().get(pk=self.proyecto.pk)
+        self.assertEqual(proyecto.num_tareas, 10)
+
+    def test_reconstruir_resumenes(self):
+        ResumenTareas.objects.filter(proyecto=self.proyecto).update(total=10)
+        ResumenAssets.objects.filter(proyecto=self.otro).delete()
+        call_command('reconstruir_resumenes', stdout=StringIO())
+        self.assertAlDia()
+
+        salida = StringIO()
+        call_command('reconstruir_resumenes', stdout=salida)
+        self.assertIn('al día', salida.getvalue())
+
+    def test_api_progreso(self):
+        respuesta = self.client.get(reverse('api_proyectos'), {'fields': 'id,progreso'})
+        self.assertEqual(respuesta.status_code, 200)
+        progreso = {fila['id']: fila['progreso'] for fila in respuesta.json()['resultados']}
+        self.assertEqual(progreso[self.proyecto.pk]['tareas'], 3)
+        self.assertEqual(progreso[self.proyecto.pk]['por_estado']['pendiente'], 3)
+
+
+# ========== INSTANTÁNEAS DIARIAS ==========
+class InstantaneasTests(TestCase):
+
+    def setUp(self):
+        sembrar(2)
+        self.proyecto = Proyecto.objects.order_by('id').first()
+        self.hoy = date(2026, 3, 10)
+
+    def como_listas(self, matriz):
+        return matriz.tolist() if instantaneas.numpy is not None else matriz
+
+    def test_empaquetado(self):
+        conteos = {('pendiente', 'alta'): 3, ('completada', 'baja'): 70000}
+        datos = instantaneas.empaquetar(conteos)
+        self.assertEqual(len(datos), 36)
+        valores = dict(zip(instantaneas.COLUMNAS, instantaneas.desempaquetar(datos)))
+        self.assertEqual(valores[('pendiente', 'alta')], 3)
+        self.assertEqual(valores[('completada', 'baja')], 70000)
+        self.assertEqual(sum(valores.values()), 70003)
+
+    def test_tomar_reemplaza_la_foto_del_dia(self):
+        self.assertEqual(instantaneas.tomar(self.hoy), 2)
+        tarea = Tarea.objects.filter(proyecto=self.proyecto).first()
+        tarea.estado = 'completada'
+        tarea.save()
+        instantaneas.tomar(self.hoy)
+        self.assertEqual(InstantaneaDiaria.objects.filter(fecha=self.hoy).count(), 2)
+
+        columnas, valores = instantaneas.serie(self.proyecto.pk, self.hoy, self.hoy, por='estado')
+        self.assertEqual(columnas, ['pendiente', 'en_proceso', 'completada'])
+        self.assertEqual(self.como_listas(valores), [[2, 0, 1]])
+
+    def test_tomar_segun_el_motor(self):
+        instantaneas.tomar(self.hoy)
+        with CaptureQueriesContext(connection) as consultas:
+            instantaneas.tomar(self.hoy)
+        sql = ' '.join(consulta['sql'].upper() for consulta in consultas)
+        if connection.features.supports_update_conflicts_with_target:
+            self.assertIn('ON CONFLICT', sql)
+        elif connection.features.supports_update_conflicts:
+            self.assertIn('ON DUPLICATE KEY UPDATE', sql)
+        else:
+            self.assertIn('DELETE', sql)
+
+        # Sin upsert: borra la foto del día y la vuelve a insertar
+        with mock.patch.object(
+            type(connection.features), 'supports_update_conflicts', new_callable=mock.PropertyMock,
+            return_value=False,
+        ):
+            Tarea.objects.filter(proyecto=self.proyecto).update(estado='completada')
+            ResumenTareas.recalcular([self.proyecto.pk])
+            self.assertEqual(instantaneas.tomar(self.hoy), 2)
+        self.assertEqual(InstantaneaDiaria.objects.filter(fecha=self.hoy).count(), 2)
+        _, valores = instantaneas.serie(self.proyecto.pk, self.hoy, self.hoy, por='estado')
+        self.assertEqual(self.como_listas(valores), [[0, 0, 3]])
+
+    def test_serie_repite_el_ultimo_dia_con_foto(self):
+        instantaneas.tomar(self.hoy - timedelta(days=5))
+        Tarea.objects.filter(proyecto=self.proyecto).update(estado='completada')
+        ResumenTareas.recalcular([self.proyecto.pk])
+        instantaneas.tomar(self.hoy - timedelta(days=2))
+
+        columnas, valores = instantaneas.serie(
+            self.proyecto.pk, self.hoy - timedelta(days=7), self.hoy - timedelta(days=1), por='estado',
+        )
+        self.assertEqual(self.como_listas(valores), [
+            [0, 0, 0], [0, 0, 0],                # antes de la primera foto
+            [3, 0, 0], [3, 0, 0], [3, 0, 0],     # la foto del día -5, repetida
+            [0, 0, 3], [0, 0, 3],
+        ])
+        # Un rango que empieza después de la última foto arranca desde ella
+        _, valores = instantaneas.serie(self.proyecto.pk, self.hoy, self.hoy)
+        fila = self.como_listas(valores)[0]
+        self.assertEqual(fila[instantaneas.COLUMNAS.index(('completada', 'alta'))], 3)
+
+        with self.assertRaises(ValueError):
+            instantaneas.serie(self.proyecto.pk, self.hoy, self.hoy - timedelta(days=1))
+
+    def test_api_serie(self):
+        instantaneas.tomar(self.hoy)
+        url = reverse('api_serie_proyecto', args=[self.proyecto.pk])
+        datos = self.client.get(url, {'desde': '2026-03-09', 'hasta': '2026-03-10', 'por': 'prioridad'}).json()
+        self.assertEqual(datos['columnas'], ['baja', 'media', 'alta'])
+        self.assertEqual(datos['valores'], [[0, 0, 0], [0, 0, 3]])
+
+        self.assertEqual(self.client.get(url, {'desde': 'ayer'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'por': 'color'}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('api_serie_proyecto', args=[999])).status_code, 404)
+
+
+# ========== REGISTRO DE ACTIVIDAD ==========
+@override_settings(PRODUCCION_ACTIVIDAD_ASINCRONA=False)
+class ActividadTests(TestCase):
+
+    def setUp(self):
+        sembrar(2)
+        self.proyecto, self.otro = Proyecto.objects.order_by('id')
+        self.tarea = Tarea.objects.filter(proyecto=self.proyecto).order_by('id').first()
+
+    def test_edicion_desde_la_vista_con_usuario(self):
+        usuario = get_user_model().objects.create_user('ana', password='clave-segura')
+        self.client.force_login(usuario)
+        etiquetas = list(Etiqueta.objects.order_by('id'))
+        with self.captureOnCommitCallbacks(execute=True):
+            respuesta = self.client.post(reverse('editar_tarea', args=[self.tarea.pk]), {
+                'titulo': self.tarea.titulo, 'descripcion': self.tarea.descripcion,
+                'estado': 'completada', 'prioridad': 'alta', 'proyecto': self.otro.pk,
+                'etiquetas': [etiquetas[1].pk],
+            })
+        self.assertEqual(respuesta.status_code, 302)
+
+        eventos = list(Actividad.objects.de_objeto('tarea', self.tarea.pk).order_by('id'))
+        self.assertEqual([e.accion for e in eventos], ['editar', 'editar', 'editar'])
+        self.assertEqual(eventos[0].usuario_id, usuario.pk)
+        self.assertEqual(eventos[0].proyecto_id, self.otro.pk)
+        self.assertEqual(eventos[0].cambios, {
+            'estado': ['pendiente', 'completada'], 'proyecto_id': [self.proyecto.pk, self.otro.pk],
+        })
+        # sembrar() le puso la etiqueta 0 a la primera tarea; set() quita y después agrega
+        self.assertEqual(eventos[1].cambios, {'etiquetas': {'agregadas': [], 'quitadas': [etiquetas[0].pk]}})
+        self.assertEqual(eventos[2].cambios, {'etiquetas': {'agregadas': [etiquetas[1].pk], 'quitadas': []}})
+
+    def test_crear_eliminar_y_cascada(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            tarea = Tarea.objects.create(titulo='Nueva', descripcion='', proyecto=self.proyecto)
+            tarea_id, otro_id = tarea.pk, self.otro.pk
+            tarea.delete()
+            self.otro.delete()
+        self.assertEqual(
+            list(Actividad.objects.de_objeto('tarea', tarea_id).values_list('accion', flat=True)),
+            ['eliminar', 'crear'],
+        )
+        # Del proyecto borrado queda un solo evento, no uno por cada hijo
+        self.assertEqual(
+            list(Actividad.objects.de_proyecto(otro_id).values_list('tipo', 'accion')),
+            [('proyecto', 'eliminar')],
+        )
+
+    def test_sin_commit_no_se_registra(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(RuntimeError), transaction.atomic():
+                self.tarea.estado = 'completada'
+                self.tarea.save()
+                raise RuntimeError
+        self.assertFalse(Actividad.objects.exists())
+
+    def test_acciones_masivas(self):
+        ids = list(Tarea.objects.filter(proyecto=self.proyecto).values_list('id', flat=True))
+        Tarea.objects.filter(id=ids[0]).update(estado='completada')
+        with self.captureOnCommitCallbacks(execute=True):
+            aplicar(seleccionar_tareas(ids=ids), estado='completada')
+        # La que ya estaba completada no cambió
+        self.assertEqual(Actividad.objects.filter(objeto_id__in=ids).count(), 2)
+
+    def test_buffer_por_lotes(self):
+        buffer = actividad.BufferActividad()
+        buffer._asegurar_hilo = lambda: None
+        eventos = [actividad.evento(self.tarea, 'editar', {'estado': ['a', 'b']}) for _ in range(3)]
+        with override_settings(PRODUCCION_ACTIVIDAD_ASINCRONA=True, PRODUCCION_ACTIVIDAD_LOTE=2):
+            buffer.agregar(eventos[:1])
+            self.assertFalse(buffer._despertar.is_set())
+            buffer.agregar(eventos[1:])
+            self.assertTrue(buffer._despertar.is_set())   # lote lleno: el hilo escribe ya
+        self.assertFalse(Actividad.objects.exists())
+
+        # Si la BD falla los eventos vuelven al buffer, hasta el máximo
+        with override_settings(PRODUCCION_ACTIVIDAD_MAXIMO=2), \
+                mock.patch.object(Actividad.objects, 'bulk_create', side_effect=DatabaseError), \
+                self.assertLogs('produccion.actividad', 'ERROR'):
+            self.assertEqual(buffer.vaciar(), 0)
+        self.assertEqual(buffer.vaciar(), 2)
+        self.assertEqual(Actividad.objects.count(), 2)
+
+    def test_api_por_tarea(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.tarea.prioridad = 'baja'
+            self.tarea.save()
+        datos = self.client.get(reverse('api_actividad'), {'tarea': self.tarea.pk}).json()
+        self.assertEqual([fila['cambios'] for fila in datos['resultados']], [{'prioridad': ['alta', 'baja']}])
+        self.assertEqual(self.client.get(reverse('api_actividad'), {'tarea': 999}).json()['resultados'], [])
+
+    def evento_viejo(self, dias, minutos, cambios, accion='editar', tarea=None):
+        tarea = tarea or self.tarea
+        return Actividad.objects.create(
+            fecha=timezone.now() - timedelta(days=dias, minutes=-minutos), proyecto_id=tarea.proyecto_id,
+            tipo='tarea', objeto_id=tarea.pk, accion=accion, descripcion=tarea.titulo, cambios=cambios,
+        )
+
+    def test_compactar(self):
+        vencido = self.evento_viejo(400, 0, {'estado': ['pendiente', 'en_proceso']})
+        self.evento_viejo(60, 0, {'estado': ['pendiente', 'en_proceso']})
+        self.evento_viejo(60, 10, {'estado': ['en_proceso', 'completada'], 'etiquetas': {'agregadas': [1], 'quitadas': []}})
+        self.evento_viejo(60, 20, {'etiquetas': {'agregadas': [], 'quitadas': [1]}})
+        self.evento_viejo(60, 200, {'prioridad': ['alta', 'baja']})   # fuera de la ventana
+        reciente = self.evento_viejo(1, 0, {'estado': ['completada', 'pendiente']})
+
+        call_command('compactar_actividad', stdout=StringIO())
+        filas = list(Actividad.objects.order_by('fecha').values_list('id', 'cambios'))
+        self.assertNotIn(vencido.pk, [pk for pk, _ in filas])
+        self.assertEqual([cambios for _, cambios in filas], [
+            {'estado': ['pendiente', 'completada']},
+            {'prioridad': ['alta', 'baja']},
+            reciente.cambios,
+        ])
+
+    def test_reconstruir_instantaneas(self):
+        # Hace 3 días la tarea pasó a en_proceso y hace 1 día a completada
+        ahora = {'estado': 'completada'}
+        Tarea.objects.filter(pk=self.tarea.pk).update(**ahora)
+        ResumenTareas.recalcular([self.proyecto.pk])
+        self.evento_viejo(3, 0, {'estado': ['pendiente', 'en_proceso']})
+        self.evento_viejo(1, 0, {'estado': ['en_proceso', 'completada']})
+        # Una tarea creada hace 2 días y ya borrada
+        borrada = Tarea(pk=9999, titulo='Borrada', proyecto_id=self.proyecto.pk)
+        self.evento_viejo(2, 0, {'proyecto_id': [None, self.proyecto.pk], 'estado': [None, 'pendiente'],
+                                 'prioridad': [None, 'alta']}, accion='crear', tarea=borrada)
+        self.evento_viejo(0, -1, {'proyecto_id': [self.proyecto.pk, None], 'estado': ['pendiente', None],
+                                  'prioridad': ['alta', None]}, accion='eliminar', tarea=borrada)
+
+        hoy = timezone.localdate()
+        instantaneas.reconstruir(hoy - timedelta(days=4))
+        _, valores = instantaneas.serie(self.proyecto.pk, hoy - timedelta(days=4), hoy - timedelta(days=1), por='estado')
+        valores = valores.tolist() if instantaneas.numpy is not None else valores
+        self.assertEqual(valores, [
+            [3, 0, 0],
+            [2, 1, 0],
+            [3, 1, 0],
+            [3, 0, 1],
+        ])
+
+
+@override_settings(PRODUCCION_ACTIVIDAD_ASINCRONA=False)
+class EliminacionPendienteTests(TestCase):
+
+    def setUp(self):
+        sembrar(2)
+        self.proyecto, self.otro = Proyecto.objects.order_by('id')
+
+    def test_marcar_oculta_y_el_comando_borra_por_lotes(self):
+        usuario = get_user_model().objects.create_user('ana', password='clave-segura')
+        self.client.force_login(usuario)
+        with self.captureOnCommitCallbacks(execute=True):
+            respuesta = self.client.post(reverse('eliminar_proyecto', args=[self.proyecto.pk]))
+        self.assertRedirects(respuesta, reverse('lista_proyectos'))
+
+        # Oculto en el acto, pero sus hijos todavía están
+        self.assertEqual(self.client.get(reverse('detalle_proyecto', args=[self.proyecto.pk])).status_code, 404)
+        self.assertNotContains(self.client.get(reverse('lista_proyectos')), self.proyecto.nombre)
+        ids = [fila['id'] for fila in self.client.get(reverse('api_proyectos')).json()['resultados']]
+        self.assertEqual(ids, [self.otro.pk])
+        self.assertEqual([o['id'] for o in autocompletar.buscar('proyectos', 'proyecto')], [self.otro.pk])
+        self.assertEqual(Tarea.objects.filter(proyecto=self.proyecto).count(), 3)
+
+        salida = StringIO()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('eliminar_proyectos_pendientes', lote=2, stdout=salida)
+        self.assertIn('tareas 2/3', salida.getvalue())
+        self.assertIn('tareas 3/3', salida.getvalue())
+        self.assertIn('1 proyectos eliminados', salida.getvalue())
+
+        self.assertFalse(Proyecto.objects.filter(pk=self.proyecto.pk).exists())
+        self.assertEqual(Tarea.objects.count(), 3)
+        self.assertEqual(Asset.objects.count(), 2)
+        self.assertEqual(Tarea.etiquetas.through.objects.count(), 5)
+        self.assertFalse(ResumenTareas.objects.filter(proyecto_id=self.proyecto.pk).exists())
+        contador = ContadorGlobal.obtener()
+        self.assertEqual((contador.proyectos, contador.tareas, contador.assets), (1, 3, 2))
+        # Un solo evento, con el usuario que pidió el borrado
+        eventos = list(Actividad.objects.de_proyecto(self.proyecto.pk).values_list('tipo', 'accion', 'usuario_id'))
+        self.assertEqual(eventos, [('proyecto', 'eliminar', usuario.pk)])
+
+    def test_marcar_oculta_sus_tareas_y_assets(self):
+        tareas = list(self.proyecto.tareas.values_list('id', flat=True))
+        asset = self.proyecto.assets.first()
+        eliminacion.marcar(self.proyecto)
+
+        for nombre, params in [('lista_tareas', {}), ('lista_tareas', {'estado': 'pendiente'}),
+                               ('exportar_tareas', {'formato': 'csv'})]:
+            with self.subTest(ruta=nombre, params=params):
+                respuesta = self.client.get(reverse(nombre), params)
+                contenido = b''.join(respuesta.streaming_content) if respuesta.streaming else respuesta.content
+                self.assertNotIn(b'Tarea nivel 0-', contenido)
+                self.assertIn(b'Tarea nivel 1-', contenido)
+        for nombre, params in [('lista_assets', {}), ('lista_assets', {'tipo': 'sprite'}),
+                               ('exportar_assets', {'formato': 'ndjson'})]:
+            with self.subTest(ruta=nombre, params=params):
+                respuesta = self.client.get(reverse(nombre), params)
+                contenido = b''.join(respuesta.streaming_content) if respuesta.streaming else respuesta.content
+                self.assertNotIn(b'Asset nivel 0-', contenido)
+                self.assertIn(b'Asset nivel 1-', contenido)
+
+        for recurso, hijos in [('tareas', set(tareas)), ('assets', {asset.pk})]:
+            with self.subTest(api=recurso):
+                ids = {fila['id'] for fila in self.client.get(reverse(f'api_{recurso}')).json()['resultados']}
+                self.assertFalse(ids & hijos)
+                self.assertEqual(self.client.get(reverse(f'api_{recurso[:-1]}', args=[min(hijos)])).status_code, 404)
+
+        encontrados = {(r['tipo'], r['id']) for r in busqueda.buscar('nivel')}
+        self.assertTrue(encontrados)
+        self.assertFalse(encontrados & ({('tarea', pk) for pk in tareas} | {('asset', asset.pk)}))
+        self.assertFalse(set(seleccionar_tareas(ids=tareas).values_list('id', flat=True)))
+        self.assertEqual(self.client.get(reverse('editar_tarea', args=[tareas[0]])).status_code, 404)
+
+    def test_acciones_masivas_no_tocan_un_proyecto_marcado_despues_de_elegir(self):
+        tareas = seleccionar_tareas(ids=list(Tarea.objects.values_list('id', flat=True)))
+        # El proyecto se marca después de fijar la selección, antes de bloquear las filas
+        bloquear = acciones_masivas._bloquear
+
+        def marcar_y_bloquear(lote):
+            if not Proyecto.objects.filter(pk=self.proyecto.pk, pendiente_eliminacion=True).exists():
+                eliminacion.marcar(self.proyecto)
+            return bloquear(lote)
+
+        with mock.patch.object(acciones_masivas, '_bloquear', side_effect=marcar_y_bloquear):
+            resultado = aplicar(tareas, estado='completada')
+        self.assertEqual(resultado['actualizadas'], 3)
+        self.assertFalse(self.proyecto.tareas.filter(estado='completada').exists())
+
+    def test_retoma_despues_de_un_corte(self):
+        eliminacion.marcar(self.proyecto)
+        # El proceso muere después de borrar las tareas, antes del primer lote de assets
+        borrar_lote = eliminacion._borrar_lote
+
+        def cortar(modelo, *args):
+            if modelo is Asset:
+                raise RuntimeError
+            return borrar_lote(modelo, *args)
+
+        with mock.patch.object(eliminacion, '_borrar_lote', side_effect=cortar), self.assertRaises(RuntimeError):
+            eliminacion.eliminar_pendientes(lote=2)
+        self.assertTrue(Proyecto.objects.filter(pk=self.proyecto.pk, pendiente_eliminacion=True).exists())
+        self.assertEqual(Tarea.objects.filter(proyecto=self.proyecto).count(), 0)
+
+        self.assertEqual(eliminacion.eliminar_pendientes(lote=2), 1)
+        self.assertFalse(Proyecto.objects.filter(pk=self.proyecto.pk).exists())
+        self.assertFalse(Asset.objects.filter(proyecto_id=self.proyecto.pk).exists())
+        self.assertEqual(eliminacion.eliminar_pendientes(), 0)
+
+
+class ArchivosTests(TestCase):
+
+    def setUp(self):
+        directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directorio)
+        ajustes = override_settings(PRODUCCION_ARCHIVOS_DIR=directorio, PRODUCCION_ARCHIVOS_TROZO=4)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+        sembrar(1)
+        self.asset, self.otro = Asset.objects.order_by('id')
+        self.contenido = b'sprite de 10'
+
+    def iniciar(self, **datos):
+        datos = {'nombre': 'heroe.png', 'tamaño': len(self.contenido), 'tipo_mime': 'image/png', **datos}
+        return self.client.post(reverse('api_subidas'), json.dumps(datos), content_type='application/json')
+
+    def trozo(self, url, inicio, fin):
+        return self.client.put(
+            url, self.contenido[inicio:fin], content_type='application/octet-stream',
+            HTTP_CONTENT_RANGE=f'bytes {inicio}-{fin - 1}/{len(self.contenido)}',
+        )
+
+    def test_subida_por_trozos_reanudable_y_deduplicada(self):
+        subida = self.iniciar(asset=self.asset.pk).json()
+        self.assertEqual((subida['recibido'], subida['tamaño_trozo'], subida['completa']), (0, 4, False))
+
+        self.assertEqual(self.trozo(subida['url'], 0, 4).json()['recibido'], 4)
+        # Un trozo repetido o salteado no se escribe: el servidor dice desde dónde seguir
+        respuesta = self.trozo(subida['url'], 8, 12)
+        self.assertEqual((respuesta.status_code, respuesta.json()['recibido']), (409, 4))
+        # Otro worker (o un reinicio) sin el hash en memoria: lo rehace desde el disco
+        almacen.hashes_en_curso.quitar(Subida.objects.get().pk)
+        self.assertEqual(self.client.get(subida['url']).json()['recibido'], 4)
+        self.trozo(subida['url'], 4, 8)
+        final = self.trozo(subida['url'], 8, 12).json()
+
+        sha256 = hashlib.sha256(self.contenido).hexdigest()
+        self.assertEqual((final['completa'], final['sha256'], final['deduplicada']), (True, sha256, False))
+        with open(almacen.ruta(sha256), 'rb') as guardado:
+            self.assertEqual(guardado.read(), self.contenido)
+        self.asset.refresh_from_db()
+        self.assertEqual((self.asset.archivo.sha256, self.asset.nombre_archivo), (sha256, 'heroe.png'))
+
+        # El mismo contenido para otro asset se transfiere igual (un sha256 no
+        # prueba tenerlo) y se deduplica recién al terminar
+        otra = self.iniciar(asset=self.otro.pk, nombre='copia.png', sha256=sha256).json()
+        self.assertFalse(otra['completa'])
+        for inicio in range(0, len(self.contenido), 4):
+            otra = self.trozo(otra['url'], inicio, inicio + 4).json()
+        self.assertEqual((otra['completa'], otra['sha256'], otra['deduplicada']), (True, sha256, True))
+        self.otro.refresh_from_db()
+        self.assertEqual(self.otro.archivo_id, self.asset.archivo_id)
+        self.assertEqual(Archivo.objects.count(), 1)
+        self.assertFalse(os.listdir(os.path.join(almacen.directorio(), 'parciales')))
+
+    def test_validaciones(self):
+        self.assertEqual(self.iniciar(tamaño=0).status_code, 400)
+        self.assertEqual(self.iniciar(asset=999999).status_code, 400)
+        subida = self.iniciar().json()
+        respuesta = self.client.put(subida['url'], b'x' * 20, content_type='application/octet-stream',
+                                    HTTP_CONTENT_RANGE=f'bytes 0-19/{len(self.contenido)}')
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertEqual(self.client.put(subida['url'], b'abcd').status_code, 400)  # sin Content-Range
+
+    def test_formulario_sin_js_y_estadisticas(self):
+        datos = {'nombre': self.asset.nombre, 'tipo': 'sprite', 'descripcion': '', 'proyecto': self.asset.proyecto_id}
+        for asset in (self.asset, self.otro):
+            respuesta = self.client.post(reverse('editar_asset', args=[asset.pk]), {
+                **datos, 'archivo_nuevo': SimpleUploadedFile('fondo.png', self.contenido, 'image/png'),
+            })
+            self.assertEqual(respuesta.status_code, 302)
+        self.asset.refresh_from_db()
+        self.otro.refresh_from_db()
+        self.assertEqual(self.asset.archivo_id, self.otro.archivo_id)
+        self.assertEqual(self.asset.nombre_archivo, 'fondo.png')
+
+        salida = StringIO()
+        call_command('estadisticas_archivos', stdout=salida)
+        self.assertIn('Almacén: 1 archivos, 12.0 B en disco', salida.getvalue())
+        self.assertIn('Deduplicación: 2.00x', salida.getvalue())
+
+        # Sin assets y viejo: limpiar_archivos lo borra de la BD y del disco
+        archivo = self.asset.archivo
+        Asset.objects.filter(archivo=archivo).update(archivo=None)
+        call_command('limpiar_archivos', stdout=StringIO())
+        self.assertTrue(Archivo.objects.exists())   # recién subido: se respeta
+        os.utime(almacen.ruta(archivo.sha256), (0, 0))
+        call_command('limpiar_archivos', stdout=StringIO())
+        self.assertFalse(Archivo.objects.exists())
+        self.assertFalse(os.path.exists(almacen.ruta(archivo.sha256)))
+
+    def test_descarga_con_rangos_y_etag(self):
+        self.asset.archivo, _ = almacen.guardar([self.contenido], 'image/png')
+        self.asset.nombre_archivo = 'héroe.png'
+        self.asset.save()
+        url = reverse('descargar_asset', args=[self.asset.pk])
+        etag = f'"{self.asset.archivo.sha256}"'
+
+        respuesta = self.client.get(url)
+        self.assertEqual((respuesta.status_code, respuesta['ETag'], respuesta['Content-Type']), (200, etag, 'image/png'))
+        self.assertEqual(b''.join(respuesta.streaming_content), self.contenido)
+        self.assertIn("filename*=utf-8''h%C3%A9roe.png", respuesta['Content-Disposition'])
+
+        for rango, esperado, contenido_rango in [
+            ('bytes=0-5', 'bytes 0-5/12', b'sprite'), ('bytes=7-', 'bytes 7-11/12', b'de 10'),
+            ('bytes=-2', 'bytes 10-11/12', b'10'), ('bytes=10-99', 'bytes 10-11/12', b'10'),
+        ]:
+            respuesta = self.client.get(url, HTTP_RANGE=rango)
+            self.assertEqual((respuesta.status_code, respuesta['Content-Range']), (206, esperado))
+            self.assertEqual(int(respuesta['Content-Length']), len(contenido_rango))
+            self.assertEqual(b''.join(respuesta.streaming_content), contenido_rango)
+        self.assertEqual(self.client.get(url, HTTP_RANGE='bytes=12-').status_code, 416)
+        # Varios rangos o If-Range de otra versión: el archivo entero
+        self.assertEqual(self.client.get(url, HTTP_RANGE='bytes=0-1,4-5').status_code, 200)
+        self.assertEqual(self.client.get(url, HTTP_RANGE='bytes=0-1', HTTP_IF_RANGE='"otro"').status_code, 200)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        with override_settings(PRODUCCION_DESCARGAS_MODO='x-accel'):
+            respuesta = self.client.get(url)
+        sha256 = self.asset.archivo.sha256
+        self.assertEqual(respuesta['X-Accel-Redirect'], f'/archivos-internos/{sha256[:2]}/{sha256[2:4]}/{sha256}')
+        self.assertEqual(respuesta.content, b'')
+        self.assertEqual(self.client.get(reverse('descargar_asset', args=[self.otro.pk])).status_code, 404)
+        self.assertEqual(self.client.post(url).status_code, 405)
+
+
+class DerivadosTests(TestCase):
+
+    def setUp(self):
+        directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directorio)
+        ajustes = override_settings(
+            PRODUCCION_ARCHIVOS_DIR=os.path.join(directorio, 'archivos'),
+            PRODUCCION_DERIVADOS_DIR=os.path.join(directorio, 'derivados'),
+            PRODUCCION_DERIVADOS_PROCESOS=0,
+        )
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+        self.directorio = directorio
+
+    def guardar(self, contenido):
+        archivo, _ = almacen.guardar([contenido])
+        return archivo.sha256
+
+    def png(self, ancho, alto):
+        salida = BytesIO()
+        Image.new('RGBA', (ancho, alto), (200, 30, 30, 255)).save(salida, 'PNG')
+        return salida.getvalue()
+
+    def wav(self):
+        salida = BytesIO()
+        with wave.open(salida, 'wb') as audio:
+            audio.setnchannels(1)
+            audio.setsampwidth(2)
+            audio.setframerate(8000)
+            audio.writeframes(b''.join(struct.pack('<h', (i * 997) % 20000 - 10000) for i in range(4000)))
+        return salida.getvalue()
+
+    def test_generadores(self):
+        cubo = b''.join(f'v {x} {y} {z}\n'.encode() for x in (0, 1) for y in (0, 1) for z in (0, 1))
+        casos = [('miniatura', self.png(1000, 500), (512, 256)), ('onda', self.wav(), (512, 128)),
+                 ('modelo', cubo + b'f 1 2 3\n', (512, 512))]
+        for tipo, contenido, mayor in casos:
+            sha256 = self.guardar(contenido)
+            destinos = derivados.destinos(sha256, tipo)
+            escritos = generar(tipo, almacen.ruta(sha256), destinos, derivados.ruta_fallo(sha256, tipo))
+            self.assertEqual(escritos, sum(os.path.getsize(ruta) for ruta in destinos.values()))
+            with Image.open(destinos[512]) as imagen:
+                self.assertEqual(imagen.size, mayor)
+            with Image.open(destinos[128]) as imagen:
+                self.assertEqual(max(imagen.size), 128)
+            self.assertTrue(derivados.completo(sha256, tipo))
+
+        # Un archivo que no es del formato esperado deja la marca de fallo en vez de reintentarse
+        sha256 = self.guardar(b'no es un wav')
+        self.assertEqual(generar('onda', almacen.ruta(sha256), derivados.destinos(sha256, 'onda'),
+                                 derivados.ruta_fallo(sha256, 'onda')), 0)
+        self.assertTrue(os.path.exists(derivados.ruta_fallo(sha256, 'onda')))
+        self.assertTrue(derivados.completo(sha256, 'onda'))
+
+    def test_vista_comando_y_detalle(self):
+        sembrar(1)
+        asset = Asset.objects.order_by('id').first()
+        sha256 = self.guardar(self.png(64, 64))
+        asset.archivo = Archivo.objects.get(sha256=sha256)
+        asset.save()
+        url = reverse('derivado', args=[sha256, 'miniatura', 256])
+
+        # Todavía sin generar: imagen genérica (el pool está desactivado en el test)
+        self.assertRedirects(self.client.get(url), static('produccion/img/vista_previa.svg'),
+                             fetch_redirect_response=False)
+        self.assertEqual(self.client.get(reverse('derivado', args=['0' * 64, 'miniatura', 256])).status_code, 404)
+        self.assertEqual(self.client.get(reverse('derivado', args=[sha256, 'miniatura', 100])).status_code, 404)
+
+        salida = StringIO()
+        call_command('generar_derivados', procesos=1, stdout=salida)
+        self.assertIn('1 archivos con vista previa', salida.getvalue())
+        respuesta = self.client.get(url)
+        self.assertEqual((respuesta.status_code, respuesta['Content-Type']), (200, 'image/png'))
+        self.assertIn('immutable', respuesta['Cache-Control'])
+        self.assertEqual(b''.join(respuesta.streaming_content)[:8], b'\x89PNG\r\n\x1a\n')
+        call_command('generar_derivados', procesos=1, stdout=salida)
+        self.assertIn('No hay vistas previas pendientes.', salida.getvalue())
+
+        self.assertContains(self.client.get(reverse('detalle_proyecto', args=[asset.proyecto_id])), url)
+
+    def test_poda_lru(self):
+        carpeta = os.path.join(derivados.directorio(), 'ab')
+        os.makedirs(carpeta)
+        for i in range(10):
+            ruta = os.path.join(carpeta, f'{i}.png')
+            with open(ruta, 'wb') as archivo:
+                archivo.write(b'x' * 100)
+            os.utime(ruta, (1000 + i, 1000 + i))
+        # Servir un derivado lo renueva: queda entre los que se conservan
+        derivados.cache.renovar(os.path.join(carpeta, '0.png'))
+
+        self.assertEqual(derivados.cache.podar(maximo=500), 600)
+        self.assertEqual(sorted(os.listdir(carpeta)), ['0.png', '7.png', '8.png', '9.png'])
+        self.assertEqual(derivados.cache.podar(maximo=500), 0)
+
+
+@override_settings(PRODUCCION_REPLICAS={'replica': 1, 'otra': 2}, PRODUCCION_REPLICAS_FIJAR_SEGUNDOS=7)
+class ReplicasTests(SimpleTestCase):
+    # Sin BD: solo qué alias elige el router (QuerySet.db no consulta)
+
+    def setUp(self):
+        self.estado = replicas.EstadoReplicas()
+        for parche in (mock.patch.object(replicas, 'estado', self.estado),
+                       mock.patch.object(self.estado, 'sanas', return_value={'replica': 1})):
+            parche.start()
+            self.addCleanup(parche.stop)
+
+    def pasar(self, metodo, vista, cookies=None, escribir=False):
+        vistos = []
+
+        def vista_simulada(request):
+            middleware.process_view(request, vista, (), {})
+            vistos.append(Tarea.objects.all().db)
+            if escribir:
+                replicas.RouterReplicas().db_for_write(Tarea)
+            vistos.append(Tarea.objects.all().db)
+            vistos.append(get_user_model().objects.all().db)
+            return HttpResponse()
+
+        middleware = replicas.ReplicasMiddleware(vista_simulada)
+        request = getattr(RequestFactory(), metodo)('/')
+        request.COOKIES.update(cookies or {})
+        return vistos, middleware(request)
+
+    def test_lecturas_a_la_replica_y_escrituras_fijan_la_primaria(self):
+        vistos, _ = self.pasar('get', views.lista_proyectos)
+        self.assertEqual(vistos, ['replica', 'replica', 'default'])   # usuarios: siempre la primaria
+        self.assertEqual(Tarea.objects.all().db, 'default')            # fuera de la petición
+        self.assertEqual(self.estado.en_uso['replica'], 0)
+
+        # Una lectura que escribe sigue leyendo de la primaria
+        self.assertEqual(self.pasar('get', views.lista_proyectos, escribir=True)[0][:2], ['replica', 'default'])
+        self.assertEqual(self.pasar('get', admin.site.index)[0][0], 'default')
+
+        vistos, respuesta = self.pasar('post', views.crear_proyecto)
+        self.assertEqual(vistos[0], 'default')
+        self.assertEqual(respuesta.cookies[replicas.COOKIE_PRIMARIA]['max-age'], 7)
+        vistos, _ = self.pasar('get', views.lista_proyectos, cookies={replicas.COOKIE_PRIMARIA: '1'})
+        self.assertEqual(vistos[0], 'default')
+
+        # En una transacción abierta se lee de la primaria
+        with mock.patch.object(connections['default'], 'in_atomic_block', True):
+            replicas.replica_actual.set('replica')
+            self.addCleanup(replicas.replica_actual.set, None)
+            self.assertEqual(Tarea.objects.all().db, 'default')
+
+    @override_settings(PRODUCCION_REPLICAS_SELECCION='menos_conexiones')
+    def test_menos_conexiones_relativo_al_peso(self):
+        self.estado.sanas.return_value = {'replica': 1, 'otra': 2}
+        self.estado.en_uso.update({'replica': 1, 'otra': 3})
+        self.assertEqual(self.estado.tomar(), 'replica')   # 1/1 contra 3/2
+        self.assertEqual(self.estado.tomar(), 'otra')      # 2/1 contra 3/2
+        self.assertEqual(dict(self.estado.en_uso), {'replica': 2, 'otra': 4})
+
+
+@override_settings(PRODUCCION_REPLICAS={'lenta': 1, 'caida': 1, 'sana': 1}, PRODUCCION_REPLICAS_RETRASO_MAXIMO=5)
+class ChequeoReplicasTests(TestCase):
+
+    def test_retraso_y_expulsion(self):
+        hace_un_rato = timezone.now() - timedelta(minutes=1)
+        Latido.objects.create(pk=1, fecha=hace_un_rato)
+        # Con el último latido de la primaria, al día; sin él, atrasa desde el que tiene
+        self.assertEqual(replicas.medir_retraso('default', hace_un_rato, timezone.now()), 0)
+        retraso = replicas.medir_retraso('default', timezone.now(), timezone.now())
+        self.assertAlmostEqual(retraso, 60, delta=5)
+
+        estado = replicas.EstadoReplicas()
+        retrasos = {'lenta': 30.0, 'caida': DatabaseError('sin conexión'), 'sana': 0.0}
+
+        def medir(alias, latido, ahora):
+            if isinstance(retrasos[alias], Exception):
+                raise retrasos[alias]
+            return retrasos[alias]
+
+        with mock.patch.object(replicas, 'medir_retraso', medir), mock.patch.object(replicas, 'connections'):
+            with self.assertLogs('produccion.replicas', 'WARNING'):
+                self.assertEqual(estado.sanas(), {'sana': 1})
+            self.assertEqual(set(estado.expulsadas), {'lenta', 'caida'})
+            self.assertGreater(Latido.objects.get().fecha, hace_un_rato)   # latido renovado
+
+            # Hasta el próximo chequeo no se vuelve a medir; después vuelven las que se pusieron al día
+            retrasos.update(lenta=1.0, caida=0.0)
+            self.assertEqual(estado.sanas(), {'sana': 1})
+            estado.proximo_chequeo = 0
+            with self.assertLogs('produccion.replicas', 'WARNING') as registro:
+                self.assertEqual(estado.sanas(), {'lenta': 1, 'caida': 1, 'sana': 1})
+            self.assertEqual(len(registro.output), 2)
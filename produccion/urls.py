@@ -1,5 +1,5 @@
 from django.urls import path
-from . import views
+from . import views, api
 
 urlpatterns = [
     # Inicio
@@ -15,12 +15,16 @@ urlpatterns = [
     # Assets
     path('assets/', views.lista_assets, name='lista_assets'),
     path('assets/crear/', views.crear_asset, name='crear_asset'),
+    path('assets/exportar/', views.exportar_assets, name='exportar_assets'),
     path('assets/<int:id>/editar/', views.editar_asset, name='editar_asset'),
+    path('assets/<int:id>/descargar/', views.descargar_asset, name='descargar_asset'),
     path('assets/<int:id>/eliminar/', views.eliminar_asset, name='eliminar_asset'),
 
     # Tareas
     path('tareas/', views.lista_tareas, name='lista_tareas'),
     path('tareas/crear/', views.crear_tarea, name='crear_tarea'),
+    path('tareas/exportar/', views.exportar_tareas, name='exportar_tareas'),
+    path('tareas/acciones/', views.acciones_masivas_tareas, name='acciones_masivas_tareas'),
     path('tareas/<int:id>/editar/', views.editar_tarea, name='editar_tarea'),
     path('tareas/<int:id>/eliminar/', views.eliminar_tarea, name='eliminar_tarea'),
 
@@ -29,4 +33,29 @@ urlpatterns = [
     path('etiquetas/crear/', views.crear_etiqueta, name='crear_etiqueta'),
     path('etiquetas/<int:id>/editar/', views.editar_etiqueta, name='editar_etiqueta'),
     path('etiquetas/<int:id>/eliminar/', views.eliminar_etiqueta, name='eliminar_etiqueta'),
-]
+
+    # Importación masiva
+    path('importar/', views.importar_datos, name='importar_datos'),
+
+    # Vistas previas de los archivos (ver derivados.py)
+    path('derivados/<str:sha256>/<str:tipo>-<int:tamaño>.png', views.derivado, name='derivado'),
+
+    # Búsqueda
+    path('buscar/', views.buscar, name='buscar'),
+    path('buscar/sugerencias/', views.sugerencias_busqueda, name='sugerencias_busqueda'),
+    path('autocompletar/<str:tipo>/', views.opciones_autocompletar, name='opciones_autocompletar'),
+
+    # API JSON v1 (lectura, acciones masivas y subidas de archivos)
+    path('api/v1/proyectos/', api.proyectos, name='api_proyectos'),
+    path('api/v1/proyectos/<int:id>/', api.proyecto, name='api_proyecto'),
+    path('api/v1/proyectos/<int:id>/serie/', api.serie_proyecto, name='api_serie_proyecto'),
+    path('api/v1/tareas/', api.tareas, name='api_tareas'),
+    path('api/v1/tareas/acciones/', api.acciones_tareas, name='api_acciones_tareas'),
+    path('api/v1/tareas/<int:id>/', api.tarea, name='api_tarea'),
+    path('api/v1/assets/', api.assets, name='api_assets'),
+    path('api/v1/assets/<int:id>/', api.asset, name='api_asset'),
+    path('api/v1/etiquetas/', api.etiquetas, name='api_etiquetas'),
+    path('api/v1/actividad/', api.actividad, name='api_actividad'),
+    path('api/v1/subidas/', api.subidas, name='api_subidas'),
+    path('api/v1/subidas/<uuid:token>/', api.subida, name='api_subida'),
+]
\ No newline at end of file
@@ -1,35 +1,146 @@
+import os
+import re
+
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
-from .models import Proyecto, DetalleProyecto, Asset, Tarea, Etiqueta
-from .forms import ProyectoForm, DetalleProyectoForm, AssetForm, TareaForm, EtiquetaForm
+from django.db import IntegrityError, transaction
+from django.http import FileResponse, Http404, JsonResponse, StreamingHttpResponse
+from django.urls import reverse
+from django.views.decorators.http import require_POST, require_safe
+from django.template.loader import render_to_string
+from django.templatetags.static import static
+from . import almacen, autocompletar, busqueda, derivados, descargas, eliminacion
+from .acciones_masivas import seleccionar_tareas, aplicar, SeleccionInvalida
+from .cache_fragmentos import clave_fragmento, obtener_fragmento
+from .condicional import condicional, resumen_lista, resumen_tabla, validado
+from .exportacion import exportar, FORMATOS
+from .models import Proyecto, DetalleProyecto, Asset, Tarea, Etiqueta, ContadorGlobal, progreso_de_proyectos
+from .forms import ProyectoForm, DetalleProyectoForm, AssetForm, TareaForm, EtiquetaForm, ImportacionForm, AccionMasivaTareasForm
+from .importacion import importar_archivo
+from .filtros import filtrar_proyectos, filtrar_assets, filtrar_tareas
+from .paginacion import paginar
+
+# Nombre del proyecto/etiqueta por el que se está filtrando (para mostrarlo en la lista)
+def _nombre_filtrado(modelo, pk):
+    if not pk:
+        return None
+    return modelo.objects.filter(pk=pk).values_list('nombre', flat=True).first()
+
+
+# Consultas de las listas y del detalle tal como las ejecutan las vistas;
+# explain_hotpaths las usa para explicar los mismos planes
+def consulta_proyectos(params):
+    return filtrar_proyectos(Proyecto.objects.visibles().con_estadisticas(), params)
+
+
+def consulta_assets(params):
+    return filtrar_assets(Asset.objects.visibles().select_related('proyecto'), params)
+
+
+def consulta_tareas(params):
+    return filtrar_tareas(Tarea.objects.visibles().select_related('proyecto').prefetch_related('etiquetas'), params)
+
+
+def consulta_assets_de_proyecto(proyecto_id):
+    return Asset.objects.filter(proyecto_id=proyecto_id).select_related('archivo')
+
+
+def consulta_tareas_de_proyecto(proyecto_id):
+    return Tarea.objects.filter(proyecto_id=proyecto_id).prefetch_related('etiquetas')
+
 
 # ========== PÁGINA DE INICIO ==========
 def index(request):
-    total_proyectos = Proyecto.objects.count()
-    total_assets = Asset.objects.count()
-    total_tareas = Tarea.objects.count()
-    total_etiquetas = Etiqueta.objects.count()
+    # Una sola fila con los totales (se mantienen con señales, ver signals.py)
+    contador = ContadorGlobal.obtener()
     
     return render(request, 'produccion/index.html', {
-        'total_proyectos': total_proyectos,
-        'total_assets': total_assets,
-        'total_tareas': total_tareas,
-        'total_etiquetas': total_etiquetas,
+        'total_proyectos': contador.proyectos,
+        'total_assets': contador.assets,
+        'total_tareas': contador.tareas,
+        'total_etiquetas': contador.etiquetas,
     })
 
 
 # ========== VISTAS DE PROYECTOS ==========
+# Los validadores de GET condicional filtran igual que la vista, así un cambio
+# fuera del filtro no invalida la página (ver condicional.py)
+@condicional(lambda request: resumen_lista(filtrar_proyectos(Proyecto.objects.visibles(), request.GET), 'proyectos'))
 def lista_proyectos(request):
-    proyectos = Proyecto.objects.all()
+    proyectos, filtros = consulta_proyectos(request.GET)
+    pagina = paginar(proyectos, 'fecha_inicio', request.GET.get('cursor'))
     return render(request, 'produccion/proyectos/lista.html', {
-        'proyectos': proyectos
+        'proyectos': pagina,
+        'pagina': pagina,
+        'filtros': filtros,
+        'estados': Proyecto.ESTADO_CHOICES,
     })
 
 
+# fecha_actualizacion del proyecto cambia también con sus assets, tareas y detalle
+def _version_detalle(request, id):
+    return Proyecto.objects.visibles().filter(id=id).values_list('fecha_actualizacion', 'id').first()
+
+
+@condicional(_version_detalle)
 def detalle_proyecto(request, id):
-    proyecto = get_object_or_404(Proyecto, id=id)
+    # Cabecera, assets y tareas se cachean por separado con la fecha_actualizacion
+    # del proyecto en la clave (ver cache_fragmentos.py), la misma que ya leyó el
+    # validador: con la caché caliente esa es la única consulta de la vista.
+    version = validado(request) or _version_detalle(request, id)
+    if version is None:
+        raise Http404
+    fecha = version[0]
+    cargado = {}
+    
+    def obtener_proyecto():
+        if 'proyecto' not in cargado:
+            cargado['proyecto'] = get_object_or_404(Proyecto.objects.visibles().select_related('detalle'), id=id)
+        return cargado['proyecto']
+    
+    def generar_cabecera():
+        proyecto = obtener_proyecto()
+        progreso = progreso_de_proyectos([proyecto.id])[proyecto.id]
+        return {
+            'nombre': proyecto.nombre,
+            'html': render_to_string('produccion/proyectos/_cabecera.html', {
+                'proyecto': proyecto,
+                'progreso': progreso,
+                'tareas_por_estado': [
+                    (codigo, nombre, progreso['por_estado'][codigo]) for codigo, nombre in Tarea.ESTADO_CHOICES
+                ],
+                'tareas_por_prioridad': [
+                    (codigo, nombre, progreso['por_prioridad'][codigo]) for codigo, nombre in Tarea.PRIORIDAD_CHOICES
+                ],
+                'assets_por_tipo': [
+                    (codigo, nombre, progreso['assets_por_tipo'][codigo]) for codigo, nombre in Asset.TIPO_CHOICES
+                ],
+            }),
+        }
+    
+    def generar_assets():
+        obtener_proyecto()
+        assets = list(consulta_assets_de_proyecto(id))
+        for asset in assets:
+            asset.vista_previa = derivados.url(asset, 256)
+            asset.vista_previa_2x = derivados.url(asset, 512)
+        return render_to_string('produccion/proyectos/_assets.html', {
+            'assets': assets
+        })
+    
+    def generar_tareas():
+        obtener_proyecto()
+        return render_to_string('produccion/proyectos/_tareas.html', {
+            'tareas': list(consulta_tareas_de_proyecto(id))
+        })
+    
+    cabecera = obtener_fragmento(clave_fragmento(id, fecha, 'cabecera'), generar_cabecera)
     return render(request, 'produccion/proyectos/detalle.html', {
-        'proyecto': proyecto
+        'proyecto_id': id,
+        'nombre': cabecera['nombre'],
+        'cabecera': cabecera['html'],
+        'seccion_assets': obtener_fragmento(clave_fragmento(id, fecha, 'assets'), generar_assets),
+        'seccion_tareas': obtener_fragmento(clave_fragmento(id, fecha, 'tareas'), generar_tareas),
     })
 
 
@@ -58,7 +169,7 @@ def crear_proyecto(request):
 
 
 def editar_proyecto(request, id):
-    proyecto = get_object_or_404(Proyecto, id=id)
+    proyecto = get_object_or_404(Proyecto.objects.visibles(), id=id)
     detalle = proyecto.detalle
     
     if request.method == 'POST':
@@ -84,10 +195,11 @@ def editar_proyecto(request, id):
 
 
 def eliminar_proyecto(request, id):
-    proyecto = get_object_or_404(Proyecto, id=id)
+    proyecto = get_object_or_404(Proyecto.objects.visibles(), id=id)
     
     if request.method == 'POST':
-        proyecto.delete()
+        # Se oculta ya y sus assets y tareas se borran por lotes en segundo plano (ver eliminacion.py)
+        eliminacion.marcar(proyecto)
         messages.success(request, 'Proyecto eliminado exitosamente')
         return redirect('lista_proyectos')
     
@@ -98,16 +210,22 @@ def eliminar_proyecto(request, id):
 
 
 # ========== VISTAS DE ASSETS ==========
+@condicional(lambda request: resumen_lista(filtrar_assets(Asset.objects.visibles(), request.GET), 'assets', con_proyecto=True))
 def lista_assets(request):
-    assets = Asset.objects.select_related('proyecto').all()
+    assets, filtros = consulta_assets(request.GET)
+    pagina = paginar(assets, 'fecha_creacion', request.GET.get('cursor'))
     return render(request, 'produccion/assets/lista.html', {
-        'assets': assets
+        'assets': pagina,
+        'pagina': pagina,
+        'filtros': filtros,
+        'tipos': Asset.TIPO_CHOICES,
+        'filtro_proyecto': _nombre_filtrado(Proyecto, filtros.get('proyecto')),
     })
 
 
 def crear_asset(request):
     if request.method == 'POST':
-        form = AssetForm(request.POST)
+        form = AssetForm(request.POST, request.FILES)
         if form.is_valid():
             form.save()
             messages.success(request, 'Asset creado exitosamente')
@@ -122,10 +240,10 @@ def crear_asset(request):
 
 
 def editar_asset(request, id):
-    asset = get_object_or_404(Asset, id=id)
+    asset = get_object_or_404(Asset.objects.visibles(), id=id)
     
     if request.method == 'POST':
-        form = AssetForm(request.POST, instance=asset)
+        form = AssetForm(request.POST, request.FILES, instance=asset)
         if form.is_valid():
             form.save()
             messages.success(request, 'Asset actualizado exitosamente')
@@ -139,8 +257,21 @@ def editar_asset(request, id):
     })
 
 
+@require_safe
+def descargar_asset(request, id):
+    # Archivo del asset con Range, ETag (su sha256) y envío sin cargarlo en memoria (ver descargas.py)
+    asset = get_object_or_404(
+        Asset.objects.visibles().select_related('archivo').filter(archivo__isnull=False),
+        id=id,
+    )
+    respuesta = descargas.responder(request, asset.archivo, asset.nombre_archivo or asset.archivo.sha256)
+    if respuesta is None:
+        raise Http404
+    return respuesta
+
+
 def eliminar_asset(request, id):
-    asset = get_object_or_404(Asset, id=id)
+    asset = get_object_or_404(Asset.objects.visibles(), id=id)
     
     if request.method == 'POST':
         asset.delete()
@@ -154,13 +285,58 @@ def eliminar_asset(request, id):
 
 
 # ========== VISTAS DE TAREAS ==========
+@condicional(lambda request: resumen_lista(filtrar_tareas(Tarea.objects.visibles(), request.GET), 'tareas', con_proyecto=True))
 def lista_tareas(request):
-    tareas = Tarea.objects.select_related('proyecto').prefetch_related('etiquetas').all()
+    tareas, filtros = consulta_tareas(request.GET)
+    pagina = paginar(tareas, 'fecha_creacion', request.GET.get('cursor'))
     return render(request, 'produccion/tareas/lista.html', {
-        'tareas': tareas
+        'tareas': pagina,
+        'pagina': pagina,
+        'filtros': filtros,
+        'estados': Tarea.ESTADO_CHOICES,
+        'prioridades': Tarea.PRIORIDAD_CHOICES,
+        'filtro_proyecto': _nombre_filtrado(Proyecto, filtros.get('proyecto')),
+        'filtro_etiqueta': _nombre_filtrado(Etiqueta, filtros.get('etiqueta')),
+        'form_masivo': AccionMasivaTareasForm(),
     })
 
 
+@require_POST
+def acciones_masivas_tareas(request):
+    # Los filtros de la lista vienen en la URL (?estado=...&proyecto=...) y se
+    # usan cuando el alcance es "todas las filtradas"
+    volver = reverse('lista_tareas') + (f'?{request.GET.urlencode()}' if request.GET else '')
+    form = AccionMasivaTareasForm(request.POST)
+    if not form.is_valid():
+        for errores in form.errors.values():
+            messages.error(request, ' '.join(errores))
+        return redirect(volver)
+    
+    datos = form.cleaned_data
+    try:
+        if datos['alcance'] == 'filtradas':
+            tareas = seleccionar_tareas(filtros=request.GET)
+        else:
+            tareas = seleccionar_tareas(ids=request.POST.getlist('ids'))
+        resultado = aplicar(
+            tareas,
+            estado=datos['estado'] or None,
+            prioridad=datos['prioridad'] or None,
+            agregar_etiquetas=[etiqueta.pk for etiqueta in datos['agregar_etiquetas']],
+            quitar_etiquetas=[etiqueta.pk for etiqueta in datos['quitar_etiquetas']],
+        )
+    except SeleccionInvalida as error:
+        messages.error(request, str(error))
+        return redirect(volver)
+    
+    messages.success(
+        request,
+        f"{resultado['seleccionadas']} tareas modificadas "
+        f"({resultado['etiquetas_agregadas']} etiquetas agregadas, {resultado['etiquetas_quitadas']} quitadas)"
+    )
+    return redirect(volver)
+
+
 def crear_tarea(request):
     if request.method == 'POST':
         form = TareaForm(request.POST)
@@ -178,7 +354,7 @@ def crear_tarea(request):
 
 
 def editar_tarea(request, id):
-    tarea = get_object_or_404(Tarea, id=id)
+    tarea = get_object_or_404(Tarea.objects.visibles(), id=id)
     
     if request.method == 'POST':
         form = TareaForm(request.POST, instance=tarea)
@@ -196,7 +372,7 @@ def editar_tarea(request, id):
 
 
 def eliminar_tarea(request, id):
-    tarea = get_object_or_404(Tarea, id=id)
+    tarea = get_object_or_404(Tarea.objects.visibles(), id=id)
     
     if request.method == 'POST':
         tarea.delete()
@@ -210,6 +386,7 @@ def eliminar_tarea(request, id):
 
 
 # ========== VISTAS DE ETIQUETAS ==========
+@condicional(lambda request: resumen_tabla(Etiqueta, 'etiquetas'))
 def lista_etiquetas(request):
     etiquetas = Etiqueta.objects.all()
     return render(request, 'produccion/etiquetas/lista.html', {
@@ -217,11 +394,22 @@ def lista_etiquetas(request):
     })
 
 
+def _guardar_etiqueta(form):
+    # clean_nombre ya descarta duplicados, pero dos altas simultáneas pueden
+    # pasar las dos la validación: el unique de nombre_normalizado decide
+    try:
+        with transaction.atomic():
+            form.save()
+    except IntegrityError:
+        form.add_error('nombre', f'Ya existe una etiqueta con el nombre "{form.cleaned_data["nombre"]}".')
+        return False
+    return True
+
+
 def crear_etiqueta(request):
     if request.method == 'POST':
         form = EtiquetaForm(request.POST)
-        if form.is_valid():
-            form.save()
+        if form.is_valid() and _guardar_etiqueta(form):
             messages.success(request, 'Etiqueta creada exitosamente')
             return redirect('lista_etiquetas')
     else:
@@ -238,8 +426,7 @@ def editar_etiqueta(request, id):
     
     if request.method == 'POST':
         form = EtiquetaForm(request.POST, instance=etiqueta)
-        if form.is_valid():
-            form.save()
+        if form.is_valid() and _guardar_etiqueta(form):
             messages.success(request, 'Etiqueta actualizada exitosamente')
             return redirect('lista_etiquetas')
     else:
@@ -262,4 +449,107 @@ def eliminar_etiqueta(request, id):
     return render(request, 'produccion/confirmar_eliminacion.html', {
         'objeto': etiqueta,
         'tipo': 'etiqueta'
-    })
\ No newline at end of file
+    })
+
+
+# ========== IMPORTACIÓN MASIVA ==========
+def importar_datos(request):
+    resultado = None
+    
+    if request.method == 'POST':
+        form = ImportacionForm(request.POST, request.FILES)
+        if form.is_valid():
+            resultado = importar_archivo(request.FILES['archivo'], form.cleaned_data['tipo'])
+            if resultado.creados:
+                messages.success(request, f'Importación terminada: {resultado.resumen()}')
+            else:
+                messages.error(request, 'No se importó ninguna fila. Revisa los errores.')
+    else:
+        form = ImportacionForm()
+    
+    return render(request, 'produccion/importar.html', {
+        'form': form,
+        'resultado': resultado,
+    })
+
+
+# ========== EXPORTACIÓN EN STREAMING ==========
+def _respuesta_exportacion(request, tipo, queryset):
+    formato = request.GET.get('formato')
+    if formato not in FORMATOS:
+        formato = 'csv'
+    respuesta = StreamingHttpResponse(
+        exportar(tipo, formato, queryset),
+        content_type=FORMATOS[formato]
+    )
+    respuesta['Content-Disposition'] = f'attachment; filename="{tipo}.{formato}"'
+    return respuesta
+
+
+def exportar_tareas(request):
+    # Respeta los mismos filtros de la lista (estado, prioridad, proyecto, etiqueta)
+    tareas, _ = filtrar_tareas(Tarea.objects.visibles(), request.GET)
+    return _respuesta_exportacion(request, 'tareas', tareas)
+
+
+def exportar_assets(request):
+    assets, _ = filtrar_assets(Asset.objects.visibles(), request.GET)
+    return _respuesta_exportacion(request, 'assets', assets)
+
+
+# ========== BÚSQUEDA ==========
+def buscar(request):
+    consulta = request.GET.get('q', '').strip()
+    resultados = busqueda.buscar(consulta) if consulta else []
+    return render(request, 'produccion/buscar.html', {
+        'consulta': consulta,
+        'resultados': resultados,
+    })
+
+
+def sugerencias_busqueda(request):
+    # Typeahead del buscador: JSON liviano, la última palabra cuenta como prefijo
+    consulta = request.GET.get('q', '').strip()
+    resultados = busqueda.sugerir(consulta) if len(consulta) >= 2 else []
+    return JsonResponse({
+        'consulta': consulta,
+        'resultados': [
+            {'tipo': r['tipo'], 'id': r['id'], 'titulo': r['titulo'], 'url': r['url']}
+            for r in resultados
+        ],
+    })
+
+
+def opciones_autocompletar(request, tipo):
+    # Opciones de los selectores de proyecto/etiquetas de los formularios (ver autocompletar.py)
+    if tipo not in autocompletar.FUENTES:
+        raise Http404
+    consulta = request.GET.get('q', '').strip()
+    return JsonResponse({
+        'consulta': consulta,
+        'resultados': autocompletar.buscar(tipo, consulta),
+    })
+
+
+# ========== VISTAS PREVIAS ==========
+SHA256_VALIDO = re.compile(r'[0-9a-f]{64}')
+
+
+def derivado(request, sha256, tipo, tamaño):
+    # Vista previa de un archivo (ver derivados.py). El nombre lleva el sha256
+    # del contenido, así que una vez generada se cachea para siempre; si todavía
+    # no está se encarga al pool y se redirige a una imagen genérica.
+    if not SHA256_VALIDO.fullmatch(sha256) or tipo not in derivados.TIPO_DERIVADO.values() or tamaño not in derivados.TAMAÑOS:
+        raise Http404
+    ruta = derivados.ruta(sha256, tipo, tamaño)
+    try:
+        respuesta = FileResponse(open(ruta, 'rb'), content_type='image/png')
+    except FileNotFoundError:
+        if not os.path.exists(almacen.ruta(sha256)):
+            raise Http404
+        if not os.path.exists(derivados.ruta_fallo(sha256, tipo)):
+            derivados.encargar(sha256, tipo)
+        return redirect(static('produccion/img/vista_previa.svg'))
+    derivados.cache.renovar(ruta)
+    respuesta['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return respuesta
@@ -0,0 +1,190 @@
+import array
+import math
+import os
+import struct
+import sys
+import tempfile
+import wave
+
+from PIL import Image, ImageDraw
+
+
+# Generadores de vistas previas. Corren en los procesos del pool de
+# derivados.py (o del comando generar_derivados), así que este módulo no
+# importa nada de Django: solo lee el archivo original y escribe PNGs.
+# Cada generador decodifica el original una vez y produce todos los tamaños.
+#   miniatura: imágenes (sprites), reducidas de mayor a menor
+#   modelo:    nube de puntos en vista isométrica de un OBJ o STL (ASCII o binario)
+#   onda:      forma de onda de un WAV PCM (8, 16, 24 o 32 bits)
+
+FONDO = (248, 249, 250)
+COLOR_ONDA = (13, 110, 253)
+MAXIMO_VERTICES = 200_000
+
+# PCM de 8 bits es sin signo (centro en 128): se pasa a con signo con translate()
+_CON_SIGNO_8 = bytes((valor - 128) & 0xFF for valor in range(256))
+# Bits de las muestras después de _muestras() (las de 24 bits quedan en 16)
+_BITS = {1: 8, 2: 16, 3: 16, 4: 32}
+
+
+def _guardar(imagen, destino):
+    # Escritura atómica: un request nunca ve un PNG a medio escribir
+    carpeta = os.path.dirname(destino)
+    os.makedirs(carpeta, exist_ok=True)
+    descriptor, temporal = tempfile.mkstemp(dir=carpeta, suffix='.tmp')
+    try:
+        with os.fdopen(descriptor, 'wb') as salida:
+            imagen.save(salida, 'PNG', optimize=True)
+        os.chmod(temporal, 0o644)
+        os.replace(temporal, destino)
+    except BaseException:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+        raise
+    return os.path.getsize(destino)
+
+
+def _reducir(imagen, destinos):
+    # Del tamaño mayor al menor, cada uno a partir del anterior
+    escritos = 0
+    for tamaño in sorted(destinos, reverse=True):
+        imagen.thumbnail((tamaño, tamaño), Image.Resampling.LANCZOS)
+        escritos += _guardar(imagen, destinos[tamaño])
+    return escritos
+
+
+# ========== MINIATURAS ==========
+def miniatura(origen, destinos):
+    mayor = max(destinos)
+    with Image.open(origen) as imagen:
+        imagen.draft('RGB', (mayor, mayor))  # JPEG: decodifica directamente reducida
+        transparente = imagen.mode in ('RGBA', 'LA', 'PA') or 'transparency' in imagen.info
+        imagen = imagen.convert('RGBA' if transparente else 'RGB')
+    return _reducir(imagen, destinos)
+
+
+# ========== MODELOS 3D ==========
+def _vertices_stl_binario(archivo, triangulos):
+    # 50 bytes por triángulo: normal + 3 vértices (12 floats) + atributo
+    paso = max(1, triangulos * 3 // MAXIMO_VERTICES)
+    registro = struct.Struct('<12x9f2x')
+    archivo.seek(84)
+    for indice in range(triangulos):
+        datos = archivo.read(50)
+        if len(datos) < 50:
+            break
+        if indice % paso == 0:
+            valores = registro.unpack(datos)
+            for i in range(0, 9, 3):
+                yield valores[i:i + 3]
+
+
+def _vertices_texto(archivo, tamaño_archivo):
+    # OBJ ("v x y z") y STL ASCII ("vertex x y z"); unos 30 bytes por vértice
+    paso = max(1, tamaño_archivo // 30 // MAXIMO_VERTICES)
+    contador = 0
+    for linea in archivo:
+        partes = linea.split()
+        if len(partes) >= 4 and partes[0] in (b'v', b'vertex'):
+            contador += 1
+            if contador % paso == 0:
+                yield tuple(float(valor) for valor in partes[1:4])
+
+
+def _vertices(origen):
+    tamaño_archivo = os.path.getsize(origen)
+    with open(origen, 'rb') as archivo:
+        cabecera = archivo.read(84)
+        if len(cabecera) == 84:
+            triangulos = struct.unpack('<I', cabecera[80:84])[0]
+            if 84 + 50 * triangulos == tamaño_archivo:
+                return list(_vertices_stl_binario(archivo, triangulos))
+        archivo.seek(0)
+        return list(_vertices_texto(archivo, tamaño_archivo))
+
+
+def modelo(origen, destinos):
+    vertices = _vertices(origen)
+    if not vertices:
+        raise ValueError('No se encontraron vértices (se aceptan OBJ y STL).')
+
+    # Proyección isométrica; la profundidad da el tono (lo cercano más oscuro)
+    coseno, seno = math.cos(math.radians(30)), math.sin(math.radians(30))
+    puntos = [((x - z) * coseno, y - (x + z) * seno, x + z + y) for x, y, z in vertices]
+    xs, ys, zs = zip(*puntos)
+    minimo_x, minimo_y, minimo_z = min(xs), min(ys), min(zs)
+    lado = max(destinos)
+    margen = lado * 0.05
+    escala = (lado - 2 * margen) / max(max(xs) - minimo_x, max(ys) - minimo_y, 1e-9)
+    rango_z = max(max(zs) - minimo_z, 1e-9)
+
+    niveles = 8
+    grupos = [[] for _ in range(niveles)]
+    for x, y, z in puntos:
+        nivel = min(int((z - minimo_z) / rango_z * niveles), niveles - 1)
+        grupos[nivel].append((margen + (x - minimo_x) * escala, lado - margen - (y - minimo_y) * escala))
+
+    imagen = Image.new('RGB', (lado, lado), FONDO)
+    dibujo = ImageDraw.Draw(imagen)
+    for nivel, grupo in enumerate(grupos):  # del fondo hacia adelante
+        tono = 190 - nivel * 150 // niveles
+        dibujo.point(grupo, fill=(tono, tono, tono + 30))
+    return _reducir(imagen, destinos)
+
+
+# ========== FORMAS DE ONDA ==========
+def _muestras(datos, ancho):
+    # Bytes PCM little-endian -> array de enteros con signo
+    if ancho == 1:
+        return array.array('b', datos.translate(_CON_SIGNO_8))
+    if ancho == 3:
+        # Se quedan los 2 bytes altos de cada muestra: alcanza para dibujar
+        recortado = bytearray(len(datos) // 3 * 2)
+        recortado[0::2] = datos[1::3]
+        recortado[1::2] = datos[2::3]
+        datos, ancho = bytes(recortado), 2
+    muestras = array.array('h' if ancho == 2 else 'i', datos)
+    if sys.byteorder == 'big':
+        muestras.byteswap()
+    return muestras
+
+
+def onda(origen, destinos):
+    columnas = max(destinos)
+    alto = columnas // 4
+    with wave.open(origen, 'rb') as audio:
+        ancho = audio.getsampwidth()
+        por_columna = max(1, math.ceil(audio.getnframes() / columnas))
+        picos = []
+        while datos := audio.readframes(por_columna):
+            muestras = _muestras(datos, ancho)
+            picos.append((min(muestras), max(muestras)))
+    if not picos:
+        raise ValueError('El audio no tiene muestras.')
+
+    escala = (alto / 2 - 1) / (1 << (_BITS[ancho] - 1))
+    imagen = Image.new('RGB', (columnas, alto), FONDO)
+    dibujo = ImageDraw.Draw(imagen)
+    centro = alto / 2
+    for x, (minimo, maximo) in enumerate(picos):
+        dibujo.line([(x, centro - maximo * escala), (x, centro - minimo * escala)], fill=COLOR_ONDA)
+    return _reducir(imagen, destinos)
+
+
+GENERADORES = {
+    'miniatura': miniatura,
+    'modelo': modelo,
+    'onda': onda,
+}
+
+
+def generar(tipo, origen, destinos, fallo):
+    # Punto de entrada del pool. Devuelve los bytes escritos; si el original no
+    # se puede leer deja el archivo `fallo` para no reintentarlo en cada request.
+    try:
+        return GENERADORES[tipo](origen, destinos)
+    except Exception as error:  # formato no soportado, archivo dañado, ...
+        os.makedirs(os.path.dirname(fallo), exist_ok=True)
+        with open(fallo, 'w') as marca:
+            marca.write(f'{type(error).__name__}: {error}\n')
+        return 0